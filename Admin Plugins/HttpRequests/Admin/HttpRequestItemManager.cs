@@ -208,6 +208,13 @@ namespace HttpRequests.Admin
             CurrentItem.Properties["SkipCertValidation"] = "No";
             CurrentItem.Properties["IncludeEventData"] = "Yes";
             CurrentItem.Properties["TimeoutMs"] = "10000";
+            CurrentItem.Properties["RetryCount"] = "0";
+            CurrentItem.Properties["RetryDelayMs"] = "1000";
+            CurrentItem.Properties["BreakerThreshold"] = "5";
+            CurrentItem.Properties["BatchEnabled"] = "No";
+            CurrentItem.Properties["BatchMaxSize"] = "50";
+            CurrentItem.Properties["BatchLingerMs"] = "1000";
+            CurrentItem.Properties["BatchCoalesce"] = "No";
             CurrentItem.Properties["AuthType"] = "None";
             CurrentItem.Properties["AuthValue"] = "";
 
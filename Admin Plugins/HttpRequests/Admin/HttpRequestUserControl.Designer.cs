@@ -53,6 +53,21 @@ namespace HttpRequests.Admin
             this._txtTimeout = new System.Windows.Forms.TextBox();
             this._lblTimeoutUnit = new System.Windows.Forms.Label();
             this._chkSkipCertValidation = new System.Windows.Forms.CheckBox();
+            this._lblRetries = new System.Windows.Forms.Label();
+            this._txtRetries = new System.Windows.Forms.TextBox();
+            this._lblRetryDelay = new System.Windows.Forms.Label();
+            this._txtRetryDelay = new System.Windows.Forms.TextBox();
+            this._lblRetryDelayUnit = new System.Windows.Forms.Label();
+            this._lblBreaker = new System.Windows.Forms.Label();
+            this._txtBreaker = new System.Windows.Forms.TextBox();
+            this._lblBreakerUnit = new System.Windows.Forms.Label();
+            this._chkBatchEnabled = new System.Windows.Forms.CheckBox();
+            this._lblBatchMaxSize = new System.Windows.Forms.Label();
+            this._txtBatchMaxSize = new System.Windows.Forms.TextBox();
+            this._lblBatchLinger = new System.Windows.Forms.Label();
+            this._txtBatchLinger = new System.Windows.Forms.TextBox();
+            this._lblBatchLingerUnit = new System.Windows.Forms.Label();
+            this._chkBatchCoalesce = new System.Windows.Forms.CheckBox();
             this._btnTest = new System.Windows.Forms.Button();
             this._grpTestResult = new System.Windows.Forms.GroupBox();
             this._lblTestStatus = new System.Windows.Forms.Label();
@@ -495,6 +510,21 @@ namespace HttpRequests.Admin
             this._tabOptions.Controls.Add(this._txtTimeout);
             this._tabOptions.Controls.Add(this._lblTimeoutUnit);
             this._tabOptions.Controls.Add(this._chkSkipCertValidation);
+            this._tabOptions.Controls.Add(this._lblRetries);
+            this._tabOptions.Controls.Add(this._txtRetries);
+            this._tabOptions.Controls.Add(this._lblRetryDelay);
+            this._tabOptions.Controls.Add(this._txtRetryDelay);
+            this._tabOptions.Controls.Add(this._lblRetryDelayUnit);
+            this._tabOptions.Controls.Add(this._lblBreaker);
+            this._tabOptions.Controls.Add(this._txtBreaker);
+            this._tabOptions.Controls.Add(this._lblBreakerUnit);
+            this._tabOptions.Controls.Add(this._chkBatchEnabled);
+            this._tabOptions.Controls.Add(this._lblBatchMaxSize);
+            this._tabOptions.Controls.Add(this._txtBatchMaxSize);
+            this._tabOptions.Controls.Add(this._lblBatchLinger);
+            this._tabOptions.Controls.Add(this._txtBatchLinger);
+            this._tabOptions.Controls.Add(this._lblBatchLingerUnit);
+            this._tabOptions.Controls.Add(this._chkBatchCoalesce);
             this._tabOptions.Location = new System.Drawing.Point(4, 22);
             this._tabOptions.Name = "_tabOptions";
             this._tabOptions.Padding = new System.Windows.Forms.Padding(6);
@@ -528,6 +558,72 @@ namespace HttpRequests.Admin
             this._lblTimeoutUnit.TabIndex = 2;
             this._lblTimeoutUnit.Text = "ms";
             //
+            // _lblRetries
+            //
+            this._lblRetries.AutoSize = true;
+            this._lblRetries.Location = new System.Drawing.Point(200, 14);
+            this._lblRetries.Name = "_lblRetries";
+            this._lblRetries.TabIndex = 11;
+            this._lblRetries.Text = "Retries:";
+            //
+            // _txtRetries
+            //
+            this._txtRetries.Location = new System.Drawing.Point(250, 11);
+            this._txtRetries.Name = "_txtRetries";
+            this._txtRetries.Size = new System.Drawing.Size(36, 20);
+            this._txtRetries.TabIndex = 12;
+            this._txtRetries.TextChanged += new System.EventHandler(this.OnUserChange);
+            //
+            // _lblRetryDelay
+            //
+            this._lblRetryDelay.AutoSize = true;
+            this._lblRetryDelay.Location = new System.Drawing.Point(300, 14);
+            this._lblRetryDelay.Name = "_lblRetryDelay";
+            this._lblRetryDelay.TabIndex = 13;
+            this._lblRetryDelay.Text = "First retry after:";
+            //
+            // _txtRetryDelay
+            //
+            this._txtRetryDelay.Location = new System.Drawing.Point(384, 11);
+            this._txtRetryDelay.Name = "_txtRetryDelay";
+            this._txtRetryDelay.Size = new System.Drawing.Size(56, 20);
+            this._txtRetryDelay.TabIndex = 14;
+            this._txtRetryDelay.TextChanged += new System.EventHandler(this.OnUserChange);
+            //
+            // _lblRetryDelayUnit
+            //
+            this._lblRetryDelayUnit.AutoSize = true;
+            this._lblRetryDelayUnit.ForeColor = System.Drawing.SystemColors.GrayText;
+            this._lblRetryDelayUnit.Location = new System.Drawing.Point(444, 14);
+            this._lblRetryDelayUnit.Name = "_lblRetryDelayUnit";
+            this._lblRetryDelayUnit.TabIndex = 15;
+            this._lblRetryDelayUnit.Text = "ms";
+            //
+            // _lblBreaker
+            //
+            this._lblBreaker.AutoSize = true;
+            this._lblBreaker.Location = new System.Drawing.Point(256, 43);
+            this._lblBreaker.Name = "_lblBreaker";
+            this._lblBreaker.TabIndex = 16;
+            this._lblBreaker.Text = "Open circuit after:";
+            //
+            // _txtBreaker
+            //
+            this._txtBreaker.Location = new System.Drawing.Point(350, 40);
+            this._txtBreaker.Name = "_txtBreaker";
+            this._txtBreaker.Size = new System.Drawing.Size(36, 20);
+            this._txtBreaker.TabIndex = 17;
+            this._txtBreaker.TextChanged += new System.EventHandler(this.OnUserChange);
+            //
+            // _lblBreakerUnit
+            //
+            this._lblBreakerUnit.AutoSize = true;
+            this._lblBreakerUnit.ForeColor = System.Drawing.SystemColors.GrayText;
+            this._lblBreakerUnit.Location = new System.Drawing.Point(390, 43);
+            this._lblBreakerUnit.Name = "_lblBreakerUnit";
+            this._lblBreakerUnit.TabIndex = 18;
+            this._lblBreakerUnit.Text = "failures (0 = off)";
+            //
             // _chkSkipCertValidation
             //
             this._chkSkipCertValidation.AutoSize = true;
@@ -538,6 +634,69 @@ namespace HttpRequests.Admin
             this._chkSkipCertValidation.Text = "Skip HTTPS certificate validation (self-signed)";
             this._chkSkipCertValidation.UseVisualStyleBackColor = true;
             this._chkSkipCertValidation.CheckedChanged += new System.EventHandler(this.OnUserChange);
+            //
+            // _chkBatchEnabled
+            //
+            this._chkBatchEnabled.AutoSize = true;
+            this._chkBatchEnabled.Location = new System.Drawing.Point(10, 70);
+            this._chkBatchEnabled.Name = "_chkBatchEnabled";
+            this._chkBatchEnabled.Size = new System.Drawing.Size(262, 17);
+            this._chkBatchEnabled.TabIndex = 4;
+            this._chkBatchEnabled.Text = "Batch events into one JSON array per time window";
+            this._chkBatchEnabled.UseVisualStyleBackColor = true;
+            this._chkBatchEnabled.CheckedChanged += new System.EventHandler(this.OnBatchEnabledChanged);
+            //
+            // _lblBatchMaxSize
+            //
+            this._lblBatchMaxSize.AutoSize = true;
+            this._lblBatchMaxSize.Location = new System.Drawing.Point(28, 97);
+            this._lblBatchMaxSize.Name = "_lblBatchMaxSize";
+            this._lblBatchMaxSize.TabIndex = 5;
+            this._lblBatchMaxSize.Text = "Max events:";
+            //
+            // _txtBatchMaxSize
+            //
+            this._txtBatchMaxSize.Location = new System.Drawing.Point(100, 94);
+            this._txtBatchMaxSize.Name = "_txtBatchMaxSize";
+            this._txtBatchMaxSize.Size = new System.Drawing.Size(50, 20);
+            this._txtBatchMaxSize.TabIndex = 6;
+            this._txtBatchMaxSize.TextChanged += new System.EventHandler(this.OnUserChange);
+            //
+            // _lblBatchLinger
+            //
+            this._lblBatchLinger.AutoSize = true;
+            this._lblBatchLinger.Location = new System.Drawing.Point(170, 97);
+            this._lblBatchLinger.Name = "_lblBatchLinger";
+            this._lblBatchLinger.TabIndex = 7;
+            this._lblBatchLinger.Text = "Max wait:";
+            //
+            // _txtBatchLinger
+            //
+            this._txtBatchLinger.Location = new System.Drawing.Point(230, 94);
+            this._txtBatchLinger.Name = "_txtBatchLinger";
+            this._txtBatchLinger.Size = new System.Drawing.Size(60, 20);
+            this._txtBatchLinger.TabIndex = 8;
+            this._txtBatchLinger.TextChanged += new System.EventHandler(this.OnUserChange);
+            //
+            // _lblBatchLingerUnit
+            //
+            this._lblBatchLingerUnit.AutoSize = true;
+            this._lblBatchLingerUnit.ForeColor = System.Drawing.SystemColors.GrayText;
+            this._lblBatchLingerUnit.Location = new System.Drawing.Point(294, 97);
+            this._lblBatchLingerUnit.Name = "_lblBatchLingerUnit";
+            this._lblBatchLingerUnit.TabIndex = 9;
+            this._lblBatchLingerUnit.Text = "ms";
+            //
+            // _chkBatchCoalesce
+            //
+            this._chkBatchCoalesce.AutoSize = true;
+            this._chkBatchCoalesce.Location = new System.Drawing.Point(28, 122);
+            this._chkBatchCoalesce.Name = "_chkBatchCoalesce";
+            this._chkBatchCoalesce.Size = new System.Drawing.Size(300, 17);
+            this._chkBatchCoalesce.TabIndex = 10;
+            this._chkBatchCoalesce.Text = "Coalesce repeats from the same source and event type";
+            this._chkBatchCoalesce.UseVisualStyleBackColor = true;
+            this._chkBatchCoalesce.CheckedChanged += new System.EventHandler(this.OnUserChange);
             // ════════════════════════════════════════════════
             // RIGHT COLUMN - Test (x=510, width=278)
             // ════════════════════════════════════════════════
@@ -665,6 +824,21 @@ namespace HttpRequests.Admin
         private System.Windows.Forms.TextBox _txtTimeout;
         private System.Windows.Forms.Label _lblTimeoutUnit;
         private System.Windows.Forms.CheckBox _chkSkipCertValidation;
+        private System.Windows.Forms.Label _lblRetries;
+        private System.Windows.Forms.TextBox _txtRetries;
+        private System.Windows.Forms.Label _lblRetryDelay;
+        private System.Windows.Forms.TextBox _txtRetryDelay;
+        private System.Windows.Forms.Label _lblRetryDelayUnit;
+        private System.Windows.Forms.Label _lblBreaker;
+        private System.Windows.Forms.TextBox _txtBreaker;
+        private System.Windows.Forms.Label _lblBreakerUnit;
+        private System.Windows.Forms.CheckBox _chkBatchEnabled;
+        private System.Windows.Forms.Label _lblBatchMaxSize;
+        private System.Windows.Forms.TextBox _txtBatchMaxSize;
+        private System.Windows.Forms.Label _lblBatchLinger;
+        private System.Windows.Forms.TextBox _txtBatchLinger;
+        private System.Windows.Forms.Label _lblBatchLingerUnit;
+        private System.Windows.Forms.CheckBox _chkBatchCoalesce;
         private System.Windows.Forms.Button _btnTest;
         private System.Windows.Forms.GroupBox _grpTestResult;
         private System.Windows.Forms.Label _lblTestStatus;
@@ -63,6 +63,14 @@ namespace HttpRequests.Admin
             _chkIncludeEventData.Checked = GetProp(item, "IncludeEventData", "Yes") != "No";
 
             _txtTimeout.Text = GetProp(item, "TimeoutMs", "10000");
+            _txtRetries.Text = GetProp(item, "RetryCount", "0");
+            _txtRetryDelay.Text = GetProp(item, "RetryDelayMs", "1000");
+            _txtBreaker.Text = GetProp(item, "BreakerThreshold", CircuitBreakerSettings.DefaultFailureThreshold.ToString());
+
+            _chkBatchEnabled.Checked = GetProp(item, "BatchEnabled", "No") == "Yes";
+            _txtBatchMaxSize.Text = GetProp(item, "BatchMaxSize", "50");
+            _txtBatchLinger.Text = GetProp(item, "BatchLingerMs", "1000");
+            _chkBatchCoalesce.Checked = GetProp(item, "BatchCoalesce", "No") == "Yes";
 
             // Auth
             var authType = GetProp(item, "AuthType", "None");
@@ -81,6 +89,7 @@ namespace HttpRequests.Admin
             UpdateBodyVisibility();
             UpdatePayloadUI();
             UpdateAuthUI();
+            UpdateBatchUI();
         }
 
         public string ValidateInput()
@@ -100,6 +109,23 @@ namespace HttpRequests.Admin
                 !int.TryParse(_txtTimeout.Text.Trim(), out _))
                 return "Timeout must be a number (milliseconds).";
 
+            if (!int.TryParse(_txtRetries.Text.Trim(), out var retries) || retries < 0 || retries > CompiledRequest.MaxRetries)
+                return $"Retries must be a number from 0 to {CompiledRequest.MaxRetries}.";
+
+            if (!int.TryParse(_txtRetryDelay.Text.Trim(), out var retryDelay) || retryDelay < 1)
+                return "First retry delay must be a positive number (milliseconds).";
+
+            if (!int.TryParse(_txtBreaker.Text.Trim(), out var breaker) || breaker < 0 || breaker > CircuitBreakerSettings.MaxFailureThreshold)
+                return $"Open circuit after must be a number from 0 (off) to {CircuitBreakerSettings.MaxFailureThreshold} failures.";
+
+            if (_chkBatchEnabled.Checked)
+            {
+                if (!int.TryParse(_txtBatchMaxSize.Text.Trim(), out var maxSize) || maxSize < 1)
+                    return "Max events per batch must be a positive number.";
+                if (!int.TryParse(_txtBatchLinger.Text.Trim(), out var linger) || linger < 1)
+                    return "Batch max wait must be a positive number (milliseconds).";
+            }
+
             var authType = _cboAuthType.SelectedItem?.ToString() ?? "None";
             if (authType == "Basic" || authType == "Digest")
             {
@@ -136,6 +162,13 @@ namespace HttpRequests.Admin
             item.Properties["SkipCertValidation"] = _chkSkipCertValidation.Checked ? "Yes" : "No";
             item.Properties["IncludeEventData"] = _chkIncludeEventData.Checked ? "Yes" : "No";
             item.Properties["TimeoutMs"] = _txtTimeout.Text.Trim();
+            item.Properties["RetryCount"] = _txtRetries.Text.Trim();
+            item.Properties["RetryDelayMs"] = _txtRetryDelay.Text.Trim();
+            item.Properties["BreakerThreshold"] = _txtBreaker.Text.Trim();
+            item.Properties["BatchEnabled"] = _chkBatchEnabled.Checked ? "Yes" : "No";
+            item.Properties["BatchMaxSize"] = _txtBatchMaxSize.Text.Trim();
+            item.Properties["BatchLingerMs"] = _txtBatchLinger.Text.Trim();
+            item.Properties["BatchCoalesce"] = _chkBatchCoalesce.Checked ? "Yes" : "No";
             item.Properties["AuthType"] = _cboAuthType.SelectedItem?.ToString() ?? "None";
             item.Properties["AuthUsername"] = _txtAuthUsername.Text;
             item.Properties["AuthPassword"] = _txtAuthPassword.Text;
@@ -163,6 +196,13 @@ namespace HttpRequests.Admin
             _chkSkipCertValidation.Checked = false;
             _chkIncludeEventData.Checked = true;
             _txtTimeout.Text = "10000";
+            _txtRetries.Text = "0";
+            _txtRetryDelay.Text = "1000";
+            _txtBreaker.Text = CircuitBreakerSettings.DefaultFailureThreshold.ToString();
+            _chkBatchEnabled.Checked = false;
+            _txtBatchMaxSize.Text = "50";
+            _txtBatchLinger.Text = "1000";
+            _chkBatchCoalesce.Checked = false;
             _cboAuthType.SelectedItem = "None";
             _txtAuthUsername.Text = "";
             _txtAuthPassword.Text = "";
@@ -174,6 +214,7 @@ namespace HttpRequests.Admin
             UpdateBodyVisibility();
             UpdatePayloadUI();
             UpdateAuthUI();
+            UpdateBatchUI();
         }
 
         // ─── Duplicate ──────────────────────────────────────
@@ -292,6 +333,7 @@ namespace HttpRequests.Admin
         private void OnPayloadTypeChanged(object sender, EventArgs e)
         {
             UpdatePayloadUI();
+            UpdateBatchUI();
             OnUserChange(sender, e);
         }
 
@@ -333,6 +375,24 @@ namespace HttpRequests.Admin
             _txtAuthToken.Visible = showToken;
         }
 
+        private void OnBatchEnabledChanged(object sender, EventArgs e)
+        {
+            UpdateBatchUI();
+            OnUserChange(sender, e);
+        }
+
+        private void UpdateBatchUI()
+        {
+            // Only JSON bodies can be sent as an array
+            var payloadType = _cboPayloadType.SelectedItem?.ToString() ?? "None";
+            _chkBatchEnabled.Enabled = payloadType == "JSON";
+
+            bool batching = _chkBatchEnabled.Checked && _chkBatchEnabled.Enabled;
+            _txtBatchMaxSize.Enabled = batching;
+            _txtBatchLinger.Enabled = batching;
+            _chkBatchCoalesce.Enabled = batching;
+        }
+
         internal void OnUserChange(object sender, EventArgs e)
         {
             ConfigurationChangedByUser?.Invoke(this, EventArgs.Empty);
@@ -0,0 +1,207 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+
+namespace HttpRequests.Background
+{
+    internal enum CircuitState
+    {
+        /// <summary>Requests are sent; consecutive failures are counted.</summary>
+        Closed,
+        /// <summary>The target is known down; requests fail without being sent.</summary>
+        Open,
+        /// <summary>The open time is over and one probe request is in flight.</summary>
+        HalfOpen
+    }
+
+    internal class CircuitBreakerSettings
+    {
+        public const int DefaultFailureThreshold = 5;
+        public const int MaxFailureThreshold = 100;
+
+        /// <summary>Consecutive failures (timeouts, connection errors, 5xx, 408, 429) that open the circuit.</summary>
+        public int FailureThreshold = DefaultFailureThreshold;
+        /// <summary>How long the circuit stays open before the first probe.</summary>
+        public TimeSpan OpenDuration = TimeSpan.FromSeconds(30);
+        /// <summary>Every failed probe doubles the open time up to this.</summary>
+        public TimeSpan MaxOpenDuration = TimeSpan.FromMinutes(5);
+    }
+
+    /// <summary>
+    /// Circuit breaker for one target host. After FailureThreshold failures
+    /// in a row the circuit opens and requests fail at once instead of each
+    /// waiting out its timeout against a dead target. When the open time is
+    /// over, the next request goes through as a probe while the others keep
+    /// failing fast; a successful probe closes the circuit, a failed one opens
+    /// it again for twice as long.
+    /// </summary>
+    internal sealed class CircuitBreaker
+    {
+        private readonly object _lock = new object();
+        private readonly CircuitBreakerSettings _settings;
+        private readonly Action<CircuitBreaker, CircuitState> _changed;
+        private int _failures;
+        private long _openUntil;
+        private long _downSince;
+        private TimeSpan _lastDowntime;
+        private TimeSpan _openFor;
+        private bool _probing;
+
+        public string Host { get; }
+        public CircuitState State { get; private set; }
+        public string LastError { get; private set; }
+        /// <summary>Consecutive failures that led to the current state.</summary>
+        public int Failures { get { lock (_lock) return _failures; } }
+        /// <summary>Requests failed without being sent since the circuit last opened.</summary>
+        public int FastFailed { get; private set; }
+        /// <summary>How long the circuit will stay open after the last transition to Open.</summary>
+        public TimeSpan OpenFor { get { lock (_lock) return _openFor; } }
+        /// <summary>Time since the circuit opened; once closed again, how long it was down.</summary>
+        public TimeSpan Downtime
+        {
+            get { lock (_lock) return State == CircuitState.Closed ? _lastDowntime : Elapsed(_downSince); }
+        }
+
+        /// <param name="changed">Called outside the lock with the breaker and its previous state.</param>
+        public CircuitBreaker(string host, CircuitBreakerSettings settings, Action<CircuitBreaker, CircuitState> changed)
+        {
+            Host = host;
+            _settings = settings;
+            _changed = changed;
+            _openFor = settings.OpenDuration;
+        }
+
+        /// <summary>
+        /// True when a request may be sent now. probe is true for the single
+        /// request let through to test an open circuit; it must be reported.
+        /// </summary>
+        public bool TryAcquire(out bool probe)
+        {
+            probe = false;
+            CircuitState previous;
+            lock (_lock)
+            {
+                previous = State;
+                switch (State)
+                {
+                    case CircuitState.Closed:
+                        return true;
+
+                    case CircuitState.Open:
+                        if (Stopwatch.GetTimestamp() < _openUntil)
+                        {
+                            FastFailed++;
+                            return false;
+                        }
+                        State = CircuitState.HalfOpen;
+                        break;
+
+                    default:
+                        if (_probing)
+                        {
+                            FastFailed++;
+                            return false;
+                        }
+                        break;
+                }
+                _probing = true;
+                probe = true;
+            }
+
+            if (previous != CircuitState.HalfOpen)
+                _changed?.Invoke(this, previous);
+            return true;
+        }
+
+        /// <summary>Outcome of a request let through by TryAcquire.</summary>
+        public void Report(bool success, string error, bool probe)
+        {
+            CircuitState previous;
+            lock (_lock)
+            {
+                previous = State;
+                if (probe)
+                    _probing = false;
+
+                if (success)
+                {
+                    _failures = 0;
+                    if (State == CircuitState.Closed)
+                        return;
+                    State = CircuitState.Closed;
+                    _openFor = _settings.OpenDuration;
+                    _lastDowntime = Elapsed(_downSince);
+                }
+                else
+                {
+                    _failures++;
+                    LastError = error;
+                    if (State == CircuitState.HalfOpen && probe)
+                    {
+                        var doubled = TimeSpan.FromTicks(_openFor.Ticks * 2);
+                        _openFor = doubled < _settings.MaxOpenDuration ? doubled : _settings.MaxOpenDuration;
+                    }
+                    else if (State != CircuitState.Closed || _failures < _settings.FailureThreshold)
+                    {
+                        return; // stragglers from before the circuit opened do not extend it
+                    }
+                    else
+                    {
+                        _downSince = Stopwatch.GetTimestamp();
+                        FastFailed = 0;
+                    }
+                    State = CircuitState.Open;
+                    _openUntil = Stopwatch.GetTimestamp() + (long)(_openFor.TotalSeconds * Stopwatch.Frequency);
+                }
+            }
+            _changed?.Invoke(this, previous);
+        }
+
+        private static TimeSpan Elapsed(long since)
+        {
+            return TimeSpan.FromSeconds((double)(Stopwatch.GetTimestamp() - since) / Stopwatch.Frequency);
+        }
+    }
+
+    /// <summary>
+    /// One CircuitBreaker per target host and failure threshold, created on
+    /// first use. Requests to the same host with the same threshold share a
+    /// breaker; a request with its own threshold gets its own.
+    /// </summary>
+    internal sealed class CircuitBreakerRegistry
+    {
+        private readonly object _lock = new object();
+        private readonly Dictionary<string, CircuitBreaker> _breakers = new Dictionary<string, CircuitBreaker>(StringComparer.OrdinalIgnoreCase);
+        private readonly CircuitBreakerSettings _settings;
+        private readonly Action<CircuitBreaker, CircuitState> _changed;
+
+        public CircuitBreakerRegistry(CircuitBreakerSettings settings, Action<CircuitBreaker, CircuitState> changed)
+        {
+            _settings = settings;
+            _changed = changed;
+        }
+
+        /// <summary>The breaker for host, or null when failureThreshold is 0 (breaker off).</summary>
+        public CircuitBreaker Get(string host, int failureThreshold)
+        {
+            if (failureThreshold <= 0)
+                return null;
+
+            var key = host + "|" + failureThreshold;
+            lock (_lock)
+            {
+                if (!_breakers.TryGetValue(key, out var breaker))
+                {
+                    var settings = new CircuitBreakerSettings
+                    {
+                        FailureThreshold = failureThreshold,
+                        OpenDuration = _settings.OpenDuration,
+                        MaxOpenDuration = _settings.MaxOpenDuration
+                    };
+                    _breakers[key] = breaker = new CircuitBreaker(host, settings, _changed);
+                }
+                return breaker;
+            }
+        }
+    }
+}
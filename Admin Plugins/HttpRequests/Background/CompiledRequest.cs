@@ -0,0 +1,166 @@
+using System;
+using System.Collections.Generic;
+using VideoOS.Platform;
+
+namespace HttpRequests.Background
+{
+    /// <summary>
+    /// A request item read once per configuration load: its properties parsed,
+    /// the HTTP config prepared (URI with query parameters, headers, auth) and
+    /// the user part of the JSON payload split out, so a rule firing only has
+    /// to merge in the event data. Instances are immutable and shared by all
+    /// firings until the next configuration change replaces them.
+    /// </summary>
+    internal sealed class CompiledRequest
+    {
+        public const int MaxRetries = 10;
+        public const int DefaultRetryDelayMs = 1000;
+
+        public readonly Item Item;
+        public readonly Guid Id;
+        public readonly string Name;
+        public readonly bool Enabled;
+
+        /// <summary>Prepared config; Body is already set unless EventBody.</summary>
+        public readonly HttpRequestConfig Config;
+        public readonly string Host;
+
+        /// <summary>The body is JSON with the triggering event merged in, built per firing.</summary>
+        public readonly bool EventBody;
+        /// <summary>Members of the user payload without the outer braces ("" when none).</summary>
+        public readonly string UserJsonInner;
+
+        public readonly int Retries;
+        public readonly int RetryDelayMs;
+        /// <summary>Failures in a row that open the target's circuit; 0 turns the breaker off.</summary>
+        public readonly int BreakerThreshold;
+
+        public readonly bool Batch;
+        public readonly int BatchMaxSize;
+        public readonly int BatchLingerMs;
+        public readonly bool BatchCoalesce;
+
+        /// <summary>Settings summary for the "Executing" log line.</summary>
+        public readonly string Description;
+
+        /// <summary>Set when the config could not be prepared (invalid URL); firing reports it.</summary>
+        public readonly string Error;
+
+        public CompiledRequest(Item item)
+        {
+            Item = item;
+            Id = item.FQID.ObjectId;
+            Name = item.Name;
+            Enabled = GetProp(item, "Enabled", "Yes") != "No";
+
+            var method = GetProp(item, "HttpMethod", "POST");
+            var payloadType = GetProp(item, "PayloadType", "JSON");
+            var userPayload = GetProp(item, "UserPayload", "");
+            var includeEvent = GetProp(item, "IncludeEventData", "Yes") != "No";
+            var timeoutMs = 10000;
+            int.TryParse(GetProp(item, "TimeoutMs", "10000"), out timeoutMs);
+            var headers = ReadKeyValueProperties(item, "Header_");
+            var queryParams = ReadKeyValueProperties(item, "QueryParam_");
+
+            // Body: JSON merges the user payload with the event on every firing
+            // (when event data is included); other types are fixed.
+            string body = null;
+            UserJsonInner = "";
+            if (payloadType != "None" && method != "GET" && method != "DELETE")
+            {
+                if (payloadType == "JSON")
+                {
+                    UserJsonInner = HttpRequestsBackgroundPlugin.UserJsonInner(userPayload);
+                    EventBody = includeEvent;
+                    body = "{" + UserJsonInner + "}";
+                }
+                else
+                {
+                    body = string.IsNullOrWhiteSpace(userPayload) ? null : userPayload;
+                }
+            }
+
+            var config = new HttpRequestConfig
+            {
+                Name = item.Name,
+                HttpMethod = method,
+                Url = GetProp(item, "Url", ""),
+                PayloadType = payloadType,
+                Body = body,
+                Headers = headers.Count > 0 ? headers : null,
+                QueryParams = queryParams.Count > 0 ? queryParams : null,
+                SkipCertValidation = GetProp(item, "SkipCertValidation", "No") == "Yes",
+                TimeoutMs = timeoutMs,
+                AuthType = GetProp(item, "AuthType", "None"),
+                AuthUsername = GetProp(item, "AuthUsername", ""),
+                AuthPassword = GetProp(item, "AuthPassword", ""),
+                AuthToken = GetProp(item, "AuthToken", "")
+            };
+
+            // An invalid URL keeps the unprepared config; the executor then
+            // fails every firing with the same error the user would see.
+            try
+            {
+                config = config.Prepare();
+                Host = config.RequestUri.Authority;
+            }
+            catch (Exception ex)
+            {
+                Error = ex.Message;
+                Host = config.Url ?? "";
+            }
+            Config = config;
+
+            int.TryParse(GetProp(item, "RetryCount", "0"), out var retries);
+            Retries = Math.Max(0, Math.Min(MaxRetries, retries));
+            RetryDelayMs = GetIntProp(item, "RetryDelayMs", DefaultRetryDelayMs);
+            if (!int.TryParse(GetProp(item, "BreakerThreshold", ""), out var breakerThreshold))
+                breakerThreshold = CircuitBreakerSettings.DefaultFailureThreshold;
+            BreakerThreshold = Math.Max(0, Math.Min(CircuitBreakerSettings.MaxFailureThreshold, breakerThreshold));
+
+            // Batching only applies to JSON bodies, which can be wrapped in an array.
+            Batch = body != null && payloadType == "JSON" && GetProp(item, "BatchEnabled", "No") == "Yes";
+            BatchMaxSize = GetIntProp(item, "BatchMaxSize", HttpRequestBatcher.DefaultMaxSize);
+            BatchLingerMs = GetIntProp(item, "BatchLingerMs", HttpRequestBatcher.DefaultLingerMs);
+            BatchCoalesce = GetProp(item, "BatchCoalesce", "No") == "Yes";
+
+            Description = $"{method} {config.Url} " +
+                $"[auth={config.AuthType}, payload={payloadType}, timeout={timeoutMs}ms, " +
+                $"headers={headers.Count}, params={queryParams.Count}, skipCert={config.SkipCertValidation}, retries={Retries}, " +
+                $"breaker={(BreakerThreshold > 0 ? BreakerThreshold.ToString() : "off")}]";
+        }
+
+        internal static string GetProp(Item item, string key, string defaultValue)
+        {
+            return item.Properties.ContainsKey(key) ? item.Properties[key] : defaultValue;
+        }
+
+        private static int GetIntProp(Item item, string key, int defaultValue)
+        {
+            return int.TryParse(GetProp(item, key, ""), out var value) && value > 0 ? value : defaultValue;
+        }
+
+        internal static Dictionary<string, string> ReadKeyValueProperties(Item item, string prefix)
+        {
+            var result = new Dictionary<string, string>(StringComparer.OrdinalIgnoreCase);
+            var countKey = prefix + "Count";
+            if (!item.Properties.ContainsKey(countKey)) return result;
+
+            int count;
+            if (!int.TryParse(item.Properties[countKey], out count)) return result;
+
+            for (int i = 0; i < count; i++)
+            {
+                var kProp = $"{prefix}{i}_Key";
+                var vProp = $"{prefix}{i}_Value";
+                if (item.Properties.ContainsKey(kProp) && item.Properties.ContainsKey(vProp))
+                {
+                    var k = item.Properties[kProp];
+                    if (!string.IsNullOrWhiteSpace(k))
+                        result[k] = item.Properties[vProp];
+                }
+            }
+            return result;
+        }
+    }
+}
@@ -0,0 +1,213 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Net.Http;
+using System.Security.Cryptography;
+using System.Text;
+using System.Text.RegularExpressions;
+using System.Threading;
+
+namespace HttpRequests.Background
+{
+    /// <summary>
+    /// Digest credentials (RFC 7616) for one target host and user, with the
+    /// last challenge the host sent. Once a challenge is known every request
+    /// is authorized up front with the next nonce-count, so only the first
+    /// request, and the first after the host's nonce goes stale, pays a 401
+    /// round trip. HttpClientHandler's own Digest support answers every
+    /// challenge but does not authorize ahead of one. Instances are shared
+    /// by all requests with the same host and credentials (Get).
+    /// </summary>
+    internal sealed class DigestCredentials
+    {
+        private static readonly ConcurrentDictionary<string, DigestCredentials> _all =
+            new ConcurrentDictionary<string, DigestCredentials>(StringComparer.Ordinal);
+
+        private readonly string _username;
+        private readonly string _password;
+        private volatile DigestChallenge _challenge;
+
+        private DigestCredentials(string username, string password)
+        {
+            _username = username;
+            _password = password;
+        }
+
+        public static DigestCredentials Get(Uri uri, string username, string password)
+        {
+            // The key only holds a hash, so listing the cache does not show passwords.
+            string passwordHash;
+            using (var sha = SHA256.Create())
+                passwordHash = Convert.ToBase64String(sha.ComputeHash(Encoding.UTF8.GetBytes(password)));
+            var key = uri.GetLeftPart(UriPartial.Authority) + "|" + username + "|" + passwordHash;
+            return _all.GetOrAdd(key, _ => new DigestCredentials(username, password));
+        }
+
+        /// <summary>
+        /// Drops credentials that no request uses any more, so an edited
+        /// password or URL does not keep the old one in memory. Called after
+        /// each configuration load with the credentials of the new requests.
+        /// </summary>
+        public static void Retain(ICollection<DigestCredentials> inUse)
+        {
+            foreach (var kvp in _all)
+            {
+                if (!inUse.Contains(kvp.Value))
+                    _all.TryRemove(kvp.Key, out _);
+            }
+        }
+
+        /// <summary>
+        /// Authorization header for a request, or null until the host has sent
+        /// a challenge. nonce is the challenge nonce the header answers.
+        /// </summary>
+        public string Authorize(HttpMethod method, Uri uri, out string nonce)
+        {
+            var challenge = _challenge;
+            nonce = challenge?.Nonce;
+            return challenge?.Authorize(_username, method.Method, uri.PathAndQuery);
+        }
+
+        /// <summary>
+        /// Takes the Digest challenge from a 401 response, preferring SHA-256
+        /// when the host offers several. True when the request should be
+        /// sent again with it: it went out without authorization (sentNonce
+        /// null), the host reports the nonce as stale, or the host has moved
+        /// to a new nonce without saying so (e.g. after a restart). Only a
+        /// challenge with the very nonce the request answered means the
+        /// credentials are wrong.
+        /// </summary>
+        public bool Challenged(HttpResponseMessage response, string sentNonce)
+        {
+            DigestChallenge best = null;
+            foreach (var header in response.Headers.WwwAuthenticate)
+            {
+                if (!string.Equals(header.Scheme, "Digest", StringComparison.OrdinalIgnoreCase) || header.Parameter == null)
+                    continue;
+                var challenge = DigestChallenge.Parse(header.Parameter, _username, _password);
+                if (challenge != null && (best == null || challenge.Preference < best.Preference))
+                    best = challenge;
+            }
+            if (best == null)
+                return false;
+
+            _challenge = best;
+            return sentNonce == null || best.Stale || !string.Equals(best.Nonce, sentNonce, StringComparison.Ordinal);
+        }
+    }
+
+    /// <summary>One Digest challenge with its running nonce-count. HA1 is worked out once.</summary>
+    internal sealed class DigestChallenge
+    {
+        private static readonly Regex _param = new Regex(@"([\w-]+)\s*=\s*(?:""((?:[^""\\]|\\.)*)""|([^\s,]*))", RegexOptions.Compiled);
+        private static readonly RandomNumberGenerator _random = RandomNumberGenerator.Create();
+
+        public readonly string Realm;
+        public readonly string Nonce;
+        public readonly string Opaque;
+        public readonly string Algorithm;
+        public readonly bool Stale;
+        /// <summary>Lower is better: SHA-256 before MD5.</summary>
+        public readonly int Preference;
+
+        private readonly bool _sha256;
+        private readonly bool _qop;
+        private readonly string _cnonce;
+        private readonly string _ha1;
+        private int _nc;
+
+        private DigestChallenge(Dictionary<string, string> p, string algorithm, string username, string password)
+        {
+            Realm = Value(p, "realm") ?? "";
+            Nonce = Value(p, "nonce") ?? "";
+            Opaque = Value(p, "opaque");
+            Algorithm = algorithm;
+            Stale = string.Equals(Value(p, "stale"), "true", StringComparison.OrdinalIgnoreCase);
+            _sha256 = algorithm.StartsWith("SHA-256", StringComparison.OrdinalIgnoreCase);
+            Preference = _sha256 ? 0 : 1;
+            _qop = Value(p, "qop") != null;
+
+            var bytes = new byte[16];
+            lock (_random) _random.GetBytes(bytes);
+            _cnonce = Hex(bytes);
+
+            _ha1 = Hash(username + ":" + Realm + ":" + password);
+            if (algorithm.EndsWith("-sess", StringComparison.OrdinalIgnoreCase))
+                _ha1 = Hash(_ha1 + ":" + Nonce + ":" + _cnonce);
+        }
+
+        /// <summary>The challenge in a WWW-Authenticate parameter, or null when it asks for something unsupported.</summary>
+        public static DigestChallenge Parse(string parameter, string username, string password)
+        {
+            var p = new Dictionary<string, string>(StringComparer.OrdinalIgnoreCase);
+            foreach (Match m in _param.Matches(parameter))
+            {
+                p[m.Groups[1].Value] = m.Groups[2].Success
+                    ? Regex.Replace(m.Groups[2].Value, @"\\(.)", "$1")
+                    : m.Groups[3].Value;
+            }
+
+            if (Value(p, "nonce") == null)
+                return null;
+            var algorithm = Value(p, "algorithm") ?? "MD5";
+            switch (algorithm.ToUpperInvariant())
+            {
+                case "MD5": case "MD5-SESS": case "SHA-256": case "SHA-256-SESS": break;
+                default: return null;
+            }
+            // Only qop=auth; auth-int alone would need the body hashed.
+            var qop = Value(p, "qop");
+            if (qop != null && Array.IndexOf(qop.Replace(" ", "").Split(','), "auth") < 0)
+                return null;
+            return new DigestChallenge(p, algorithm, username, password);
+        }
+
+        public string Authorize(string username, string method, string uri)
+        {
+            var ha2 = Hash(method + ":" + uri);
+            var sb = new StringBuilder("Digest username=\"").Append(Quote(username))
+                .Append("\", realm=\"").Append(Quote(Realm))
+                .Append("\", nonce=\"").Append(Quote(Nonce))
+                .Append("\", uri=\"").Append(Quote(uri))
+                .Append("\", algorithm=").Append(Algorithm);
+            if (_qop)
+            {
+                var nc = Interlocked.Increment(ref _nc).ToString("x8");
+                sb.Append(", response=\"").Append(Hash(_ha1 + ":" + Nonce + ":" + nc + ":" + _cnonce + ":auth:" + ha2))
+                    .Append("\", qop=auth, nc=").Append(nc)
+                    .Append(", cnonce=\"").Append(_cnonce).Append('"');
+            }
+            else
+            {
+                sb.Append(", response=\"").Append(Hash(_ha1 + ":" + Nonce + ":" + ha2)).Append('"');
+            }
+            if (Opaque != null)
+                sb.Append(", opaque=\"").Append(Quote(Opaque)).Append('"');
+            return sb.ToString();
+        }
+
+        private string Hash(string text)
+        {
+            using (var algorithm = _sha256 ? (HashAlgorithm)SHA256.Create() : MD5.Create())
+                return Hex(algorithm.ComputeHash(Encoding.UTF8.GetBytes(text)));
+        }
+
+        private static string Hex(byte[] bytes)
+        {
+            var sb = new StringBuilder(bytes.Length * 2);
+            foreach (var b in bytes)
+                sb.Append(b.ToString("x2"));
+            return sb.ToString();
+        }
+
+        private static string Quote(string value)
+        {
+            return value.Replace("\\", "\\\\").Replace("\"", "\\\"");
+        }
+
+        private static string Value(Dictionary<string, string> p, string key)
+        {
+            return p.TryGetValue(key, out var value) ? value : null;
+        }
+    }
+}
@@ -0,0 +1,161 @@
+using System;
+using System.Collections.Generic;
+using System.Text;
+using System.Threading;
+
+namespace HttpRequests.Background
+{
+    /// <summary>
+    /// Collects the JSON payloads of one request item for up to a linger time
+    /// and sends them as a single JSON array, so a rule that fires many times a
+    /// second costs one HTTP call per window instead of one per event. With
+    /// coalescing, a repeat of an event already in the window (same source and
+    /// event type) replaces the earlier copy and is counted in its "Coalesced"
+    /// field instead of adding another element.
+    /// </summary>
+    internal sealed class HttpRequestBatcher
+    {
+        public const int DefaultMaxSize = 50;
+        public const int DefaultLingerMs = 1000;
+
+        private readonly object _lock = new object();
+        private readonly Dictionary<Guid, Batch> _batches = new Dictionary<Guid, Batch>();
+        private readonly Action<Guid, HttpRequestConfig, int, int> _send;
+        private bool _closed;
+
+        /// <param name="send">
+        /// Called outside the lock with the request id, the config carrying the
+        /// array body, the number of events in it and how many were coalesced.
+        /// </param>
+        public HttpRequestBatcher(Action<Guid, HttpRequestConfig, int, int> send)
+        {
+            _send = send;
+        }
+
+        /// <summary>
+        /// Add one event payload (a JSON object) to the window of requestId.
+        /// config is used for the request when the window is sent, so the most
+        /// recent settings win. coalesceKey is null to never coalesce.
+        /// </summary>
+        public void Add(Guid requestId, HttpRequestConfig config, string payload, string coalesceKey, int maxSize, int lingerMs)
+        {
+            Batch full = null;
+            lock (_lock)
+            {
+                if (_closed) return;
+
+                if (!_batches.TryGetValue(requestId, out var batch))
+                {
+                    batch = new Batch(requestId);
+                    _batches[requestId] = batch;
+                    batch.Timer = new Timer(_ => Expired(batch), null, Math.Max(lingerMs, 1), Timeout.Infinite);
+                }
+
+                batch.Config = config;
+                batch.Events++;
+                if (coalesceKey != null && batch.ByKey.TryGetValue(coalesceKey, out var index))
+                {
+                    batch.Payloads[index] = payload;
+                    batch.Counts[index]++;
+                }
+                else
+                {
+                    if (coalesceKey != null)
+                        batch.ByKey[coalesceKey] = batch.Payloads.Count;
+                    batch.Payloads.Add(payload);
+                    batch.Counts.Add(1);
+                }
+
+                if (batch.Payloads.Count >= maxSize)
+                {
+                    Remove(batch);
+                    full = batch;
+                }
+            }
+
+            if (full != null)
+                Send(full);
+        }
+
+        private void Expired(Batch batch)
+        {
+            lock (_lock)
+            {
+                if (!_batches.TryGetValue(batch.RequestId, out var current) || current != batch)
+                    return; // already sent because it filled up
+                Remove(batch);
+            }
+            Send(batch);
+        }
+
+        // Called with _lock held.
+        private void Remove(Batch batch)
+        {
+            _batches.Remove(batch.RequestId);
+            batch.Timer.Dispose();
+        }
+
+        private void Send(Batch batch)
+        {
+            var sb = new StringBuilder("[");
+            for (int i = 0; i < batch.Payloads.Count; i++)
+            {
+                if (i > 0) sb.Append(", ");
+                AppendPayload(sb, batch.Payloads[i], batch.Counts[i]);
+            }
+            sb.Append("]");
+
+            _send(batch.RequestId, batch.Config.WithBody(sb.ToString()), batch.Events, batch.Events - batch.Payloads.Count);
+        }
+
+        // payload is a JSON object; a coalesced one gets "Coalesced": count as its last member.
+        private static void AppendPayload(StringBuilder sb, string payload, int count)
+        {
+            if (count == 1)
+            {
+                sb.Append(payload);
+                return;
+            }
+
+            var inner = payload.Trim();
+            inner = inner.Substring(1, inner.Length - 2).Trim();
+            sb.Append("{");
+            if (inner.Length > 0)
+                sb.Append(inner).Append(", ");
+            sb.Append("\"Coalesced\": ").Append(count).Append("}");
+        }
+
+        /// <summary>Discards windows that have not been sent yet; returns the number of events dropped.</summary>
+        public int Close()
+        {
+            lock (_lock)
+            {
+                _closed = true;
+                int events = 0;
+                foreach (var batch in _batches.Values)
+                {
+                    batch.Timer.Dispose();
+                    events += batch.Events;
+                }
+                _batches.Clear();
+                return events;
+            }
+        }
+
+        private sealed class Batch
+        {
+            public readonly Guid RequestId;
+            public readonly List<string> Payloads = new List<string>();
+            public readonly List<int> Counts = new List<int>();
+            public readonly Dictionary<string, int> ByKey = new Dictionary<string, int>(StringComparer.Ordinal);
+            public HttpRequestConfig Config;
+            public Timer Timer;
+            public int Events;
+
+            public Batch(Guid requestId)
+            {
+                RequestId = requestId;
+            }
+        }
+    }
+}
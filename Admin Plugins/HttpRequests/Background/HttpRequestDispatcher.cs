@@ -0,0 +1,233 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Threading;
+using System.Threading.Tasks;
+using CommunitySDK;
+
+namespace HttpRequests.Background
+{
+    internal enum QueueOverflowPolicy
+    {
+        /// <summary>Drop the request that has waited longest; the newest event always gets queued.</summary>
+        DropOldest,
+        /// <summary>Refuse the new request; queued events keep their order.</summary>
+        DropNewest
+    }
+
+    /// <summary>
+    /// Bounded queue between rule actions and the executor. Each target host
+    /// has its own FIFO and at most MaxPerHost requests in flight, so one slow
+    /// target cannot hold up requests to other hosts, and an event storm turns
+    /// into a queue of bounded length instead of a growing number of blocked
+    /// thread-pool threads. When Capacity requests are waiting, the overflow
+    /// policy decides which one is dropped.
+    /// </summary>
+    internal sealed class HttpRequestDispatcher
+    {
+        public const int DefaultCapacity = 1000;
+        public const int DefaultMaxPerHost = 8;
+        private const int StatsIntervalMs = 60000;
+
+        private static readonly PluginLog _log = new PluginLog("HttpRequests.Dispatcher");
+
+        private readonly object _lock = new object();
+        private readonly Dictionary<string, HostQueue> _hosts = new Dictionary<string, HostQueue>(StringComparer.OrdinalIgnoreCase);
+        private readonly Timer _statsTimer;
+        private long _sequence;
+        private int _queued;
+        private int _inFlight;
+
+        // Since the last stats line
+        private long _started;
+        private long _dropped;
+        private int _maxQueued;
+        private int _maxInFlight;
+        private long _waitTicks;
+        private long _maxWaitTicks;
+
+        public int Capacity { get; }
+        public int MaxPerHost { get; }
+        public QueueOverflowPolicy OverflowPolicy { get; }
+
+        public HttpRequestDispatcher(int capacity = DefaultCapacity, int maxPerHost = DefaultMaxPerHost,
+            QueueOverflowPolicy overflowPolicy = QueueOverflowPolicy.DropOldest)
+        {
+            Capacity = capacity;
+            MaxPerHost = maxPerHost;
+            OverflowPolicy = overflowPolicy;
+            _statsTimer = new Timer(_ => LogStats(), null, StatsIntervalMs, StatsIntervalMs);
+        }
+
+        public int QueueDepth { get { lock (_lock) return _queued; } }
+        public int InFlight { get { lock (_lock) return _inFlight; } }
+
+        /// <summary>
+        /// Queue work for host. work receives the time it spent queued and runs
+        /// on the thread pool once the host has a free slot. Returns false when
+        /// the request was dropped because the queue is full (DropNewest).
+        /// </summary>
+        public bool Enqueue(string host, string name, Func<TimeSpan, Task> work)
+        {
+            var item = new WorkItem(name, Stopwatch.GetTimestamp(), work);
+            WorkItem dropped = null;
+            bool start = false;
+            lock (_lock)
+            {
+                item.Sequence = ++_sequence;
+                if (!_hosts.TryGetValue(host, out var queue))
+                    _hosts[host] = queue = new HostQueue();
+
+                if (queue.Running < MaxPerHost && queue.Pending.Count == 0)
+                {
+                    start = true;
+                    queue.Running++;
+                    CountStart(item);
+                }
+                else
+                {
+                    if (_queued >= Capacity)
+                    {
+                        _dropped++;
+                        dropped = OverflowPolicy == QueueOverflowPolicy.DropNewest ? item : RemoveOldest();
+                    }
+                    if (dropped != item)
+                    {
+                        queue.Pending.AddLast(item);
+                        _queued++;
+                        if (_queued > _maxQueued) _maxQueued = _queued;
+                    }
+                }
+            }
+
+            if (dropped != null)
+                _log.Error($"Queue full ({Capacity}), dropped '{dropped.Name}' ({OverflowPolicy})");
+            if (start)
+                Run(host, item);
+            return dropped != item;
+        }
+
+        // Oldest pending item across all hosts. Called with _lock held.
+        private WorkItem RemoveOldest()
+        {
+            HostQueue oldest = null;
+            foreach (var q in _hosts.Values)
+            {
+                if (q.Pending.Count > 0 && (oldest == null || q.Pending.First.Value.Sequence < oldest.Pending.First.Value.Sequence))
+                    oldest = q;
+            }
+            if (oldest == null) return null;
+            var item = oldest.Pending.First.Value;
+            oldest.Pending.RemoveFirst();
+            _queued--;
+            return item;
+        }
+
+        // Called with _lock held.
+        private void CountStart(WorkItem item)
+        {
+            _inFlight++;
+            _started++;
+            if (_inFlight > _maxInFlight) _maxInFlight = _inFlight;
+            var wait = Stopwatch.GetTimestamp() - item.EnqueuedAt;
+            _waitTicks += wait;
+            if (wait > _maxWaitTicks) _maxWaitTicks = wait;
+        }
+
+        private void Run(string host, WorkItem item)
+        {
+            var waited = TimeSpan.FromSeconds((double)(Stopwatch.GetTimestamp() - item.EnqueuedAt) / Stopwatch.Frequency);
+            Task.Run(async () =>
+            {
+                try
+                {
+                    await item.Work(waited).ConfigureAwait(false);
+                }
+                catch (Exception ex)
+                {
+                    _log.Error($"Request '{item.Name}' failed: {ex.Message}", ex);
+                }
+                finally
+                {
+                    Completed(host);
+                }
+            });
+        }
+
+        private void Completed(string host)
+        {
+            WorkItem next = null;
+            lock (_lock)
+            {
+                _inFlight--;
+                var queue = _hosts[host];
+                if (queue.Pending.Count > 0)
+                {
+                    next = queue.Pending.First.Value;
+                    queue.Pending.RemoveFirst();
+                    _queued--;
+                    CountStart(next);
+                }
+                else
+                {
+                    queue.Running--;
+                    if (queue.Running == 0)
+                        _hosts.Remove(host);
+                }
+            }
+            if (next != null)
+                Run(host, next);
+        }
+
+        private void LogStats()
+        {
+            string line;
+            lock (_lock)
+            {
+                if (_started == 0 && _dropped == 0 && _queued == 0 && _inFlight == 0)
+                    return;
+                double ms = 1000.0 / Stopwatch.Frequency;
+                line = $"Dispatcher: started={_started}, dropped={_dropped}, queued={_queued} (max {_maxQueued}), " +
+                    $"inFlight={_inFlight} (max {_maxInFlight}), hosts={_hosts.Count}, " +
+                    $"wait avg={(_started > 0 ? _waitTicks * ms / _started : 0):0.0}ms max={_maxWaitTicks * ms:0.0}ms";
+                _started = _dropped = _waitTicks = _maxWaitTicks = 0;
+                _maxQueued = _queued;
+                _maxInFlight = _inFlight;
+            }
+            _log.Info(line);
+        }
+
+        public void Close()
+        {
+            _statsTimer.Dispose();
+            LogStats();
+            lock (_lock)
+            {
+                foreach (var q in _hosts.Values)
+                    q.Pending.Clear();
+                _queued = 0;
+            }
+        }
+
+        private sealed class HostQueue
+        {
+            public readonly LinkedList<WorkItem> Pending = new LinkedList<WorkItem>();
+            public int Running;
+        }
+
+        private sealed class WorkItem
+        {
+            public readonly string Name;
+            public readonly long EnqueuedAt;
+            public readonly Func<TimeSpan, Task> Work;
+            public long Sequence;
+
+            public WorkItem(string name, long enqueuedAt, Func<TimeSpan, Task> work)
+            {
+                Name = name;
+                EnqueuedAt = enqueuedAt;
+                Work = work;
+            }
+        }
+    }
+}
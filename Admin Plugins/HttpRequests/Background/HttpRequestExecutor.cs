@@ -1,16 +1,20 @@
 using System;
+using System.Collections.Concurrent;
 using System.Collections.Generic;
 using System.Diagnostics;
-using System.IO;
 using System.Net;
-using System.Net.Cache;
+using System.Net.Http;
 using System.Text;
+using System.Threading;
+using System.Threading.Tasks;
 using CommunitySDK;
 
 namespace HttpRequests.Background
 {
     internal class HttpRequestConfig
     {
+        private static readonly PluginLog _log = new PluginLog("HttpRequests.Config");
+
         public string Name;
         public string HttpMethod;
         public string Url;
@@ -24,6 +28,102 @@ namespace HttpRequests.Background
         public string AuthUsername;
         public string AuthPassword;
         public string AuthToken;
+
+        // Worked out by Prepare(); null until then.
+        public HttpMethod RequestMethod;
+        public Uri RequestUri;
+        public KeyValuePair<string, string>[] RequestHeaders;
+        /// <summary>Custom headers that HttpClient only accepts on the body (Content-Type, Content-Encoding, ...).</summary>
+        public KeyValuePair<string, string>[] ContentHeaders;
+        /// <summary>Content-Type for a body from the payload type; null when one is configured.</summary>
+        public string ContentType;
+        public string Authorization;
+        public DigestCredentials Digest;
+        public string ClientKey;
+
+        public bool IsPrepared => RequestUri != null;
+
+        /// <summary>
+        /// Copy of this config with the URI (including query parameters), the
+        /// header lists, content type, Authorization header (or Digest
+        /// credentials) and client key worked out, so sending it only has to build the message. Throws
+        /// UriFormatException for an invalid URL. Headers that cannot be sent
+        /// are logged here and left out. A prepared config is shared
+        /// by every firing of its request and is not modified afterwards.
+        /// </summary>
+        public HttpRequestConfig Prepare()
+        {
+            var prepared = (HttpRequestConfig)MemberwiseClone();
+            prepared.RequestMethod = new HttpMethod(HttpMethod);
+            prepared.RequestUri = new Uri(HttpRequestExecutor.BuildUrlWithParams(Url, QueryParams));
+
+            // Custom headers. HttpClient rejects content headers on the request
+            // itself, so sort them the way it does by adding them to a probe.
+            var headers = new List<KeyValuePair<string, string>>();
+            var contentHeaders = new List<KeyValuePair<string, string>>();
+            if (Headers != null)
+            {
+                using (var probe = new HttpRequestMessage())
+                using (var content = new ByteArrayContent(Array.Empty<byte>()))
+                {
+                    foreach (var kvp in Headers)
+                    {
+                        if (kvp.Key.Equals("Content-Length", StringComparison.OrdinalIgnoreCase))
+                            _log.Error($"Request '{Name}': header 'Content-Length' is set from the body, ignoring it");
+                        else if (probe.Headers.TryAddWithoutValidation(kvp.Key, kvp.Value))
+                            headers.Add(kvp);
+                        else if (content.Headers.TryAddWithoutValidation(kvp.Key, kvp.Value))
+                            contentHeaders.Add(kvp);
+                        else
+                            _log.Error($"Request '{Name}': header '{kvp.Key}' cannot be sent, ignoring it");
+                    }
+                }
+            }
+
+            // .NET Framework refuses a body, even an empty one, on GET and HEAD,
+            // and content headers can only travel with one.
+            if (contentHeaders.Count > 0 &&
+                (prepared.RequestMethod == System.Net.Http.HttpMethod.Get || prepared.RequestMethod == System.Net.Http.HttpMethod.Head))
+            {
+                foreach (var kvp in contentHeaders)
+                    _log.Error($"Request '{Name}': header '{kvp.Key}' cannot be sent with {HttpMethod}, ignoring it");
+                contentHeaders.Clear();
+            }
+
+            prepared.RequestHeaders = headers.ToArray();
+            prepared.ContentHeaders = contentHeaders.ToArray();
+            prepared.ContentType = contentHeaders.Exists(h => h.Key.Equals("Content-Type", StringComparison.OrdinalIgnoreCase))
+                ? null
+                : HttpRequestExecutor.GetContentType(PayloadType);
+
+            switch (AuthType)
+            {
+                case "Basic":
+                    var credentials = (AuthUsername ?? "") + ":" + (AuthPassword ?? "");
+                    prepared.Authorization = "Basic " + Convert.ToBase64String(Encoding.UTF8.GetBytes(credentials));
+                    break;
+
+                case "Bearer":
+                    prepared.Authorization = "Bearer " + (AuthToken ?? "");
+                    break;
+
+                case "Digest":
+                    if (!string.IsNullOrEmpty(AuthUsername))
+                        prepared.Digest = DigestCredentials.Get(prepared.RequestUri, AuthUsername, AuthPassword ?? "");
+                    break;
+            }
+
+            prepared.ClientKey = SkipCertValidation ? "insecure" : "default";
+            return prepared;
+        }
+
+        /// <summary>Copy of this config with another body (per-event and batched requests).</summary>
+        public HttpRequestConfig WithBody(string body)
+        {
+            var copy = (HttpRequestConfig)MemberwiseClone();
+            copy.Body = body;
+            return copy;
+        }
     }
 
     internal class HttpRequestResult
@@ -33,118 +133,165 @@ namespace HttpRequests.Background
         public long ElapsedMs;
         public bool Success;
         public string Error;
+        /// <summary>Attempts sent to the target (0 when the circuit was open).</summary>
+        public int Attempts = 1;
+        /// <summary>Not sent because the target's circuit breaker is open.</summary>
+        public bool CircuitOpen;
+
+        /// <summary>
+        /// Worth retrying and counted against the target's circuit breaker: no
+        /// response at all (timeout, refused, reset) or 5xx, 408 or 429. Other
+        /// statuses mean the target is up and answered.
+        /// </summary>
+        public bool IsTransientFailure =>
+            !Success && (StatusCode == 0 || StatusCode >= 500 || StatusCode == 408 || StatusCode == 429);
     }
 
+    /// <summary>
+    /// Sends requests through shared HttpClient instances, so connections
+    /// (and their TLS sessions) are kept alive and reused across rule firings
+    /// instead of being opened for every request. One client exists per
+    /// certificate-validation mode, a property of the handler rather than of
+    /// a request. Digest is answered here rather than by the handler, so the
+    /// host's challenge is remembered and later requests are authorized
+    /// before they are sent (DigestCredentials).
+    /// </summary>
     internal static class HttpRequestExecutor
     {
         private static readonly PluginLog _log = new PluginLog("HttpRequests.Executor");
 
+        /// <summary>Connections kept open to one host; matches HttpRequestDispatcher.MaxPerHost.</summary>
+        public const int MaxConnectionsPerHost = HttpRequestDispatcher.DefaultMaxPerHost;
+
+        /// <summary>Longest wait between retries, however many attempts came before.</summary>
+        public const int MaxRetryDelayMs = 30000;
+
+        private static readonly ConcurrentDictionary<string, HttpClient> _clients =
+            new ConcurrentDictionary<string, HttpClient>(StringComparer.Ordinal);
+
+        private static readonly Random _jitter = new Random();
+
+        /// <summary>Blocking wrapper for callers on a worker thread (admin Test button).</summary>
         public static HttpRequestResult Execute(HttpRequestConfig config)
+        {
+            return ExecuteAsync(config).GetAwaiter().GetResult();
+        }
+
+        /// <summary>
+        /// Sends config, retrying transient failures up to retries times. The
+        /// wait before retry n is retryDelayMs * 2^(n-1), capped at
+        /// MaxRetryDelayMs, of which a random half is taken off so that
+        /// requests failing together do not retry together. breaker (may be
+        /// null) is asked before every attempt and told its outcome; while it
+        /// is open nothing is sent. ElapsedMs covers all attempts and waits.
+        /// </summary>
+        public static async Task<HttpRequestResult> ExecuteAsync(HttpRequestConfig config,
+            CircuitBreaker breaker, int retries, int retryDelayMs)
         {
             var sw = Stopwatch.StartNew();
-            try
+            HttpRequestResult result = null;
+            int attempts = 0;
+            while (true)
             {
-                // Build URL with query params
-                var url = BuildUrlWithParams(config.Url, config.QueryParams);
-
-                var request = (HttpWebRequest)WebRequest.Create(url);
-                request.Method = config.HttpMethod;
-                request.Timeout = config.TimeoutMs > 0 ? config.TimeoutMs : 10000;
-                request.CachePolicy = new RequestCachePolicy(RequestCacheLevel.NoCacheNoStore);
-
-                if (config.SkipCertValidation)
+                bool probe = false;
+                if (breaker != null && !breaker.TryAcquire(out probe))
                 {
-                    request.ServerCertificateValidationCallback = (sender, cert, chain, errors) => true;
+                    result = new HttpRequestResult
+                    {
+                        Success = false,
+                        CircuitOpen = true,
+                        Error = $"Target {breaker.Host} is down, request not sent (circuit open" +
+                            (result != null ? ", last error: " + result.Error : "") + ")"
+                    };
+                    break;
                 }
 
-                // Authentication
-                ApplyAuth(request, config);
-
-                // Custom headers
-                if (config.Headers != null)
+                try
                 {
-                    foreach (var kvp in config.Headers)
-                    {
-                        switch (kvp.Key.ToLowerInvariant())
-                        {
-                            case "content-type":
-                                request.ContentType = kvp.Value;
-                                break;
-                            case "accept":
-                                request.Accept = kvp.Value;
-                                break;
-                            case "user-agent":
-                                request.UserAgent = kvp.Value;
-                                break;
-                            default:
-                                request.Headers[kvp.Key] = kvp.Value;
-                                break;
-                        }
-                    }
+                    result = await ExecuteAsync(config).ConfigureAwait(false);
                 }
-
-                // Body
-                if (!string.IsNullOrEmpty(config.Body) &&
-                    config.HttpMethod != "GET" && config.HttpMethod != "DELETE")
+                finally
                 {
-                    if (request.ContentType == null)
-                        request.ContentType = GetContentType(config.PayloadType);
+                    breaker?.Report(result != null && !result.IsTransientFailure, result?.Error, probe);
+                }
+                attempts++;
 
-                    var bodyBytes = Encoding.UTF8.GetBytes(config.Body);
-                    request.ContentLength = bodyBytes.Length;
+                if (!result.IsTransientFailure || attempts > retries)
+                    break;
+                await Task.Delay(RetryDelay(attempts, retryDelayMs)).ConfigureAwait(false);
+            }
 
-                    using (var stream = request.GetRequestStream())
-                    {
-                        stream.Write(bodyBytes, 0, bodyBytes.Length);
-                    }
-                }
+            result.Attempts = attempts;
+            result.ElapsedMs = sw.ElapsedMilliseconds;
+            return result;
+        }
 
-                using (var response = (HttpWebResponse)request.GetResponse())
-                {
-                    sw.Stop();
-                    string responseBody;
-                    using (var reader = new StreamReader(response.GetResponseStream(), Encoding.UTF8))
-                    {
-                        responseBody = reader.ReadToEnd();
-                    }
+        private static TimeSpan RetryDelay(int attempt, int retryDelayMs)
+        {
+            var delay = Math.Min(MaxRetryDelayMs, retryDelayMs * Math.Pow(2, attempt - 1));
+            double jitter;
+            lock (_jitter) jitter = _jitter.NextDouble();
+            return TimeSpan.FromMilliseconds(delay * (0.5 + jitter / 2));
+        }
 
-                    return new HttpRequestResult
-                    {
-                        StatusCode = (int)response.StatusCode,
-                        ResponseBody = responseBody,
-                        ElapsedMs = sw.ElapsedMilliseconds,
-                        Success = true
-                    };
-                }
-            }
-            catch (WebException wex)
+        public static async Task<HttpRequestResult> ExecuteAsync(HttpRequestConfig config)
+        {
+            var sw = Stopwatch.StartNew();
+            var timeoutMs = config.TimeoutMs > 0 ? config.TimeoutMs : 10000;
+            try
             {
-                sw.Stop();
+                // Requests from the background plugin are prepared once per
+                // configuration; the admin Test button prepares on every send.
+                var prepared = config.IsPrepared ? config : config.Prepare();
 
-                if (wex.Response is HttpWebResponse errorResponse)
+                byte[] body = null;
+                if (!string.IsNullOrEmpty(prepared.Body) &&
+                    prepared.HttpMethod != "GET" && prepared.HttpMethod != "DELETE")
+                    body = Encoding.UTF8.GetBytes(prepared.Body);
+
+                var client = GetClient(prepared);
+                using (var cts = new CancellationTokenSource(timeoutMs))
                 {
-                    string errorBody;
-                    using (var reader = new StreamReader(errorResponse.GetResponseStream(), Encoding.UTF8))
+                    string nonce = null;
+                    var authorization = prepared.Authorization ?? prepared.Digest?.Authorize(prepared.RequestMethod, prepared.RequestUri, out nonce);
+                    var response = await SendAsync(client, prepared, body, authorization, cts.Token).ConfigureAwait(false);
+
+                    // First request to a Digest host, or its nonce went stale or
+                    // was replaced: answer the challenge once; later requests reuse it.
+                    if (response.StatusCode == HttpStatusCode.Unauthorized && prepared.Digest != null &&
+                        prepared.Digest.Challenged(response, nonce))
                     {
-                        errorBody = reader.ReadToEnd();
+                        response.Dispose();
+                        authorization = prepared.Digest.Authorize(prepared.RequestMethod, prepared.RequestUri, out nonce);
+                        response = await SendAsync(client, prepared, body, authorization, cts.Token).ConfigureAwait(false);
                     }
 
-                    return new HttpRequestResult
+                    using (response)
                     {
-                        StatusCode = (int)errorResponse.StatusCode,
-                        ResponseBody = errorBody,
-                        ElapsedMs = sw.ElapsedMilliseconds,
-                        Success = false,
-                        Error = $"HTTP {(int)errorResponse.StatusCode}: {errorResponse.StatusDescription}"
-                    };
-                }
+                        var responseBody = await response.Content.ReadAsStringAsync().ConfigureAwait(false);
+                        sw.Stop();
 
+                        var statusCode = (int)response.StatusCode;
+                        return new HttpRequestResult
+                        {
+                            StatusCode = statusCode,
+                            ResponseBody = responseBody,
+                            ElapsedMs = sw.ElapsedMilliseconds,
+                            Success = response.IsSuccessStatusCode,
+                            Error = response.IsSuccessStatusCode ? null : $"HTTP {statusCode}: {response.ReasonPhrase}"
+                        };
+                    }
+                }
+            }
+            catch (OperationCanceledException)
+            {
+                sw.Stop();
                 return new HttpRequestResult
                 {
                     StatusCode = 0,
                     ElapsedMs = sw.ElapsedMilliseconds,
                     Success = false,
-                    Error = wex.Message
+                    Error = $"The operation has timed out ({timeoutMs}ms)"
                 };
             }
             catch (Exception ex)
@@ -155,42 +302,71 @@ namespace HttpRequests.Background
                     StatusCode = 0,
                     ElapsedMs = sw.ElapsedMilliseconds,
                     Success = false,
-                    Error = ex.Message
+                    Error = Innermost(ex).Message
                 };
             }
         }
 
-        private static void ApplyAuth(HttpWebRequest request, HttpRequestConfig config)
+        private static async Task<HttpResponseMessage> SendAsync(HttpClient client, HttpRequestConfig prepared,
+            byte[] body, string authorization, CancellationToken token)
         {
-            if (string.IsNullOrEmpty(config.AuthType) || config.AuthType == "None")
-                return;
-
-            switch (config.AuthType)
+            using (var request = new HttpRequestMessage(prepared.RequestMethod, prepared.RequestUri))
             {
-                case "Basic":
-                    var credentials = (config.AuthUsername ?? "") + ":" + (config.AuthPassword ?? "");
-                    var basicToken = Convert.ToBase64String(Encoding.UTF8.GetBytes(credentials));
-                    request.Headers["Authorization"] = "Basic " + basicToken;
-                    break;
+                if (authorization != null)
+                    request.Headers.TryAddWithoutValidation("Authorization", authorization);
 
-                case "Bearer":
-                    request.Headers["Authorization"] = "Bearer " + (config.AuthToken ?? "");
-                    break;
+                foreach (var kvp in prepared.RequestHeaders)
+                    request.Headers.TryAddWithoutValidation(kvp.Key, kvp.Value);
 
-                case "Digest":
-                    if (!string.IsNullOrEmpty(config.AuthUsername))
-                    {
-                        var credCache = new CredentialCache();
-                        credCache.Add(new Uri(config.Url), "Digest",
-                            new NetworkCredential(config.AuthUsername ?? "", config.AuthPassword ?? ""));
-                        request.Credentials = credCache;
-                        request.PreAuthenticate = true;
-                    }
-                    break;
+                // Configured content headers are sent without a body too, on an
+                // empty one, as HttpWebRequest did.
+                if (body != null || prepared.ContentHeaders.Length > 0)
+                {
+                    request.Content = new ByteArrayContent(body ?? Array.Empty<byte>());
+                    if (body != null && prepared.ContentType != null)
+                        request.Content.Headers.TryAddWithoutValidation("Content-Type", prepared.ContentType);
+                    foreach (var kvp in prepared.ContentHeaders)
+                        request.Content.Headers.TryAddWithoutValidation(kvp.Key, kvp.Value);
+                }
+
+                return await client.SendAsync(request, HttpCompletionOption.ResponseContentRead, token)
+                    .ConfigureAwait(false);
             }
         }
 
-        private static string GetContentType(string payloadType)
+        private static HttpClient GetClient(HttpRequestConfig config)
+        {
+            var key = config.ClientKey;
+
+            return _clients.GetOrAdd(key, _ =>
+            {
+                var handler = new HttpClientHandler
+                {
+                    MaxConnectionsPerServer = MaxConnectionsPerHost,
+                    UseCookies = false
+                };
+                if (config.SkipCertValidation)
+                    handler.ServerCertificateCustomValidationCallback = (message, cert, chain, errors) => true;
+
+                _log.Info($"Created HTTP client '{key}' (max {MaxConnectionsPerHost} connections per host)");
+
+                // Per-request timeouts come from the CancellationToken.
+                var client = new HttpClient(handler) { Timeout = Timeout.InfiniteTimeSpan };
+                // Webhook bodies are small: send them right away instead of
+                // waiting a round trip for "100 Continue".
+                client.DefaultRequestHeaders.ExpectContinue = false;
+                return client;
+            });
+        }
+
+        private static Exception Innermost(Exception ex)
+        {
+            while (ex.InnerException != null)
+                ex = ex.InnerException;
+            return ex;
+        }
+
+        internal static string GetContentType(string payloadType)
         {
             switch (payloadType)
             {
@@ -202,7 +378,7 @@ namespace HttpRequests.Background
             }
         }
 
-        private static string BuildUrlWithParams(string baseUrl, Dictionary<string, string> queryParams)
+        internal static string BuildUrlWithParams(string baseUrl, Dictionary<string, string> queryParams)
         {
             if (queryParams == null || queryParams.Count == 0)
                 return baseUrl;
@@ -2,7 +2,7 @@ using System;
 using System.Collections.Generic;
 using System.Linq;
 using System.Text;
-using System.Threading;
+using System.Threading.Tasks;
 using CommunitySDK;
 using HttpRequests.Messaging;
 using VideoOS.Platform;
@@ -17,16 +17,25 @@ namespace HttpRequests.Background
         private static readonly PluginLog _log = new PluginLog("HttpRequests");
         private readonly SystemLog _sysLog = new SystemLog(_log);
         private readonly CrossMessageHandler _cmh = new CrossMessageHandler(_log);
+        private readonly HttpRequestDispatcher _dispatcher = new HttpRequestDispatcher();
+        private readonly HttpRequestBatcher _batcher;
+        private readonly CircuitBreakerRegistry _breakers;
         private object _configMessageFolderObj;
         private object _configMessageRequestObj;
         private volatile bool _closing;
 
         internal static HttpRequestsBackgroundPlugin Instance { get; private set; }
 
-        // Cached config
-        private List<Item> _folders = new List<Item>();
-        private List<Item> _requests = new List<Item>();
-        private readonly object _configLock = new object();
+        public HttpRequestsBackgroundPlugin()
+        {
+            _batcher = new HttpRequestBatcher(SendBatch);
+            _breakers = new CircuitBreakerRegistry(new CircuitBreakerSettings(), OnCircuitChanged);
+        }
+
+        // Compiled request items by ObjectId. Replaced as a whole on every
+        // configuration change, so firings read it without locking.
+        private volatile Dictionary<Guid, CompiledRequest> _requests = new Dictionary<Guid, CompiledRequest>();
+        private volatile string _siteJson = "";
 
         public override Guid Id => HttpRequestsDefinition.BackgroundPluginId;
         public override string Name => "HTTP Requests Background";
@@ -79,6 +88,10 @@ namespace HttpRequests.Background
             }
 
             _cmh.Close();
+            var unsent = _batcher.Close();
+            if (unsent > 0)
+                _log.Info($"Discarded {unsent} batched events that were not sent yet");
+            _dispatcher.Close();
         }
 
         private void LoadConfig()
@@ -88,21 +101,26 @@ namespace HttpRequests.Background
                 var folders = Configuration.Instance.GetItemConfigurations(
                     HttpRequestsDefinition.PluginId, null, HttpRequestsDefinition.FolderKindId);
 
-                var allRequests = new List<Item>();
+                var compiled = new Dictionary<Guid, CompiledRequest>();
                 foreach (var folder in folders)
                 {
                     var requests = Configuration.Instance.GetItemConfigurations(
                         HttpRequestsDefinition.PluginId, folder, HttpRequestsDefinition.RequestKindId);
-                    allRequests.AddRange(requests);
+                    foreach (var item in requests)
+                    {
+                        var request = new CompiledRequest(item);
+                        if (request.Error != null)
+                            _log.Error($"Request '{request.Name}' has an invalid URL: {request.Error}");
+                        compiled[request.Id] = request;
+                    }
                 }
 
-                lock (_configLock)
-                {
-                    _folders = folders;
-                    _requests = allRequests;
-                }
+                _siteJson = BuildSiteJson();
+                _requests = compiled;
+                DigestCredentials.Retain(new HashSet<DigestCredentials>(
+                    compiled.Values.Select(r => r.Config?.Digest).Where(d => d != null)));
 
-                _log.Info($"Loaded config: {folders.Count} folders, {allRequests.Count} requests");
+                _log.Info($"Loaded config: {folders.Count} folders, {compiled.Count} requests");
             }
             catch (Exception ex)
             {
@@ -123,110 +141,116 @@ namespace HttpRequests.Background
         {
             if (_closing) return;
 
-            ThreadPool.QueueUserWorkItem(_ =>
+            try
             {
-                try
-                {
-                    ExecuteForItem(targetFqid, triggeringEvent);
-                }
-                catch (Exception ex)
-                {
-                    _log.Error($"Action execution error: {ex.Message}", ex);
-                }
-            });
+                ExecuteForItem(targetFqid, triggeringEvent);
+            }
+            catch (Exception ex)
+            {
+                _log.Error($"Action execution error: {ex.Message}", ex);
+            }
         }
 
+        // Resolves the request on the rule engine's thread (a dictionary lookup
+        // plus the event JSON) and queues the HTTP call on the dispatcher,
+        // which bounds concurrency per host.
         private void ExecuteForItem(FQID targetFqid, BaseEvent triggeringEvent)
         {
             var targetId = targetFqid.ObjectId;
 
-            List<Item> requests;
-            lock (_configLock)
+            if (!_requests.TryGetValue(targetId, out var request))
             {
-                requests = _requests.ToList();
+                _log.Error($"Request item not found: {targetId}");
+                return;
             }
 
-            var requestItem = requests.FirstOrDefault(r => r.FQID.ObjectId == targetId);
-            if (requestItem != null)
+            if (!request.Enabled)
             {
-                ExecuteRequest(requestItem, triggeringEvent);
+                _log.Info($"Request '{request.Name}' is disabled, skipping");
+                return;
             }
-            else
+
+            var body = request.EventBody && triggeringEvent != null
+                ? BuildJsonPayload(request.UserJsonInner, triggeringEvent, _siteJson)
+                : request.Config.Body;
+
+            if (request.Batch)
             {
-                _log.Error($"Request item not found: {targetId}");
+                _batcher.Add(targetId, request.Config, body,
+                    request.BatchCoalesce ? CoalesceKey(triggeringEvent) : null,
+                    request.BatchMaxSize, request.BatchLingerMs);
+                return;
             }
+
+            _log.Info($"Executing '{request.Name}': {request.Description}");
+            var config = ReferenceEquals(body, request.Config.Body) ? request.Config : request.Config.WithBody(body);
+            Enqueue(request, config, triggeringEvent, 1);
         }
 
-        private bool ExecuteRequest(Item requestItem, BaseEvent triggeringEvent)
+        // Called by the batcher when a window is full or its linger time is up.
+        private void SendBatch(Guid requestId, HttpRequestConfig config, int events, int coalesced)
         {
-            var method = GetProp(requestItem, "HttpMethod", "POST");
-            var url = GetProp(requestItem, "Url", "");
-            var payloadType = GetProp(requestItem, "PayloadType", "JSON");
-            var userPayload = GetProp(requestItem, "UserPayload", "");
-            var skipCert = GetProp(requestItem, "SkipCertValidation", "No") == "Yes";
-            var includeEvent = GetProp(requestItem, "IncludeEventData", "Yes") != "No";
-            var timeoutMs = 10000;
-            int.TryParse(GetProp(requestItem, "TimeoutMs", "10000"), out timeoutMs);
-            var authType = GetProp(requestItem, "AuthType", "None");
-
-            var enabled = GetProp(requestItem, "Enabled", "Yes") != "No";
-            if (!enabled)
-            {
-                _log.Info($"Request '{requestItem.Name}' is disabled, skipping");
-                return true;
-            }
+            if (_closing) return;
 
-            // Build body
-            string body = null;
-            if (payloadType != "None" && method != "GET" && method != "DELETE")
+            if (!_requests.TryGetValue(requestId, out var request))
             {
-                if (payloadType == "JSON")
-                    body = BuildJsonPayload(userPayload, triggeringEvent, includeEvent);
-                else
-                    body = string.IsNullOrWhiteSpace(userPayload) ? null : userPayload;
+                _log.Error($"Request item not found, dropping batch of {events} events: {requestId}");
+                return;
             }
 
-            var headers = ReadKeyValueProperties(requestItem, "Header_");
-
-            // Read query params
-            var queryParams = ReadKeyValueProperties(requestItem, "QueryParam_");
+            _log.Info($"Executing '{request.Name}': {config.HttpMethod} {config.Url} " +
+                $"[batch of {events} events, {coalesced} coalesced]");
+            Enqueue(request, config, null, events);
+        }
 
-            var authUsername = GetProp(requestItem, "AuthUsername", "");
-            var authPassword = GetProp(requestItem, "AuthPassword", "");
-            var authToken = GetProp(requestItem, "AuthToken", "");
+        private void Enqueue(CompiledRequest request, HttpRequestConfig config, BaseEvent triggeringEvent, int events)
+        {
+            if (!_dispatcher.Enqueue(request.Host, request.Name,
+                    waited => ExecuteRequestAsync(request, config, triggeringEvent, waited, events)))
+            {
+                _sysLog.RequestFailed(config.HttpMethod, config.Url,
+                    events > 1 ? $"Request queue full, batch of {events} events dropped" : "Request queue full, request dropped");
+            }
+        }
 
-            _log.Info($"Executing '{requestItem.Name}': {method} {url} " +
-                $"[auth={authType}, payload={payloadType}, timeout={timeoutMs}ms, " +
-                $"headers={headers.Count}, params={queryParams.Count}, skipCert={skipCert}]");
+        // Events from the same source with the same type and name replace each
+        // other within a batch window.
+        private static string CoalesceKey(BaseEvent evt)
+        {
+            var h = evt?.EventHeader;
+            if (h == null) return null;
+            var source = h.Source?.FQID != null ? h.Source.FQID.ObjectId.ToString() : h.Source?.Name ?? "";
+            return source + "|" + h.Type + "|" + h.Name;
+        }
 
-            var config = new HttpRequestConfig
-            {
-                Name = requestItem.Name,
-                HttpMethod = method,
-                Url = url,
-                PayloadType = payloadType,
-                Body = body,
-                Headers = headers.Count > 0 ? headers : null,
-                QueryParams = queryParams.Count > 0 ? queryParams : null,
-                SkipCertValidation = skipCert,
-                TimeoutMs = timeoutMs,
-                AuthType = authType,
-                AuthUsername = authUsername,
-                AuthPassword = authPassword,
-                AuthToken = authToken
-            };
-
-            var result = HttpRequestExecutor.Execute(config);
+        private async Task<bool> ExecuteRequestAsync(CompiledRequest request, HttpRequestConfig config, BaseEvent triggeringEvent, TimeSpan waited, int events)
+        {
+            var requestItem = request.Item;
+            var method = config.HttpMethod;
+            var url = config.Url;
+            var result = await HttpRequestExecutor.ExecuteAsync(config, _breakers.Get(request.Host, request.BreakerThreshold),
+                request.Retries, request.RetryDelayMs).ConfigureAwait(false);
+            var queued = waited.TotalMilliseconds >= 1 ? $", queued {waited.TotalMilliseconds:0}ms" : "";
+            if (events > 1)
+                queued += $", {events} events";
+            if (result.Attempts > 1)
+                queued += $", {result.Attempts} attempts";
 
             if (result.Success)
             {
-                _log.Info($"Success '{requestItem.Name}': {method} {url} -> {result.StatusCode} ({result.ElapsedMs}ms)");
+                _log.Info($"Success '{requestItem.Name}': {method} {url} -> {result.StatusCode} ({result.ElapsedMs}ms{queued})");
                 _sysLog.RequestExecuted(method, url, result.StatusCode, result.ElapsedMs);
                 FireEvent(requestItem, triggeringEvent, true, result);
             }
+            else if (result.CircuitOpen && result.Attempts == 0)
+            {
+                // The System Log already has the target marked down (OnCircuitChanged).
+                _log.Info($"Skipped '{requestItem.Name}': {method} {url} -> {result.Error}{queued}");
+                FireEvent(requestItem, triggeringEvent, false, result);
+            }
             else
             {
-                _log.Error($"Failed '{requestItem.Name}': {method} {url} -> {result.Error} ({result.ElapsedMs}ms)");
+                _log.Error($"Failed '{requestItem.Name}': {method} {url} -> {result.Error} ({result.ElapsedMs}ms{queued})");
                 _sysLog.RequestFailed(method, url, result.Error);
                 FireEvent(requestItem, triggeringEvent, false, result);
             }
@@ -236,61 +260,60 @@ namespace HttpRequests.Background
             return result.Success;
         }
 
-        private static Dictionary<string, string> ReadKeyValueProperties(Item item, string prefix)
+        private void OnCircuitChanged(CircuitBreaker breaker, CircuitState previous)
         {
-            var result = new Dictionary<string, string>(StringComparer.OrdinalIgnoreCase);
-            var countKey = prefix + "Count";
-            if (!item.Properties.ContainsKey(countKey)) return result;
-
-            int count;
-            if (!int.TryParse(item.Properties[countKey], out count)) return result;
-
-            for (int i = 0; i < count; i++)
+            switch (breaker.State)
             {
-                var kProp = $"{prefix}{i}_Key";
-                var vProp = $"{prefix}{i}_Value";
-                if (item.Properties.ContainsKey(kProp) && item.Properties.ContainsKey(vProp))
-                {
-                    var k = item.Properties[kProp];
-                    if (!string.IsNullOrWhiteSpace(k))
-                        result[k] = item.Properties[vProp];
-                }
+                case CircuitState.Open when previous == CircuitState.Closed:
+                    _log.Error($"Target {breaker.Host} is down after {breaker.Failures} failures in a row " +
+                        $"({breaker.LastError}); requests fail fast for {breaker.OpenFor.TotalSeconds:0}s");
+                    _sysLog.TargetDown(breaker.Host, breaker.Failures, breaker.LastError, (int)breaker.OpenFor.TotalSeconds);
+                    break;
+
+                case CircuitState.Open:
+                    _log.Info($"Target {breaker.Host} is still down ({breaker.LastError}); next probe in {breaker.OpenFor.TotalSeconds:0}s");
+                    break;
+
+                case CircuitState.HalfOpen:
+                    _log.Info($"Target {breaker.Host}: sending a probe request");
+                    break;
+
+                case CircuitState.Closed:
+                    _log.Info($"Target {breaker.Host} is reachable again after {breaker.Downtime.TotalSeconds:0}s, " +
+                        $"{breaker.FastFailed} requests were not sent");
+                    _sysLog.TargetRecovered(breaker.Host, (int)breaker.Downtime.TotalSeconds, breaker.FastFailed);
+                    break;
             }
-            return result;
         }
 
-        private string BuildJsonPayload(string userPayload, BaseEvent triggeringEvent, bool includeEvent)
+        /// <summary>
+        /// Members of the user's JSON payload without the outer braces, ready
+        /// to be merged with the event. A payload that is not a JSON object is
+        /// wrapped as "data".
+        /// </summary>
+        internal static string UserJsonInner(string userPayload)
         {
-            var hasUserPayload = !string.IsNullOrWhiteSpace(userPayload);
-            string userJsonInner = "";
-
-            if (hasUserPayload)
-            {
-                var trimmed = userPayload.Trim();
-                if (trimmed.StartsWith("{") && trimmed.EndsWith("}"))
-                    userJsonInner = trimmed.Substring(1, trimmed.Length - 2).Trim();
-                else
-                    userJsonInner = $"\"data\": {EscapeJsonString(trimmed)}";
-            }
+            if (string.IsNullOrWhiteSpace(userPayload))
+                return "";
 
-            if (!includeEvent || triggeringEvent == null)
-            {
-                if (hasUserPayload)
-                    return "{" + userJsonInner + "}";
-                return "{}";
-            }
-
-            var eventJson = BuildEventJson(triggeringEvent);
+            var trimmed = userPayload.Trim();
+            if (trimmed.StartsWith("{") && trimmed.EndsWith("}"))
+                return trimmed.Substring(1, trimmed.Length - 2).Trim();
+            return $"\"data\": {EscapeJsonString(trimmed)}";
+        }
 
-            var parts = new List<string>();
-            if (!string.IsNullOrEmpty(userJsonInner))
-                parts.Add(userJsonInner);
-            parts.Add(eventJson);
+        internal static string BuildJsonPayload(string userJsonInner, BaseEvent triggeringEvent, string siteJson)
+        {
+            if (triggeringEvent == null)
+                return "{" + userJsonInner + "}";
 
-            return "{" + string.Join(", ", parts) + "}";
+            var eventJson = BuildEventJson(triggeringEvent, siteJson);
+            if (string.IsNullOrEmpty(userJsonInner))
+                return "{" + eventJson + "}";
+            return "{" + userJsonInner + ", " + eventJson + "}";
         }
 
-        private string BuildEventJson(BaseEvent evt)
+        private static string BuildEventJson(BaseEvent evt, string siteJson)
         {
             if (evt?.EventHeader == null)
                 return "\"Event\": {}";
@@ -320,13 +343,19 @@ namespace HttpRequests.Background
             }
 
             sb.Append("}}");
+            sb.Append(siteJson);
+            return sb.ToString();
+        }
 
+        // The site part of the event JSON only changes with the configuration.
+        internal static string BuildSiteJson()
+        {
             try
             {
                 var site = EnvironmentManager.Instance.MasterSite;
                 if (site != null)
                 {
-                    sb.AppendFormat(", \"Site\": {{\"ServerHostname\": {0}, \"AbsoluteUri\": {1}}}",
+                    return string.Format(", \"Site\": {{\"ServerHostname\": {0}, \"AbsoluteUri\": {1}}}",
                         EscapeJsonString(site.ServerId?.ServerHostname ?? ""),
                         EscapeJsonString(site.ServerId != null
                             ? $"{site.ServerId.ServerScheme}://{site.ServerId.ServerHostname}/"
@@ -335,7 +364,7 @@ namespace HttpRequests.Background
             }
             catch { }
 
-            return sb.ToString();
+            return "";
         }
 
         private static string EscapeJsonString(string value)
@@ -371,8 +400,8 @@ namespace HttpRequests.Background
                     ? HttpRequestsDefinition.EvtRequestExecutedId
                     : HttpRequestsDefinition.EvtRequestFailedId;
 
-                var method = GetProp(requestItem, "HttpMethod", "?");
-                var url = GetProp(requestItem, "Url", "");
+                var method = CompiledRequest.GetProp(requestItem, "HttpMethod", "?");
+                var url = CompiledRequest.GetProp(requestItem, "Url", "");
 
                 var customTag = success
                     ? $"Request: {method} {url} | Status: {result.StatusCode} | Time: {result.ElapsedMs}ms"
@@ -436,10 +465,5 @@ namespace HttpRequests.Background
                 _log.Error($"Failed to transmit execution result: {ex.Message}");
             }
         }
-
-        private static string GetProp(Item item, string key, string defaultValue)
-        {
-            return item.Properties.ContainsKey(key) ? item.Properties[key] : defaultValue;
-        }
     }
 }
@@ -0,0 +1,217 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Linq;
+using HttpRequests;
+using HttpRequests.Background;
+using VideoOS.Platform;
+using VideoOS.Platform.Data;
+
+namespace HttpRequestsDiagnostics
+{
+    internal class FireOverheadResult
+    {
+        public int Requests;
+        public int Fires;
+        public double CompileMillis;
+        public double LegacyMicros;
+        public long LegacyBytes;
+        public double CompiledMicros;
+        public long CompiledBytes;
+        public string Difference;
+
+        public override string ToString()
+        {
+            var text = $"{Requests} requests, {Fires} firings: per firing {LegacyMicros:0.0} µs / {LegacyBytes} B uncompiled, " +
+                $"{CompiledMicros:0.0} µs / {CompiledBytes} B compiled ({LegacyMicros / Math.Max(CompiledMicros, 0.001):0.0}x). " +
+                $"Compiling all requests took {CompileMillis:0.0} ms.";
+            return Difference == null ? text : text + " MISMATCH: " + Difference;
+        }
+    }
+
+    /// <summary>
+    /// Times what a rule firing costs before its HTTP call is queued, for a
+    /// set of synthetic request items. The uncompiled path is what every
+    /// firing did before CompiledRequest: a linear search of the item list,
+    /// parsing every property and preparing URI, headers and auth. The
+    /// compiled path is ExecuteForItem's: a dictionary lookup and the event
+    /// JSON. Both must produce the same request. Allocation figures come from
+    /// AppDomain monitoring and include other threads, so treat them as
+    /// approximate.
+    /// </summary>
+    internal static class FireOverheadBenchmark
+    {
+        public const int DefaultRequests = 500;
+        public const int DefaultFires = 20000;
+
+        public static FireOverheadResult Run(int requests = DefaultRequests, int fires = DefaultFires)
+        {
+            AppDomain.MonitoringIsEnabled = true;
+            var items = Enumerable.Range(0, requests).Select(CreateItem).ToList();
+            var evt = CreateEvent();
+            var siteJson = HttpRequestsBackgroundPlugin.BuildSiteJson();
+
+            var random = new Random(1);
+            var targets = new Guid[fires];
+            for (int i = 0; i < fires; i++)
+                targets[i] = items[random.Next(items.Count)].FQID.ObjectId;
+
+            var sw = Stopwatch.StartNew();
+            var compiled = new Dictionary<Guid, CompiledRequest>();
+            foreach (var item in items)
+                compiled[item.FQID.ObjectId] = new CompiledRequest(item);
+            sw.Stop();
+
+            var result = new FireOverheadResult
+            {
+                Requests = requests,
+                Fires = fires,
+                CompileMillis = sw.Elapsed.TotalMilliseconds,
+                Difference = Compare(Legacy(items, new object(), targets[0], evt),
+                    Compiled(compiled, targets[0], evt, siteJson))
+            };
+
+            var itemsLock = new object();
+            Measure(id => Legacy(items, itemsLock, id, evt), targets, out result.LegacyMicros, out result.LegacyBytes);
+            Measure(id => Compiled(compiled, id, evt, siteJson), targets, out result.CompiledMicros, out result.CompiledBytes);
+            return result;
+        }
+
+        private static void Measure(Func<Guid, HttpRequestConfig> fire, Guid[] targets,
+            out double microsPerFire, out long bytesPerFire)
+        {
+            fire(targets[0]); // warm up (JIT)
+            var domain = AppDomain.CurrentDomain;
+            long allocated = domain.MonitoringTotalAllocatedMemorySize;
+            var sw = Stopwatch.StartNew();
+            foreach (var id in targets) fire(id);
+            sw.Stop();
+            allocated = domain.MonitoringTotalAllocatedMemorySize - allocated;
+
+            microsPerFire = sw.Elapsed.TotalMilliseconds * 1000.0 / targets.Length;
+            bytesPerFire = allocated / targets.Length;
+        }
+
+        private static HttpRequestConfig Compiled(Dictionary<Guid, CompiledRequest> requests, Guid id, BaseEvent evt, string siteJson)
+        {
+            var request = requests[id];
+            var body = request.EventBody
+                ? HttpRequestsBackgroundPlugin.BuildJsonPayload(request.UserJsonInner, evt, siteJson)
+                : request.Config.Body;
+            return request.Config.WithBody(body);
+        }
+
+        // The per-firing work before request items were compiled.
+        private static HttpRequestConfig Legacy(List<Item> items, object itemsLock, Guid id, BaseEvent evt)
+        {
+            Item item;
+            lock (itemsLock)
+            {
+                item = items.FirstOrDefault(r => r.FQID.ObjectId == id);
+            }
+
+            var method = CompiledRequest.GetProp(item, "HttpMethod", "POST");
+            var payloadType = CompiledRequest.GetProp(item, "PayloadType", "JSON");
+            var userPayload = CompiledRequest.GetProp(item, "UserPayload", "");
+            var includeEvent = CompiledRequest.GetProp(item, "IncludeEventData", "Yes") != "No";
+            var timeoutMs = 10000;
+            int.TryParse(CompiledRequest.GetProp(item, "TimeoutMs", "10000"), out timeoutMs);
+
+            string body = null;
+            if (payloadType != "None" && method != "GET" && method != "DELETE")
+            {
+                var inner = HttpRequestsBackgroundPlugin.UserJsonInner(userPayload);
+                body = HttpRequestsBackgroundPlugin.BuildJsonPayload(inner, includeEvent ? evt : null,
+                    HttpRequestsBackgroundPlugin.BuildSiteJson());
+            }
+
+            var headers = CompiledRequest.ReadKeyValueProperties(item, "Header_");
+            var queryParams = CompiledRequest.ReadKeyValueProperties(item, "QueryParam_");
+
+            return new HttpRequestConfig
+            {
+                Name = item.Name,
+                HttpMethod = method,
+                Url = CompiledRequest.GetProp(item, "Url", ""),
+                PayloadType = payloadType,
+                Body = body,
+                Headers = headers.Count > 0 ? headers : null,
+                QueryParams = queryParams.Count > 0 ? queryParams : null,
+                SkipCertValidation = CompiledRequest.GetProp(item, "SkipCertValidation", "No") == "Yes",
+                TimeoutMs = timeoutMs,
+                AuthType = CompiledRequest.GetProp(item, "AuthType", "None"),
+                AuthUsername = CompiledRequest.GetProp(item, "AuthUsername", ""),
+                AuthPassword = CompiledRequest.GetProp(item, "AuthPassword", ""),
+                AuthToken = CompiledRequest.GetProp(item, "AuthToken", "")
+            }.Prepare();
+        }
+
+        /// <summary>First difference between the two requests, or null when they match.</summary>
+        private static string Compare(HttpRequestConfig a, HttpRequestConfig b)
+        {
+            if (a.RequestUri != b.RequestUri) return "URI " + a.RequestUri + " vs " + b.RequestUri;
+            if (a.Body != b.Body) return "body differs";
+            if (a.Authorization != b.Authorization) return "Authorization differs";
+            if (a.ContentType != b.ContentType) return "Content-Type " + a.ContentType + " vs " + b.ContentType;
+            if (a.RequestHeaders.Length != b.RequestHeaders.Length) return "header count differs";
+            if (a.ContentHeaders.Length != b.ContentHeaders.Length) return "content header count differs";
+            return null;
+        }
+
+        // A request as a typical integration configures it: JSON with event
+        // data, Basic auth, a few headers and query parameters.
+        private static Item CreateItem(int index)
+        {
+            var fqid = new FQID
+            {
+                ObjectId = Guid.NewGuid(),
+                Kind = HttpRequestsDefinition.RequestKindId,
+                FolderType = FolderType.No
+            };
+            var item = new Item(fqid, $"Benchmark request {index}");
+            var p = item.Properties;
+            p["Enabled"] = "Yes";
+            p["HttpMethod"] = "POST";
+            p["Url"] = $"https://integration{index % 20}.example.com/hooks/{index}";
+            p["PayloadType"] = "JSON";
+            p["UserPayload"] = "{\"site\": \"Main\", \"zone\": " + index + ", \"severity\": \"high\"}";
+            p["IncludeEventData"] = "Yes";
+            p["SkipCertValidation"] = "No";
+            p["TimeoutMs"] = "10000";
+            p["AuthType"] = "Basic";
+            p["AuthUsername"] = "integration";
+            p["AuthPassword"] = "secret" + index;
+            p["Header_Count"] = "3";
+            p["Header_0_Key"] = "X-Source"; p["Header_0_Value"] = "XProtect";
+            p["Header_1_Key"] = "X-Request"; p["Header_1_Value"] = index.ToString();
+            p["Header_2_Key"] = "Accept"; p["Header_2_Value"] = "application/json";
+            p["QueryParam_Count"] = "2";
+            p["QueryParam_0_Key"] = "token"; p["QueryParam_0_Value"] = "abc " + index;
+            p["QueryParam_1_Key"] = "format"; p["QueryParam_1_Value"] = "json";
+            return item;
+        }
+
+        private static BaseEvent CreateEvent()
+        {
+            return new AnalyticsEvent
+            {
+                EventHeader = new EventHeader
+                {
+                    ID = Guid.NewGuid(),
+                    Class = "Analytics",
+                    Type = "Motion",
+                    Timestamp = DateTime.Now,
+                    Name = "Motion Started",
+                    Message = "Motion Started",
+                    CustomTag = "",
+                    Priority = 5,
+                    Source = new EventSource
+                    {
+                        Name = "Lobby Camera",
+                        FQID = new FQID { ObjectId = Guid.NewGuid(), Kind = Kind.Camera }
+                    }
+                }
+            };
+        }
+    }
+}
@@ -0,0 +1,80 @@
+using System;
+
+namespace HttpRequestsDiagnostics
+{
+    /// <summary>
+    /// Command-line diagnostics for the HTTP Requests plugin. Kept out of the
+    /// plugin so the Management Client only shows configuration.
+    /// </summary>
+    internal class Program
+    {
+        private const string Usage =
+            "Usage: HttpRequestsDiagnostics resilience [test-server-url]\n" +
+            "       HttpRequestsDiagnostics overhead [requests] [firings]\n" +
+            "  resilience  Run the breaker and retry scenarios against test_server.py\n" +
+            "              (default " + ResilienceTest.DefaultBaseUrl + ").\n" +
+            "  overhead    Time rule firings on synthetic requests, uncompiled and compiled\n" +
+            "              (default 500 requests, 20000 firings). Nothing is sent.";
+
+        private static int Main(string[] args)
+        {
+            var command = args.Length > 0 ? args[0].ToLowerInvariant() : "";
+            try
+            {
+                switch (command)
+                {
+                    case "resilience":
+                        return RunResilience(args.Length > 1 ? args[1] : ResilienceTest.DefaultBaseUrl);
+                    case "overhead":
+                        return RunOverhead(
+                            IntArg(args, 1, FireOverheadBenchmark.DefaultRequests),
+                            IntArg(args, 2, FireOverheadBenchmark.DefaultFires));
+                    default:
+                        Console.Error.WriteLine(Usage);
+                        return 2;
+                }
+            }
+            catch (Exception ex)
+            {
+                Console.Error.WriteLine("Failed: " + ex.Message);
+                return 1;
+            }
+        }
+
+        private static int RunResilience(string baseUrl)
+        {
+            if (!Uri.TryCreate(baseUrl, UriKind.Absolute, out _))
+            {
+                Console.Error.WriteLine("Expected the URL of test_server.py, for example " + ResilienceTest.DefaultBaseUrl);
+                return 2;
+            }
+
+            Console.WriteLine($"Resilience test against {baseUrl} (about a minute)...");
+            var results = ResilienceTest.Run(baseUrl, Console.WriteLine);
+            var passed = results.TrueForAll(r => r.Passed);
+            Console.WriteLine(passed ? "All scenarios passed." : "Some scenarios FAILED.");
+            return passed ? 0 : 1;
+        }
+
+        private static int RunOverhead(int requests, int fires)
+        {
+            if (requests < 1 || fires < 1)
+            {
+                Console.Error.WriteLine(Usage);
+                return 2;
+            }
+
+            Console.WriteLine($"Measuring {fires} firings across {requests} requests...");
+            var result = FireOverheadBenchmark.Run(requests, fires);
+            Console.WriteLine(result);
+            return result.Difference == null ? 0 : 1;
+        }
+
+        private static int IntArg(string[] args, int index, int defaultValue)
+        {
+            if (args.Length <= index)
+                return defaultValue;
+            return int.TryParse(args[index], out var value) ? value : -1;
+        }
+    }
+}
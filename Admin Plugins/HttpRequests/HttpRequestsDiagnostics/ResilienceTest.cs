@@ -0,0 +1,211 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Threading;
+using System.Threading.Tasks;
+using HttpRequests.Background;
+
+namespace HttpRequestsDiagnostics
+{
+    internal class ResilienceScenarioResult
+    {
+        public string Fault;
+        public int Events;
+        // Without breaker or retries, as before
+        public int BaselineSent;
+        public long BaselineWorkerMs;
+        // With breaker and retries
+        public int Sent;
+        public int FastFailed;
+        public long WorkerMs;
+        public bool CircuitOpened;
+        /// <summary>From the target becoming healthy to the first successful request, or -1 if none.</summary>
+        public double RecoverySeconds;
+        public string Failure;
+
+        public bool Passed => Failure == null;
+
+        public override string ToString()
+        {
+            return $"{Fault}: {Events} events. Without breaker: {BaselineSent} sent to the down target, " +
+                $"worker time {BaselineWorkerMs / 1000.0:0.0}s. With breaker and {ResilienceTest.Retries} retries: " +
+                $"{Sent} sent, {FastFailed} failed fast, worker time {WorkerMs / 1000.0:0.0}s " +
+                $"(saved {(BaselineWorkerMs - WorkerMs) / 1000.0:0.0}s), recovered after " +
+                (RecoverySeconds < 0 ? "never" : $"{RecoverySeconds:0.0}s") +
+                (Passed ? ". PASS" : ". FAIL: " + Failure);
+        }
+    }
+
+    /// <summary>
+    /// Drives the executor, dispatcher and circuit breaker against the fault
+    /// profiles of test_server.py. For each fault (connection reset, 503,
+    /// hang) events fire at a steady rate while the target is broken, then
+    /// the same host turns healthy (the fault prefix is dropped from the
+    /// path). Each scenario runs once the old way, without breaker or retries,
+    /// and once with them, and reports requests that reached the broken
+    /// target, worker time (time requests held a dispatcher slot, retries and
+    /// waits included) and how long after the target recovered the first
+    /// request succeeded. Short timeouts and open times keep a run under a
+    /// minute.
+    /// </summary>
+    internal static class ResilienceTest
+    {
+        public const string DefaultBaseUrl = "http://localhost:4474";
+        public static readonly string[] Faults = { "reset", "down", "dead" };
+
+        public const int EventsPerSecond = 20;
+        public const int OutageMs = 3000;
+        public const int RecoveryWindowMs = 5000;
+        public const int TimeoutMs = 1000;
+        public const int Retries = 2;
+        public const int RetryDelayMs = 100;
+
+        private static readonly CircuitBreakerSettings _settings = new CircuitBreakerSettings
+        {
+            OpenDuration = TimeSpan.FromSeconds(1),
+            MaxOpenDuration = TimeSpan.FromSeconds(2)
+        };
+
+        public static List<ResilienceScenarioResult> Run(string baseUrl, Action<string> progress)
+        {
+            baseUrl = baseUrl.TrimEnd('/');
+            var results = new List<ResilienceScenarioResult>();
+            foreach (var fault in Faults)
+            {
+                progress?.Invoke($"{fault}: without breaker...");
+                var baseline = RunPhase(baseUrl, fault, false);
+                progress?.Invoke($"{fault}: with breaker...");
+                var resilient = RunPhase(baseUrl, fault, true);
+
+                var result = new ResilienceScenarioResult
+                {
+                    Fault = fault,
+                    Events = resilient.Events,
+                    BaselineSent = baseline.SentWhileDown,
+                    BaselineWorkerMs = baseline.WorkerMs,
+                    Sent = resilient.SentWhileDown,
+                    FastFailed = resilient.FastFailed,
+                    WorkerMs = resilient.WorkerMs,
+                    CircuitOpened = resilient.CircuitOpened,
+                    RecoverySeconds = resilient.RecoverySeconds
+                };
+
+                // The target is down for the whole outage, so the breaker must
+                // open, spare it most requests, and let traffic through again
+                // within one (doubled) open time plus a probe's timeout.
+                var recoveryBound = _settings.MaxOpenDuration.TotalSeconds + TimeoutMs / 1000.0 + 0.5;
+                if (baseline.SentWhileDown == 0 || baseline.SucceededWhileDown > 0)
+                    result.Failure = $"the target did not fail; is test_server.py running at {baseUrl}?";
+                else if (!resilient.CircuitOpened)
+                    result.Failure = "circuit never opened";
+                else if (resilient.SentWhileDown >= baseline.SentWhileDown)
+                    result.Failure = "breaker did not reduce requests to the down target";
+                else if (resilient.RecoverySeconds < 0 || resilient.RecoverySeconds > recoveryBound)
+                    result.Failure = $"recovery took longer than {recoveryBound:0.0}s";
+
+                results.Add(result);
+                progress?.Invoke(result.ToString());
+            }
+            return results;
+        }
+
+        private class Phase
+        {
+            public int Events;
+            public int SentWhileDown;
+            public int SucceededWhileDown;
+            public int FastFailed;
+            public long WorkerMs;
+            public bool CircuitOpened;
+            public double RecoverySeconds = -1;
+        }
+
+        private static Phase RunPhase(string baseUrl, string fault, bool resilient)
+        {
+            var down = Config(baseUrl + "/__fault/" + fault + "/hook");
+            var up = Config(baseUrl + "/hook");
+            var host = up.RequestUri.Authority;
+
+            var phase = new Phase();
+            var stateLock = new object();
+            var breaker = resilient
+                ? new CircuitBreaker(host, _settings, (b, previous) =>
+                {
+                    if (b.State == CircuitState.Open)
+                        lock (stateLock) phase.CircuitOpened = true;
+                })
+                : null;
+            var dispatcher = new HttpRequestDispatcher();
+            var pending = new List<Task>();
+            var clock = Stopwatch.StartNew();
+
+            try
+            {
+                int total = (OutageMs + RecoveryWindowMs) * EventsPerSecond / 1000;
+                for (int i = 0; i < total; i++)
+                {
+                    var due = i * 1000 / EventsPerSecond;
+                    var sleep = due - (int)clock.ElapsedMilliseconds;
+                    if (sleep > 0)
+                        Thread.Sleep(sleep);
+
+                    var isDown = clock.ElapsedMilliseconds < OutageMs;
+                    var config = isDown ? down : up;
+                    var done = new TaskCompletionSource<bool>();
+                    pending.Add(done.Task);
+                    phase.Events++;
+
+                    dispatcher.Enqueue(host, "resilience " + fault, async waited =>
+                    {
+                        try
+                        {
+                            var result = await HttpRequestExecutor.ExecuteAsync(config, breaker,
+                                resilient ? Retries : 0, RetryDelayMs).ConfigureAwait(false);
+                            var finished = clock.Elapsed.TotalSeconds;
+                            lock (stateLock)
+                            {
+                                phase.WorkerMs += result.ElapsedMs;
+                                if (result.CircuitOpen && result.Attempts == 0)
+                                    phase.FastFailed++;
+                                if (isDown)
+                                {
+                                    phase.SentWhileDown += result.Attempts;
+                                    if (result.Success) phase.SucceededWhileDown++;
+                                }
+                                else if (result.Success && phase.RecoverySeconds < 0)
+                                {
+                                    phase.RecoverySeconds = Math.Max(0, finished - OutageMs / 1000.0);
+                                }
+                            }
+                        }
+                        finally
+                        {
+                            done.TrySetResult(true);
+                        }
+                    });
+                }
+
+                Task.WaitAll(pending.ToArray(), TimeSpan.FromSeconds(30));
+            }
+            finally
+            {
+                dispatcher.Close();
+            }
+            return phase;
+        }
+
+        private static HttpRequestConfig Config(string url)
+        {
+            return new HttpRequestConfig
+            {
+                Name = "Resilience test",
+                HttpMethod = "POST",
+                Url = url,
+                PayloadType = "JSON",
+                Body = "{\"test\": \"resilience\"}",
+                TimeoutMs = TimeoutMs,
+                AuthType = "None"
+            }.Prepare();
+        }
+    }
+}
@@ -0,0 +1,4 @@
+using System.Runtime.CompilerServices;
+
+// The diagnostics tool drives the plugin's internal request pipeline.
+[assembly: InternalsVisibleTo("HttpRequestsDiagnostics")]
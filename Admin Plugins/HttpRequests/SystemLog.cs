@@ -34,6 +34,28 @@ namespace HttpRequests
                 CategoryName = "HTTP Requests",
                 Message = "HTTP {p1} to '{p2}' failed: {p3}"
             },
+            ["TargetDown"] = new LogMessage
+            {
+                Id = "TargetDown",
+                Group = Group.System,
+                Severity = Severity.Warning,
+                Status = Status.Failure,
+                RelatedObjectKind = Kind.Server,
+                Category = Category.Text.ToString(),
+                CategoryName = "HTTP Requests",
+                Message = "Target '{p1}' is down after {p2} failures in a row ({p3}). Requests to it fail without being sent; probing again in {p4}s"
+            },
+            ["TargetRecovered"] = new LogMessage
+            {
+                Id = "TargetRecovered",
+                Group = Group.System,
+                Severity = Severity.Info,
+                Status = Status.Success,
+                RelatedObjectKind = Kind.Server,
+                Category = Category.Text.ToString(),
+                CategoryName = "HTTP Requests",
+                Message = "Target '{p1}' is reachable again after {p2}s; {p3} requests were not sent while it was down"
+            },
         };
 
         public void RequestExecuted(string method, string url, int statusCode, long elapsedMs) =>
@@ -48,5 +70,18 @@ namespace HttpRequests
             {
                 ["p1"] = method, ["p2"] = url, ["p3"] = error
             });
+
+        public void TargetDown(string host, int failures, string lastError, int probeSeconds) =>
+            WriteEntry("TargetDown", new Dictionary<string, string>
+            {
+                ["p1"] = host, ["p2"] = failures.ToString(),
+                ["p3"] = lastError ?? "", ["p4"] = probeSeconds.ToString()
+            });
+
+        public void TargetRecovered(string host, int downSeconds, int notSent) =>
+            WriteEntry("TargetRecovered", new Dictionary<string, string>
+            {
+                ["p1"] = host, ["p2"] = downSeconds.ToString(), ["p3"] = notSent.ToString()
+            });
     }
 }
@@ -0,0 +1,369 @@
+"""
+Replay recorded webhook traffic against a target
+
+Reads a log written by `test_server.py --record FILE` and sends every
+request again, keeping the original gaps between requests divided by
+--speed, so a day of rule-triggered traffic can be played against a
+candidate target in minutes. The log is streamed, not loaded: a replay of
+any length needs little memory.
+
+Requests go out over a pool of --connections keep-alive connections. The
+schedule is open-loop: a request is due at its recorded time whether or
+not the target has answered the ones before it. Latency is measured from
+that due time, so a target that falls behind shows it in the percentiles
+(no coordinated omission). "service" is measured from the actual send.
+
+Usage:
+  python replay_traffic.py traffic.jsonl                       # original endpoints, real time
+  python replay_traffic.py traffic.jsonl --speed 60            # an hour per minute
+  python replay_traffic.py traffic.jsonl --target https://hooks.example.com --insecure
+  python replay_traffic.py traffic.jsonl --speed 0             # as fast as the pool allows
+  python replay_traffic.py traffic.jsonl --header "Authorization: Bearer abc"
+
+Without --target each request goes back to the test server endpoint that
+recorded it (localhost and the recorded port). Recorded Authorization
+headers are replayed as they are; that works for Basic and Bearer, but a
+Digest response is bound to its nonce and will be rejected, so override
+it with --header or replay against a target without Digest.
+
+No third-party dependencies.
+"""
+
+from urllib.parse import urlparse
+import argparse
+import asyncio
+import base64
+import json
+import os
+import ssl
+import sys
+import time
+
+# Set per request by the replay; dropped from recorded requests.
+HOP_HEADERS = {"host", "content-length", "transfer-encoding", "connection", "keep-alive", "expect"}
+
+QUEUE_SIZE = 10000  # requests due but waiting for a free connection
+PROGRESS_SECONDS = 5.0
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def read_log(path, limit):
+    """Yield the recorded requests in order, one parsed line at a time.
+    Stops at the size the log had when the replay started, so a replay into
+    a test server that is still recording to it does not feed on itself."""
+    end = os.path.getsize(path)
+    with open(path, "rb") as f:
+        count = position = 0
+        for number, line in enumerate(f, 1):
+            position += len(line)
+            if position > end:
+                return
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict) or not all(k in record for k in ("t", "method", "target")):
+                print(f"  line {number}: not a recorded request, skipped", file=sys.stderr)
+                continue
+            yield record
+            count += 1
+            if limit and count >= limit:
+                return
+
+
+class Target:
+    """Where one recorded request goes: scheme, host, port and path prefix."""
+
+    def __init__(self, scheme, host, port, prefix=""):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.prefix = prefix.rstrip("/")
+        default = 443 if scheme == "https" else 80
+        self.host_header = host if port == default else f"{host}:{port}"
+
+    @property
+    def key(self):
+        return self.scheme, self.host, self.port
+
+    @classmethod
+    def parse(cls, url):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"not an http(s) URL: {url}")
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        return cls(parsed.scheme, parsed.hostname, port, parsed.path)
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection to a target."""
+
+    def __init__(self, target, ssl_context):
+        self.target = target
+        self.ssl_context = ssl_context if target.scheme == "https" else None
+        self.reader = self.writer = None
+        self.used = False
+
+    async def request(self, method, target, headers, body):
+        """Send one request and read the response. Returns the status code.
+        A keep-alive connection the server closed while idle is reopened
+        once; any other connection error is raised."""
+        for attempt in (0, 1):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(
+                    self.target.host, self.target.port, ssl=self.ssl_context,
+                    server_hostname=self.target.host if self.ssl_context else None)
+                self.used = False
+            reused = self.used
+            try:
+                self.writer.write(self.encode(method, target, headers, body))
+                return await self.read_response(method)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if not reused or attempt:
+                    raise
+            finally:
+                self.used = True
+
+    def encode(self, method, target, headers, body):
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.target.host_header}"]
+        lines += [f"{k}: {v}" for k, v in headers]
+        if body or method in ("POST", "PUT", "PATCH"):
+            lines.append(f"Content-Length: {len(body)}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    async def read_response(self, method):
+        while True:
+            head = await self.reader.readuntil(b"\r\n\r\n")
+            status_line, _, rest = head.partition(b"\r\n")
+            status = int(status_line.split(b" ", 2)[1])
+            if status >= 200 or status == 101:
+                break  # skip 1xx (100 Continue)
+        headers = {}
+        for line in rest.split(b"\r\n"):
+            name, sep, value = line.partition(b":")
+            if sep:
+                headers[name.strip().lower().decode("latin-1")] = value.strip().decode("latin-1")
+
+        if method == "HEAD" or status in (204, 304):
+            pass
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+                if size == 0:
+                    while (await self.reader.readuntil(b"\r\n")) != b"\r\n":
+                        pass
+                    break
+                await self.reader.readexactly(size + 2)
+        elif "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            await self.reader.read()  # body until the server closes
+            self.close()
+        if "close" in headers.get("connection", "").lower():
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Results:
+    def __init__(self):
+        self.latency = []   # ms from due time to response
+        self.service = []   # ms from send to response
+        self.statuses = {}
+        self.errors = {}
+        self.sent = 0
+        self.window_latency = []
+
+    def add(self, status, due, sent, done):
+        self.sent += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.latency.append((done - due) * 1000)
+        self.window_latency.append((done - due) * 1000)
+        self.service.append((done - sent) * 1000)
+
+    def failed(self, error):
+        self.sent += 1
+        self.errors[error] = self.errors.get(error, 0) + 1
+
+
+class Replay:
+    def __init__(self, args):
+        self.args = args
+        self.target = Target.parse(args.target) if args.target else None
+        self.extra_headers = []
+        for header in args.header:
+            name, sep, value = header.partition(":")
+            if not sep:
+                raise ValueError(f"--header needs NAME: VALUE, got {header!r}")
+            self.extra_headers.append((name.strip(), value.strip()))
+        replaced = {name.lower() for name, _ in self.extra_headers}
+        self.dropped = HOP_HEADERS | replaced
+        self.ssl_context = ssl.create_default_context()
+        if args.insecure:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.results = Results()
+        self.records = 0
+        self.behind = 0.0  # worst lag of the schedule behind the recording, seconds
+        self.targets = {}
+
+    def target_for(self, record):
+        if self.target:
+            return self.target
+        key = (record.get("scheme", "http"), record.get("port"))
+        target = self.targets.get(key)
+        if target is None:
+            target = self.targets[key] = Target(key[0], self.args.host, key[1])
+        return target
+
+    def prepare(self, record):
+        """(target, method, request target, headers, body) for one record."""
+        target = self.target_for(record)
+        headers = [(k, v) for k, v in record.get("headers", []) if k.lower() not in self.dropped]
+        headers += self.extra_headers
+        if "body64" in record:
+            body = base64.b64decode(record["body64"])
+        else:
+            body = record.get("body", "").encode("utf-8")
+        return target, record["method"], target.prefix + record["target"], headers, body
+
+    async def schedule(self, queue):
+        """Put every record on the queue at its due time."""
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        first = None
+        for record in read_log(self.args.log, self.args.limit):
+            if first is None:
+                first = record["t"]
+            offset = (record["t"] - first) / self.args.speed if self.args.speed > 0 else 0.0
+            due = start + offset
+            wait = due - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                self.behind = max(self.behind, -wait)
+            self.records += 1
+            # Blocks when every connection is busy and QUEUE_SIZE requests
+            # are waiting; the due time keeps counting.
+            await queue.put((due, self.prepare(record)))
+        for _ in range(self.args.connections):
+            await queue.put(None)
+
+    async def worker(self, queue):
+        loop = asyncio.get_event_loop()
+        connections = {}
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                due, (target, method, path, headers, body) = item
+                connection = connections.get(target.key)
+                if connection is None:
+                    connection = connections[target.key] = Connection(target, self.ssl_context)
+                sent = loop.time()
+                try:
+                    status = await asyncio.wait_for(connection.request(method, path, headers, body), self.args.timeout)
+                except asyncio.TimeoutError:
+                    connection.close()
+                    self.results.failed("timeout")
+                except (OSError, asyncio.IncompleteReadError, ValueError) as ex:
+                    connection.close()
+                    self.results.failed(type(ex).__name__)
+                else:
+                    self.results.add(status, due, sent, loop.time())
+        finally:
+            for connection in connections.values():
+                connection.close()
+
+    async def progress(self, started):
+        while True:
+            await asyncio.sleep(PROGRESS_SECONDS)
+            window = sorted(self.results.window_latency)
+            self.results.window_latency = []
+            print(f"  {time.monotonic() - started:7.1f}s  {self.results.sent:8d} sent"
+                  f"  {len(window) / PROGRESS_SECONDS:7.0f} req/s"
+                  f"  p50 {_percentile(window, 50):8.2f}  p99 {_percentile(window, 99):8.2f} ms", flush=True)
+
+    async def run(self):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        started = time.monotonic()
+        reporter = asyncio.ensure_future(self.progress(started))
+        workers = [asyncio.ensure_future(self.worker(queue)) for _ in range(self.args.connections)]
+        try:
+            await self.schedule(queue)
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+        return time.monotonic() - started
+
+    def report(self, elapsed):
+        r = self.results
+        print()
+        print(f"  {self.records} requests replayed in {elapsed:.1f}s ({r.sent / max(elapsed, 1e-9):.0f} req/s)"
+              f" over {self.args.connections} connections at speed {self.args.speed or 'max'}")
+        if self.args.speed > 0:
+            print(f"  schedule fell behind the recording by up to {self.behind * 1000:.0f} ms")
+        print("  statuses: " + (", ".join(f"{k}: {v}" for k, v in sorted(r.statuses.items())) or "none"))
+        if r.errors:
+            print("  errors:   " + ", ".join(f"{k}: {v}" for k, v in sorted(r.errors.items())))
+        print()
+        print(f"  {'ms':8} {'min':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'p99.9':>9} {'max':>9}")
+        for name, samples in (("latency", r.latency), ("service", r.service)):
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            print(f"  {name:8} {ordered[0]:9.2f} {_percentile(ordered, 50):9.2f} {_percentile(ordered, 90):9.2f} "
+                  f"{_percentile(ordered, 99):9.2f} {_percentile(ordered, 99.9):9.2f} {ordered[-1]:9.2f}")
+        print()
+        print("  latency: from the request's due time; service: from when it was sent")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a test_server.py --record log against a target")
+    parser.add_argument("log", help="JSON-lines log written by test_server.py --record")
+    parser.add_argument("--target", metavar="URL",
+                        help="send every request here (path prefix allowed); default: the recording endpoint")
+    parser.add_argument("--host", default="localhost", help="host of the recording endpoints without --target")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="divide the recorded gaps by this (60 = an hour per minute, 0 = no waiting)")
+    parser.add_argument("--connections", type=int, default=16, help="keep-alive connections in the pool")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds before a request counts as timed out")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N requests")
+    parser.add_argument("--header", action="append", default=[], metavar="'NAME: VALUE'",
+                        help="set a header on every request, replacing the recorded one")
+    parser.add_argument("--insecure", action="store_true", help="do not verify HTTPS certificates")
+    args = parser.parse_args()
+    if args.speed < 0 or args.connections < 1:
+        parser.error("--speed must be >= 0 and --connections >= 1")
+
+    try:
+        replay = Replay(args)
+    except ValueError as ex:
+        parser.error(str(ex))
+    try:
+        elapsed = asyncio.run(replay.run())
+    except KeyboardInterrupt:
+        print("\n  Interrupted")
+        return 1
+    except OSError as ex:
+        print(f"  {ex}", file=sys.stderr)
+        return 1
+    replay.report(elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,17 +9,70 @@ Endpoints:
   http://localhost:4477   - Digest auth (admin:secret)
   https://localhost:4478  - HTTPS no auth (self-signed cert)
   https://localhost:4479  - HTTPS + Basic auth
+
+All endpoints run on one asyncio event loop with HTTP/1.1 keep-alive, so
+bursts of rule actions are served concurrently instead of one request at a
+time. Printing every request is by far the slowest part; use --quiet when
+measuring throughput.
+
+Every port also answers GET /__stats (no auth) with JSON counters for all
+endpoints: requests per method, auth outcome and status, in-flight requests
+and their peak, new and open connections, requests on reused (keep-alive)
+connections, TLS handshakes and resumed sessions, inter-arrival gaps and
+body sizes, and events: a JSON array body is a batch and counts one event
+per element (plus the repeats in its "Coalesced" field), so events/sec can
+be compared with requests/sec.
+DELETE /__stats resets them. With --quiet a one-line summary is printed
+every 5 seconds instead of the requests.
+
+--record FILE appends every request (arrival time, endpoint, method,
+target, headers, body) to a JSON-lines log through a buffered writer;
+replay_traffic.py sends a log back to any target at its original pace.
+
+The Digest endpoint checks response hashes (SHA-256 or MD5, qop=auth),
+issues random nonces that go stale after --nonce-ttl seconds and rejects
+a nonce-count used twice. authChallengeRate in /__stats is the share of
+requests answered with a challenge, i.e. the extra 401 round trips.
+
+Slow and broken targets: prefix the path with /__fault/SPEC or add
+?fault=SPEC, where SPEC is a profile name (slow, veryslow, drip, flaky,
+down, reset, dead) or terms such as delay:2000,status:500:0.1 (see
+FaultProfile). --fault PORT=SPEC applies a profile to a whole endpoint.
+
+Usage:
+  python test_server.py                    # print every request
+  python test_server.py --quiet            # rate summary every 5 s
+  python test_server.py --quiet --summary 1
+  python test_server.py --fault 4474=slow --fault 4476=flaky
+  python test_server.py --quiet --record traffic.jsonl  # for replay_traffic.py
+  curl http://localhost:4474/__fault/delay:2000,burst:5:20/hook
+  python test_server.py --cert cert.pem --key key.pem   # HTTPS with your own cert
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
+from email.utils import formatdate
+from http import HTTPStatus
+import argparse
+import asyncio
+import http.client
+import io
+import ipaddress
 import json
+import math
+import random
 import base64
+import hashlib
+import hmac
+import re
+import secrets
+import socket
 import ssl
+import struct
 import os
-import sys
 import tempfile
 import threading
+import time
+from collections import deque
 from datetime import datetime
 
 COLORS = {
@@ -40,17 +93,29 @@ COLORS = {
 AUTH_USER = "admin"
 AUTH_PASS = "secret"
 AUTH_TOKEN = "my-bearer-token-123"
-DIGEST_NONCE = "test-nonce-123456"
+DIGEST_NONCE_TTL = 300  # seconds a Digest nonce stays valid (--nonce-ttl)
+
+# Connection limits
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 120  # longer than the .NET ServicePoint idle time (100 s)
+
+METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH", "HEAD")
 
 # Print lock for thread safety
 _print_lock = threading.Lock()
 
+# Set by --quiet
+QUIET = False
+
 
 def c(color, text):
     return f"{COLORS.get(color, '')}{text}{COLORS['reset']}"
 
 
 def safe_print(*args, **kwargs):
+    if QUIET:
+        return
     with _print_lock:
         print(*args, **kwargs)
 
@@ -88,132 +153,879 @@ def print_body(body_bytes):
         formatted = json.dumps(data, indent=2)
         for line in formatted.split("\n"):
             safe_print(f"    {line}")
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, UnicodeDecodeError):
         text = body_bytes.decode("utf-8", errors="replace")
         safe_print(c("cyan", f"  Body ({len(body_bytes)} bytes):"))
         for line in text.split("\n")[:20]:
             safe_print(f"    {line}")
 
 
-def check_basic_auth(handler):
-    auth_header = handler.headers.get("Authorization", "")
+# ---------------------------------------------------------------------------
+# HTTP/1.1 on asyncio streams
+# ---------------------------------------------------------------------------
+
+class BadRequest(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """One parsed request. headers is an http.client.HTTPMessage
+    (case-insensitive get, original case in items())."""
+
+    def __init__(self, method, target, version, headers, body=b""):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers
+        self.body = body
+        parsed = urlparse(target)
+        self.path = parsed.path
+        self.query = parsed.query
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("Connection", "").lower()
+        if self.version == "HTTP/1.1":
+            return "close" not in connection
+        return "keep-alive" in connection
+
+
+class Response:
+    def __init__(self, status, body=None, headers=None, action=None):
+        self.status = status
+        self.headers = headers or {}
+        # "ok", "rejected" or "challenged" when the endpoint has auth; Digest
+        # adds "stale" (expired nonce) and "replayed" (nc used before)
+        self.auth_outcome = None
+        self.action = action  # "reset" or "hang" instead of sending anything
+        self.drip_seconds = 0.0
+        if body is None:
+            self.body = b""
+        elif isinstance(body, bytes):
+            self.body = body
+        else:
+            self.body = json.dumps(body, indent=2).encode()
+            self.headers.setdefault("Content-Type", "application/json")
+
+    def encode(self, keep_alive, head_only=False):
+        """Status line, headers and body as one buffer, so they leave in one write."""
+        try:
+            reason = HTTPStatus(self.status).phrase
+        except ValueError:
+            reason = ""
+        lines = [f"HTTP/1.1 {self.status} {reason}",
+                 "Server: HttpRequestsTestServer",
+                 f"Date: {_http_date()}",
+                 f"Content-Length: {len(self.body)}",
+                 "Connection: " + ("keep-alive" if keep_alive else "close")]
+        # A list value repeats the header (several WWW-Authenticate challenges)
+        lines += [f"{k}: {item}" for k, v in self.headers.items()
+                  for item in (v if isinstance(v, list) else (v,))]
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        return head if head_only else head + self.body
+
+    def pad(self, size):
+        """Grow a JSON body to size bytes with trailing whitespace."""
+        if len(self.body) < size:
+            self.body += b" " * (size - len(self.body) - 1) + b"\n"
+
+
+_date_cache = [0, ""]
+
+
+def _http_date():
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache[0] = now
+        _date_cache[1] = formatdate(now, usegmt=True)
+    return _date_cache[1]
+
+
+async def read_request(reader, writer):
+    """Read one request from a keep-alive connection. Returns None when the
+    client closed the connection (or stayed idle) between requests."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+    except asyncio.IncompleteReadError as ex:
+        if ex.partial.strip():
+            raise BadRequest(400, "Incomplete request head")
+        return None
+    except asyncio.LimitOverrunError:
+        raise BadRequest(431, "Request head too large")
+    except asyncio.TimeoutError:
+        return None
+
+    request_line, _, rest = head.partition(b"\r\n")
+    try:
+        method, target, version = request_line.decode("latin-1").split(" ")
+    except ValueError:
+        raise BadRequest(400, "Malformed request line")
+    if not version.startswith("HTTP/1."):
+        raise BadRequest(505, "Only HTTP/1.x is supported")
+    headers = http.client.parse_headers(io.BytesIO(rest))
+
+    # HttpWebRequest sends Expect: 100-continue on requests with a body and
+    # waits up to 350 ms for it before sending the body anyway.
+    if headers.get("Expect", "").lower() == "100-continue" and version == "HTTP/1.1":
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+    if "chunked" in headers.get("Transfer-Encoding", "").lower():
+        body = await read_chunked(reader)
+    else:
+        try:
+            length = int(headers.get("Content-Length", 0))
+        except ValueError:
+            raise BadRequest(400, "Invalid Content-Length")
+        if length < 0 or length > MAX_BODY_BYTES:
+            raise BadRequest(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+    return Request(method, target, version, headers, body)
+
+
+async def read_chunked(reader):
+    chunks, total = [], 0
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        try:
+            size = int(line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            raise BadRequest(400, "Invalid chunk size")
+        if size == 0:
+            # Trailers, up to the empty line
+            while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                pass
+            return b"".join(chunks)
+        total += size
+        if total > MAX_BODY_BYTES:
+            raise BadRequest(413, "Request body too large")
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+SAMPLE_SIZE = 10000  # latest inter-arrival gaps and body sizes kept per endpoint
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _distribution(samples, scale=1.0, digits=3):
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+
+    def r(value):
+        return round(value * scale, digits) if digits else int(round(value * scale))
+
+    return {
+        "count": len(ordered),
+        "min": r(ordered[0]),
+        "p50": r(_percentile(ordered, 50)),
+        "p90": r(_percentile(ordered, 90)),
+        "p99": r(_percentile(ordered, 99)),
+        "max": r(ordered[-1]),
+        "mean": r(sum(ordered) / len(ordered)),
+    }
+
+
+# Auth outcomes that cost the client a 401 round trip before the real request
+CHALLENGES = ("challenged", "stale")
+
+
+class EndpointStats:
+    """Counters for one endpoint. Everything runs on the event loop thread,
+    so no locking is needed."""
+
+    def __init__(self, label):
+        self.label = label
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.methods = {}
+        self.auth = {}
+        self.statuses = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections_open = getattr(self, "connections_open", 0)
+        self.connections = 0
+        self.reused_requests = 0
+        self.tls_handshakes = 0
+        self.tls_resumed = 0
+        self.body_bytes = 0
+        self.faults = {}
+        self.events = 0
+        self.batches = 0
+        self.coalesced = 0
+        self.batch_sizes = deque(maxlen=SAMPLE_SIZE)
+        self.last_arrival = None
+        self.gaps = deque(maxlen=SAMPLE_SIZE)
+        self.body_sizes = deque(maxlen=SAMPLE_SIZE)
+        # Since the last summary line
+        self.window_connections = 0
+        self.window_requests = 0
+        self.window_events = 0
+        self.window_batches = 0
+        self.window_authed = 0
+        self.window_challenges = 0
+        self.window_max_in_flight = 0
+        self.window_gaps = []
+
+    def connected(self, writer):
+        self.connections += 1
+        self.window_connections += 1
+        self.connections_open += 1
+        tls = writer.get_extra_info("ssl_object")
+        if tls is not None:
+            self.tls_handshakes += 1
+            self.tls_resumed += bool(tls.session_reused)
+
+    def arrived(self, request, reused):
+        now = time.perf_counter()
+        self.reused_requests += reused
+        if self.last_arrival is not None:
+            gap = now - self.last_arrival
+            self.gaps.append(gap)
+            self.window_gaps.append(gap)
+        self.last_arrival = now
+        self.requests += 1
+        self.window_requests += 1
+        self.methods[request.method] = self.methods.get(request.method, 0) + 1
+        self.body_bytes += len(request.body)
+        self.body_sizes.append(len(request.body))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.window_max_in_flight = max(self.window_max_in_flight, self.in_flight)
+
+    def delivered(self, body):
+        """Count the events in an accepted body. A JSON array is a batch: one
+        event per element, plus the repeats folded into an element's
+        "Coalesced" count. Anything else is one event. Returns the number of
+        elements for a batch, else None."""
+        events = size = None
+        if body.lstrip()[:1] == b"[":
+            try:
+                elements = json.loads(body)
+            except ValueError:
+                elements = None
+            if isinstance(elements, list):
+                size = len(elements)
+                coalesced = sum(e["Coalesced"] - 1 for e in elements
+                                if isinstance(e, dict) and isinstance(e.get("Coalesced"), int) and e["Coalesced"] > 1)
+                events = size + coalesced
+                self.batches += 1
+                self.window_batches += 1
+                self.coalesced += coalesced
+                self.batch_sizes.append(size)
+        if events is None:
+            events = 1
+        self.events += events
+        self.window_events += events
+        return size
+
+    def answered(self, status, auth_outcome):
+        self.in_flight -= 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if auth_outcome:
+            self.auth[auth_outcome] = self.auth.get(auth_outcome, 0) + 1
+            self.window_authed += 1
+            self.window_challenges += auth_outcome in CHALLENGES
+
+    def challenge_rate(self):
+        """Share of requests answered with a challenge the client has to
+        repeat the request for: the extra 401 round trips."""
+        answered = sum(self.auth.values())
+        return round(sum(self.auth.get(o, 0) for o in CHALLENGES) / answered, 4) if answered else 0
+
+    def to_dict(self, elapsed):
+        return {
+            "requests": self.requests,
+            "requestsPerSec": round(self.requests / elapsed, 1) if elapsed > 0 else 0,
+            "methods": self.methods,
+            "auth": self.auth,
+            "authChallengeRate": self.challenge_rate(),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "inFlight": self.in_flight,
+            "maxInFlight": self.max_in_flight,
+            "connectionsOpen": self.connections_open,
+            "connections": self.connections,
+            "reusedRequests": self.reused_requests,
+            "tls": {"handshakes": self.tls_handshakes, "resumed": self.tls_resumed},
+            "faults": self.faults,
+            "events": self.events,
+            "eventsPerSec": round(self.events / elapsed, 1) if elapsed > 0 else 0,
+            "batches": {"requests": self.batches, "coalesced": self.coalesced, **_distribution(self.batch_sizes, digits=0)},
+            "interArrivalMs": _distribution(self.gaps, 1000.0),
+            "bodyBytes": {"total": self.body_bytes, **_distribution(self.body_sizes, digits=0)},
+        }
+
+
+class Stats:
+    def __init__(self):
+        self.endpoints = {}
+        self.started = time.monotonic()
+        self.window_started = self.started
+
+    def add(self, label):
+        self.endpoints[label] = EndpointStats(label)
+        return self.endpoints[label]
+
+    def reset(self):
+        self.started = self.window_started = time.monotonic()
+        for ep in self.endpoints.values():
+            ep.reset()
+
+    def to_dict(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            "uptimeSec": round(elapsed, 3),
+            "requests": sum(ep.requests for ep in self.endpoints.values()),
+            "endpoints": {label: ep.to_dict(elapsed) for label, ep in self.endpoints.items()},
+        }
+
+    def summary_line(self):
+        """One line covering the time since the previous call."""
+        now = time.monotonic()
+        elapsed = max(now - self.window_started, 1e-9)
+        self.window_started = now
+        total = sum(ep.window_requests for ep in self.endpoints.values())
+        gaps = sorted(g for ep in self.endpoints.values() for g in ep.window_gaps)
+        busiest = sorted(self.endpoints.values(), key=lambda ep: -ep.window_requests)
+        parts = [f"{ep.label} {ep.window_requests / elapsed:.0f}" for ep in busiest if ep.window_requests]
+        line = (f"  {datetime.now().strftime('%H:%M:%S')}  {total / elapsed:7.0f} req/s"
+                f"  in-flight max {max((ep.window_max_in_flight for ep in self.endpoints.values()), default=0):3d}"
+                f"  conns {sum(ep.connections_open for ep in self.endpoints.values()):4d}"
+                f" (+{sum(ep.window_connections for ep in self.endpoints.values())} new)")
+        batches = sum(ep.window_batches for ep in self.endpoints.values())
+        if batches:
+            events = sum(ep.window_events for ep in self.endpoints.values())
+            line += f"  {events / elapsed:7.0f} ev/s ({events / max(total, 1):.1f} per request)"
+        authed = sum(ep.window_authed for ep in self.endpoints.values())
+        if authed:
+            challenges = sum(ep.window_challenges for ep in self.endpoints.values())
+            line += f"  401 challenges {challenges / authed:6.1%}"
+        if gaps:
+            line += f"  gap p50 {_percentile(gaps, 50) * 1000:.2f} / p99 {_percentile(gaps, 99) * 1000:.2f} ms"
+        if parts:
+            line += "  (" + ", ".join(parts) + ")"
+        for ep in self.endpoints.values():
+            ep.window_connections = 0
+            ep.window_requests = 0
+            ep.window_events = 0
+            ep.window_batches = 0
+            ep.window_authed = 0
+            ep.window_challenges = 0
+            ep.window_max_in_flight = ep.in_flight
+            ep.window_gaps = []
+        return line
+
+
+STATS = Stats()
+
+
+async def print_summaries(interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(STATS.summary_line(), flush=True)
+
+
+# ---------------------------------------------------------------------------
+# Traffic recording (--record), replayed by replay_traffic.py
+# ---------------------------------------------------------------------------
+
+class Recorder:
+    """Appends every request to a JSON-lines log, one compact object per
+    line: arrival time (Unix seconds), endpoint port and scheme, method,
+    target, headers in order and the body (text, or base64 in "body64" when
+    it is not UTF-8). Writes go to a large buffer that is flushed once a
+    second and on shutdown, so recording does not add a disk write to every
+    request."""
+
+    BUFFER_BYTES = 1 << 20
+    FLUSH_SECONDS = 1.0
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8", buffering=self.BUFFER_BYTES)
+        self.records = 0
+
+    def record(self, endpoint, request):
+        entry = {
+            "t": round(time.time(), 6),
+            "port": endpoint.port,
+            "scheme": "https" if endpoint.ssl_context else "http",
+            "method": request.method,
+            "target": request.target,
+            "headers": list(request.headers.items()),
+        }
+        try:
+            entry["body"] = request.body.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body64"] = base64.b64encode(request.body).decode("ascii")
+        self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self.records += 1
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.FLUSH_SECONDS)
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+RECORDER = None  # set by --record
+
+
+# ---------------------------------------------------------------------------
+# Auth checks: return None when the request may proceed, else the response
+# ---------------------------------------------------------------------------
+
+def check_basic_auth(request):
+    auth_header = request.headers.get("Authorization", "")
     expected = base64.b64encode(f"{AUTH_USER}:{AUTH_PASS}".encode()).decode()
     if auth_header == f"Basic {expected}":
         safe_print(c("green", f"  Auth: Basic OK (user={AUTH_USER})"))
-        return True
+        return None
     safe_print(c("red", f"  Auth: Basic FAILED - got: {auth_header or '(none)'}"))
-    handler.send_response(401)
-    handler.send_header("WWW-Authenticate", 'Basic realm="Test Server"')
-    handler.send_header("Content-Type", "application/json")
-    handler.end_headers()
-    handler.wfile.write(json.dumps({"error": "Unauthorized", "expected": "Basic", "user": AUTH_USER, "pass": AUTH_PASS}).encode())
-    return False
+    return Response(401, {"error": "Unauthorized", "expected": "Basic", "user": AUTH_USER, "pass": AUTH_PASS},
+                    {"WWW-Authenticate": 'Basic realm="Test Server"'})
 
 
-def check_bearer_auth(handler):
-    auth_header = handler.headers.get("Authorization", "")
+def check_bearer_auth(request):
+    auth_header = request.headers.get("Authorization", "")
     if auth_header == f"Bearer {AUTH_TOKEN}":
         safe_print(c("green", "  Auth: Bearer OK"))
-        return True
+        return None
     safe_print(c("red", f"  Auth: Bearer FAILED - got: {auth_header or '(none)'}"))
-    handler.send_response(401)
-    handler.send_header("WWW-Authenticate", 'Bearer realm="Test Server"')
-    handler.send_header("Content-Type", "application/json")
-    handler.end_headers()
-    handler.wfile.write(json.dumps({"error": "Unauthorized", "expected": "Bearer", "token": AUTH_TOKEN}).encode())
-    return False
-
-
-def check_digest_auth(handler):
-    auth_header = handler.headers.get("Authorization", "")
-    if not auth_header.startswith("Digest "):
-        safe_print(c("yellow", "  Auth: Digest challenge sent"))
-        handler.send_response(401)
-        handler.send_header(
-            "WWW-Authenticate",
-            f'Digest realm="Test Server", nonce="{DIGEST_NONCE}", qop="auth", algorithm=MD5',
-        )
-        handler.send_header("Content-Type", "application/json")
-        handler.end_headers()
-        handler.wfile.write(json.dumps({"error": "Digest challenge"}).encode())
-        return False
-    if f'username="{AUTH_USER}"' in auth_header:
-        safe_print(c("green", f"  Auth: Digest OK (user={AUTH_USER})"))
-        return True
-    safe_print(c("red", f"  Auth: Digest FAILED - got: {auth_header}"))
-    handler.send_response(401)
-    handler.send_header("Content-Type", "application/json")
-    handler.end_headers()
-    handler.wfile.write(json.dumps({"error": "Unauthorized"}).encode())
-    return False
-
-
-def make_handler(auth_check, label):
-    """Create a handler class with the given auth check function."""
-
-    class Handler(BaseHTTPRequestHandler):
-        def _handle(self, method):
-            now = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            path = self.path
-            parsed = urlparse(path)
+    return Response(401, {"error": "Unauthorized", "expected": "Bearer", "token": AUTH_TOKEN},
+                    {"WWW-Authenticate": 'Bearer realm="Test Server"'})
+
+
+class DigestAuth:
+    """RFC 7616 Digest with qop=auth, MD5 or SHA-256 (plain or -sess).
+
+    Every challenge carries a fresh random nonce that is valid for
+    DIGEST_NONCE_TTL seconds. A request must echo a nonce this server
+    issued, the request target as uri, a nonce-count (nc) it has not used
+    before with that nonce and the matching response hash. A correct
+    response with an expired or unknown nonce gets a new challenge with
+    stale=true, so the client can retry without asking for the password.
+    A client that remembers the challenge and counts nc up answers every
+    request on the first try; one that waits to be challenged costs a 401
+    round trip per request, which shows in the auth outcomes in /__stats.
+    """
+
+    ALGORITHMS = {"MD5": hashlib.md5, "SHA-256": hashlib.sha256}
+    NC_WINDOW = 256  # how far behind the highest nc a request may arrive (parallel connections)
+    PARAM = re.compile(r'([\w-]+)\s*=\s*(?:"((?:[^"\\]|\\.)*)"|([^\s,]*))')
+
+    def __init__(self, user, password, realm, ttl):
+        self.user = user
+        self.password = password
+        self.realm = realm
+        self.ttl = ttl
+        self.opaque = secrets.token_hex(8)
+        self.nonces = {}  # nonce -> [issued (monotonic), highest nc, set of recent nc]
+        self.pruned = time.monotonic()
+
+    def check(self, request):
+        auth_header = request.headers.get("Authorization", "")
+        if auth_header[:7].lower() != "digest ":
+            safe_print(c("yellow", "  Auth: Digest challenge sent"))
+            return self.challenge("challenged", "Digest challenge")
+        params = self.parse(auth_header[7:])
+
+        algorithm = params.get("algorithm", "MD5")
+        hash_name = algorithm[:-5] if algorithm.upper().endswith("-SESS") else algorithm
+        h = self.ALGORITHMS.get(hash_name.upper())
+        if h is None:
+            return self.reject(f"unsupported algorithm {algorithm}")
+        if params.get("username") != self.user or params.get("realm") != self.realm:
+            return self.reject("unknown user or realm")
+        if params.get("uri") != request.target:
+            return self.reject(f"uri {params.get('uri')!r} is not the request target")
+        if params.get("qop") != "auth" or not params.get("cnonce"):
+            return self.reject("qop=auth with cnonce and nc required")
+        try:
+            nc = int(params.get("nc", ""), 16)
+        except ValueError:
+            return self.reject("bad nc")
+
+        def hx(text):
+            return h(text.encode()).hexdigest()
+
+        nonce, cnonce = params.get("nonce", ""), params["cnonce"]
+        ha1 = hx(f"{self.user}:{self.realm}:{self.password}")
+        if hash_name != algorithm:
+            ha1 = hx(f"{ha1}:{nonce}:{cnonce}")
+        ha2 = hx(f"{request.method}:{params['uri']}")
+        expected = hx(f"{ha1}:{nonce}:{params['nc']}:{cnonce}:auth:{ha2}")
+        if not hmac.compare_digest(expected, params.get("response", "")):
+            return self.reject("wrong response hash")
+
+        state = self.nonces.get(nonce)
+        if state is None or time.monotonic() - state[0] > self.ttl:
+            safe_print(c("yellow", "  Auth: Digest nonce expired, stale challenge sent"))
+            return self.challenge("stale", "Nonce expired", stale=True)
+        issued, highest, seen = state
+        if nc in seen or nc <= highest - self.NC_WINDOW:
+            return self.reject(f"nc {params['nc']} replayed", "replayed")
+        seen.add(nc)
+        if nc > highest:
+            state[1] = nc
+            if len(seen) > 2 * self.NC_WINDOW:
+                state[2] = {n for n in seen if n > nc - self.NC_WINDOW}
+        safe_print(c("green", f"  Auth: Digest OK (user={self.user}, {algorithm}, nc={nc})"))
+        return None
+
+    def parse(self, text):
+        return {m.group(1).lower(): re.sub(r"\\(.)", r"\1", m.group(2)) if m.group(2) is not None else m.group(3)
+                for m in self.PARAM.finditer(text)}
+
+    def challenge(self, outcome, error, stale=False):
+        now = time.monotonic()
+        if now - self.pruned > self.ttl:
+            self.pruned = now
+            self.nonces = {n: s for n, s in self.nonces.items() if now - s[0] <= self.ttl}
+        nonce = secrets.token_hex(16)
+        self.nonces[nonce] = [now, 0, set()]
+        # One challenge per algorithm, preferred first (RFC 7616 section 3.7)
+        response = Response(401, {"error": error}, {"WWW-Authenticate": [
+            f'Digest realm="{self.realm}", qop="auth", algorithm={algorithm}, nonce="{nonce}", '
+            f'opaque="{self.opaque}"' + (", stale=true" if stale else "")
+            for algorithm in ("SHA-256", "MD5")]})
+        response.auth_outcome = outcome
+        return response
+
+    def reject(self, reason, outcome="rejected"):
+        safe_print(c("red", f"  Auth: Digest FAILED - {reason}"))
+        return self.challenge(outcome, f"Unauthorized: {reason}")
+
+
+DIGEST = DigestAuth(AUTH_USER, AUTH_PASS, "Test Server", DIGEST_NONCE_TTL)
+
+
+def check_digest_auth(request):
+    return DIGEST.check(request)
+
+
+# ---------------------------------------------------------------------------
+# Fault injection
+# ---------------------------------------------------------------------------
+
+# Shorthands for common profiles; any spec below may be used in their place.
+FAULT_PROFILES = {
+    "slow": "lognormal:800:0.5",
+    "veryslow": "delay:15000",
+    "drip": "drip:5000:2048",
+    "flaky": "burst:5:20",
+    "down": "status:503",
+    "reset": "reset",
+    "dead": "hang",
+}
+
+
+class FaultProfile:
+    """How to misbehave on one request. A spec is a comma-separated list of
+    terms, or the name of one of FAULT_PROFILES:
+
+      delay:MS              wait MS before answering
+      lognormal:MEDIAN[:S]  wait a lognormal time with median MEDIAN ms, sigma S (0.5)
+      drip:MS[:BYTES]       send the body over MS, padded to BYTES
+      status:CODE[:P]       answer CODE instead of 200, with probability P (1)
+      burst:N:M[:CODE]      answer CODE (503) to the first N of every M requests
+      reset[:P]             abort the connection with a TCP RST instead of answering
+      hang[:P]              never answer; hold the connection until the client gives up
+
+    Waiting is asyncio.sleep, so a slow request never delays another one."""
+
+    def __init__(self, spec):
+        self.spec = FAULT_PROFILES.get(spec, spec)
+        self.delay_ms = 0.0
+        self.lognormal = None
+        self.drip_ms = 0.0
+        self.drip_bytes = 0
+        self.status = None
+        self.burst = None
+        self.reset = 0.0
+        self.hang = 0.0
+        for term in filter(None, self.spec.split(",")):
+            name, _, arg = term.strip().partition(":")
+            args = arg.split(":") if arg else []
+            try:
+                self._add(name, args)
+            except (ValueError, IndexError):
+                raise ValueError(f"Invalid fault term '{term}'")
+
+    def _add(self, name, args):
+        if name == "delay":
+            self.delay_ms = float(args[0])
+        elif name == "lognormal":
+            self.lognormal = (math.log(float(args[0])), float(args[1]) if len(args) > 1 else 0.5)
+        elif name == "drip":
+            self.drip_ms = float(args[0])
+            self.drip_bytes = int(args[1]) if len(args) > 1 else 0
+        elif name == "status":
+            self.status = (int(args[0]), float(args[1]) if len(args) > 1 else 1.0)
+        elif name == "burst":
+            n, m = int(args[0]), int(args[1])
+            if not 0 < n <= m:
+                raise ValueError(name)
+            self.burst = (n, m, int(args[2]) if len(args) > 2 else 503)
+        elif name == "reset":
+            self.reset = float(args[0]) if args else 1.0
+        elif name == "hang":
+            self.hang = float(args[0]) if args else 1.0
+        else:
+            raise ValueError(name)
+
+    def delay(self):
+        seconds = self.delay_ms / 1000.0
+        if self.lognormal:
+            seconds += random.lognormvariate(*self.lognormal) / 1000.0
+        return seconds
+
+    def error_status(self, counter):
+        """Status to answer instead of 200, or None. counter numbers the
+        requests seen with this spec on the endpoint, from 0."""
+        if self.burst and counter % self.burst[1] < self.burst[0]:
+            return self.burst[2]
+        if self.status and random.random() < self.status[1]:
+            return self.status[0]
+        return None
+
 
+def split_fault(request):
+    """Fault spec of a request and the path with the /__fault/SPEC prefix
+    removed. The spec may also come from ?fault=SPEC."""
+    path = request.path
+    spec = None
+    if path.startswith("/__fault/"):
+        spec, _, rest = path[len("/__fault/"):].partition("/")
+        path = "/" + rest
+    if "fault=" in request.query:
+        spec = parse_qs(request.query).get("fault", [spec])[-1]
+    return spec, path
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+class Endpoint:
+    """One listening port with its auth check. Every connection gets its own
+    task, and a connection serves requests until the client closes it."""
+
+    def __init__(self, port, auth_check, label, ssl_context=None):
+        self.port = port
+        self.auth_check = auth_check
+        self.label = label
+        self.ssl_context = ssl_context
+        self.server = None
+        self.stats = STATS.add(label)
+        self.fault = None  # FaultProfile for requests that do not name one (--fault)
+        self._fault_cache = {}
+        self._fault_counters = {}
+
+    @property
+    def url(self):
+        scheme = "https" if self.ssl_context else "http"
+        return f"{scheme}://localhost:{self.port}"
+
+    async def start(self, host):
+        self.server = await asyncio.start_server(
+            self.serve_connection, host, self.port, ssl=self.ssl_context,
+            limit=MAX_HEADER_BYTES, backlog=1024, reuse_address=True)
+
+    async def serve_connection(self, reader, writer):
+        self.stats.connected(writer)
+        counted = False
+        served = 0
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, writer)
+                except BadRequest as ex:
+                    writer.write(Response(ex.status, {"error": str(ex)}).encode(keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                if request.path == "/__stats":
+                    response, counted = self.stats_request(request), False
+                else:
+                    if RECORDER:
+                        RECORDER.record(self, request)
+                    self.stats.arrived(request, reused=served > 0)
+                    served += 1
+                    response, counted = await self.handle(request), True
+                if response.action == "reset":
+                    abort_with_reset(writer)
+                    return
+                if response.action == "hang":
+                    # Read and drop until the client times out and closes.
+                    while await reader.read(65536):
+                        pass
+                    break
+                keep_alive = request.keep_alive
+                await write_response(writer, response, keep_alive, request.method == "HEAD")
+                if counted:
+                    self.stats.answered(response.status, response.auth_outcome)
+                    counted = False
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError, OSError):
+            pass  # client went away mid-request
+        finally:
+            if counted:
+                self.stats.answered(0, None)
+            self.stats.connections_open -= 1
+            if not writer.is_closing():
+                writer.close()
+
+    def stats_request(self, request):
+        """GET /__stats returns the counters of all endpoints, DELETE resets them.
+        Not counted itself and not subject to the endpoint's auth."""
+        if request.method == "DELETE":
+            STATS.reset()
+            return Response(200, {"status": "reset"})
+        if request.method not in ("GET", "HEAD"):
+            return Response(405, {"error": "Use GET or DELETE"}, {"Allow": "GET, DELETE"})
+        return Response(200, STATS.to_dict())
+
+    async def handle(self, request):
+        now = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+
+        if not QUIET:
             safe_print()
             print_separator()
             safe_print(
                 f"  {c('bold', now)}  "
-                f"{c('white', f'[{label}]')}  "
-                f"{c('green', method)}  "
-                f"{c('blue', parsed.path)}"
-                f"{c('gray', '?' + parsed.query if parsed.query else '')}"
+                f"{c('white', f'[{self.label}]')}  "
+                f"{c('green', request.method)}  "
+                f"{c('blue', request.path)}"
+                f"{c('gray', '?' + request.query if request.query else '')}"
             )
             print_separator()
+            print_headers(request.headers)
+            print_query_params(request.target)
 
-            print_headers(self.headers)
-            print_query_params(path)
+        if request.method not in METHODS:
+            print_separator()
+            return Response(501, {"error": f"Unsupported method {request.method}"})
 
-            if auth_check and not auth_check(self):
-                print_separator()
-                return
+        spec, path = split_fault(request)
+        try:
+            fault = self.fault_profile(spec) if spec else self.fault
+        except ValueError as ex:
+            print_separator()
+            return Response(400, {"error": str(ex), "profiles": sorted(FAULT_PROFILES)})
+        if fault:
+            if fault.reset and random.random() < fault.reset:
+                safe_print(c("red", "  Fault: connection reset"))
+                return self.faulted("reset", Response(0, action="reset"))
+            if fault.hang and random.random() < fault.hang:
+                safe_print(c("red", "  Fault: hanging"))
+                return self.faulted("hang", Response(0, action="hang"))
+            wait = fault.delay()
+            if wait > 0:
+                safe_print(c("yellow", f"  Fault: delay {wait * 1000:.0f} ms"))
+                self.stats.faults["delay"] = self.stats.faults.get("delay", 0) + 1
+                await asyncio.sleep(wait)
 
-            length = int(self.headers.get("Content-Length", 0))
-            body = self.rfile.read(length) if length > 0 else b""
-            print_body(body)
+        auth_outcome = None
+        if self.auth_check:
+            rejected = self.auth_check(request)
+            if rejected is not None:
+                print_separator()
+                # No Authorization header: a challenge the client is expected to answer.
+                if rejected.auth_outcome is None:
+                    rejected.auth_outcome = "rejected" if request.headers.get("Authorization") else "challenged"
+                return rejected
+            auth_outcome = "ok"
 
+        if not QUIET:
+            print_body(request.body)
             print_separator()
 
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            response = {
-                "status": "ok",
-                "server": label,
-                "method": method,
-                "path": parsed.path,
-                "timestamp": now,
-            }
-            if parsed.query:
-                response["query"] = dict(parse_qs(parsed.query))
-            self.wfile.write(json.dumps(response, indent=2).encode())
+        if fault:
+            counter = self._fault_counters.get(fault.spec, 0)
+            self._fault_counters[fault.spec] = counter + 1
+            status = fault.error_status(counter)
+            if status:
+                safe_print(c("red", f"  Fault: status {status}"))
+                response = Response(status, {"error": "Injected fault", "status": status, "server": self.label})
+                response.auth_outcome = auth_outcome
+                return self.faulted("status", response)
 
-        def do_GET(self):
-            self._handle("GET")
+        batch_size = self.stats.delivered(request.body)
+        response = {
+            "status": "ok",
+            "server": self.label,
+            "method": request.method,
+            "path": path,
+            "timestamp": now,
+        }
+        if batch_size is not None:
+            response["events"] = batch_size
+        if request.query:
+            response["query"] = dict(parse_qs(request.query))
+        if fault and fault.spec:
+            response["fault"] = fault.spec
+        response = Response(200, response)
+        response.auth_outcome = auth_outcome
+        if fault and fault.drip_ms > 0:
+            response.pad(fault.drip_bytes)
+            response.drip_seconds = fault.drip_ms / 1000.0
+            self.stats.faults["drip"] = self.stats.faults.get("drip", 0) + 1
+        return response
 
-        def do_POST(self):
-            self._handle("POST")
+    def fault_profile(self, spec):
+        profile = self._fault_cache.get(spec)
+        if profile is None:
+            profile = self._fault_cache[spec] = FaultProfile(spec)
+        return profile
 
-        def do_PUT(self):
-            self._handle("PUT")
+    def faulted(self, kind, response):
+        self.stats.faults[kind] = self.stats.faults.get(kind, 0) + 1
+        return response
 
-        def do_DELETE(self):
-            self._handle("DELETE")
 
-        def do_PATCH(self):
-            self._handle("PATCH")
-
-        def log_message(self, format, *args):
+def abort_with_reset(writer):
+    """Close with RST instead of FIN: SO_LINGER 0, then abort the transport."""
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        except OSError:
             pass
+    writer.transport.abort()
+
 
-    return Handler
+async def write_response(writer, response, keep_alive, head_only):
+    if response.drip_seconds <= 0 or head_only or not response.body:
+        writer.write(response.encode(keep_alive, head_only))
+        await writer.drain()
+        return
+    # Slow drip: headers at once, then the body in small pieces spread over drip_seconds.
+    writer.write(response.encode(keep_alive, head_only=True))
+    body = response.body
+    pieces = max(1, min(len(body), int(response.drip_seconds * 20)))
+    step = -(-len(body) // pieces)
+    interval = response.drip_seconds / pieces
+    for i in range(0, len(body), step):
+        writer.write(body[i:i + step])
+        await writer.drain()
+        await asyncio.sleep(interval)
 
 
 def generate_self_signed_cert():
@@ -264,81 +1076,107 @@ def generate_self_signed_cert():
         return None, None
 
 
-def start_server(port, handler_class, label, use_ssl=False, cert_path=None, key_path=None):
-    """Start an HTTP(S) server in a background thread."""
-    server = HTTPServer(("0.0.0.0", port), handler_class)
-    if use_ssl and cert_path and key_path:
-        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-        ctx.load_cert_chain(cert_path, key_path)
-        server.socket = ctx.wrap_socket(server.socket, server_side=True)
-    thread = threading.Thread(target=server.serve_forever, daemon=True)
-    thread.start()
-    return server
-
+def make_ssl_context(cert_path, key_path):
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert_path, key_path)
+    return ctx
 
-if __name__ == "__main__":
-    import ipaddress
-
-    safe_print(c("bold", "\n  HTTP Requests Test Server"))
-    safe_print(c("dim", "  ========================\n"))
-
-    servers = []
 
-    # HTTP servers
+async def serve(args):
     endpoints = [
-        (4474, None,              "No Auth"),
-        (4475, check_basic_auth,  "Basic Auth"),
-        (4476, check_bearer_auth, "Bearer Auth"),
-        (4477, check_digest_auth, "Digest Auth"),
+        Endpoint(4474, None,              "No Auth"),
+        Endpoint(4475, check_basic_auth,  "Basic Auth"),
+        Endpoint(4476, check_bearer_auth, "Bearer Auth"),
+        Endpoint(4477, check_digest_auth, "Digest Auth"),
     ]
 
-    for port, auth_fn, label in endpoints:
-        handler = make_handler(auth_fn, label)
-        srv = start_server(port, handler, label)
-        servers.append(srv)
-        scheme = "http"
-        url = f"{scheme}://localhost:{port}"
+    # HTTPS servers (own cert, or generated if cryptography is available)
+    cert_path, key_path = (args.cert, args.key) if args.cert else generate_self_signed_cert()
+    if cert_path:
+        ctx = make_ssl_context(cert_path, key_path)
+        endpoints += [
+            Endpoint(4478, None,             "HTTPS No Auth", ctx),
+            Endpoint(4479, check_basic_auth, "HTTPS + Basic", ctx),
+        ]
+
+    for port_spec in args.fault:
+        port, _, spec = port_spec.partition("=")
+        matches = [ep for ep in endpoints if str(ep.port) == port]
+        if not matches:
+            raise SystemExit(f"--fault: no endpoint on port {port}")
+        matches[0].fault = FaultProfile(spec)
+
+    for ep in endpoints:
+        await ep.start(args.host)
         auth_info = ""
-        if "Basic" in label or "Digest" in label:
+        if "Basic" in ep.label or "Digest" in ep.label:
             auth_info = f"  ({AUTH_USER}:{AUTH_PASS})"
-        elif "Bearer" in label:
+        elif "Bearer" in ep.label:
             auth_info = f"  (token: {AUTH_TOKEN})"
-        safe_print(f"  {c('green', 'OK')}  {c('blue', url):<45} {c('white', label)}{c('gray', auth_info)}")
+        if ep.fault:
+            auth_info += f"  fault: {ep.fault.spec}"
+        print(f"  {c('green', 'OK')}  {c('blue', ep.url):<45} {c('white', ep.label)}{c('gray', auth_info)}")
 
-    # HTTPS servers (if cryptography is available)
-    cert_path, key_path = generate_self_signed_cert()
-    if cert_path:
-        https_endpoints = [
-            (4478, None,             "HTTPS No Auth"),
-            (4479, check_basic_auth, "HTTPS + Basic"),
-        ]
-        for port, auth_fn, label in https_endpoints:
-            handler = make_handler(auth_fn, label)
-            srv = start_server(port, handler, label, use_ssl=True, cert_path=cert_path, key_path=key_path)
-            servers.append(srv)
-            url = f"https://localhost:{port}"
-            auth_info = ""
-            if "Basic" in label:
-                auth_info = f"  ({AUTH_USER}:{AUTH_PASS})"
-            safe_print(f"  {c('green', 'OK')}  {c('blue', url):<45} {c('white', label)}{c('gray', auth_info)}")
-    else:
-        safe_print()
-        safe_print(c("yellow", "  HTTPS disabled - install 'cryptography' package for HTTPS:"))
-        safe_print(c("gray",   "    pip install cryptography"))
-
-    safe_print()
-    safe_print(c("dim", "  Credentials:"))
-    safe_print(f"    Username: {c('cyan', AUTH_USER)}")
-    safe_print(f"    Password: {c('cyan', AUTH_PASS)}")
-    safe_print(f"    Token:    {c('cyan', AUTH_TOKEN)}")
-    safe_print()
-    safe_print(c("dim", "  Press Ctrl+C to stop all servers"))
-    safe_print()
+    if not cert_path:
+        print()
+        print(c("yellow", "  HTTPS disabled - install 'cryptography' package for HTTPS:"))
+        print(c("gray",   "    pip install cryptography"))
+        print(c("gray",   "  or pass --cert and --key"))
+
+    print()
+    print(c("dim", "  Credentials:"))
+    print(f"    Username: {c('cyan', AUTH_USER)}")
+    print(f"    Password: {c('cyan', AUTH_PASS)}")
+    print(f"    Token:    {c('cyan', AUTH_TOKEN)}")
+    print()
+    print(c("dim", "  Counters: GET /__stats on any port (DELETE resets)"))
+    if RECORDER:
+        print(c("dim", f"  Recording requests to {RECORDER.path}"))
+    print(c("dim", "  Press Ctrl+C to stop all servers"))
+    print()
+
+    summary = args.summary if args.summary is not None else (5.0 if QUIET else 0)
+    if summary > 0:
+        asyncio.ensure_future(print_summaries(summary))
+    if RECORDER:
+        asyncio.ensure_future(RECORDER.flush_periodically())
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for ep in endpoints:
+            ep.server.close()
+        if RECORDER:
+            RECORDER.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP Requests test server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--quiet", action="store_true", help="do not print each request")
+    parser.add_argument("--summary", type=float, metavar="SECONDS",
+                        help="print a one-line rate summary this often (default 5 with --quiet, else off)")
+    parser.add_argument("--fault", action="append", default=[], metavar="PORT=SPEC",
+                        help="fault profile for every request to PORT, e.g. 4474=slow or 4475=delay:2000,burst:5:20")
+    parser.add_argument("--nonce-ttl", type=float, default=DIGEST_NONCE_TTL, metavar="SECONDS",
+                        help=f"how long a Digest nonce stays valid before it is stale (default {DIGEST_NONCE_TTL})")
+    parser.add_argument("--record", metavar="FILE",
+                        help="append every request to FILE (JSON lines) for replay_traffic.py")
+    parser.add_argument("--cert", help="PEM certificate for the HTTPS endpoints")
+    parser.add_argument("--key", help="PEM private key for --cert")
+    args = parser.parse_args()
+    if bool(args.cert) != bool(args.key):
+        parser.error("--cert and --key go together")
+    QUIET = args.quiet
+    DIGEST.ttl = args.nonce_ttl
+    if args.record:
+        RECORDER = Recorder(args.record)
+
+    print(c("bold", "\n  HTTP Requests Test Server"))
+    print(c("dim", "  ========================\n"))
 
     try:
-        threading.Event().wait()
+        asyncio.run(serve(args))
     except KeyboardInterrupt:
-        safe_print(c("yellow", "\n  Shutting down..."))
-        for srv in servers:
-            srv.shutdown()
-        safe_print(c("green", "  Done.\n"))
+        print(c("yellow", "\n  Shutting down..."))
+        print(c("green", "  Done.\n"))
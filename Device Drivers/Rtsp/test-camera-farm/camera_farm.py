@@ -0,0 +1,883 @@
+"""
+RTSP camera farm for the MSC RTSP Driver
+==========================================
+
+One asyncio process that serves N virtual cameras over RTSP, so the driver
+can be run with all 16 channels (or several driver instances) against
+cameras of different codecs, resolutions, frame rates, GOP lengths and
+bitrates without a container per camera.
+
+  rtsp://<host>:8554/cam1 .. /camN
+
+Every camera answers OPTIONS, DESCRIBE, SETUP, PLAY, PAUSE, TEARDOWN and
+GET_PARAMETER, and streams RTP over the RTSP connection (TCP interleaved)
+or over UDP, whichever the client asks for in SETUP. Video is H.264 or
+H.265 with real parameter sets (VPS/SPS/PPS, in the SDP and before every
+keyframe) and slice headers, so FFmpeg detects codec, resolution and
+keyframes as it would for a camera. The slice data is noise: the stream
+has the size and timing of real video, but decodes to garbage.
+
+Frames are generated once per camera profile at startup, as a ring of two
+GOPs that are already split into RTP payloads (FU-A / FU fragmentation).
+Sending a frame only adds the 12-byte RTP header per packet, so one
+process can keep up with many cameras. A session starts at a keyframe and
+is paced by its own clock. When a TCP client cannot keep up, frames are
+dropped until the next keyframe, as cameras do, instead of buffering.
+
+Every few seconds (--report) the farm prints aggregate RTP packets/sec,
+Mbit/s, frames/sec, sessions per transport and late or dropped frames.
+
+Usage:
+  python camera_farm.py                       # 16 cameras, mixed profiles
+  python camera_farm.py --cameras 4 --codec h265 --resolution 1280x720 --fps 15 --gop 30 --kbps 1500
+  python camera_farm.py --camera 3=h264,3840x2160,25,50,12000
+  python camera_farm.py --cert server.crt --key server.key   # RTSPS (RTSP over TLS)
+
+No third-party dependencies.
+"""
+
+from urllib.parse import urlparse
+from email.utils import formatdate
+import argparse
+import asyncio
+import base64
+import os
+import random
+import re
+import ssl
+import struct
+import sys
+import time
+from datetime import datetime
+
+# Profiles the cameras cycle through unless --codec, --resolution etc. say
+# otherwise: (codec, width, height, fps, GOP frames, kbit/s)
+PRESETS = [
+    ("h264", 1920, 1080, 25, 50, 4000),
+    ("h265", 1920, 1080, 25, 50, 2000),
+    ("h264", 1280, 720, 15, 30, 1500),
+    ("h265", 3840, 2160, 20, 40, 8000),
+    ("h264", 640, 360, 10, 20, 512),
+    ("h265", 1280, 720, 30, 60, 1200),
+]
+
+RTP_PAYLOAD_TYPE = 96
+RTP_CLOCK = 90000
+MTU_PAYLOAD = 1400            # RTP payload bytes per packet
+KEYFRAME_RATIO = 6            # a keyframe is this many times the size of a P frame
+SIZE_JITTER = 0.15            # frame sizes vary by up to +/- this share
+RING_GOPS = 2
+MAX_TCP_BUFFER = 2 * 1024 * 1024  # queued bytes before a TCP session drops frames
+RTCP_INTERVAL = 5.0
+SESSION_TIMEOUT = 60
+UDP_PAIR_ATTEMPTS = 32        # ephemeral binds tried before SETUP gives up on UDP
+NTP_EPOCH_OFFSET = 2208988800
+
+
+# ─── Bitstream helpers ────────────────────────────────────────────────────────
+
+class BitWriter:
+    def __init__(self):
+        self.bits = []
+
+    def u(self, n, value):
+        self.bits += [(value >> (n - 1 - i)) & 1 for i in range(n)]
+
+    def ue(self, value):
+        value += 1
+        n = value.bit_length()
+        self.u(n - 1, 0)
+        self.u(n, value)
+
+    def se(self, value):
+        self.ue(2 * value - 1 if value > 0 else -2 * value)
+
+    def trailing(self):
+        """rbsp_trailing_bits / byte_alignment: a 1, then 0s to a byte boundary."""
+        self.bits.append(1)
+        while len(self.bits) % 8:
+            self.bits.append(0)
+
+    def fill_ones(self):
+        """Pad a slice header to a byte boundary with 1s, so its last byte is never 0."""
+        while len(self.bits) % 8:
+            self.bits.append(1)
+
+    def bytes(self):
+        return bytes(int("".join(map(str, self.bits[i:i + 8])), 2) for i in range(0, len(self.bits), 8))
+
+
+def escape(rbsp):
+    """Insert emulation prevention bytes (00 00 0x -> 00 00 03 0x)."""
+    out = bytearray()
+    zeros = 0
+    for b in rbsp:
+        if zeros >= 2 and b <= 3:
+            out.append(3)
+            zeros = 0
+        out.append(b)
+        zeros = zeros + 1 if b == 0 else 0
+    return bytes(out)
+
+
+# Slice data is random bytes without zeros, so it can never contain a start
+# code or need escaping, and compresses like real video would (not at all).
+_NO_ZEROS = bytes([1]) + bytes(range(1, 256))
+
+
+def noise(rng, size):
+    return rng.randbytes(size).translate(_NO_ZEROS) if hasattr(rng, "randbytes") \
+        else os.urandom(size).translate(_NO_ZEROS)
+
+
+# ─── Codecs ───────────────────────────────────────────────────────────────────
+
+class H264:
+    name = "H264"
+    LOG2_MAX_FRAME_NUM = 8
+
+    def __init__(self, width, height, fps):
+        self.width, self.height, self.fps = width, height, fps
+        self.parameter_sets = [self.sps(), self.pps()]
+
+    def level(self):
+        mbs = ((self.width + 15) // 16) * ((self.height + 15) // 16)
+        return 51 if mbs > 8192 else 40 if mbs > 3600 else 31 if mbs > 1620 else 30
+
+    def sps(self):
+        w = BitWriter()
+        w.u(8, 100)            # profile_idc: High
+        w.u(8, 0)              # constraint flags
+        w.u(8, self.level())
+        w.ue(0)                # seq_parameter_set_id
+        w.ue(1)                # chroma_format_idc 4:2:0
+        w.ue(0)                # bit_depth_luma_minus8
+        w.ue(0)                # bit_depth_chroma_minus8
+        w.u(1, 0)              # qpprime_y_zero_transform_bypass_flag
+        w.u(1, 0)              # seq_scaling_matrix_present_flag
+        w.ue(self.LOG2_MAX_FRAME_NUM - 4)
+        w.ue(2)                # pic_order_cnt_type: from frame_num
+        w.ue(1)                # max_num_ref_frames
+        w.u(1, 0)              # gaps_in_frame_num_value_allowed_flag
+        mb_w, mb_h = (self.width + 15) // 16, (self.height + 15) // 16
+        w.ue(mb_w - 1)
+        w.ue(mb_h - 1)
+        w.u(1, 1)              # frame_mbs_only_flag
+        w.u(1, 1)              # direct_8x8_inference_flag
+        crop_right, crop_bottom = (mb_w * 16 - self.width) // 2, (mb_h * 16 - self.height) // 2
+        w.u(1, 1 if crop_right or crop_bottom else 0)
+        if crop_right or crop_bottom:
+            w.ue(0); w.ue(crop_right); w.ue(0); w.ue(crop_bottom)
+        w.u(1, 1)              # vui_parameters_present_flag
+        w.u(1, 0); w.u(1, 0); w.u(1, 0); w.u(1, 0)  # aspect ratio, overscan, video signal, chroma loc
+        w.u(1, 1)              # timing_info_present_flag
+        w.u(32, 1)             # num_units_in_tick
+        w.u(32, 2 * self.fps)  # time_scale (two ticks per frame)
+        w.u(1, 1)              # fixed_frame_rate_flag
+        w.u(1, 0); w.u(1, 0)   # nal / vcl hrd
+        w.u(1, 0)              # pic_struct_present_flag
+        w.u(1, 0)              # bitstream_restriction_flag
+        w.trailing()
+        return bytes([0x67]) + escape(w.bytes())
+
+    def pps(self):
+        w = BitWriter()
+        w.ue(0); w.ue(0)       # pic / seq parameter set id
+        w.u(1, 0)              # entropy_coding_mode_flag: CAVLC
+        w.u(1, 0)              # bottom_field_pic_order_in_frame_present_flag
+        w.ue(0)                # num_slice_groups_minus1
+        w.ue(0); w.ue(0)       # num_ref_idx_l0/l1_default_active_minus1
+        w.u(1, 0); w.u(2, 0)   # weighted_pred_flag, weighted_bipred_idc
+        w.se(0); w.se(0); w.se(0)  # pic_init_qp/qs_minus26, chroma_qp_index_offset
+        w.u(1, 1)              # deblocking_filter_control_present_flag
+        w.u(1, 0); w.u(1, 0)   # constrained_intra_pred, redundant_pic_cnt_present
+        w.trailing()
+        return bytes([0x68]) + escape(w.bytes())
+
+    def slice(self, key, index, idr_id, payload):
+        """index: position in the GOP (frame_num)."""
+        w = BitWriter()
+        w.ue(0)                # first_mb_in_slice
+        w.ue(7 if key else 5)  # slice_type: all I / all P
+        w.ue(0)                # pic_parameter_set_id
+        w.u(self.LOG2_MAX_FRAME_NUM, index % (1 << self.LOG2_MAX_FRAME_NUM))
+        if key:
+            w.ue(idr_id)       # idr_pic_id
+            w.u(1, 0); w.u(1, 0)  # no_output_of_prior_pics, long_term_reference
+        else:
+            w.u(1, 0)          # num_ref_idx_active_override_flag
+            w.u(1, 0)          # ref_pic_list_modification_flag_l0
+            w.u(1, 0)          # adaptive_ref_pic_marking_mode_flag
+        w.se(0)                # slice_qp_delta
+        w.ue(1)                # disable_deblocking_filter_idc
+        w.fill_ones()
+        header = bytes([0x65 if key else 0x41])
+        return header + escape(w.bytes()) + payload
+
+    def packetize(self, nal, mtu):
+        if len(nal) <= mtu:
+            return [nal]
+        indicator = (nal[0] & 0xE0) | 28  # FU-A
+        kind = nal[0] & 0x1F
+        chunks = [nal[i:i + mtu - 2] for i in range(1, len(nal), mtu - 2)]
+        return [bytes([indicator, (0x80 if i == 0 else 0) | (0x40 if i == len(chunks) - 1 else 0) | kind]) + chunk
+                for i, chunk in enumerate(chunks)]
+
+    def fmtp(self):
+        sps, pps = self.parameter_sets
+        return (f"packetization-mode=1;profile-level-id={sps[1:4].hex()};"
+                f"sprop-parameter-sets={base64.b64encode(sps).decode()},{base64.b64encode(pps).decode()}")
+
+
+class H265:
+    name = "H265"
+    LOG2_MAX_POC_LSB = 8
+
+    def __init__(self, width, height, fps):
+        self.width, self.height, self.fps = width, height, fps
+        self.parameter_sets = [self.vps(), self.sps(), self.pps()]
+
+    @staticmethod
+    def nal_header(kind):
+        return bytes([kind << 1, 1])  # layer 0, temporal id 0
+
+    def level(self):
+        samples = self.width * self.height
+        return 153 if samples > 2228224 else 123 if samples > 983040 else 93  # 5.1, 4.1, 3.1 (x30)
+
+    def profile_tier_level(self, w):
+        w.u(2, 0); w.u(1, 0); w.u(5, 1)      # profile space, tier, profile_idc: Main
+        w.u(32, 0x60000000)                  # compatible with Main and Main 10
+        w.u(1, 1); w.u(1, 0); w.u(1, 0); w.u(1, 1)  # progressive, interlaced, non-packed, frame-only
+        w.u(32, 0); w.u(12, 0)               # reserved (43 bits) + inbld
+        w.u(8, self.level())
+
+    def vps(self):
+        w = BitWriter()
+        w.u(4, 0)              # vps_video_parameter_set_id
+        w.u(1, 1); w.u(1, 1)   # base layer internal / available
+        w.u(6, 0)              # vps_max_layers_minus1
+        w.u(3, 0)              # vps_max_sub_layers_minus1
+        w.u(1, 1)              # vps_temporal_id_nesting_flag
+        w.u(16, 0xFFFF)
+        self.profile_tier_level(w)
+        w.u(1, 1)              # vps_sub_layer_ordering_info_present_flag
+        w.ue(1); w.ue(0); w.ue(0)  # max_dec_pic_buffering_minus1, num_reorder, latency
+        w.u(6, 0)              # vps_max_layer_id
+        w.ue(0)                # vps_num_layer_sets_minus1
+        w.u(1, 1)              # vps_timing_info_present_flag
+        w.u(32, 1); w.u(32, self.fps)
+        w.u(1, 0)              # vps_poc_proportional_to_timing_flag
+        w.ue(0)                # vps_num_hrd_parameters
+        w.u(1, 0)              # vps_extension_flag
+        w.trailing()
+        return self.nal_header(32) + escape(w.bytes())
+
+    def sps(self):
+        w = BitWriter()
+        w.u(4, 0)              # sps_video_parameter_set_id
+        w.u(3, 0)              # sps_max_sub_layers_minus1
+        w.u(1, 1)              # sps_temporal_id_nesting_flag
+        self.profile_tier_level(w)
+        w.ue(0)                # sps_seq_parameter_set_id
+        w.ue(1)                # chroma_format_idc 4:2:0
+        coded_w, coded_h = -(-self.width // 8) * 8, -(-self.height // 8) * 8
+        w.ue(coded_w)
+        w.ue(coded_h)
+        crop_right, crop_bottom = (coded_w - self.width) // 2, (coded_h - self.height) // 2
+        w.u(1, 1 if crop_right or crop_bottom else 0)
+        if crop_right or crop_bottom:
+            w.ue(0); w.ue(crop_right); w.ue(0); w.ue(crop_bottom)
+        w.ue(0); w.ue(0)       # bit depth luma / chroma minus 8
+        w.ue(self.LOG2_MAX_POC_LSB - 4)
+        w.u(1, 1)              # sps_sub_layer_ordering_info_present_flag
+        w.ue(1); w.ue(0); w.ue(0)
+        w.ue(0)                # log2_min_luma_coding_block_size_minus3 (8)
+        w.ue(3)                # log2_diff_max_min_luma_coding_block_size (CTB 64)
+        w.ue(0)                # log2_min_luma_transform_block_size_minus2 (4)
+        w.ue(3)                # log2_diff_max_min_luma_transform_block_size (32)
+        w.ue(0); w.ue(0)       # max_transform_hierarchy_depth inter / intra
+        w.u(1, 0)              # scaling_list_enabled_flag
+        w.u(1, 0)              # amp_enabled_flag
+        w.u(1, 0)              # sample_adaptive_offset_enabled_flag
+        w.u(1, 0)              # pcm_enabled_flag
+        w.ue(1)                # num_short_term_ref_pic_sets: one, "previous frame"
+        w.ue(1); w.ue(0)       # num_negative_pics, num_positive_pics
+        w.ue(0); w.u(1, 1)     # delta_poc_s0_minus1, used_by_curr_pic_s0_flag
+        w.u(1, 0)              # long_term_ref_pics_present_flag
+        w.u(1, 0)              # sps_temporal_mvp_enabled_flag
+        w.u(1, 0)              # strong_intra_smoothing_enabled_flag
+        w.u(1, 0)              # vui_parameters_present_flag (frame rate is in the VPS)
+        w.u(1, 0)              # sps_extension_present_flag
+        w.trailing()
+        return self.nal_header(33) + escape(w.bytes())
+
+    def pps(self):
+        w = BitWriter()
+        w.ue(0); w.ue(0)       # pps / sps id
+        w.u(1, 0); w.u(1, 0)   # dependent slices, output_flag_present
+        w.u(3, 0)              # num_extra_slice_header_bits
+        w.u(1, 0); w.u(1, 0)   # sign_data_hiding, cabac_init_present
+        w.ue(0); w.ue(0)       # num_ref_idx_l0/l1_default_active_minus1
+        w.se(0)                # init_qp_minus26
+        w.u(1, 0); w.u(1, 0); w.u(1, 0)  # constrained_intra_pred, transform_skip, cu_qp_delta
+        w.se(0); w.se(0)       # cb / cr qp offset
+        w.u(1, 0); w.u(1, 0); w.u(1, 0); w.u(1, 0)  # slice chroma qp, weighted pred/bipred, transquant bypass
+        w.u(1, 0); w.u(1, 0)   # tiles, entropy_coding_sync
+        w.u(1, 0)              # pps_loop_filter_across_slices_enabled_flag
+        w.u(1, 0)              # deblocking_filter_control_present_flag
+        w.u(1, 0); w.u(1, 0)   # pps_scaling_list_data_present, lists_modification_present
+        w.ue(0)                # log2_parallel_merge_level_minus2
+        w.u(1, 0); w.u(1, 0)   # slice header extension, pps extension
+        w.trailing()
+        return self.nal_header(34) + escape(w.bytes())
+
+    def slice(self, key, index, idr_id, payload):
+        w = BitWriter()
+        w.u(1, 1)              # first_slice_segment_in_pic_flag
+        if key:
+            w.u(1, 0)          # no_output_of_prior_pics_flag
+        w.ue(0)                # slice_pic_parameter_set_id
+        w.ue(2 if key else 1)  # slice_type: I / P
+        if not key:
+            w.u(self.LOG2_MAX_POC_LSB, index % (1 << self.LOG2_MAX_POC_LSB))
+            w.u(1, 1)          # short_term_ref_pic_set_sps_flag
+            w.u(1, 0)          # num_ref_idx_active_override_flag
+            w.ue(0)            # five_minus_max_num_merge_cand
+        w.se(0)                # slice_qp_delta
+        w.trailing()           # byte_alignment()
+        return self.nal_header(19 if key else 1) + escape(w.bytes()) + payload
+
+    def packetize(self, nal, mtu):
+        if len(nal) <= mtu:
+            return [nal]
+        kind = (nal[0] >> 1) & 0x3F
+        header = bytes([(nal[0] & 0x81) | (49 << 1), nal[1]])  # FU
+        chunks = [nal[i:i + mtu - 3] for i in range(2, len(nal), mtu - 3)]
+        return [header + bytes([(0x80 if i == 0 else 0) | (0x40 if i == len(chunks) - 1 else 0) | kind]) + chunk
+                for i, chunk in enumerate(chunks)]
+
+    def fmtp(self):
+        vps, sps, pps = (base64.b64encode(p).decode() for p in self.parameter_sets)
+        return f"sprop-vps={vps};sprop-sps={sps};sprop-pps={pps}"
+
+
+CODECS = {"h264": H264, "h265": H265}
+
+
+# ─── Cameras ──────────────────────────────────────────────────────────────────
+
+class Profile:
+    """Codec settings and the pre-packetised frame ring they produce. Cameras
+    with equal profiles share one ring."""
+
+    _rings = {}
+
+    def __init__(self, codec, width, height, fps, gop, kbps):
+        if codec not in CODECS:
+            raise ValueError(f"codec must be one of {', '.join(CODECS)}, got {codec!r}")
+        if width < 16 or height < 16 or width % 2 or height % 2:
+            raise ValueError(f"resolution must be even and at least 16x16, got {width}x{height}")
+        if fps < 1 or gop < 1 or kbps < 1:
+            raise ValueError("fps, gop and kbps must be positive")
+        self.codec, self.width, self.height = codec, width, height
+        self.fps, self.gop, self.kbps = fps, gop, kbps
+        self.encoder = CODECS[codec](width, height, fps)
+        key = (codec, width, height, fps, gop, kbps)
+        if key not in self._rings:
+            self._rings[key] = self.build_ring()
+        self.frames = self._rings[key]
+
+    def __str__(self):
+        return f"{self.encoder.name} {self.width}x{self.height} {self.fps} fps, GOP {self.gop}, {self.kbps} kbit/s"
+
+    def build_ring(self):
+        """RING_GOPS GOPs of (is_key, [RTP payloads]). Keyframes carry the
+        parameter sets in front, as most cameras send them."""
+        rng = random.Random(f"{self.codec}{self.width}{self.height}{self.fps}{self.gop}{self.kbps}")
+        gop_bytes = self.kbps * 1000 / 8 * self.gop / self.fps
+        p_size = gop_bytes / (self.gop - 1 + KEYFRAME_RATIO)
+        frames = []
+        for g in range(RING_GOPS):
+            for index in range(self.gop):
+                key = index == 0
+                size = (KEYFRAME_RATIO if key else 1) * p_size * (1 + rng.uniform(-SIZE_JITTER, SIZE_JITTER))
+                nal = self.encoder.slice(key, index, g % 2, noise(rng, max(16, int(size))))
+                payloads = list(self.encoder.parameter_sets) if key else []
+                payloads += self.encoder.packetize(nal, MTU_PAYLOAD)
+                frames.append((key, payloads))
+        return frames
+
+
+class Camera:
+    def __init__(self, number, profile):
+        self.number = number
+        self.name = f"cam{number}"
+        self.profile = profile
+        self.sessions = 0
+
+    def sdp(self, host):
+        p = self.profile
+        return "\r\n".join([
+            "v=0",
+            f"o=- {random.getrandbits(32)} 1 IN IP4 {host}",
+            f"s=Camera farm {self.name}",
+            f"i={p}",
+            "c=IN IP4 0.0.0.0",
+            "t=0 0",
+            "a=control:*",
+            "a=range:npt=0-",
+            f"m=video 0 RTP/AVP {RTP_PAYLOAD_TYPE}",
+            f"a=rtpmap:{RTP_PAYLOAD_TYPE} {p.encoder.name}/{RTP_CLOCK}",
+            f"a=fmtp:{RTP_PAYLOAD_TYPE} {p.encoder.fmtp()}",
+            f"a=framerate:{p.fps}",
+            f"a=x-dimensions:{p.width},{p.height}",
+            "a=control:trackID=0",
+            "",
+        ])
+
+
+# ─── Statistics ───────────────────────────────────────────────────────────────
+
+class Stats:
+    def __init__(self):
+        self.started = self.window_started = time.monotonic()
+        self.packets = self.bytes = self.frames = 0
+        self.dropped = self.late = 0
+        self.sessions = {"tcp": 0, "udp": 0}
+        self.total_sessions = 0
+        self.window_packets = self.window_bytes = self.window_frames = 0
+
+    def sent(self, packets, size):
+        self.packets += packets
+        self.bytes += size
+        self.frames += 1
+        self.window_packets += packets
+        self.window_bytes += size
+        self.window_frames += 1
+
+    def line(self):
+        now = time.monotonic()
+        elapsed = max(now - self.window_started, 1e-9)
+        self.window_started = now
+        line = (f"  {datetime.now().strftime('%H:%M:%S')}  sessions {sum(self.sessions.values()):3d}"
+                f" (tcp {self.sessions['tcp']}, udp {self.sessions['udp']})"
+                f"  {self.window_packets / elapsed:8.0f} pkt/s  {self.window_bytes * 8 / elapsed / 1e6:7.1f} Mbit/s"
+                f"  {self.window_frames / elapsed:6.0f} frames/s  dropped {self.dropped}  late {self.late}")
+        self.window_packets = self.window_bytes = self.window_frames = 0
+        return line
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (f"  {self.total_sessions} sessions in {elapsed:.0f}s: {self.packets} RTP packets"
+                f" ({self.packets / elapsed:.0f}/s), {self.bytes * 8 / elapsed / 1e6:.1f} Mbit/s,"
+                f" {self.frames} frames, {self.dropped} dropped, {self.late} late")
+
+
+STATS = Stats()
+VERBOSE = False
+
+
+def log(message):
+    if VERBOSE:
+        print(f"  {datetime.now().strftime('%H:%M:%S.%f')[:-3]}  {message}", flush=True)
+
+
+# ─── RTP sessions ─────────────────────────────────────────────────────────────
+
+class UdpSink(asyncio.DatagramProtocol):
+    """Server side of a UDP RTP or RTCP port. Receiver reports are ignored."""
+
+    def error_received(self, exc):
+        pass  # ICMP port unreachable while the client is gone
+
+
+class Session:
+    def __init__(self, camera, client, writer):
+        self.id = f"{random.getrandbits(48):012X}"
+        self.camera = camera
+        self.client = client
+        self.writer = writer
+        self.transport = None          # "tcp" or "udp"
+        self.channel = 0               # interleaved RTP channel (RTCP is +1)
+        self.rtp = self.rtcp = None    # UDP transports
+        self.ssrc = random.getrandbits(32)
+        self.seq = random.getrandbits(16)
+        self.rtp_base = random.getrandbits(32)
+        self.task = None
+        self.frame = 0                 # frames since PLAY
+        self.packets = self.octets = 0
+
+    async def setup(self, transport_header, host):
+        """Pick the first transport the client offers that the farm supports.
+        Returns the Transport response header, or None (461)."""
+        for spec in transport_header.split(","):
+            params = [p.strip() for p in spec.split(";")]
+            proto = params[0].upper()
+            if "multicast" in (p.lower() for p in params):
+                continue
+            if proto == "RTP/AVP/TCP":
+                channels = next((p.split("=")[1] for p in params if p.startswith("interleaved=")), "0-1")
+                self.channel = int(channels.split("-")[0])
+                self.transport = "tcp"
+                return f"RTP/AVP/TCP;unicast;interleaved={self.channel}-{self.channel + 1};ssrc={self.ssrc:08X}"
+            if proto in ("RTP/AVP", "RTP/AVP/UDP"):
+                ports = next((p.split("=")[1] for p in params if p.startswith("client_port=")), None)
+                if not ports:
+                    continue
+                rtp_port = int(ports.split("-")[0])
+                rtcp_port = int(ports.split("-")[1]) if "-" in ports else rtp_port + 1
+                try:
+                    self.rtp, self.rtcp = await self.open_udp_pair(host, rtp_port, rtcp_port)
+                except OSError as exc:
+                    log(f"{self.client} no UDP port pair: {exc}")
+                    continue
+                self.transport = "udp"
+                server = self.rtp.get_extra_info("sockname")[1]
+                return (f"RTP/AVP;unicast;client_port={rtp_port}-{rtcp_port};"
+                        f"server_port={server}-{server + 1};ssrc={self.ssrc:08X}")
+        return None
+
+    async def open_udp_pair(self, host, rtp_port, rtcp_port):
+        """Bind RTP to an even port and RTCP to the odd port above it
+        (RFC 3550 section 11), so clients that expect the pair find it."""
+        loop = asyncio.get_event_loop()
+        for _ in range(UDP_PAIR_ATTEMPTS):
+            rtp, _ = await loop.create_datagram_endpoint(
+                UdpSink, local_addr=(host, 0), remote_addr=(self.client, rtp_port))
+            port = rtp.get_extra_info("sockname")[1]
+            if port % 2 == 0:
+                try:
+                    rtcp, _ = await loop.create_datagram_endpoint(
+                        UdpSink, local_addr=(host, port + 1), remote_addr=(self.client, rtcp_port))
+                    return rtp, rtcp
+                except OSError:
+                    pass  # the odd port is taken; try another pair
+            rtp.close()
+        raise OSError(f"no free even/odd pair after {UDP_PAIR_ATTEMPTS} attempts")
+
+    def play(self):
+        if self.task is None:
+            STATS.sessions[self.transport] += 1
+            STATS.total_sessions += 1
+            self.camera.sessions += 1
+            self.task = asyncio.ensure_future(self.stream())
+
+    def pause(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+            STATS.sessions[self.transport] -= 1
+            self.camera.sessions -= 1
+
+    def close(self):
+        self.pause()
+        for t in (self.rtp, self.rtcp):
+            if t is not None:
+                t.close()
+        self.rtp = self.rtcp = None
+
+    def rtp_time(self):
+        return (self.rtp_base + self.frame * RTP_CLOCK // self.camera.profile.fps) & 0xFFFFFFFF
+
+    async def stream(self):
+        """Send the ring from its first keyframe, one frame per 1/fps on this
+        session's own clock. A frame more than one interval late counts as
+        late and is sent at once; the clock is not reset."""
+        profile = self.camera.profile
+        frames = profile.frames
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        next_rtcp = start
+        interval = 1.0 / profile.fps
+        wait_for_key = False
+        ring = 0
+        while True:
+            due = start + self.frame * interval
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -interval:
+                STATS.late += 1
+
+            key, payloads = frames[ring]
+            ring = (ring + 1) % len(frames)
+            timestamp = self.rtp_time()
+            self.frame += 1
+
+            if self.transport == "tcp":
+                if self.writer.is_closing():
+                    return
+                if self.writer.transport.get_write_buffer_size() > MAX_TCP_BUFFER or (wait_for_key and not key):
+                    # Client cannot keep up: skip to the next keyframe.
+                    wait_for_key = True
+                    STATS.dropped += 1
+                    continue
+                wait_for_key = False
+            self.send_frame(payloads, timestamp)
+
+            if loop.time() >= next_rtcp:
+                next_rtcp += RTCP_INTERVAL
+                self.send_rtcp(timestamp)
+
+    def send_frame(self, payloads, timestamp):
+        last = len(payloads) - 1
+        size = 0
+        if self.transport == "tcp":
+            chunks = []
+            for i, payload in enumerate(payloads):
+                chunks.append(struct.pack("!cBHBBHII", b"$", self.channel, 12 + len(payload), 0x80,
+                                          (0x80 if i == last else 0) | RTP_PAYLOAD_TYPE,
+                                          self.seq, timestamp, self.ssrc))
+                chunks.append(payload)
+                self.seq = (self.seq + 1) & 0xFFFF
+                size += 12 + len(payload)
+            self.writer.write(b"".join(chunks))
+        else:
+            for i, payload in enumerate(payloads):
+                self.rtp.sendto(struct.pack("!BBHII", 0x80, (0x80 if i == last else 0) | RTP_PAYLOAD_TYPE,
+                                            self.seq, timestamp, self.ssrc) + payload)
+                self.seq = (self.seq + 1) & 0xFFFF
+                size += 12 + len(payload)
+        self.packets += len(payloads)
+        self.octets += size
+        STATS.sent(len(payloads), size)
+
+    def send_rtcp(self, timestamp):
+        """Sender report, so the client can map RTP time to wall-clock time."""
+        now = time.time() + NTP_EPOCH_OFFSET
+        report = struct.pack("!BBHIIIIII", 0x80, 200, 6, self.ssrc, int(now), int((now % 1) * (1 << 32)),
+                             timestamp, self.packets & 0xFFFFFFFF, self.octets & 0xFFFFFFFF)
+        if self.transport == "tcp":
+            if not self.writer.is_closing():
+                self.writer.write(struct.pack("!cBH", b"$", self.channel + 1, len(report)) + report)
+        elif self.rtcp is not None:
+            self.rtcp.sendto(report)
+
+
+# ─── RTSP ─────────────────────────────────────────────────────────────────────
+
+class RtspConnection:
+    """One client connection: RTSP requests, interleaved RTCP from the
+    client (ignored) and the sessions set up on it. Closing the connection
+    ends its sessions."""
+
+    METHODS = "OPTIONS, DESCRIBE, SETUP, PLAY, PAUSE, TEARDOWN, GET_PARAMETER, SET_PARAMETER"
+
+    def __init__(self, farm, reader, writer):
+        self.farm = farm
+        self.reader = reader
+        self.writer = writer
+        peer = writer.get_extra_info("peername")
+        self.client = peer[0] if peer else "127.0.0.1"
+        self.local = writer.get_extra_info("sockname")[0]
+        self.sessions = {}
+
+    async def serve(self):
+        log(f"{self.client} connected")
+        try:
+            while True:
+                first = await self.reader.readexactly(1)
+                if first == b"$":
+                    _, length = struct.unpack("!BH", await self.reader.readexactly(3))
+                    await self.reader.readexactly(length)
+                    continue
+                head = first + await self.reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0) or 0)
+                if length:
+                    await self.reader.readexactly(length)
+                try:
+                    method, url, _ = lines[0].split(" ")
+                except ValueError:
+                    self.reply(400, headers)
+                    continue
+                await self.handle(method.upper(), url, headers)
+                await self.writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError, OSError):
+            pass
+        finally:
+            for session in self.sessions.values():
+                session.close()
+            self.writer.close()
+            log(f"{self.client} disconnected")
+
+    def reply(self, status, headers, extra=None, body=b""):
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 454: "Session Not Found",
+                   455: "Method Not Valid in This State", 459: "Aggregate Operation Not Allowed",
+                   461: "Unsupported Transport", 501: "Not Implemented"}
+        lines = [f"RTSP/1.0 {status} {reasons.get(status, '')}", f"CSeq: {headers.get('cseq', '0')}",
+                 "Server: MSC camera farm", f"Date: {formatdate(usegmt=True)}"]
+        lines += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        if body:
+            lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+    def camera(self, url):
+        name = urlparse(url).path.strip("/").split("/")[0]
+        return self.farm.cameras.get(name)
+
+    def session(self, headers):
+        return self.sessions.get(headers.get("session", "").split(";")[0].strip())
+
+    async def handle(self, method, url, headers):
+        log(f"{self.client} {method} {url}")
+        if method == "OPTIONS":
+            self.reply(200, headers, {"Public": self.METHODS})
+        elif method in ("GET_PARAMETER", "SET_PARAMETER"):
+            session = self.session(headers)
+            self.reply(200, headers, {"Session": session.id} if session else None)
+        elif method == "DESCRIBE":
+            camera = self.camera(url)
+            if camera is None:
+                self.reply(404, headers)
+                return
+            base = url.rstrip("/") + "/"
+            self.reply(200, headers, {"Content-Type": "application/sdp", "Content-Base": base},
+                       camera.sdp(self.local).encode())
+        elif method == "SETUP":
+            camera = self.camera(url)
+            if camera is None:
+                self.reply(404, headers)
+                return
+            if self.session(headers) is not None:
+                self.reply(459, headers)  # one video track per camera
+                return
+            session = Session(camera, self.client, self.writer)
+            transport = await session.setup(headers.get("transport", ""), self.local)
+            if transport is None:
+                self.reply(461, headers)
+                return
+            self.sessions[session.id] = session
+            self.reply(200, headers, {"Transport": transport, "Session": f"{session.id};timeout={SESSION_TIMEOUT}"})
+            log(f"{self.client} {camera.name} session {session.id} over {session.transport}")
+        elif method in ("PLAY", "PAUSE", "TEARDOWN"):
+            session = self.session(headers)
+            if session is None:
+                self.reply(454, headers)
+                return
+            if method == "PLAY":
+                track = url.rstrip("/") + ("" if url.rstrip("/").endswith("trackID=0") else "/trackID=0")
+                self.reply(200, headers, {"Session": session.id, "Range": "npt=0.000-",
+                                          "RTP-Info": f"url={track};seq={session.seq};rtptime={session.rtp_time()}"})
+                await self.writer.drain()  # the PLAY response goes before the first frame
+                session.play()
+            elif method == "PAUSE":
+                session.pause()
+                self.reply(200, headers, {"Session": session.id})
+            else:
+                session.close()
+                del self.sessions[session.id]
+                self.reply(200, headers, {"Session": session.id})
+        else:
+            self.reply(501, headers, {"Public": self.METHODS})
+
+
+class CameraFarm:
+    def __init__(self, cameras):
+        self.cameras = {camera.name: camera for camera in cameras}
+
+    async def serve(self, host, port, ssl_context, report):
+        server = await asyncio.start_server(lambda r, w: RtspConnection(self, r, w).serve(),
+                                            host, port, ssl=ssl_context, backlog=256)
+        scheme = "rtsps" if ssl_context else "rtsp"
+        shown = "localhost" if host in ("0.0.0.0", "::") else host
+        for camera in self.cameras.values():
+            print(f"  {scheme}://{shown}:{port}/{camera.name:<6}  {camera.profile}")
+        total = sum(c.profile.kbps for c in self.cameras.values())
+        print(f"\n  {len(self.cameras)} cameras, {total / 1000:.1f} Mbit/s for one session each. Ctrl+C to stop.\n",
+              flush=True)
+        try:
+            while True:
+                await asyncio.sleep(report)
+                print(STATS.line(), flush=True)
+        finally:
+            server.close()
+
+
+def parse_resolution(text):
+    match = re.fullmatch(r"(\d+)x(\d+)", text.strip().lower())
+    if not match:
+        raise ValueError(f"resolution must look like 1920x1080, got {text!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def build_cameras(args):
+    """Cameras cycle through PRESETS; --codec etc. override every camera,
+    --camera N=... replaces camera N entirely."""
+    overrides = {}
+    for spec in args.camera:
+        number, sep, values = spec.partition("=")
+        parts = values.split(",")
+        if not sep or not number.isdigit() or len(parts) != 5:
+            raise ValueError(f"--camera needs N=CODEC,WxH,FPS,GOP,KBPS, got {spec!r}")
+        width, height = parse_resolution(parts[1])
+        overrides[int(number)] = (parts[0].lower(), width, height, int(parts[2]), int(parts[3]), int(parts[4]))
+
+    resolution = parse_resolution(args.resolution) if args.resolution else None
+    cameras = []
+    for number in range(1, args.cameras + 1):
+        codec, width, height, fps, gop, kbps = PRESETS[(number - 1) % len(PRESETS)]
+        codec = args.codec or codec
+        width, height = resolution or (width, height)
+        fps, gop, kbps = args.fps or fps, args.gop or gop, args.kbps or kbps
+        if number in overrides:
+            codec, width, height, fps, gop, kbps = overrides[number]
+        cameras.append(Camera(number, Profile(codec, width, height, fps, gop, kbps)))
+    return cameras
+
+
+def main():
+    global VERBOSE
+    parser = argparse.ArgumentParser(description="RTSP camera farm: N virtual H.264/H.265 cameras in one process")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8554)
+    parser.add_argument("--cameras", type=int, default=16, help="number of cameras, served as /cam1 .. /camN")
+    parser.add_argument("--codec", choices=sorted(CODECS), help="codec for every camera")
+    parser.add_argument("--resolution", help="WxH for every camera, e.g. 1280x720")
+    parser.add_argument("--fps", type=int, help="frame rate for every camera")
+    parser.add_argument("--gop", type=int, help="frames from one keyframe to the next for every camera")
+    parser.add_argument("--kbps", type=int, help="bitrate in kbit/s for every camera")
+    parser.add_argument("--camera", action="append", default=[], metavar="N=CODEC,WxH,FPS,GOP,KBPS",
+                        help="profile of camera N, e.g. 3=h265,3840x2160,20,40,8000")
+    parser.add_argument("--report", type=float, default=5.0, metavar="SECONDS", help="rate line interval")
+    parser.add_argument("--cert", help="PEM certificate: serve RTSPS (RTSP over TLS) instead of RTSP")
+    parser.add_argument("--key", help="PEM private key for --cert")
+    parser.add_argument("--verbose", action="store_true", help="print every RTSP request")
+    args = parser.parse_args()
+    if bool(args.cert) != bool(args.key):
+        parser.error("--cert and --key go together")
+    if args.cameras < 1:
+        parser.error("--cameras must be at least 1")
+    VERBOSE = args.verbose
+
+    print("\n  RTSP camera farm\n  ================\n")
+    started = time.monotonic()
+    try:
+        cameras = build_cameras(args)
+    except ValueError as ex:
+        parser.error(str(ex))
+    print(f"  Frame rings built in {time.monotonic() - started:.1f}s\n")
+
+    ssl_context = None
+    if args.cert:
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(args.cert, args.key)
+
+    try:
+        asyncio.run(CameraFarm(cameras).serve(args.host, args.port, ssl_context, args.report))
+    except KeyboardInterrupt:
+        print("\n" + STATS.summary())
+    except OSError as ex:
+        print(f"  {ex}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
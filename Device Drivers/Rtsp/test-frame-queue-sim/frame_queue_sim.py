@@ -0,0 +1,543 @@
+"""
+Frame queue policy simulator for the MSC RTSP and RTMP Drivers
+===============================================================
+
+A discrete-event simulation of the frame queue that sits between the
+stream worker (producer) and XProtect's GetLiveFrame loop (consumer) in
+RtspStreamBuffer / RtmpStreamBuffer, so queue policies can be compared on
+the same input before one is written in C#.
+
+The producer pushes frames at their arrival times, taken from a recorded
+trace or a synthetic camera (codec-agnostic: frame sizes, keyframes, GOP),
+optionally with network jitter and source stalls that make frames arrive
+late and then in a burst. The consumer is the driver's GetLiveFrame loop:
+it pops a frame, paces delivery to the media timestamps while 1..30 frames
+are queued (the same rule as the C# sessions), then the Recording Server
+takes a service time per frame and may stall.
+
+Policies:
+
+  drop-to-keyframe   today's code: at 300 frames, drop from the head to
+                     the next keyframe (a whole GOP when the head is one)
+  bounded-latency    frames older than --max-latency are dropped a GOP at
+                     a time; if no keyframe is left, new frames are
+                     dropped until one arrives
+  ring-gop-index     a preallocated ring of --ring-mb with an index of
+                     keyframe positions; when full, jump to the newest
+                     keyframe, dropping all older GOPs at once
+
+For each policy it reports frames delivered and lost, frames delivered
+after a gap but before the next keyframe (which do not decode cleanly),
+the longest freeze a viewer would see, queue latency percentiles and the
+memory the queue holds.
+
+Usage:
+  python frame_queue_sim.py                                 # every built-in scenario
+  python frame_queue_sim.py --scenario consumer-stalls
+  python frame_queue_sim.py --fps 30 --gop 300 --consumer-stall 4 --consumer-stall-every 30
+  python frame_queue_sim.py --trace trace.csv --source-stall 2 --source-stall-every 20
+  python frame_queue_sim.py --scenario slow-consumer --write-trace slow.csv --csv results.csv
+
+A trace is either a CSV with a header naming capture (seconds), size
+(bytes), key (0/1) and optionally arrival (seconds), or ffprobe packet
+output:
+
+  ffprobe -v error -select_streams v:0 -show_entries packet=pts_time,size,flags -of csv=p=0 in.mp4 > trace.csv
+
+No third-party dependencies.
+"""
+
+from collections import deque
+import argparse
+import csv
+import heapq
+import math
+import random
+import sys
+import time
+
+PACING_MAX_DEPTH = 30      # the sessions pace only with 1..30 frames queued
+PACING_MAX_SLEEP = 0.2     # and never sleep 200 ms or more for one frame
+DROP_TO_KEYFRAME_MAX = 300  # RtspStreamBuffer / RtmpStreamBuffer.MaxQueueSize
+
+# Built-in scenarios: settings that differ from the command line defaults
+SCENARIOS = {
+    "steady": {},
+    "consumer-stalls": {"consumer_stall": 3.0, "consumer_stall_every": 20.0},
+    "source-bursts": {"jitter": 30.0, "source_stall": 2.0, "source_stall_every": 15.0},
+    "long-gop": {"gop": 250, "consumer_stall": 3.0, "consumer_stall_every": 20.0},
+    "slow-consumer": {"consumer_ms": 45.0},
+    "4k-stalls": {"kbps": 16000, "fps": 30, "gop": 60, "consumer_stall": 5.0, "consumer_stall_every": 30.0},
+}
+
+
+class Frame:
+    __slots__ = ("seq", "capture", "arrival", "size", "key")
+
+    def __init__(self, seq, capture, arrival, size, key):
+        self.seq = seq
+        self.capture = capture
+        self.arrival = arrival
+        self.size = size
+        self.key = key
+
+
+# ─── Traces ───────────────────────────────────────────────────────────────────
+
+def synthetic_trace(fps, gop, kbps, key_ratio, duration, rng):
+    """(capture, size, key) for a camera with a fixed GOP. Keyframes are
+    key_ratio times the size of the frames between them; sizes vary +/-25%."""
+    frames_per_gop = gop
+    mean = kbps * 1000 / 8 / fps
+    inter = mean * frames_per_gop / (key_ratio + frames_per_gop - 1)
+    trace = []
+    for n in range(int(duration * fps)):
+        key = n % gop == 0
+        size = (inter * key_ratio if key else inter) * rng.uniform(0.75, 1.25)
+        trace.append((n / fps, max(16, int(size)), key))
+    return trace
+
+
+def read_trace(path):
+    """(capture, size, key[, arrival]) from a header CSV or ffprobe packet
+    output, with times relative to the first frame."""
+    with open(path, newline="") as f:
+        rows = [row for row in csv.reader(f) if row]
+    if not rows:
+        raise ValueError(f"{path}: empty trace")
+    trace = []
+    if rows[0][0].strip().lower() in ("capture", "arrival", "size", "key"):
+        names = [name.strip().lower() for name in rows[0]]
+        missing = {"capture", "size", "key"} - set(names)
+        if missing:
+            raise ValueError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+        for row in rows[1:]:
+            r = dict(zip(names, row))
+            entry = (float(r["capture"]), int(r["size"]), r["key"].strip().lower() in ("1", "true", "k", "yes"))
+            if r.get("arrival"):
+                entry += (float(r["arrival"]),)
+            trace.append(entry)
+    else:
+        # ffprobe: pts_time,size,flags (K_ marks a keyframe); packets without a pts are skipped
+        for row in rows:
+            if len(row) < 3 or row[0] in ("", "N/A"):
+                continue
+            trace.append((float(row[0]), int(row[1]), "K" in row[2]))
+        trace.sort()
+    if not trace:
+        raise ValueError(f"{path}: no frames")
+    start = trace[0][0]
+    return [(t[0] - start,) + t[1:3] + ((t[3] - start,) if len(t) > 3 else ()) for t in trace]
+
+
+def arrivals(trace, jitter, stall, stall_every, rng):
+    """Frames with arrival times: recorded ones, or capture time plus up to
+    jitter ms, held back by source stalls and released in a burst when the
+    stall ends. Arrival order is capture order, as over TCP."""
+    frames = []
+    last = 0.0
+    stalls = Stalls(stall, stall_every, rng)
+    for seq, entry in enumerate(trace):
+        capture, size, key = entry[:3]
+        if len(entry) > 3:
+            arrival = entry[3]
+        else:
+            arrival = stalls.until(capture + rng.uniform(0, jitter / 1000))
+        last = max(last, arrival)
+        frames.append(Frame(seq, capture, last, size, key))
+    return frames
+
+
+def write_trace(path, frames):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["capture", "arrival", "size", "key"])
+        for frame in frames:
+            writer.writerow([f"{frame.capture:.6f}", f"{frame.arrival:.6f}", frame.size, int(frame.key)])
+
+
+class Stalls:
+    """Stalls of a fixed length, starting at random on average every
+    `every` seconds."""
+
+    def __init__(self, length, every, rng):
+        self.length = length
+        self.every = every
+        self.rng = rng
+        self.next_start = rng.expovariate(1 / every) if length and every else math.inf
+        self.end = -math.inf
+
+    def until(self, t):
+        """t, or the end of the stall t falls in."""
+        while t >= self.next_start:
+            self.end = self.next_start + self.length
+            self.next_start = self.end + self.rng.expovariate(1 / self.every)
+        return self.end if t < self.end else t
+
+
+# ─── Queue policies ───────────────────────────────────────────────────────────
+
+class Policy:
+    """A frame queue. Subclasses decide what to drop; the base keeps the
+    byte count and an index of the keyframes queued."""
+
+    name = ""
+
+    def __init__(self, args):
+        self.queue = deque()
+        self.keys = deque()          # seq of each keyframe in the queue, oldest first
+        self.bytes = 0
+        self.peak_bytes = 0
+        self.dropped = 0
+        self.wait_for_key = False
+
+    def _append(self, frame):
+        self.queue.append(frame)
+        if frame.key:
+            self.keys.append(frame.seq)
+        self.bytes += frame.size
+        if self.bytes > self.peak_bytes:
+            self.peak_bytes = self.bytes
+
+    def _pop_head(self):
+        frame = self.queue.popleft()
+        if self.keys and self.keys[0] == frame.seq:
+            self.keys.popleft()
+        self.bytes -= frame.size
+        return frame
+
+    def _drop_head(self):
+        self._pop_head()
+        self.dropped += 1
+
+    def _drop_gop(self):
+        """Drop the head and everything up to the next keyframe. Returns
+        False when no keyframe was left: new frames must wait for one."""
+        self._drop_head()
+        while self.queue and not self.queue[0].key:
+            self._drop_head()
+        return bool(self.queue)
+
+    def push(self, frame, now):
+        self._append(frame)
+
+    def pop(self, now):
+        return self._pop_head() if self.queue else None
+
+    def memory(self):
+        """Bytes the policy needs: what it held at most, or what it reserves."""
+        return self.peak_bytes
+
+
+class DropToKeyframe(Policy):
+    name = "drop-to-keyframe"
+
+    def __init__(self, args):
+        super().__init__(args)
+        self.max_frames = args.max_frames
+
+    def push(self, frame, now):
+        # As RtspStreamBuffer.PushFrame: drop until a keyframe follows at least one drop
+        if len(self.queue) >= self.max_frames:
+            dropped = 0
+            while self.queue:
+                if self.queue[0].key and dropped > 0:
+                    break
+                self._drop_head()
+                dropped += 1
+        self._append(frame)
+
+
+class BoundedLatency(Policy):
+    name = "bounded-latency"
+
+    def __init__(self, args):
+        super().__init__(args)
+        self.max_latency = args.max_latency / 1000
+        self.max_frames = args.max_frames
+
+    def _expire(self, now):
+        while self.queue and now - self.queue[0].arrival > self.max_latency:
+            if not self._drop_gop():
+                self.wait_for_key = True
+
+    def push(self, frame, now):
+        self._expire(now)
+        if self.wait_for_key:
+            if not frame.key:
+                self.dropped += 1
+                return
+            self.wait_for_key = False
+        if len(self.queue) >= self.max_frames and not self._drop_gop() and not frame.key:
+            self.wait_for_key = True
+            self.dropped += 1
+            return
+        self._append(frame)
+
+    def pop(self, now):
+        self._expire(now)
+        return super().pop(now)
+
+
+class RingGopIndex(Policy):
+    name = "ring-gop-index"
+
+    def __init__(self, args):
+        super().__init__(args)
+        self.capacity = int(args.ring_mb * 1024 * 1024)
+
+    def push(self, frame, now):
+        if self.wait_for_key:
+            if not frame.key:
+                self.dropped += 1
+                return
+            self.wait_for_key = False
+        if self.bytes + frame.size > self.capacity:
+            # Jump to the newest keyframe, dropping every older GOP at once
+            if self.keys and self.keys[-1] != self.queue[0].seq:
+                newest = self.keys[-1]
+                while self.queue[0].seq != newest:
+                    self._drop_head()
+            if self.bytes + frame.size > self.capacity:
+                while self.queue:
+                    self._drop_head()
+                if not frame.key:
+                    self.wait_for_key = True
+                    self.dropped += 1
+                    return
+        self._append(frame)
+
+    def memory(self):
+        return self.capacity
+
+
+POLICIES = {policy.name: policy for policy in (DropToKeyframe, BoundedLatency, RingGopIndex)}
+
+
+# ─── Simulation ───────────────────────────────────────────────────────────────
+
+class Result:
+    def __init__(self, policy, frames):
+        self.policy = policy
+        self.frames = frames
+        self.delivered = 0
+        self.broken = 0              # delivered after a gap, before the next keyframe
+        self.latencies = []          # delivery - arrival, seconds
+        self.max_freeze = 0.0
+        self.byte_seconds = 0.0      # for the mean bytes held
+        self.duration = 0.0
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def simulate(policy, frames, args, rng):
+    """Runs frames through policy with the GetLiveFrame consumer."""
+    events = []
+    counter = 0
+    now = 0.0
+    result = Result(policy, frames)
+    consumer_stalls = Stalls(args.consumer_stall, args.consumer_stall_every, rng)
+    state = {"waiting": False, "prev_pts": None, "prev_deliver": None,
+             "last_seq": None, "decodable": False, "last_good": None,
+             "held_since": 0.0}
+
+    def at(t, action, *payload):
+        nonlocal counter
+        counter += 1
+        heapq.heappush(events, (t, counter, action, payload))
+
+    def account():
+        # Time-weighted bytes held, sampled before every change
+        result.byte_seconds += policy.bytes * (now - state["held_since"])
+        state["held_since"] = now
+
+    def push(frame):
+        account()
+        policy.push(frame, now)
+        if state["waiting"]:
+            state["waiting"] = False
+            at(now, pull)
+
+    def pull():
+        resume = consumer_stalls.until(now)
+        if resume > now:
+            at(resume, pull)
+            return
+        account()
+        frame = policy.pop(now)
+        if frame is None:
+            state["waiting"] = True
+            return
+        deliver = now
+        depth = len(policy.queue)
+        prev_pts = state["prev_pts"]
+        if 0 < depth <= PACING_MAX_DEPTH and prev_pts is not None and frame.capture > prev_pts:
+            remaining = state["prev_deliver"] + (frame.capture - prev_pts) - now
+            if 0 < remaining < PACING_MAX_SLEEP:
+                deliver = now + remaining
+        state["prev_pts"] = frame.capture
+        state["prev_deliver"] = deliver
+        at(deliver, delivered, frame)
+
+    def delivered(frame):
+        result.delivered += 1
+        result.latencies.append(now - frame.arrival)
+        if frame.key:
+            state["decodable"] = True
+        elif state["last_seq"] is None or frame.seq != state["last_seq"] + 1:
+            state["decodable"] = False
+        state["last_seq"] = frame.seq
+        if state["decodable"]:
+            if state["last_good"] is not None:
+                result.max_freeze = max(result.max_freeze, now - state["last_good"])
+            state["last_good"] = now
+        else:
+            result.broken += 1
+        service = args.consumer_ms / 1000 * rng.uniform(0.5, 1.5)
+        at(now + service, pull)
+
+    for frame in frames:
+        at(frame.arrival, push, frame)
+    at(0.0, pull)
+    end = frames[-1].arrival + 60.0
+    while events:
+        t, _, action, payload = heapq.heappop(events)
+        if t > end:
+            break
+        now = t
+        action(*payload)
+    account()
+    result.duration = max(now, 1e-9)
+    return result
+
+
+# ─── Reporting ────────────────────────────────────────────────────────────────
+
+HEADER = (f"  {'policy':18s} {'delivered':>9s} {'lost':>7s} {'broken':>7s} {'freeze':>7s}"
+          f" {'p50 ms':>7s} {'p99 ms':>7s} {'max ms':>7s} {'mem MB':>7s} {'mean MB':>8s}")
+
+
+def row(result):
+    frames = len(result.frames)
+    lost = 100 * result.policy.dropped / frames if frames else 0.0
+    return (f"  {result.policy.name:18s} {result.delivered:9d} {lost:6.2f}% {result.broken:7d}"
+            f" {result.max_freeze:6.2f}s {1000 * result.percentile(50):7.0f} {1000 * result.percentile(99):7.0f}"
+            f" {1000 * max(result.latencies, default=0):7.0f} {result.policy.memory() / 1e6:7.1f}"
+            f" {result.byte_seconds / result.duration / 1e6:8.2f}")
+
+
+def describe(args, frames):
+    parts = [f"{len(frames)} frames"]
+    if args.trace:
+        parts.append(f"from {args.trace}")
+    else:
+        parts.append(f"{args.fps} fps, GOP {args.gop}, {args.kbps} kbit/s")
+    if args.jitter:
+        parts.append(f"jitter {args.jitter:g} ms")
+    if args.source_stall and args.source_stall_every:
+        parts.append(f"source stalls {args.source_stall:g}s every ~{args.source_stall_every:g}s")
+    parts.append(f"consumer {args.consumer_ms:g} ms/frame")
+    if args.consumer_stall and args.consumer_stall_every:
+        parts.append(f"stalls {args.consumer_stall:g}s every ~{args.consumer_stall_every:g}s")
+    return ", ".join(parts)
+
+
+def run(name, args, writer):
+    rng = random.Random(args.seed)
+    if args.trace:
+        trace = read_trace(args.trace)
+    else:
+        trace = synthetic_trace(args.fps, args.gop, args.kbps, args.key_ratio, args.duration, rng)
+    frames = arrivals(trace, args.jitter, args.source_stall, args.source_stall_every, rng)
+    if args.write_trace:
+        write_trace(args.write_trace, frames)
+
+    print(f"\n  {name}: {describe(args, frames)}\n")
+    print(HEADER)
+    for policy_name in args.policy or POLICIES:
+        started = time.perf_counter()
+        # Every policy sees the same consumer stalls and service times
+        result = simulate(POLICIES[policy_name](args), frames, args, random.Random(args.seed + 1))
+        print(row(result) + (f"   ({time.perf_counter() - started:.1f}s)" if args.verbose else ""))
+        if writer is not None:
+            writer.writerow([name, policy_name, len(frames), result.delivered, result.policy.dropped,
+                             result.broken, f"{result.max_freeze:.3f}",
+                             f"{1000 * result.percentile(50):.1f}", f"{1000 * result.percentile(99):.1f}",
+                             f"{1000 * max(result.latencies, default=0):.1f}", result.policy.memory(),
+                             f"{result.byte_seconds / result.duration:.0f}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame queue policy simulator for RtspStreamBuffer / RtmpStreamBuffer")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS) + ["all"],
+                        help="built-in scenario (default: all, unless a trace or camera setting is given)")
+    parser.add_argument("--policy", action="append", choices=sorted(POLICIES), help="policy to run (repeatable)")
+    source = parser.add_argument_group("frames")
+    source.add_argument("--trace", help="recorded trace (CSV or ffprobe packet output) instead of a synthetic camera")
+    source.add_argument("--fps", type=int, default=25)
+    source.add_argument("--gop", type=int, default=50, help="frames from one keyframe to the next")
+    source.add_argument("--kbps", type=int, default=4000)
+    source.add_argument("--key-ratio", type=float, default=8.0, help="keyframe size relative to other frames")
+    source.add_argument("--duration", type=float, default=600.0, metavar="SECONDS")
+    source.add_argument("--jitter", type=float, default=0.0, metavar="MS", help="random network delay per frame")
+    source.add_argument("--source-stall", type=float, default=0.0, metavar="SECONDS",
+                        help="frames held back, then delivered in a burst")
+    source.add_argument("--source-stall-every", type=float, default=0.0, metavar="SECONDS")
+    consumer = parser.add_argument_group("consumer")
+    consumer.add_argument("--consumer-ms", type=float, default=2.0, help="Recording Server time per frame (+/-50%%)")
+    consumer.add_argument("--consumer-stall", type=float, default=0.0, metavar="SECONDS",
+                          help="consumer stops pulling frames")
+    consumer.add_argument("--consumer-stall-every", type=float, default=0.0, metavar="SECONDS")
+    policy = parser.add_argument_group("policies")
+    policy.add_argument("--max-frames", type=int, default=DROP_TO_KEYFRAME_MAX,
+                        help="queue limit of drop-to-keyframe and bounded-latency")
+    policy.add_argument("--max-latency", type=float, default=1000.0, metavar="MS", help="bounded-latency limit")
+    policy.add_argument("--ring-mb", type=float, default=8.0, help="ring-gop-index capacity")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--write-trace", metavar="FILE", help="save the frames (with arrival times) as a trace CSV")
+    parser.add_argument("--csv", metavar="FILE", help="append one result row per scenario and policy")
+    parser.add_argument("--verbose", action="store_true", help="show how long each simulation took")
+    args = parser.parse_args()
+
+    customised = args.trace or any(
+        parser.get_default(key) != value for key, value in vars(args).items()
+        if key in ("fps", "gop", "kbps", "key_ratio", "jitter", "source_stall", "source_stall_every",
+                   "consumer_ms", "consumer_stall", "consumer_stall_every"))
+    scenario = args.scenario or ("custom" if customised else "all")
+    if scenario == "all" and args.write_trace:
+        parser.error("--write-trace needs a single scenario")
+
+    writer = None
+    if args.csv:
+        out = open(args.csv, "a", newline="")
+        writer = csv.writer(out)
+        if out.tell() == 0:
+            writer.writerow(["scenario", "policy", "frames", "delivered", "lost", "broken", "max_freeze_s",
+                             "latency_p50_ms", "latency_p99_ms", "latency_max_ms", "memory_bytes", "mean_bytes"])
+
+    print("\n  Frame queue policy simulator\n  ============================")
+    try:
+        if scenario == "custom":
+            run("custom", args, writer)
+        for name in (SCENARIOS if scenario == "all" else [scenario] if scenario != "custom" else []):
+            scenario_args = argparse.Namespace(**vars(args))
+            for key, value in SCENARIOS[name].items():
+                # Settings given on the command line win over the scenario's
+                if getattr(args, key) == parser.get_default(key):
+                    setattr(scenario_args, key, value)
+            run(name, scenario_args, writer)
+    except (OSError, ValueError) as ex:
+        print(f"  {ex}", file=sys.stderr)
+        return 1
+    print("\n  lost: frames dropped by the queue. broken: delivered after a gap, before the next keyframe."
+          "\n  freeze: longest time between cleanly decodable frames. p50/p99/max: delivery - arrival."
+          "\n  mem MB: most bytes held (ring: bytes reserved). mean MB: average bytes held.\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,861 @@
+"""
+Network impairment proxy for the MSC RTSP and RTMP Drivers
+===========================================================
+
+A userspace TCP/UDP proxy that sits between a test source (MediaMTX, the
+camera farm, an FFmpeg or OBS publisher) and a driver, and makes the path
+between them behave like a poor WAN link: packet loss (random or in
+bursts), reordering, latency with jitter, a bandwidth cap with a bounded
+queue, and stalls where nothing gets through. It needs no root, no tc/netem
+and runs the same on Windows and Linux.
+
+  RTSP:  driver  --rtsp://proxy:9554/cam1-->  proxy  -->  camera :8554
+  RTMP:  OBS     --rtmp://proxy:9783/stream1->  proxy  -->  driver :8783
+
+Every connection (and every UDP client) is its own flow with its own loss
+state, queue and counters; its two directions are impaired separately.
+"down" is from the target to the client (RTSP media), "up" is from the
+client to the target (RTMP media). TCP is never made to lose bytes: a lost
+segment is delivered one retransmission timeout late (--rto), holding up
+everything behind it, which is what loss looks like to a TCP reader.
+
+RTSP connections are recognised from their first request. SETUP requests
+for RTP over UDP are rewritten so that RTP and RTCP also pass through the
+proxy (on ports it allocates), and get the same impairment as datagrams:
+loss, reordering and tail drop at the queue. TCP interleaved RTP stays in
+the RTSP connection.
+
+Every few seconds (--report) the proxy prints one line per flow direction
+with throughput, packets/sec, loss, queue drops, reordering,
+retransmissions and the delay it added, optionally also to a CSV file, so
+frame drops and latency in the driver log can be set against what the
+network did. Settings can be changed while running by typing them on
+stdin, e.g. "loss=5 burst=4" or "rate=0".
+
+Usage:
+  python impairment_proxy.py --tcp 9554=127.0.0.1:8554 --latency 80 --jitter 30 --loss 1
+  python impairment_proxy.py --tcp 9554=10.0.0.48:554 --rate 3000 --queue 300 --stall 2 --stall-every 60
+  python impairment_proxy.py --tcp 9783=127.0.0.1:8783 --direction up --loss 2 --burst 5
+  python impairment_proxy.py --tcp 9554=127.0.0.1:8554,loss=3 --tcp 9555=127.0.0.1:8554 --csv flows.csv
+
+No third-party dependencies.
+"""
+
+from collections import deque
+from urllib.parse import urlparse
+import argparse
+import asyncio
+import csv
+import random
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+
+MSS = 1448                    # TCP data is impaired in segments of this size
+MAX_BUFFERED = 4 * 1024 * 1024  # per direction, before the proxy stops reading
+READ_SIZE = 65536             # largest TCP read when the queue has room
+UDP_IDLE = 60.0               # seconds before an idle --udp flow is forgotten
+RELAY_PORTS = (20000, 60000)  # where RTP/RTCP relay port pairs are allocated
+
+_RTSP_REQUEST = re.compile(rb"^[A-Z_]+ \S+ RTSP/1\.\d\r\n")
+
+
+# ─── Impairment settings ──────────────────────────────────────────────────────
+
+class Profile:
+    """What the link does. One profile per listener; flows read it live, so
+    changes typed on stdin apply to open flows at once."""
+
+    KEYS = {
+        "latency": float,      # ms, one way
+        "jitter": float,       # ms, +/- around latency
+        "loss": float,         # percent
+        "burst": float,        # mean length of a loss burst, in packets
+        "reorder": float,      # percent of datagrams sent ahead of the queue
+        "rate": float,         # kbit/s, 0 = unlimited
+        "queue": float,        # ms of data the bottleneck queue holds at --rate
+        "stall": float,        # seconds nothing gets through
+        "stall-every": float,  # mean seconds between stalls
+        "rto": float,          # ms a lost TCP segment is held back
+        "direction": str,      # both, up or down
+    }
+
+    def __init__(self, values):
+        self.values = dict(values)
+        self.overrides = set()
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["values"][name.replace("_", "-")]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def derive(self, overrides):
+        profile = Profile(self.values)
+        profile.values.update(overrides)
+        profile.overrides = set(overrides)
+        return profile
+
+    def update(self, values, inherited=False):
+        for key, value in values.items():
+            if not (inherited and key in self.overrides):
+                self.values[key] = value
+
+    def describe(self):
+        parts = []
+        if self.latency or self.jitter:
+            parts.append(f"latency {self.latency:g}" + (f"±{self.jitter:g}" if self.jitter else "") + " ms")
+        if self.loss:
+            parts.append(f"loss {self.loss:g}%" + (f" in bursts of {self.burst:g}" if self.burst > 1 else ""))
+        if self.reorder:
+            parts.append(f"reorder {self.reorder:g}%")
+        if self.rate:
+            parts.append(f"rate {self.rate:g} kbit/s, queue {self.queue:g} ms")
+        if self.stall and self.stall_every:
+            parts.append(f"stall {self.stall:g}s every ~{self.stall_every:g}s")
+        if not parts:
+            return "no impairment"
+        return ", ".join(parts) + ("" if self.direction == "both" else f" ({self.direction} only)")
+
+
+def parse_settings(text):
+    """'loss=2 rate=4000' or 'loss=2,rate=4000' -> {"loss": 2.0, "rate": 4000.0}"""
+    values = {}
+    for item in re.split(r"[,\s]+", text.strip()):
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        key = key.strip().lower().replace("_", "-")
+        if not sep or key not in Profile.KEYS:
+            raise ValueError(f"unknown setting {item!r} (expected one of {', '.join(Profile.KEYS)})")
+        try:
+            values[key] = Profile.KEYS[key](value)
+        except ValueError:
+            raise ValueError(f"bad value for {key}: {value!r}") from None
+        if key == "direction" and values[key] not in ("both", "up", "down"):
+            raise ValueError("direction must be both, up or down")
+        if key != "direction" and values[key] < 0:
+            raise ValueError(f"{key} cannot be negative")
+    if values.get("loss", 0) >= 100:
+        raise ValueError("loss must be below 100%")
+    return values
+
+
+# ─── Flows and links ──────────────────────────────────────────────────────────
+
+class Stalls:
+    """Stall schedule shared by a flow and the RTP relays it sets up, since an
+    outage takes the whole path down. Stalls start at random, on average
+    every stall-every seconds."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.next_start = None
+        self.end = 0.0
+
+    def until(self, now):
+        """End of the stall in progress at now, or now."""
+        p = self.profile
+        if not (p.stall and p.stall_every):
+            self.next_start = None
+            return now
+        if self.next_start is None:
+            self.next_start = now + random.expovariate(1 / p.stall_every)
+        if now >= self.next_start:
+            self.end = self.next_start + p.stall
+            self.next_start = self.end + random.expovariate(1 / p.stall_every)
+            STATS.stalls += 1
+        return self.end if now < self.end else now
+
+
+class Link:
+    """One direction of a flow: decides when (and whether) each packet or
+    segment comes out, and counts what went through."""
+
+    def __init__(self, flow, direction):
+        self.flow = flow
+        self.direction = direction
+        self.link_free = 0.0      # when the bottleneck finishes sending what it has
+        self.last_due = 0.0       # packets that are not reordered keep their order
+        self.bad = False          # Gilbert loss state
+        self.totals = dict.fromkeys(Link.COUNTERS, 0)
+        self.window = dict.fromkeys(Link.COUNTERS, 0)
+        self.delay_max = 0.0
+
+    COUNTERS = ("packets", "bytes", "out_packets", "out_bytes", "lost", "queue_drops",
+                "reordered", "retransmits", "delay")
+
+    def _count(self, key, amount=1):
+        self.totals[key] += amount
+        self.window[key] += amount
+
+    def _lost(self, p):
+        loss = p.loss / 100
+        if loss <= 0:
+            return False
+        if p.burst <= 1:
+            return random.random() < loss
+        # Gilbert model: bursts of mean length `burst`, `loss` of packets overall
+        leave = 1 / p.burst
+        enter = loss * leave / (1 - loss)
+        if random.random() < (leave if self.bad else enter):
+            self.bad = not self.bad
+        return self.bad
+
+    def schedule(self, size, now, datagram):
+        """Time at which a packet of size bytes arriving now is delivered, or
+        None when it is lost. TCP segments are never lost, only late."""
+        self._count("packets")
+        self._count("bytes", size)
+        p = self.flow.profile
+        if p.direction not in ("both", self.direction):
+            return now
+
+        sent = self.flow.stalls.until(now)
+        if p.rate:
+            start = max(sent, self.link_free)
+            if datagram and start - now > p.queue / 1000:
+                self._count("queue_drops")
+                return None
+            self.link_free = sent = start + size * 8 / (p.rate * 1000)
+        if self._lost(p):
+            if datagram:
+                self._count("lost")
+                return None
+            self._count("retransmits")
+            sent += p.rto / 1000
+
+        delay = p.latency / 1000
+        if p.jitter:
+            delay = max(0.0, delay + random.uniform(-p.jitter, p.jitter) / 1000)
+        if datagram and p.reorder and random.random() * 100 < p.reorder:
+            # As netem does: sent without the delay, ahead of what is waiting
+            self._count("reordered")
+            return sent
+        # Strictly later than the previous packet, so timers firing together keep the order
+        due = self.last_due = max(sent + delay, self.last_due + 1e-6)
+        return due
+
+    def backlog(self, now):
+        """Seconds of data waiting at the bottleneck (or behind a stall)."""
+        return max(self.link_free, self.flow.stalls.end) - now
+
+    def delivered(self, size, queued_at, now):
+        delay = now - queued_at
+        self._count("out_packets")
+        self._count("out_bytes", size)
+        self._count("delay", delay)
+        if delay > self.delay_max:
+            self.delay_max = delay
+
+    def take_window(self):
+        window, self.window = self.window, dict.fromkeys(Link.COUNTERS, 0)
+        delay_max, self.delay_max = self.delay_max, 0.0
+        return window, delay_max
+
+
+class Flow:
+    """A TCP connection, a UDP client of a --udp listener, or the RTP/RTCP of
+    one RTSP SETUP over UDP."""
+
+    def __init__(self, kind, label, profile, stalls=None):
+        STATS.flow_count += 1
+        self.id = STATS.flow_count
+        self.kind = kind
+        self.label = label
+        self.profile = profile
+        self.stalls = stalls or Stalls(profile)
+        self.up = Link(self, "up")
+        self.down = Link(self, "down")
+        self.started = time.monotonic()
+        STATS.flows[self.id] = self
+        log(f"#{self.id} {self.kind} {self.label} opened ({profile.describe()})")
+
+    def close(self, reason=""):
+        if STATS.flows.pop(self.id, None) is None:
+            return
+        elapsed = time.monotonic() - self.started
+        parts = []
+        for link in (self.up, self.down):
+            t = link.totals
+            if t["packets"]:
+                parts.append(f"{link.direction} {t['out_bytes'] / 1e6:.1f} MB"
+                             f" lost {t['lost']} qdrop {t['queue_drops']} rexmit {t['retransmits']}")
+        log(f"#{self.id} {self.kind} {self.label} closed after {elapsed:.0f}s"
+            + (f" ({reason})" if reason else "") + (": " + "; ".join(parts) if parts else ""))
+
+
+# ─── TCP ──────────────────────────────────────────────────────────────────────
+
+class Pipe:
+    """Carries one direction of a TCP flow: the reader schedules segments
+    through the link, the sender writes them out when they are due."""
+
+    def __init__(self, link, writer):
+        self.link = link
+        self.writer = writer
+        self.queue = deque()
+        self.queued = 0
+        self.wake = asyncio.Event()
+        self.drained = asyncio.Event()
+        self.broken = False
+
+    def push(self, data, now):
+        # Unimpaired directions need not be cut into segments
+        step = MSS if self.link.flow.profile.direction in ("both", self.link.direction) else len(data)
+        for offset in range(0, len(data), step):
+            segment = data[offset:offset + step]
+            self.queue.append((self.link.schedule(len(segment), now, False), now, segment))
+        self.queued += len(data)
+        self.wake.set()
+
+    def finish(self):
+        self.queue.append((None, None, None))
+        self.wake.set()
+
+    async def send(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                while not self.queue:
+                    self.wake.clear()
+                    await self.wake.wait()
+                due = self.queue[0][0]
+                if due is None:
+                    if self.writer.can_write_eof():
+                        self.writer.write_eof()
+                    return
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Write everything that is due in one go
+                now = loop.time()
+                chunks = []
+                while self.queue and self.queue[0][0] is not None and self.queue[0][0] <= now:
+                    _, queued_at, segment = self.queue.popleft()
+                    self.link.delivered(len(segment), queued_at, now)
+                    chunks.append(segment)
+                data = b"".join(chunks)
+                self.writer.write(data)
+                self.queued -= len(data)
+                await self.writer.drain()
+                if self.queued < MAX_BUFFERED // 2:
+                    self.drained.set()
+        except (ConnectionError, OSError):
+            # The far side is gone: stop reading for it
+            self.broken = True
+            self.drained.set()
+
+    def room(self):
+        """Bytes the bottleneck queue can still take, so one read does not
+        overshoot --queue. At least a segment, as a sender's window would be."""
+        p = self.link.flow.profile
+        if not p.rate or p.direction not in ("both", self.link.direction):
+            return READ_SIZE
+        seconds = p.queue / 1000 - self.link.backlog(asyncio.get_running_loop().time())
+        return int(min(READ_SIZE, max(MSS, seconds * p.rate * 1000 / 8)))
+
+    async def throttle(self):
+        """Stop reading while the bottleneck queue or our own buffer is full,
+        as a TCP sender stops when the window is."""
+        loop = asyncio.get_running_loop()
+        excess = self.link.backlog(loop.time()) - self.link.flow.profile.queue / 1000
+        if excess > 0:
+            await asyncio.sleep(excess)
+        while self.queued > MAX_BUFFERED and not self.broken:
+            self.drained.clear()
+            await self.drained.wait()
+
+
+async def pump(reader, pipe, rewrite=None):
+    loop = asyncio.get_running_loop()
+    sender = asyncio.ensure_future(pipe.send())
+    try:
+        while True:
+            await pipe.throttle()
+            data = await reader.read(pipe.room())
+            if not data or pipe.broken:
+                break
+            if rewrite is not None:
+                data = await rewrite(data)
+            if data:
+                pipe.push(data, loop.time())
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        pipe.finish()
+        await sender
+
+
+class TcpListener:
+    def __init__(self, port, host, target_port, profile):
+        self.port = port
+        self.host = host
+        self.target_port = target_port
+        self.profile = profile
+
+    async def handle(self, client_reader, client_writer):
+        peer = client_writer.get_extra_info("peername")
+        label = f"{peer[0]}:{peer[1]} > {self.host}:{self.target_port}"
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(self.host, self.target_port)
+        except OSError as ex:
+            log(f"{label}: cannot connect to target: {ex}")
+            client_writer.close()
+            return
+        for writer in (client_writer, upstream_writer):
+            sock = writer.get_extra_info("socket")
+            if sock is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        flow = Flow("tcp", label, self.profile)
+        rtsp = RtspRewriter(flow, peer[0], upstream_writer.get_extra_info("peername")[0])
+        try:
+            await asyncio.gather(
+                pump(client_reader, Pipe(flow.up, upstream_writer), rtsp.requests),
+                pump(upstream_reader, Pipe(flow.down, client_writer), rtsp.responses))
+        finally:
+            for writer in (client_writer, upstream_writer):
+                writer.close()
+            rtsp.close()
+            flow.close()
+
+
+# ─── RTSP over UDP ────────────────────────────────────────────────────────────
+
+class RtspRewriter:
+    """Watches an RTSP connection and moves RTP/RTCP over UDP through the
+    proxy: the client_port in SETUP and the server_port in its response are
+    replaced with relay ports. Anything that is not RTSP passes untouched."""
+
+    def __init__(self, flow, client_host, server_host):
+        self.flow = flow
+        self.client_host = client_host
+        self.server_host = server_host
+        self.active = None          # decided by the first bytes from the client
+        self.request_buffer = bytearray()
+        self.response_buffer = bytearray()
+        self.pending = {}           # CSeq -> relay waiting for the SETUP response
+        self.relays = []
+
+    async def requests(self, data):
+        if self.active is None:
+            self.active = bool(_RTSP_REQUEST.match(bytes(data[:256])))
+        if not self.active:
+            return data
+        return await self._messages(self.request_buffer, data, self._request)
+
+    async def responses(self, data):
+        if not self.active:
+            return data
+        return await self._messages(self.response_buffer, data, self._response)
+
+    async def _messages(self, buffer, data, handle):
+        """Complete messages in buffer + data, rewritten; interleaved ($) RTP
+        frames pass as they are. Incomplete input waits for more."""
+        buffer += data
+        out = bytearray()
+        while buffer:
+            if buffer[0] == 0x24:
+                if len(buffer) < 4:
+                    break
+                end = 4 + struct.unpack_from(">H", buffer, 2)[0]
+                if len(buffer) < end:
+                    break
+                out += buffer[:end]
+                del buffer[:end]
+                continue
+            head_end = buffer.find(b"\r\n\r\n")
+            if head_end < 0:
+                if len(buffer) > 65536:
+                    # Not RTSP after all; stop looking
+                    self.active = False
+                    out += buffer
+                    del buffer[:]
+                break
+            head = bytes(buffer[:head_end + 4]).decode("latin-1")
+            length = re.search(r"(?im)^content-length:\s*(\d+)", head)
+            end = head_end + 4 + (int(length.group(1)) if length else 0)
+            if len(buffer) < end:
+                break
+            body = bytes(buffer[head_end + 4:end])
+            del buffer[:end]
+            out += (await handle(head)).encode("latin-1") + body
+        return bytes(out)
+
+    async def _request(self, head):
+        lines = head.split("\r\n")
+        method, _, rest = lines[0].partition(" ")
+        url = rest.rsplit(" ", 1)[0]
+        if method in ("DESCRIBE", "SETUP") and self.flow.label.find(" /") < 0:
+            self.flow.label += " " + (urlparse(url).path or "/")
+        if method != "SETUP":
+            return head
+        transport = _header(lines, "transport")
+        cseq = _header(lines, "cseq")
+        if transport is None or cseq is None or "interleaved=" in lines[transport] \
+                or "/TCP" in lines[transport].upper():
+            return head
+        ports = re.search(r"client_port=(\d+)(?:-(\d+))?", lines[transport])
+        if not ports:
+            return head
+        relay = await UdpRelay.open(self.flow, url, self.client_host, int(ports.group(1)), self.server_host)
+        self.relays.append(relay)
+        self.pending[lines[cseq].split(":", 1)[1].strip()] = relay
+        line = re.sub(r"client_port=\d+(?:-\d+)?", f"client_port={relay.server_side_port}-{relay.server_side_port + 1}",
+                      lines[transport])
+        lines[transport] = re.sub(r";destination=[^;,]*", "", line)
+        return "\r\n".join(lines)
+
+    async def _response(self, head):
+        lines = head.split("\r\n")
+        cseq = _header(lines, "cseq")
+        relay = self.pending.pop(lines[cseq].split(":", 1)[1].strip(), None) if cseq is not None else None
+        if relay is None:
+            return head
+        transport = _header(lines, "transport")
+        ports = re.search(r"server_port=(\d+)(?:-(\d+))?", lines[transport]) if transport is not None else None
+        if not ports:
+            relay.close()
+            return head
+        relay.server_port = int(ports.group(1))
+        line = re.sub(r"server_port=\d+(?:-\d+)?", f"server_port={relay.client_side_port}-{relay.client_side_port + 1}",
+                      lines[transport])
+        lines[transport] = re.sub(r";source=[^;,]*", "", line)
+        return "\r\n".join(lines)
+
+    def close(self):
+        for relay in self.relays:
+            relay.close()
+
+
+def _header(lines, name):
+    """Index of the first header line called name, or None."""
+    prefix = name + ":"
+    for index, line in enumerate(lines[1:], 1):
+        if line.lower().startswith(prefix):
+            return index
+    return None
+
+
+class _Endpoint(asyncio.DatagramProtocol):
+    def __init__(self, received):
+        self.received = received
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.received(data, addr)
+
+    def error_received(self, exc):
+        pass
+
+
+def send_later(link, transport, data, addr, due, now):
+    """Deliver a datagram through link at due (None: it was lost)."""
+    if due is None:
+        return
+
+    def send():
+        if not transport.is_closing():
+            transport.sendto(data, addr)
+            link.delivered(len(data), now, asyncio.get_running_loop().time())
+
+    if due <= now:
+        send()
+    else:
+        asyncio.get_running_loop().call_at(due, send)
+
+
+class UdpRelay:
+    """RTP and RTCP of one SETUP: a port pair the server sends to (in place of
+    the client's) and a pair the client sees as the server's."""
+
+    def __init__(self, flow, client_host, client_port, server_host):
+        self.flow = flow
+        self.client_host = client_host
+        self.client_port = client_port
+        self.server_host = server_host
+        self.server_port = None    # from the SETUP response
+        self.server_side = []      # [rtp, rtcp] endpoints facing the server
+        self.client_side = []      # [rtp, rtcp] endpoints facing the client
+        self.server_side_port = self.client_side_port = None
+
+    @staticmethod
+    async def open(parent, url, client_host, client_port, server_host):
+        path = urlparse(url).path or url
+        flow = Flow("rtp", f"{client_host}:{client_port} {path}", parent.profile, parent.stalls)
+        relay = UdpRelay(flow, client_host, client_port, server_host)
+        relay.server_side_port, relay.server_side = await _bind_pair(relay._from_server)
+        relay.client_side_port, relay.client_side = await _bind_pair(relay._from_client)
+        return relay
+
+    def _from_server(self, channel, data, addr):
+        now = asyncio.get_running_loop().time()
+        due = self.flow.down.schedule(len(data), now, True)
+        send_later(self.flow.down, self.client_side[channel].transport, data,
+                   (self.client_host, self.client_port + channel), due, now)
+
+    def _from_client(self, channel, data, addr):
+        if self.server_port is None:
+            return
+        now = asyncio.get_running_loop().time()
+        due = self.flow.up.schedule(len(data), now, True)
+        send_later(self.flow.up, self.server_side[channel].transport, data,
+                   (self.server_host, self.server_port + channel), due, now)
+
+    def close(self):
+        for endpoint in self.server_side + self.client_side:
+            endpoint.transport.close()
+        self.flow.close()
+
+
+async def _bind_pair(received):
+    """Endpoints on an even port and the odd port above it (RTP, RTCP)."""
+    loop = asyncio.get_running_loop()
+    for _ in range(100):
+        port = random.randrange(RELAY_PORTS[0], RELAY_PORTS[1], 2)
+        endpoints = []
+        try:
+            for channel in (0, 1):
+                _, endpoint = await loop.create_datagram_endpoint(
+                    lambda channel=channel: _Endpoint(lambda data, addr: received(channel, data, addr)),
+                    local_addr=("0.0.0.0", port + channel))
+                endpoints.append(endpoint)
+            return port, endpoints
+        except OSError:
+            for endpoint in endpoints:
+                endpoint.transport.close()
+    raise OSError("no free UDP port pair for RTP relay")
+
+
+# ─── Plain UDP ────────────────────────────────────────────────────────────────
+
+class UdpListener:
+    """--udp: each client address is a flow with its own socket to the target."""
+
+    def __init__(self, port, host, target_port, profile):
+        self.port = port
+        self.host = host
+        self.target_port = target_port
+        self.profile = profile
+        self.transport = None
+        self.clients = {}          # addr -> (flow, upstream endpoint, last seen)
+
+    async def start(self, bind):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _Endpoint(self._from_client), local_addr=(bind, self.port))
+        asyncio.ensure_future(self._expire())
+
+    def _from_client(self, data, addr):
+        entry = self.clients.get(addr)
+        if entry is None:
+            entry = [Flow("udp", f"{addr[0]}:{addr[1]} > {self.host}:{self.target_port}", self.profile), None, 0]
+            self.clients[addr] = entry
+            asyncio.ensure_future(self._connect(addr, entry))
+        entry[2] = time.monotonic()
+        if entry[1] is None:
+            return
+        now = asyncio.get_running_loop().time()
+        due = entry[0].up.schedule(len(data), now, True)
+        send_later(entry[0].up, entry[1].transport, data, None, due, now)
+
+    async def _connect(self, addr, entry):
+        flow = entry[0]
+
+        def from_target(data, _):
+            now = asyncio.get_running_loop().time()
+            due = flow.down.schedule(len(data), now, True)
+            send_later(flow.down, self.transport, data, addr, due, now)
+
+        try:
+            _, entry[1] = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: _Endpoint(from_target), remote_addr=(self.host, self.target_port))
+        except OSError as ex:
+            self.clients.pop(addr, None)
+            flow.close(str(ex))
+
+    async def _expire(self):
+        while True:
+            await asyncio.sleep(UDP_IDLE / 4)
+            cutoff = time.monotonic() - UDP_IDLE
+            for addr, (flow, endpoint, seen) in list(self.clients.items()):
+                if seen < cutoff:
+                    del self.clients[addr]
+                    if endpoint is not None:
+                        endpoint.transport.close()
+                    flow.close("idle")
+
+
+# ─── Statistics ───────────────────────────────────────────────────────────────
+
+class Stats:
+    def __init__(self):
+        self.flows = {}
+        self.flow_count = 0
+        self.stalls = 0
+        self.window_started = time.monotonic()
+        self.csv = None
+
+    def lines(self):
+        now = time.monotonic()
+        elapsed = max(now - self.window_started, 1e-9)
+        self.window_started = now
+        stamp = datetime.now().strftime("%H:%M:%S")
+        lines = []
+        total_bytes = total_packets = 0
+        for flow in list(self.flows.values()):
+            for link in (flow.up, flow.down):
+                w, delay_max = link.take_window()
+                if not w["packets"] and not w["out_packets"]:
+                    continue
+                total_bytes += w["out_bytes"]
+                total_packets += w["out_packets"]
+                mbits = w["out_bytes"] * 8 / elapsed / 1e6
+                pps = w["out_packets"] / elapsed
+                lost = 100 * w["lost"] / w["packets"] if w["packets"] else 0.0
+                delay = 1000 * w["delay"] / w["out_packets"] if w["out_packets"] else 0.0
+                lines.append(f"  {stamp}  #{flow.id:<3d} {flow.kind} {link.direction:4s} {mbits:7.2f} Mbit/s"
+                             f" {pps:6.0f} pkt/s  lost {lost:4.1f}%  qdrop {w['queue_drops']}"
+                             f"  reord {w['reordered']}  rexmit {w['retransmits']}"
+                             f"  delay {delay:.0f}/{1000 * delay_max:.0f} ms  {flow.label}")
+                if self.csv is not None:
+                    self.csv.writerow([datetime.now().isoformat(timespec="seconds"), flow.id, flow.kind, flow.label,
+                                       link.direction, f"{mbits:.3f}", f"{pps:.1f}", w["packets"], w["out_packets"],
+                                       w["lost"], w["queue_drops"], w["reordered"], w["retransmits"],
+                                       f"{delay:.1f}", f"{1000 * delay_max:.1f}"])
+        lines.append(f"  {stamp}  flows {len(self.flows)}  {total_bytes * 8 / elapsed / 1e6:.2f} Mbit/s"
+                     f"  {total_packets / elapsed:.0f} pkt/s  stalls {self.stalls}")
+        return lines
+
+    def open_csv(self, path):
+        self._csv_file = open(path, "a", newline="", buffering=1)
+        self.csv = csv.writer(self._csv_file)
+        if self._csv_file.tell() == 0:
+            self.csv.writerow(["time", "flow", "kind", "label", "direction", "mbit_s", "pkt_s", "packets_in",
+                               "packets_out", "lost", "queue_drops", "reordered", "retransmits",
+                               "delay_avg_ms", "delay_max_ms"])
+
+
+STATS = Stats()
+
+
+def log(message):
+    print(f"  {datetime.now().strftime('%H:%M:%S')}  {message}", flush=True)
+
+
+# ─── Startup ──────────────────────────────────────────────────────────────────
+
+def parse_mapping(spec, base):
+    """'9554=127.0.0.1:8554[,loss=2,...]' -> (9554, '127.0.0.1', 8554, profile)"""
+    mapping, _, settings = spec.partition(",")
+    listen, sep, target = mapping.partition("=")
+    host, _, port = target.rpartition(":")
+    if not sep or not host or not listen.isdigit() or not port.isdigit():
+        raise ValueError(f"bad mapping {spec!r}, expected LISTEN_PORT=HOST:PORT[,setting=value...]")
+    overrides = parse_settings(settings) if settings else {}
+    return int(listen), host.strip("[]"), int(port), base.derive(overrides)
+
+
+def read_commands(loop, profiles):
+    """Settings typed on stdin apply to every listener, except where a
+    listener overrides them in its mapping."""
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            values = parse_settings(line)
+        except ValueError as ex:
+            print(f"  {ex}", flush=True)
+            continue
+
+        def apply(values=values):
+            profiles[0].update(values)
+            for profile in profiles[1:]:
+                profile.update(values, inherited=True)
+            for index, profile in enumerate(profiles[1:], 1):
+                log(f"listener {index}: {profile.describe()}")
+
+        loop.call_soon_threadsafe(apply)
+
+
+async def serve(args, tcp, udp, profiles):
+    loop = asyncio.get_running_loop()
+    servers = []
+    for port, host, target_port, profile in tcp:
+        listener = TcpListener(port, host, target_port, profile)
+        servers.append(await asyncio.start_server(listener.handle, args.bind, port))
+        print(f"  tcp {args.bind}:{port} -> {host}:{target_port}  {profile.describe()}")
+    for port, host, target_port, profile in udp:
+        await UdpListener(port, host, target_port, profile).start(args.bind)
+        print(f"  udp {args.bind}:{port} -> {host}:{target_port}  {profile.describe()}")
+    print("\n  Type settings (e.g. loss=5 rate=2000) to change them while running. Ctrl+C to stop.\n", flush=True)
+    threading.Thread(target=read_commands, args=(loop, profiles), daemon=True).start()
+    while True:
+        await asyncio.sleep(args.report)
+        for line in STATS.lines():
+            print(line)
+        sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Network impairment proxy for RTSP/RTMP driver testing")
+    parser.add_argument("--tcp", action="append", default=[], metavar="PORT=HOST:PORT[,SETTING=VALUE...]",
+                        help="listen on PORT and forward to HOST:PORT; settings override the defaults below")
+    parser.add_argument("--udp", action="append", default=[], metavar="PORT=HOST:PORT[,SETTING=VALUE...]",
+                        help="the same for plain UDP (RTSP over UDP needs only --tcp)")
+    parser.add_argument("--bind", default="0.0.0.0")
+    parser.add_argument("--latency", type=float, default=0, metavar="MS", help="one-way delay")
+    parser.add_argument("--jitter", type=float, default=0, metavar="MS", help="random +/- on the delay; order is kept")
+    parser.add_argument("--loss", type=float, default=0, metavar="PCT", help="packet loss")
+    parser.add_argument("--burst", type=float, default=1, metavar="N", help="mean loss burst length in packets")
+    parser.add_argument("--reorder", type=float, default=0, metavar="PCT",
+                        help="datagrams sent ahead of the queue, skipping --latency")
+    parser.add_argument("--rate", type=float, default=0, metavar="KBIT", help="bandwidth cap per flow and direction")
+    parser.add_argument("--queue", type=float, default=500, metavar="MS", help="bottleneck queue at --rate")
+    parser.add_argument("--stall", type=float, default=0, metavar="SECONDS", help="length of link stalls")
+    parser.add_argument("--stall-every", type=float, default=0, metavar="SECONDS", help="mean time between stalls")
+    parser.add_argument("--rto", type=float, default=200, metavar="MS", help="how late a lost TCP segment arrives")
+    parser.add_argument("--direction", choices=("both", "up", "down"), default="both",
+                        help="impair only toward the target (up) or toward the client (down)")
+    parser.add_argument("--report", type=float, default=5.0, metavar="SECONDS", help="flow line interval")
+    parser.add_argument("--csv", metavar="FILE", help="also append every flow line to FILE")
+    parser.add_argument("--seed", type=int, help="random seed, for repeatable runs")
+    args = parser.parse_args()
+    if not args.tcp and not args.udp:
+        parser.error("give at least one --tcp or --udp mapping")
+
+    defaults = {key: getattr(args, key.replace("-", "_")) for key in Profile.KEYS}
+    try:
+        parse_settings(" ".join(f"{key}={value}" for key, value in defaults.items()))
+        base = Profile(defaults)
+        tcp = [parse_mapping(spec, base) for spec in args.tcp]
+        udp = [parse_mapping(spec, base) for spec in args.udp]
+    except ValueError as ex:
+        parser.error(str(ex))
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.csv:
+        STATS.open_csv(args.csv)
+
+    print("\n  Network impairment proxy\n  ========================\n")
+    try:
+        asyncio.run(serve(args, tcp, udp, [base] + [m[3] for m in tcp + udp]))
+    except KeyboardInterrupt:
+        for flow in list(STATS.flows.values()):
+            flow.close("stopped")
+    except OSError as ex:
+        print(f"  {ex}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
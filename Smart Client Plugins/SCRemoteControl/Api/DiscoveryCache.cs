@@ -0,0 +1,154 @@
+using System;
+using System.Collections;
+using System.Collections.Generic;
+using System.Security.Cryptography;
+using System.Text;
+using Newtonsoft.Json;
+using SCRemoteControl.Server;
+using VideoOS.Platform;
+using VideoOS.Platform.Messaging;
+
+namespace SCRemoteControl.Api
+{
+    /// <summary>
+    /// Caches the serialized JSON of the discovery lists (cameras, views,
+    /// workspaces) so repeated GETs do not walk the Milestone configuration.
+    /// Each entry carries a strong ETag (hash of the exact response bytes) for
+    /// If-None-Match / 304 handling. Entries are dropped on
+    /// ConfigurationChangedIndication and after MaxAge, which also covers
+    /// client-side view edits that send no configuration message.
+    /// </summary>
+    class DiscoveryCache
+    {
+        public const string Cameras = "cameras";
+        public const string Views = "views";
+        public const string Workspaces = "workspaces";
+
+        private static readonly TimeSpan MaxAge = TimeSpan.FromSeconds(60);
+
+        private static readonly Lazy<DiscoveryCache> _instance = new Lazy<DiscoveryCache>(() => new DiscoveryCache());
+        public static DiscoveryCache Instance => _instance.Value;
+
+        private readonly object _lock = new object();
+        private readonly Dictionary<string, DiscoveryEntry> _entries = new Dictionary<string, DiscoveryEntry>();
+        private long _generation;
+        private long _hits;
+        private long _misses;
+        private object _configReceiver;
+
+        public long Hits { get { lock (_lock) return _hits; } }
+        public long Misses { get { lock (_lock) return _misses; } }
+
+        public void Start()
+        {
+            if (_configReceiver != null) return;
+            try
+            {
+                _configReceiver = EnvironmentManager.Instance.RegisterReceiver(
+                    OnConfigurationChanged,
+                    new MessageIdFilter(MessageId.Server.ConfigurationChangedIndication));
+            }
+            catch (Exception ex)
+            {
+                SCRemoteControlDefinition.Log.Error("DiscoveryCache: failed to register configuration receiver", ex);
+            }
+        }
+
+        public void Stop()
+        {
+            if (_configReceiver != null)
+            {
+                try { EnvironmentManager.Instance.UnRegisterReceiver(_configReceiver); } catch { }
+                _configReceiver = null;
+            }
+            InvalidateAll();
+        }
+
+        /// <summary>
+        /// Return the cached entry for key, building and serializing it with
+        /// build/settings when missing or stale. Empty lists are not cached:
+        /// SmartClientHelper returns an empty list when discovery fails.
+        /// </summary>
+        public DiscoveryEntry Get(string key, Func<ICollection> build, JsonSerializerSettings settings)
+        {
+            long generation;
+            lock (_lock)
+            {
+                if (_entries.TryGetValue(key, out var cached) && DateTime.UtcNow - cached.BuiltAt < MaxAge)
+                {
+                    _hits++;
+                    return cached;
+                }
+                _misses++;
+                generation = _generation;
+            }
+
+            // Build outside the lock; a slow camera walk must not block the other lists.
+            var items = build();
+            var body = Encoding.UTF8.GetBytes(JsonConvert.SerializeObject(items, settings));
+            var entry = new DiscoveryEntry(body, ComputeETag(body), DateTime.UtcNow);
+
+            lock (_lock)
+            {
+                // Drop the result if the configuration changed while it was being built.
+                if (items.Count > 0 && generation == _generation)
+                    _entries[key] = entry;
+            }
+            return entry;
+        }
+
+        public void Invalidate(string key)
+        {
+            lock (_lock)
+            {
+                _entries.Remove(key);
+                _generation++;
+            }
+        }
+
+        public void InvalidateAll()
+        {
+            lock (_lock)
+            {
+                _entries.Clear();
+                _generation++;
+            }
+        }
+
+        private object OnConfigurationChanged(Message message, FQID destination, FQID sender)
+        {
+            InvalidateAll();
+            return null;
+        }
+
+        private static string ComputeETag(byte[] body)
+        {
+            using (var sha = SHA256.Create())
+            {
+                var hash = sha.ComputeHash(body);
+                // 128 bits is plenty to tell two list versions apart.
+                return "\"" + BitConverter.ToString(hash, 0, 16).Replace("-", "").ToLowerInvariant() + "\"";
+            }
+        }
+    }
+
+    class DiscoveryEntry
+    {
+        private byte[] _gzipBody;
+
+        public byte[] Body { get; }
+
+        /// <summary>Body compressed once for gzip clients; races only repeat the work.</summary>
+        public byte[] GzipBody => _gzipBody ?? (_gzipBody = CompressionHandler.Compress(Body, CompressionHandler.Gzip));
+
+        public string ETag { get; }
+        public DateTime BuiltAt { get; }
+
+        public DiscoveryEntry(byte[] body, string etag, DateTime builtAt)
+        {
+            Body = body;
+            ETag = etag;
+            BuiltAt = builtAt;
+        }
+    }
+}
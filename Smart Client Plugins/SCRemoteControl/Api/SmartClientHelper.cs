@@ -1,8 +1,10 @@
 using System;
 using System.Collections.Generic;
+using System.Diagnostics;
 using System.Drawing;
 using System.Linq;
 using System.Windows;
+using SCRemoteControl.Server;
 using VideoOS.Platform;
 using VideoOS.Platform.Client;
 using VideoOS.Platform.ConfigurationItems;
@@ -29,9 +31,11 @@ namespace SCRemoteControl.Api
 
         public static void RunOnUiThread(Action action)
         {
+            long start = Stopwatch.GetTimestamp();
             var app = Application.Current;
             if (app != null)
                 app.Dispatcher.BeginInvoke(action);
+            RequestTiming.Add(RequestTiming.Dispatch, start);
         }
 
         // --- Item Discovery ---
@@ -272,7 +276,10 @@ namespace SCRemoteControl.Api
                 }
 
                 if (changed)
+                {
                     topGroup.PropertiesModified();
+                    DiscoveryCache.Instance.Invalidate(DiscoveryCache.Views);
+                }
             }
             catch (Exception ex)
             {
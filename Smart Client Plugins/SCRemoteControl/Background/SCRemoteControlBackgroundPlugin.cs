@@ -1,5 +1,6 @@
 using System;
 using System.Collections.Generic;
+using SCRemoteControl.Api;
 using SCRemoteControl.Overlay;
 using SCRemoteControl.Server;
 using VideoOS.Platform;
@@ -23,6 +24,8 @@ namespace SCRemoteControl.Background
                 // Start the overlay tracker before the HTTP server so any early
                 // POST /api/overlays request sees a live AddOn registry.
                 OverlayManager.Instance.Start();
+                EventBroadcaster.Instance.Start();
+                DiscoveryCache.Instance.Start();
                 RemoteControlServer.Instance.Start();
                 SCRemoteControlDefinition.Log.Info("Background plugin initialized, server started");
             }
@@ -37,6 +40,8 @@ namespace SCRemoteControl.Background
             try
             {
                 RemoteControlServer.Instance.Stop();
+                DiscoveryCache.Instance.Stop();
+                EventBroadcaster.Instance.Stop();
                 OverlayManager.Instance.Stop();
                 SCRemoteControlDefinition.Log.Info("Background plugin closed, server stopped");
             }
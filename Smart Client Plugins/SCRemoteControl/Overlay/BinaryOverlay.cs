@@ -0,0 +1,227 @@
+using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Text;
+using System.Windows;
+using System.Windows.Media;
+
+namespace SCRemoteControl.Overlay
+{
+    /// <summary>
+    /// Compact binary overlay encoding, an alternative to SVG text for
+    /// high-frequency overlays. Records map one-to-one onto ParsedShapes, so
+    /// decoding is a single pass over the buffer with no XML or number parsing.
+    /// Styles are fully resolved (no inheritance) and stored once in a shared
+    /// table that shapes refer to by index.
+    ///
+    /// Layout, little-endian; str = u16 byte length + UTF-8:
+    /// <code>
+    /// "SCO" u8 version(1)
+    /// f32 x4   viewBox x, y, width, height
+    /// u16      style count, then per style:
+    ///   u8     flags: 1 fill, 2 stroke, 4 font-family, 8 italic
+    ///   u32    fill ARGB (flag 1), u32 stroke ARGB (flag 2)
+    ///   f32 x5 fill-opacity, stroke-opacity, opacity, stroke-width, font-size
+    ///   u16    font-weight (1-999)
+    ///   str    font-family (flag 4)
+    /// u16      shape count, then per shape:
+    ///   u8     type: 1 rect, 2 circle, 3 ellipse, 4 line, 5 polyline, 6 polygon, 7 path, 8 text
+    ///   u8     flags: 1 id, 2 transform
+    ///   u16    style index
+    ///   str    id (flag 1)
+    ///   f32 x6 transform m11 m12 m21 m22 offsetX offsetY (flag 2)
+    ///   rect x y width height rx ry | circle cx cy r | ellipse cx cy rx ry |
+    ///   line x1 y1 x2 y2 | poly u16 n, n x (x y) | path str d | text x y str text
+    /// </code>
+    /// </summary>
+    public static class BinaryOverlay
+    {
+        public const byte Version = 1;
+
+        private const byte StyleFill = 1, StyleStroke = 2, StyleFontFamily = 4, StyleItalic = 8;
+        private const byte ShapeId = 1, ShapeTransform = 2;
+
+        private enum ShapeType : byte
+        {
+            Rect = 1,
+            Circle = 2,
+            Ellipse = 3,
+            Line = 4,
+            Polyline = 5,
+            Polygon = 6,
+            Path = 7,
+            Text = 8,
+        }
+
+        /// <summary>Decode a binary overlay. Throws ArgumentException on malformed input.</summary>
+        public static ParsedOverlay Decode(byte[] data)
+        {
+            if (data == null || data.Length < 4)
+                throw new ArgumentException("binary overlay is empty");
+            if (data[0] != 'S' || data[1] != 'C' || data[2] != 'O')
+                throw new ArgumentException("binary overlay: bad magic, expected \"SCO\"");
+            if (data[3] != Version)
+                throw new ArgumentException("binary overlay: unsupported version " + data[3] + " (expected " + Version + ")");
+
+            var r = new Reader(data, 4);
+            try
+            {
+                var overlay = new ParsedOverlay
+                {
+                    ViewBox = new Rect(r.F32(), r.F32(), r.F32(), r.F32())
+                };
+
+                var styles = new ShapeStyle[r.U16()];
+                for (int i = 0; i < styles.Length; i++)
+                    styles[i] = ReadStyle(ref r);
+
+                int count = r.U16();
+                if (count > OverlayManager.MaxShapesPerOverlay)
+                    throw new ArgumentException("overlay has " + count + " shapes, max " + OverlayManager.MaxShapesPerOverlay);
+                overlay.Shapes = new List<ParsedShape>(count);
+                for (int i = 0; i < count; i++)
+                    overlay.Shapes.Add(ReadShape(ref r, styles));
+
+                if (r.Position != data.Length)
+                    throw new ArgumentException("binary overlay: " + (data.Length - r.Position) + " trailing bytes");
+                return overlay;
+            }
+            catch (EndOfStreamException)
+            {
+                throw new ArgumentException("binary overlay: truncated at byte " + r.Position);
+            }
+        }
+
+        private static ShapeStyle ReadStyle(ref Reader r)
+        {
+            byte flags = r.U8();
+            var style = new ShapeStyle();
+            if ((flags & StyleFill) != 0) style.Fill = r.Color();
+            if ((flags & StyleStroke) != 0) style.Stroke = r.Color();
+            style.FillOpacity = Clamp01(r.F32());
+            style.StrokeOpacity = Clamp01(r.F32());
+            style.Opacity = Clamp01(r.F32());
+            style.StrokeWidth = Math.Max(0, r.F32());
+            style.FontSize = Math.Max(1, r.F32());
+            style.FontWeight = FontWeight.FromOpenTypeWeight(Math.Min(999, Math.Max(1, (int)r.U16())));
+            if ((flags & StyleFontFamily) != 0) style.FontFamily = r.Str();
+            if ((flags & StyleItalic) != 0) style.FontStyle = FontStyles.Italic;
+            return style;
+        }
+
+        private static ParsedShape ReadShape(ref Reader r, ShapeStyle[] styles)
+        {
+            int at = r.Position;
+            var type = (ShapeType)r.U8();
+            byte flags = r.U8();
+            int styleIndex = r.U16();
+            if (styleIndex >= styles.Length)
+                throw new ArgumentException("binary overlay: style index " + styleIndex + " out of range at byte " + at);
+
+            string id = (flags & ShapeId) != 0 ? r.Str() : null;
+            var transform = (flags & ShapeTransform) != 0
+                ? new Matrix(r.F32(), r.F32(), r.F32(), r.F32(), r.F32(), r.F32())
+                : Matrix.Identity;
+
+            ParsedShape shape;
+            switch (type)
+            {
+                case ShapeType.Rect:
+                    shape = new RectShape { X = r.F32(), Y = r.F32(), Width = r.F32(), Height = r.F32(), Rx = r.F32(), Ry = r.F32() };
+                    break;
+                case ShapeType.Circle:
+                    shape = new CircleShape { Cx = r.F32(), Cy = r.F32(), R = r.F32() };
+                    break;
+                case ShapeType.Ellipse:
+                    shape = new EllipseShape { Cx = r.F32(), Cy = r.F32(), Rx = r.F32(), Ry = r.F32() };
+                    break;
+                case ShapeType.Line:
+                    shape = new LineShape { X1 = r.F32(), Y1 = r.F32(), X2 = r.F32(), Y2 = r.F32() };
+                    break;
+                case ShapeType.Polyline:
+                case ShapeType.Polygon:
+                    int n = r.U16();
+                    var points = new List<Point>(n);
+                    for (int i = 0; i < n; i++) points.Add(new Point(r.F32(), r.F32()));
+                    shape = new PolyShape { Points = points, Closed = type == ShapeType.Polygon };
+                    break;
+                case ShapeType.Path:
+                    shape = new PathShape { D = r.Str() };
+                    break;
+                case ShapeType.Text:
+                    shape = new TextShape { X = r.F32(), Y = r.F32(), Text = r.Str() };
+                    break;
+                default:
+                    throw new ArgumentException("binary overlay: unknown shape type " + (byte)type + " at byte " + at);
+            }
+
+            // Shapes share their table style; patches clone a shape (and its
+            // style) before changing it, so sharing is safe.
+            shape.Id = id;
+            shape.Style = styles[styleIndex];
+            shape.Transform = transform;
+            return shape;
+        }
+
+        private static double Clamp01(double v) => v < 0 ? 0 : (v > 1 ? 1 : v);
+
+        /// <summary>Bounds-checked little-endian cursor over the payload.</summary>
+        private struct Reader
+        {
+            private readonly byte[] _data;
+            public int Position;
+
+            public Reader(byte[] data, int position)
+            {
+                _data = data;
+                Position = position;
+            }
+
+            private void Need(int n)
+            {
+                if (_data.Length - Position < n) throw new EndOfStreamException();
+            }
+
+            public byte U8()
+            {
+                Need(1);
+                return _data[Position++];
+            }
+
+            public ushort U16()
+            {
+                Need(2);
+                var v = BitConverter.ToUInt16(_data, Position);
+                Position += 2;
+                return v;
+            }
+
+            public Color Color()
+            {
+                Need(4);
+                uint v = BitConverter.ToUInt32(_data, Position);
+                Position += 4;
+                return System.Windows.Media.Color.FromArgb((byte)(v >> 24), (byte)(v >> 16), (byte)(v >> 8), (byte)v);
+            }
+
+            public double F32()
+            {
+                Need(4);
+                float v = BitConverter.ToSingle(_data, Position);
+                if (float.IsNaN(v) || float.IsInfinity(v))
+                    throw new ArgumentException("binary overlay: non-finite number at byte " + Position);
+                Position += 4;
+                return v;
+            }
+
+            public string Str()
+            {
+                int length = U16();
+                Need(length);
+                var s = Encoding.UTF8.GetString(_data, Position, length);
+                Position += length;
+                return s;
+            }
+        }
+    }
+}
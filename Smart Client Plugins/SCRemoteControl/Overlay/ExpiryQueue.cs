@@ -0,0 +1,83 @@
+using System;
+using System.Collections.Generic;
+
+namespace SCRemoteControl.Overlay
+{
+    /// <summary>
+    /// Min-heap of (due time, overlay id). Entries are never removed when an
+    /// overlay is deleted or its expiry changes; the owner checks each popped
+    /// entry against the live record and drops it when it is stale. Not thread
+    /// safe, OverlayManager guards it with its registry lock.
+    /// </summary>
+    class ExpiryQueue
+    {
+        private readonly List<Entry> _heap = new List<Entry>();
+
+        public int Count => _heap.Count;
+
+        public DateTime? NextDue => _heap.Count > 0 ? _heap[0].Due : (DateTime?)null;
+
+        public void Push(DateTime due, string overlayId)
+        {
+            _heap.Add(new Entry(due, overlayId));
+            int i = _heap.Count - 1;
+            while (i > 0)
+            {
+                int parent = (i - 1) / 2;
+                if (_heap[parent].Due <= _heap[i].Due) break;
+                Swap(i, parent);
+                i = parent;
+            }
+        }
+
+        /// <summary>Remove and return the earliest entry if it is due at or before now.</summary>
+        public bool TryPopDue(DateTime now, out DateTime due, out string overlayId)
+        {
+            if (_heap.Count == 0 || _heap[0].Due > now)
+            {
+                due = default(DateTime);
+                overlayId = null;
+                return false;
+            }
+
+            due = _heap[0].Due;
+            overlayId = _heap[0].OverlayId;
+            int last = _heap.Count - 1;
+            _heap[0] = _heap[last];
+            _heap.RemoveAt(last);
+
+            int i = 0;
+            while (true)
+            {
+                int left = 2 * i + 1, right = left + 1, smallest = i;
+                if (left < _heap.Count && _heap[left].Due < _heap[smallest].Due) smallest = left;
+                if (right < _heap.Count && _heap[right].Due < _heap[smallest].Due) smallest = right;
+                if (smallest == i) break;
+                Swap(i, smallest);
+                i = smallest;
+            }
+            return true;
+        }
+
+        public void Clear() => _heap.Clear();
+
+        private void Swap(int a, int b)
+        {
+            var t = _heap[a];
+            _heap[a] = _heap[b];
+            _heap[b] = t;
+        }
+
+        private struct Entry
+        {
+            public readonly DateTime Due;
+            public readonly string OverlayId;
+
+            public Entry(DateTime due, string overlayId)
+            {
+                Due = due;
+                OverlayId = overlayId;
+            }
+        }
+    }
+}
@@ -1,10 +1,13 @@
 using System;
 using System.Collections.Generic;
+using System.Diagnostics;
 using System.Linq;
+using System.Threading;
 using System.Windows;
 using System.Windows.Media;
 using System.Windows.Shapes;
 using System.Windows.Threading;
+using SCRemoteControl.Server;
 using VideoOS.Platform;
 using VideoOS.Platform.Client;
 
@@ -26,8 +29,33 @@ namespace SCRemoteControl.Overlay
 
         private readonly object _lock = new object();
         private readonly Dictionary<string, OverlayRecord> _overlays = new Dictionary<string, OverlayRecord>(StringComparer.Ordinal);
+        // Secondary index camera -> (overlayId -> record), kept in step with
+        // _overlays under _lock so per-camera paths scale with that camera's
+        // overlay count instead of the global one. Always go through Store/Unstore.
+        private readonly Dictionary<Guid, Dictionary<string, OverlayRecord>> _byCamera = new Dictionary<Guid, Dictionary<string, OverlayRecord>>();
         private readonly List<ImageViewerAddOn> _activeAddOns = new List<ImageViewerAddOn>();
 
+        // TTL bookkeeping, guarded by _lock. A one-shot timer is armed for the
+        // earliest pending expiry, so overlays go away within a few ms of their
+        // ExpiresAt and nothing scans the registry on a fixed tick.
+        private readonly ExpiryQueue _expiries = new ExpiryQueue();
+        private Timer _expiryTimer;
+        private DateTime _expiryArmedFor = DateTime.MaxValue;
+        private long _expired;
+        private double _expiryLatenessTotalMs;
+        private double _expiryLatenessMaxMs;
+
+        private long _version;       // guarded by _lock
+        private long _draws;         // Interlocked; written on the UI thread, read by the API
+        private long _drawsSkipped;
+        private long _passes;
+
+        /// <summary>
+        /// Raised after an overlay was upserted, patched, removed or expired. Fired
+        /// outside the registry lock, on the calling thread (HTTP worker or UI thread).
+        /// </summary>
+        public event EventHandler<OverlayChangedEventArgs> OverlayChanged;
+
         private DispatcherTimer _timer;
         private ClientControl.NewImageViewerControlHandler _newViewerHandler;
         private bool _started;
@@ -40,9 +68,15 @@ namespace SCRemoteControl.Overlay
             _newViewerHandler = OnNewImageViewerControl;
             ClientControl.Instance.NewImageViewerControlEvent += _newViewerHandler;
 
-            // Run the redraw + TTL pass on the UI thread. 3 Hz keeps the
-            // overlay aligned through window resizes without measurable cost.
-            Application.Current?.Dispatcher.BeginInvoke(new Action(() =>
+            lock (_lock)
+            {
+                _expiryTimer = new Timer(OnExpiryTimer, null, Timeout.Infinite, Timeout.Infinite);
+                _expiryArmedFor = DateTime.MaxValue;
+            }
+
+            // Run the redraw pass on the UI thread. 3 Hz keeps the overlay
+            // aligned through window resizes without measurable cost.
+            Dispatch(new Action(() =>
             {
                 _timer = new DispatcherTimer(DispatcherPriority.Background)
                 {
@@ -62,6 +96,13 @@ namespace SCRemoteControl.Overlay
 
             try { ClientControl.Instance.NewImageViewerControlEvent -= _newViewerHandler; } catch { }
 
+            lock (_lock)
+            {
+                _expiryTimer?.Dispose();
+                _expiryTimer = null;
+                _expiries.Clear();
+            }
+
             Application.Current?.Dispatcher.Invoke(new Action(() =>
             {
                 _timer?.Stop();
@@ -70,9 +111,10 @@ namespace SCRemoteControl.Overlay
                 lock (_lock)
                 {
                     foreach (var rec in _overlays.Values)
-                        foreach (var kv in rec.ShapeIds.ToList())
-                            TryRemoveFromAddOn(kv.Key, kv.Value);
+                        foreach (var kv in rec.Drawn.ToList())
+                            TryRemoveFromAddOn(kv.Key, kv.Value.ShapeId);
                     _overlays.Clear();
+                    _byCamera.Clear();
                     _activeAddOns.Clear();
                 }
             }));
@@ -83,6 +125,34 @@ namespace SCRemoteControl.Overlay
         // --- Public API ---
 
         public UpsertResult Upsert(string overlayId, Guid cameraId, string svg, int? ttlSeconds, int zOrder)
+        {
+            ValidateKey(overlayId, cameraId);
+            if (svg == null || svg.Length > MaxSvgBytes)
+                throw new ArgumentException("svg body too large (max " + MaxSvgBytes + " bytes)");
+
+            long parseStart = Stopwatch.GetTimestamp();
+            var parsed = SvgParser.Parse(svg); // throws SvgParseException on bad input
+            RequestTiming.Add(RequestTiming.Parse, parseStart);
+            return Upsert(overlayId, cameraId, svg, parsed, ttlSeconds, zOrder);
+        }
+
+        /// <summary>
+        /// Upsert from the compact binary encoding (see BinaryOverlay). The record
+        /// keeps no SVG text, so GET returns the overlay without a body.
+        /// </summary>
+        public UpsertResult UpsertBinary(string overlayId, Guid cameraId, byte[] data, int? ttlSeconds, int zOrder)
+        {
+            ValidateKey(overlayId, cameraId);
+            if (data == null || data.Length > MaxSvgBytes)
+                throw new ArgumentException("binary body too large (max " + MaxSvgBytes + " bytes)");
+
+            long parseStart = Stopwatch.GetTimestamp();
+            var parsed = BinaryOverlay.Decode(data); // throws ArgumentException on bad input
+            RequestTiming.Add(RequestTiming.Parse, parseStart);
+            return Upsert(overlayId, cameraId, null, parsed, ttlSeconds, zOrder);
+        }
+
+        private static void ValidateKey(string overlayId, Guid cameraId)
         {
             if (string.IsNullOrWhiteSpace(overlayId))
                 throw new ArgumentException("overlayId is required");
@@ -90,10 +160,10 @@ namespace SCRemoteControl.Overlay
                 throw new ArgumentException("overlayId must be 128 chars or less");
             if (cameraId == Guid.Empty)
                 throw new ArgumentException("cameraId is required");
-            if (svg == null || svg.Length > MaxSvgBytes)
-                throw new ArgumentException("svg body too large (max " + MaxSvgBytes + " bytes)");
+        }
 
-            var parsed = SvgParser.Parse(svg); // throws SvgParseException on bad input
+        private UpsertResult Upsert(string overlayId, Guid cameraId, string svg, ParsedOverlay parsed, int? ttlSeconds, int zOrder)
+        {
             if (parsed.Shapes.Count > MaxShapesPerOverlay)
                 throw new ArgumentException("overlay has " + parsed.Shapes.Count + " shapes, max " + MaxShapesPerOverlay);
 
@@ -103,13 +173,15 @@ namespace SCRemoteControl.Overlay
 
             OverlayRecord previous;
             OverlayRecord record;
+            long lockStart = Stopwatch.GetTimestamp();
             lock (_lock)
             {
+                RequestTiming.Add(RequestTiming.Lock, lockStart);
                 _overlays.TryGetValue(overlayId, out previous);
 
-                if (previous == null)
+                if (previous == null || previous.CameraId != cameraId)
                 {
-                    int countForCamera = _overlays.Values.Count(o => o.CameraId == cameraId);
+                    int countForCamera = _byCamera.TryGetValue(cameraId, out var forCamera) ? forCamera.Count : 0;
                     if (countForCamera >= MaxOverlaysPerCamera)
                         throw new InvalidOperationException("camera has " + countForCamera + " overlays, max " + MaxOverlaysPerCamera);
                 }
@@ -123,29 +195,31 @@ namespace SCRemoteControl.Overlay
                     ZOrder = zOrder,
                     ExpiresAt = expiresAt,
                     CreatedAt = DateTime.UtcNow,
+                    Version = ++_version,
                 };
                 // Inherit existing shape IDs so the next tick can ShapesOverlayUpdate
                 // in place. If camera changed, clear them so we re-add cleanly.
                 if (previous != null && previous.CameraId == cameraId)
-                    record.ShapeIds = previous.ShapeIds;
+                    record.Drawn = previous.Drawn;
 
-                _overlays[overlayId] = record;
+                Store(record, previous);
             }
 
             // If the camera moved (upsert that changed cameraId), drop prior shapes
             // from the old AddOns.
             if (previous != null && previous.CameraId != cameraId)
             {
-                Application.Current?.Dispatcher.BeginInvoke(new Action(() =>
+                Dispatch(new Action(() =>
                 {
-                    foreach (var kv in previous.ShapeIds)
-                        TryRemoveFromAddOn(kv.Key, kv.Value);
+                    foreach (var kv in previous.Drawn)
+                        TryRemoveFromAddOn(kv.Key, kv.Value.ShapeId);
                 }));
             }
 
             // Trigger an immediate draw pass so the new overlay is visible
             // before the next timer tick.
-            Application.Current?.Dispatcher.BeginInvoke(new Action(ApplyAll));
+            Dispatch(new Action(ApplyAll));
+            RaiseChanged(OverlayChange.Upserted, record);
 
             return new UpsertResult
             {
@@ -156,50 +230,168 @@ namespace SCRemoteControl.Overlay
             };
         }
 
+        /// <summary>
+        /// Update attributes of individual shapes (addressed by their SVG id) without
+        /// resubmitting the whole document. Only the touched shapes are copied and
+        /// re-parsed; the rest of the overlay is shared with the previous record.
+        /// Returns null when the overlay does not exist. ttlSeconds, when given,
+        /// restarts the expiry clock; otherwise the current expiry is kept.
+        /// </summary>
+        public UpsertResult Patch(string overlayId, IList<ShapePatch> patches, int? ttlSeconds)
+        {
+            if (string.IsNullOrWhiteSpace(overlayId))
+                throw new ArgumentException("overlayId is required");
+            if (patches == null || patches.Count == 0)
+                throw new ArgumentException("at least one shape patch is required");
+            if (patches.Count > MaxShapesPerOverlay)
+                throw new ArgumentException("patch has " + patches.Count + " shapes, max " + MaxShapesPerOverlay);
+
+            int patchBytes = 0;
+            foreach (var p in patches)
+            {
+                if (p == null || string.IsNullOrEmpty(p.ShapeId))
+                    throw new ArgumentException("every shape patch needs an id");
+                if (p.Attributes == null || p.Attributes.Count == 0)
+                    throw new ArgumentException("shape patch '" + p.ShapeId + "' has no attributes");
+                foreach (var kv in p.Attributes)
+                    patchBytes += (kv.Key?.Length ?? 0) + (kv.Value?.Length ?? 0);
+            }
+            if (patchBytes > MaxSvgBytes)
+                throw new ArgumentException("patch too large (max " + MaxSvgBytes + " bytes)");
+
+            OverlayRecord previous;
+            OverlayRecord record;
+            long lockStart = Stopwatch.GetTimestamp();
+            lock (_lock)
+            {
+                RequestTiming.Add(RequestTiming.Lock, lockStart);
+                if (!_overlays.TryGetValue(overlayId, out previous)) return null;
+
+                var parsed = previous.Parsed.CloneShallow();
+                var copied = new HashSet<int>();
+                var merged = previous.Patches == null
+                    ? new Dictionary<string, Dictionary<string, string>>(StringComparer.Ordinal)
+                    : previous.Patches.ToDictionary(kv => kv.Key, kv => new Dictionary<string, string>(kv.Value), StringComparer.Ordinal);
+
+                foreach (var p in patches)
+                {
+                    int idx = parsed.IndexOf(p.ShapeId);
+                    if (idx < 0)
+                        throw new ArgumentException("overlay has no shape with id '" + p.ShapeId + "'");
+                    if (copied.Add(idx))
+                        parsed.Shapes[idx] = parsed.Shapes[idx].Clone();
+
+                    if (!merged.TryGetValue(p.ShapeId, out var attrs))
+                        merged[p.ShapeId] = attrs = new Dictionary<string, string>(StringComparer.Ordinal);
+                    foreach (var kv in p.Attributes)
+                    {
+                        SvgParser.ApplyAttribute(parsed.Shapes[idx], kv.Key, kv.Value); // throws SvgParseException
+                        attrs.TryGetValue("style", out var style);
+                        if (kv.Key == "style")
+                        {
+                            // Declarations add to earlier style patches, as they do on screen.
+                            style = SvgParser.MergeStyle(style, kv.Value);
+                        }
+                        else
+                        {
+                            attrs[kv.Key] = kv.Value;
+                            // A later attribute wins over an earlier style patch of the same property.
+                            if (style == null || !SvgParser.IsStyleProperty(kv.Key)) continue;
+                            style = SvgParser.RemoveStyleProperty(style, kv.Key);
+                        }
+                        if (style != null) attrs["style"] = style;
+                        else attrs.Remove("style");
+                    }
+                }
+
+                var expiresAt = previous.ExpiresAt;
+                if (ttlSeconds.HasValue)
+                    expiresAt = ttlSeconds.Value > 0 ? DateTime.UtcNow.AddSeconds(ttlSeconds.Value) : (DateTime?)null;
+
+                record = new OverlayRecord
+                {
+                    OverlayId = overlayId,
+                    CameraId = previous.CameraId,
+                    Svg = previous.Svg,
+                    Patches = merged,
+                    Parsed = parsed,
+                    ZOrder = previous.ZOrder,
+                    ExpiresAt = expiresAt,
+                    CreatedAt = previous.CreatedAt,
+                    Version = ++_version,
+                    Drawn = previous.Drawn,
+                };
+                Store(record, previous);
+            }
+
+            Dispatch(new Action(ApplyAll));
+            RaiseChanged(OverlayChange.Patched, record);
+
+            return new UpsertResult
+            {
+                ExpiresAt = record.ExpiresAt,
+                Displayed = AnyAddOnShowsCamera(record.CameraId),
+                ShapeCount = record.Parsed.Shapes.Count,
+                Replaced = true,
+            };
+        }
+
         public bool Remove(string overlayId)
         {
             OverlayRecord rec;
+            long lockStart = Stopwatch.GetTimestamp();
             lock (_lock)
             {
+                RequestTiming.Add(RequestTiming.Lock, lockStart);
                 if (!_overlays.TryGetValue(overlayId, out rec)) return false;
-                _overlays.Remove(overlayId);
+                Unstore(rec);
             }
-            Application.Current?.Dispatcher.BeginInvoke(new Action(() =>
+            Dispatch(new Action(() =>
             {
-                foreach (var kv in rec.ShapeIds) TryRemoveFromAddOn(kv.Key, kv.Value);
+                foreach (var kv in rec.Drawn) TryRemoveFromAddOn(kv.Key, kv.Value.ShapeId);
             }));
+            RaiseChanged(OverlayChange.Removed, rec);
             return true;
         }
 
         public int RemoveByCamera(Guid cameraId)
         {
             List<OverlayRecord> removed;
+            long lockStart = Stopwatch.GetTimestamp();
             lock (_lock)
             {
-                removed = _overlays.Values.Where(o => o.CameraId == cameraId).ToList();
-                foreach (var r in removed) _overlays.Remove(r.OverlayId);
+                RequestTiming.Add(RequestTiming.Lock, lockStart);
+                if (!_byCamera.TryGetValue(cameraId, out var forCamera)) return 0;
+                removed = forCamera.Values.ToList();
+                foreach (var r in removed) Unstore(r);
             }
-            Application.Current?.Dispatcher.BeginInvoke(new Action(() =>
+            Dispatch(new Action(() =>
             {
                 foreach (var rec in removed)
-                    foreach (var kv in rec.ShapeIds) TryRemoveFromAddOn(kv.Key, kv.Value);
+                    foreach (var kv in rec.Drawn) TryRemoveFromAddOn(kv.Key, kv.Value.ShapeId);
             }));
+            foreach (var rec in removed) RaiseChanged(OverlayChange.Removed, rec);
             return removed.Count;
         }
 
         public int RemoveAll()
         {
             List<OverlayRecord> removed;
+            long lockStart = Stopwatch.GetTimestamp();
             lock (_lock)
             {
+                RequestTiming.Add(RequestTiming.Lock, lockStart);
                 removed = _overlays.Values.ToList();
                 _overlays.Clear();
+                _byCamera.Clear();
+                _expiries.Clear();
             }
-            Application.Current?.Dispatcher.BeginInvoke(new Action(() =>
+            Dispatch(new Action(() =>
             {
                 foreach (var rec in removed)
-                    foreach (var kv in rec.ShapeIds) TryRemoveFromAddOn(kv.Key, kv.Value);
+                    foreach (var kv in rec.Drawn) TryRemoveFromAddOn(kv.Key, kv.Value.ShapeId);
             }));
+            foreach (var rec in removed) RaiseChanged(OverlayChange.Removed, rec);
             return removed.Count;
         }
 
@@ -217,6 +409,57 @@ namespace SCRemoteControl.Overlay
             lock (_lock) { return _overlays.Values.ToList(); }
         }
 
+        public OverlayDrawStats GetDrawStats()
+        {
+            return new OverlayDrawStats
+            {
+                Draws = Interlocked.Read(ref _draws),
+                Skipped = Interlocked.Read(ref _drawsSkipped),
+                Passes = Interlocked.Read(ref _passes),
+            };
+        }
+
+        public OverlayExpiryStats GetExpiryStats()
+        {
+            lock (_lock)
+            {
+                return new OverlayExpiryStats
+                {
+                    Expired = _expired,
+                    Pending = _expiries.Count,
+                    LatenessMeanMs = _expired > 0 ? _expiryLatenessTotalMs / _expired : 0,
+                    LatenessMaxMs = _expiryLatenessMaxMs,
+                };
+            }
+        }
+
+        public List<OverlayRecord> ListByCamera(Guid cameraId)
+        {
+            lock (_lock)
+            {
+                return _byCamera.TryGetValue(cameraId, out var forCamera)
+                    ? forCamera.Values.ToList()
+                    : new List<OverlayRecord>();
+            }
+        }
+
+        /// <summary>Cameras shown in at least one viewport, with the number of viewports showing each.</summary>
+        public Dictionary<Guid, int> GetDisplayedCameras()
+        {
+            var displayed = new Dictionary<Guid, int>();
+            lock (_activeAddOns)
+            {
+                foreach (var addOn in _activeAddOns)
+                {
+                    if (addOn.CameraFQID == null) continue;
+                    var id = addOn.CameraFQID.ObjectId;
+                    displayed.TryGetValue(id, out var n);
+                    displayed[id] = n + 1;
+                }
+            }
+            return displayed;
+        }
+
         public bool AnyAddOnShowsCamera(Guid cameraId)
         {
             lock (_activeAddOns)
@@ -225,6 +468,74 @@ namespace SCRemoteControl.Overlay
             }
         }
 
+        // Queue work on the UI thread. When called from a request, the time
+        // spent queueing shows up as the dispatch phase in Server-Timing.
+        private static void Dispatch(Action action)
+        {
+            long start = Stopwatch.GetTimestamp();
+            Application.Current?.Dispatcher.BeginInvoke(action);
+            RequestTiming.Add(RequestTiming.Dispatch, start);
+        }
+
+        private void RaiseChanged(OverlayChange change, OverlayRecord record)
+        {
+            var handler = OverlayChanged;
+            if (handler == null) return;
+            try { handler(this, new OverlayChangedEventArgs(change, record)); }
+            catch (Exception ex) { SCRemoteControlDefinition.Log.Error("OverlayChanged handler failed", ex); }
+        }
+
+        // Caller holds _lock.
+        private void Store(OverlayRecord record, OverlayRecord previous)
+        {
+            if (previous != null && previous.CameraId != record.CameraId)
+                Unstore(previous);
+            _overlays[record.OverlayId] = record;
+            if (!_byCamera.TryGetValue(record.CameraId, out var forCamera))
+                _byCamera[record.CameraId] = forCamera = new Dictionary<string, OverlayRecord>(StringComparer.Ordinal);
+            forCamera[record.OverlayId] = record;
+
+            // A record replaced with the same expiry (patch without ttlSeconds)
+            // is already queued under its id.
+            if (record.ExpiresAt.HasValue && (previous == null || previous.ExpiresAt != record.ExpiresAt))
+            {
+                _expiries.Push(record.ExpiresAt.Value, record.OverlayId);
+                CompactExpiries();
+                ArmExpiry(record.ExpiresAt.Value);
+            }
+        }
+
+        // Caller holds _lock. Overlays refreshed with a new TTL leave stale entries
+        // behind; rebuild the queue when they clearly outnumber the live ones, so it
+        // stays bounded by the live overlays however fast clients refresh.
+        private void CompactExpiries()
+        {
+            if (_expiries.Count <= 2 * _overlays.Count + 256) return;
+            _expiries.Clear();
+            foreach (var rec in _overlays.Values)
+                if (rec.ExpiresAt.HasValue) _expiries.Push(rec.ExpiresAt.Value, rec.OverlayId);
+        }
+
+        // Caller holds _lock.
+        private void ArmExpiry(DateTime due)
+        {
+            if (_expiryTimer == null || due >= _expiryArmedFor) return;
+            _expiryArmedFor = due;
+            // Capped so far-off expiries stay within Timer's range; an early wake-up
+            // pops nothing and re-arms.
+            var delay = (long)Math.Ceiling((due - DateTime.UtcNow).TotalMilliseconds);
+            _expiryTimer.Change(Math.Max(0, Math.Min(delay, 3600 * 1000)), Timeout.Infinite);
+        }
+
+        // Caller holds _lock.
+        private void Unstore(OverlayRecord record)
+        {
+            _overlays.Remove(record.OverlayId);
+            if (_byCamera.TryGetValue(record.CameraId, out var forCamera)
+                && forCamera.Remove(record.OverlayId) && forCamera.Count == 0)
+                _byCamera.Remove(record.CameraId);
+        }
+
         // --- AddOn lifecycle ---
 
         private void OnNewImageViewerControl(ImageViewerAddOn addOn)
@@ -233,7 +544,7 @@ namespace SCRemoteControl.Overlay
             addOn.CloseEvent += AddOn_CloseEvent;
             addOn.PropertyChangedEvent += AddOn_PropertyChangedEvent;
             // Apply any registered overlays that match the camera in this slot.
-            Application.Current?.Dispatcher.BeginInvoke(new Action(ApplyAll));
+            Dispatch(new Action(ApplyAll));
         }
 
         private void AddOn_CloseEvent(object sender, EventArgs e)
@@ -246,7 +557,7 @@ namespace SCRemoteControl.Overlay
             lock (_lock)
             {
                 foreach (var rec in _overlays.Values)
-                    rec.ShapeIds.Remove(addOn); // shapes go away with the AddOn itself
+                    rec.Drawn.Remove(addOn); // shapes go away with the AddOn itself
             }
         }
 
@@ -263,60 +574,105 @@ namespace SCRemoteControl.Overlay
             {
                 foreach (var rec in _overlays.Values)
                 {
-                    if (rec.ShapeIds.TryGetValue(addOn, out var shapeId) && rec.CameraId != currentCamera)
+                    if (rec.Drawn.TryGetValue(addOn, out var drawn) && rec.CameraId != currentCamera)
                     {
-                        toRemove.Add(new KeyValuePair<OverlayRecord, Guid>(rec, shapeId));
-                        rec.ShapeIds.Remove(addOn);
+                        toRemove.Add(new KeyValuePair<OverlayRecord, Guid>(rec, drawn.ShapeId));
+                        rec.Drawn.Remove(addOn);
                     }
                 }
             }
             foreach (var kv in toRemove) TryRemoveFromAddOn(addOn, kv.Value);
 
-            Application.Current?.Dispatcher.BeginInvoke(new Action(ApplyAll));
+            Dispatch(new Action(ApplyAll));
         }
 
         // --- Tick / drawing ---
 
         private void OnTick(object sender, EventArgs e)
         {
-            // Expire first so stale overlays don't redraw.
-            PruneExpired();
             ApplyAll();
         }
 
-        private void PruneExpired()
+        /// <summary>
+        /// Expiry timer callback (thread pool). Pops only the queue entries that are
+        /// due, drops the ones that no longer match a live record, and re-arms the
+        /// timer for the next pending expiry.
+        /// </summary>
+        private void OnExpiryTimer(object state)
         {
-            var now = DateTime.UtcNow;
-            List<OverlayRecord> expired;
+            var expired = new List<OverlayRecord>();
             lock (_lock)
             {
-                expired = _overlays.Values
-                    .Where(o => o.ExpiresAt.HasValue && o.ExpiresAt.Value <= now)
-                    .ToList();
-                foreach (var r in expired) _overlays.Remove(r.OverlayId);
+                if (_expiryTimer == null) return;
+                _expiryArmedFor = DateTime.MaxValue;
+
+                var now = DateTime.UtcNow;
+                while (_expiries.TryPopDue(now, out _, out var overlayId))
+                {
+                    if (!_overlays.TryGetValue(overlayId, out var rec)) continue;
+                    if (!rec.ExpiresAt.HasValue || rec.ExpiresAt.Value > now) continue; // expiry moved
+                    Unstore(rec);
+                    expired.Add(rec);
+
+                    var lateMs = (now - rec.ExpiresAt.Value).TotalMilliseconds;
+                    _expired++;
+                    _expiryLatenessTotalMs += lateMs;
+                    if (lateMs > _expiryLatenessMaxMs) _expiryLatenessMaxMs = lateMs;
+                }
+
+                CompactExpiries();
+
+                var next = _expiries.NextDue;
+                if (next.HasValue) ArmExpiry(next.Value);
             }
-            foreach (var rec in expired)
-                foreach (var kv in rec.ShapeIds.ToList())
-                    TryRemoveFromAddOn(kv.Key, kv.Value);
+
+            if (expired.Count == 0) return;
+            Dispatch(new Action(() =>
+            {
+                foreach (var rec in expired)
+                    foreach (var kv in rec.Drawn.ToList())
+                        TryRemoveFromAddOn(kv.Key, kv.Value.ShapeId);
+            }));
+            foreach (var rec in expired) RaiseChanged(OverlayChange.Expired, rec);
         }
 
         private void ApplyAll()
         {
-            OverlayRecord[] overlaysSnapshot;
+            Interlocked.Increment(ref _passes);
             ImageViewerAddOn[] addOnsSnapshot;
-            lock (_lock) { overlaysSnapshot = _overlays.Values.ToArray(); }
             lock (_activeAddOns) { addOnsSnapshot = _activeAddOns.ToArray(); }
 
+            // Snapshot only the cameras that are on screen right now.
+            var byCameraSnapshot = new Dictionary<Guid, OverlayRecord[]>();
+            lock (_lock)
+            {
+                foreach (var addOn in addOnsSnapshot)
+                {
+                    var cam = addOn?.CameraFQID?.ObjectId ?? Guid.Empty;
+                    if (cam == Guid.Empty || byCameraSnapshot.ContainsKey(cam)) continue;
+                    if (_byCamera.TryGetValue(cam, out var forCamera))
+                        byCameraSnapshot[cam] = forCamera.Values.ToArray();
+                }
+            }
+
             foreach (var addOn in addOnsSnapshot)
             {
                 if (addOn == null || addOn.CameraFQID == null) continue;
                 var paint = addOn.PaintSizeWpf;
                 if (paint.Width <= 0 || paint.Height <= 0) continue;
 
-                var cameraId = addOn.CameraFQID.ObjectId;
-                foreach (var rec in overlaysSnapshot)
+                if (!byCameraSnapshot.TryGetValue(addOn.CameraFQID.ObjectId, out var overlaysForCamera)) continue;
+                foreach (var rec in overlaysForCamera)
                 {
-                    if (rec.CameraId != cameraId) continue;
+                    // Skip overlays this viewport already shows at the current
+                    // version and size; only new/changed records or resized
+                    // viewers pay for BuildShapes + ShapesOverlayUpdate.
+                    rec.Drawn.TryGetValue(addOn, out var drawn);
+                    if (drawn != null && drawn.Version == rec.Version && drawn.PaintSize == paint)
+                    {
+                        Interlocked.Increment(ref _drawsSkipped);
+                        continue;
+                    }
 
                     var shapes = BuildShapes(rec, paint);
                     if (shapes.Count == 0) continue;
@@ -324,15 +680,18 @@ namespace SCRemoteControl.Overlay
                     var renderParams = new ShapesOverlayRenderParameters { ZOrder = rec.ZOrder };
                     try
                     {
-                        if (rec.ShapeIds.TryGetValue(addOn, out var existingId))
+                        if (drawn != null)
                         {
-                            addOn.ShapesOverlayUpdate(existingId, shapes, renderParams);
+                            addOn.ShapesOverlayUpdate(drawn.ShapeId, shapes, renderParams);
                         }
                         else
                         {
-                            var id = addOn.ShapesOverlayAdd(shapes, renderParams);
-                            rec.ShapeIds[addOn] = id;
+                            drawn = new DrawnOverlay { ShapeId = addOn.ShapesOverlayAdd(shapes, renderParams) };
+                            rec.Drawn[addOn] = drawn;
                         }
+                        drawn.Version = rec.Version;
+                        drawn.PaintSize = paint;
+                        Interlocked.Increment(ref _draws);
                     }
                     catch (Exception ex)
                     {
@@ -372,12 +731,72 @@ namespace SCRemoteControl.Overlay
     {
         public string OverlayId;
         public Guid CameraId;
+        /// <summary>SVG as posted; null for overlays posted in the binary encoding.</summary>
         public string Svg;
+        /// <summary>Attributes patched since the last full upsert, keyed by shape id.</summary>
+        public Dictionary<string, Dictionary<string, string>> Patches;
         public ParsedOverlay Parsed;
         public int ZOrder = 100;
         public DateTime? ExpiresAt;
         public DateTime CreatedAt;
-        public Dictionary<ImageViewerAddOn, Guid> ShapeIds = new Dictionary<ImageViewerAddOn, Guid>();
+        /// <summary>Bumped on every upsert/patch; viewports drawn at an older version are redrawn.</summary>
+        public long Version;
+        public Dictionary<ImageViewerAddOn, DrawnOverlay> Drawn = new Dictionary<ImageViewerAddOn, DrawnOverlay>();
+    }
+
+    /// <summary>What one AddOn currently shows for an overlay.</summary>
+    class DrawnOverlay
+    {
+        public Guid ShapeId;
+        public long Version;
+        public Size PaintSize;
+    }
+
+    class OverlayDrawStats
+    {
+        /// <summary>ShapesOverlayAdd/ShapesOverlayUpdate calls since start.</summary>
+        public long Draws;
+        /// <summary>Overlay/viewport pairs skipped because nothing changed.</summary>
+        public long Skipped;
+        /// <summary>Redraw passes (timer ticks plus upsert/AddOn triggered passes).</summary>
+        public long Passes;
+    }
+
+    class OverlayExpiryStats
+    {
+        /// <summary>Overlays removed by TTL since start.</summary>
+        public long Expired;
+        /// <summary>Entries in the expiry queue, including stale ones not yet popped.</summary>
+        public int Pending;
+        /// <summary>Mean and worst time between ExpiresAt and the actual removal.</summary>
+        public double LatenessMeanMs;
+        public double LatenessMaxMs;
+    }
+
+    enum OverlayChange
+    {
+        Upserted,
+        Patched,
+        Removed,
+        Expired,
+    }
+
+    class OverlayChangedEventArgs : EventArgs
+    {
+        public OverlayChangedEventArgs(OverlayChange change, OverlayRecord record)
+        {
+            Change = change;
+            Record = record;
+        }
+
+        public OverlayChange Change { get; }
+        public OverlayRecord Record { get; }
+    }
+
+    class ShapePatch
+    {
+        public string ShapeId;
+        public Dictionary<string, string> Attributes;
     }
 
     class UpsertResult
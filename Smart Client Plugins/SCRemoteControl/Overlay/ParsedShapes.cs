@@ -1,3 +1,4 @@
+using System;
 using System.Collections.Generic;
 using System.Globalization;
 using System.Windows;
@@ -15,6 +16,44 @@ namespace SCRemoteControl.Overlay
     {
         public Rect ViewBox { get; set; } = new Rect(0, 0, 1000, 1000);
         public List<ParsedShape> Shapes { get; set; } = new List<ParsedShape>();
+
+        private Dictionary<string, int> _idIndex;
+
+        /// <summary>
+        /// Index of the first shape carrying the given SVG id, or -1. The lookup
+        /// table is built on first use; Shapes must not be reordered afterwards.
+        /// </summary>
+        public int IndexOf(string shapeId)
+        {
+            if (string.IsNullOrEmpty(shapeId)) return -1;
+            if (_idIndex == null)
+            {
+                var index = new Dictionary<string, int>(StringComparer.Ordinal);
+                for (int i = 0; i < Shapes.Count; i++)
+                {
+                    var id = Shapes[i].Id;
+                    if (!string.IsNullOrEmpty(id) && !index.ContainsKey(id))
+                        index[id] = i;
+                }
+                _idIndex = index;
+            }
+            return _idIndex.TryGetValue(shapeId, out var idx) ? idx : -1;
+        }
+
+        /// <summary>
+        /// Shallow copy: a new shape list holding the same shape instances. Used by
+        /// patch updates, which replace only the shapes they touch (copy-on-write)
+        /// so a render pass on the UI thread never sees a half-applied patch.
+        /// </summary>
+        public ParsedOverlay CloneShallow()
+        {
+            return new ParsedOverlay
+            {
+                ViewBox = ViewBox,
+                Shapes = new List<ParsedShape>(Shapes),
+                _idIndex = _idIndex,
+            };
+        }
     }
 
     public class ShapeStyle
@@ -50,9 +89,22 @@ namespace SCRemoteControl.Overlay
 
     public abstract class ParsedShape
     {
+        /// <summary>Value of the SVG id attribute, used to address the shape in patch updates.</summary>
+        public string Id { get; set; }
         public ShapeStyle Style { get; set; } = new ShapeStyle();
         public Matrix Transform { get; set; } = Matrix.Identity;
 
+        public ParsedShape Clone()
+        {
+            var copy = (ParsedShape)MemberwiseClone();
+            copy.Style = Style.Clone();
+            CopyMembers(copy);
+            return copy;
+        }
+
+        /// <summary>Deep-copy reference-typed members that MemberwiseClone shares.</summary>
+        protected virtual void CopyMembers(ParsedShape copy) { }
+
         /// <summary>
         /// Build a WPF Shape positioned in the target paint area. Caller provides
         /// the viewBox-to-paint matrix; this method composes it with the shape's
@@ -139,6 +191,12 @@ namespace SCRemoteControl.Overlay
     {
         public List<Point> Points { get; set; } = new List<Point>();
         public bool Closed { get; set; }
+
+        protected override void CopyMembers(ParsedShape copy)
+        {
+            ((PolyShape)copy).Points = new List<Point>(Points);
+        }
+
         protected override Geometry BuildGeometry()
         {
             if (Points.Count < 2) return null;
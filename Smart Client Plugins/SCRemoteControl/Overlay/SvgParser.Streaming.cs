@@ -0,0 +1,463 @@
+using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.IO;
+using System.Text;
+using System.Windows;
+using System.Windows.Media;
+using System.Xml;
+
+namespace SCRemoteControl.Overlay
+{
+    /// <summary>
+    /// Forward-only parse path. Reads the document once with an XmlReader,
+    /// collects the attributes of each element into a stack-allocated struct,
+    /// and scans plain decimal numbers and point lists by hand instead of
+    /// going through Regex.Replace / Regex.Split per attribute. Anything the
+    /// scanner does not recognise falls back to the same double.TryParse the
+    /// DOM path uses, so both paths produce identical ParsedOverlay output.
+    /// </summary>
+    public static partial class SvgParser
+    {
+        // Same reader settings XDocument.Parse uses, so both paths accept and
+        // reject the same documents with the same messages.
+        private static readonly XmlReaderSettings StreamSettings = new XmlReaderSettings
+        {
+            IgnoreWhitespace = true,
+            DtdProcessing = DtdProcessing.Parse,
+            MaxCharactersFromEntities = 10000000,
+            XmlResolver = null,
+        };
+
+        // Exact powers of ten; a mantissa below 2^53 divided by one of these is
+        // correctly rounded, i.e. equal to what double.Parse returns.
+        private static readonly double[] Pow10 =
+        {
+            1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10, 1e11,
+            1e12, 1e13, 1e14, 1e15, 1e16, 1e17, 1e18, 1e19, 1e20, 1e21, 1e22,
+        };
+
+        public static ParsedOverlay ParseStreaming(string svg)
+        {
+            if (string.IsNullOrWhiteSpace(svg))
+                throw new SvgParseException("SVG body is empty");
+
+            using (var reader = XmlReader.Create(new StringReader(svg), StreamSettings))
+            {
+                ParsedOverlay overlay = null;
+                SvgParseException invalid = null;
+                try
+                {
+                    overlay = ReadDocument(reader);
+                }
+                catch (SvgParseException ex)
+                {
+                    invalid = ex;
+                }
+                catch (XmlException ex)
+                {
+                    throw new SvgParseException("Invalid XML: " + ex.Message);
+                }
+
+                // Read to the end: XDocument.Parse rejects malformed trailing content
+                // (and reports it ahead of any root/viewBox problem).
+                try
+                {
+                    while (reader.Read()) { }
+                }
+                catch (XmlException ex)
+                {
+                    throw new SvgParseException("Invalid XML: " + ex.Message);
+                }
+
+                if (invalid != null) throw invalid;
+                return overlay;
+            }
+        }
+
+        private static ParsedOverlay ReadDocument(XmlReader reader)
+        {
+            if (reader.MoveToContent() != XmlNodeType.Element || reader.LocalName != "svg")
+                throw new SvgParseException("Root element must be <svg>");
+
+            var attrs = default(ElementAttributes);
+            ReadAttributes(reader, ref attrs);
+
+            var overlay = new ParsedOverlay
+            {
+                ViewBox = ParseViewBox(attrs.ViewBox)
+            };
+
+            var rootStyle = new ShapeStyle();
+            ApplyStyle(ref attrs, rootStyle);
+
+            if (!reader.IsEmptyElement)
+                ReadChildren(reader, rootStyle, Matrix.Identity, overlay.Shapes);
+
+            return overlay;
+        }
+
+        /// <summary>
+        /// Visit the child elements of the element the reader is on. Returns with
+        /// the reader on that element's end tag.
+        /// </summary>
+        private static void ReadChildren(XmlReader reader, ShapeStyle style, Matrix transform, List<ParsedShape> output)
+        {
+            int depth = reader.Depth;
+            while (reader.Read())
+            {
+                if (reader.NodeType == XmlNodeType.Element)
+                    VisitElement(reader, style, transform, output);
+                else if (reader.NodeType == XmlNodeType.EndElement && reader.Depth == depth)
+                    return;
+            }
+        }
+
+        private static void VisitElement(XmlReader reader, ShapeStyle parentStyle, Matrix parentTransform, List<ParsedShape> output)
+        {
+            var a = default(ElementAttributes);
+            ReadAttributes(reader, ref a);
+            var name = reader.LocalName;
+            bool empty = reader.IsEmptyElement;
+
+            var style = parentStyle.Clone();
+            ApplyStyle(ref a, style);
+
+            var transform = parentTransform;
+            var localTransform = ParseTransform(a.Transform);
+            if (!localTransform.IsIdentity)
+            {
+                localTransform.Append(parentTransform);
+                transform = localTransform;
+            }
+
+            int before = output.Count;
+            switch (name)
+            {
+                case "g":
+                    if (!empty) ReadChildren(reader, style, transform, output);
+                    return;
+                case "rect":
+                    output.Add(new RectShape
+                    {
+                        Style = style,
+                        Transform = transform,
+                        X = Num(a.X),
+                        Y = Num(a.Y),
+                        Width = Num(a.Width),
+                        Height = Num(a.Height),
+                        Rx = Num(a.Rx),
+                        Ry = Num(a.Ry),
+                    });
+                    break;
+                case "circle":
+                    output.Add(new CircleShape
+                    {
+                        Style = style,
+                        Transform = transform,
+                        Cx = Num(a.Cx),
+                        Cy = Num(a.Cy),
+                        R = Num(a.R),
+                    });
+                    break;
+                case "ellipse":
+                    output.Add(new EllipseShape
+                    {
+                        Style = style,
+                        Transform = transform,
+                        Cx = Num(a.Cx),
+                        Cy = Num(a.Cy),
+                        Rx = Num(a.Rx),
+                        Ry = Num(a.Ry),
+                    });
+                    break;
+                case "line":
+                    output.Add(new LineShape
+                    {
+                        Style = style,
+                        Transform = transform,
+                        X1 = Num(a.X1),
+                        Y1 = Num(a.Y1),
+                        X2 = Num(a.X2),
+                        Y2 = Num(a.Y2),
+                    });
+                    break;
+                case "polyline":
+                case "polygon":
+                    output.Add(new PolyShape
+                    {
+                        Style = style,
+                        Transform = transform,
+                        Closed = name == "polygon",
+                        Points = ScanPoints(a.Points),
+                    });
+                    break;
+                case "path":
+                    output.Add(new PathShape
+                    {
+                        Style = style,
+                        Transform = transform,
+                        D = a.D,
+                    });
+                    break;
+                case "text":
+                    output.Add(new TextShape
+                    {
+                        Style = style,
+                        Transform = transform,
+                        X = Num(a.X),
+                        Y = Num(a.Y),
+                        Text = empty ? "" : ReadText(reader),
+                    });
+                    empty = true; // ReadText consumed the content
+                    break;
+            }
+
+            if (!empty) SkipContent(reader);
+
+            if (output.Count == before + 1)
+                output[before].Id = a.Id;
+        }
+
+        /// <summary>Concatenated descendant text, like XElement.Value.</summary>
+        private static string ReadText(XmlReader reader)
+        {
+            int depth = reader.Depth;
+            string first = null;
+            StringBuilder sb = null;
+            while (reader.Read())
+            {
+                switch (reader.NodeType)
+                {
+                    case XmlNodeType.Text:
+                    case XmlNodeType.CDATA:
+                    case XmlNodeType.SignificantWhitespace:
+                        if (first == null) first = reader.Value;
+                        else (sb ?? (sb = new StringBuilder(first))).Append(reader.Value);
+                        break;
+                    case XmlNodeType.EndElement:
+                        if (reader.Depth == depth) return sb?.ToString() ?? first ?? "";
+                        break;
+                }
+            }
+            return sb?.ToString() ?? first ?? "";
+        }
+
+        /// <summary>
+        /// Move to the end tag of the current element. Unlike XmlReader.Skip this
+        /// leaves the reader on the end tag, which is what ReadChildren expects.
+        /// </summary>
+        private static void SkipContent(XmlReader reader)
+        {
+            int depth = reader.Depth;
+            while (reader.Read())
+            {
+                if (reader.NodeType == XmlNodeType.EndElement && reader.Depth == depth) return;
+            }
+        }
+
+        // --- attributes ---
+
+        /// <summary>The attributes the parser looks at; everything else is ignored.</summary>
+        private struct ElementAttributes
+        {
+            public string Id, Transform, Style, ViewBox;
+            public string Fill, Stroke, FillOpacity, StrokeOpacity, Opacity, StrokeWidth;
+            public string FontFamily, FontSize, FontWeight, FontStyle;
+            public string X, Y, Width, Height, Rx, Ry, Cx, Cy, R, X1, Y1, X2, Y2, Points, D;
+        }
+
+        private static void ReadAttributes(XmlReader reader, ref ElementAttributes a)
+        {
+            if (!reader.HasAttributes) return;
+            while (reader.MoveToNextAttribute())
+            {
+                // XElement.Attribute("x") only matches attributes without a namespace.
+                if (reader.NamespaceURI.Length != 0) continue;
+                var v = reader.Value;
+                switch (reader.LocalName)
+                {
+                    case "id": a.Id = v; break;
+                    case "transform": a.Transform = v; break;
+                    case "style": a.Style = v; break;
+                    case "viewBox": a.ViewBox = v; break;
+                    case "fill": a.Fill = v; break;
+                    case "stroke": a.Stroke = v; break;
+                    case "fill-opacity": a.FillOpacity = v; break;
+                    case "stroke-opacity": a.StrokeOpacity = v; break;
+                    case "opacity": a.Opacity = v; break;
+                    case "stroke-width": a.StrokeWidth = v; break;
+                    case "font-family": a.FontFamily = v; break;
+                    case "font-size": a.FontSize = v; break;
+                    case "font-weight": a.FontWeight = v; break;
+                    case "font-style": a.FontStyle = v; break;
+                    case "x": a.X = v; break;
+                    case "y": a.Y = v; break;
+                    case "width": a.Width = v; break;
+                    case "height": a.Height = v; break;
+                    case "rx": a.Rx = v; break;
+                    case "ry": a.Ry = v; break;
+                    case "cx": a.Cx = v; break;
+                    case "cy": a.Cy = v; break;
+                    case "r": a.R = v; break;
+                    case "x1": a.X1 = v; break;
+                    case "y1": a.Y1 = v; break;
+                    case "x2": a.X2 = v; break;
+                    case "y2": a.Y2 = v; break;
+                    case "points": a.Points = v; break;
+                    case "d": a.D = v; break;
+                }
+            }
+            reader.MoveToElement();
+        }
+
+        /// <summary>Streaming counterpart of ReadStyle, without the per-attribute lambdas.</summary>
+        private static void ApplyStyle(ref ElementAttributes a, ShapeStyle style)
+        {
+            if (!string.IsNullOrEmpty(a.Fill)) style.Fill = ParseColor(a.Fill);
+            if (!string.IsNullOrEmpty(a.Stroke)) style.Stroke = ParseColor(a.Stroke);
+            if (!string.IsNullOrEmpty(a.FillOpacity)) style.FillOpacity = Clamp01(Num(a.FillOpacity));
+            if (!string.IsNullOrEmpty(a.StrokeOpacity)) style.StrokeOpacity = Clamp01(Num(a.StrokeOpacity));
+            if (!string.IsNullOrEmpty(a.Opacity)) style.Opacity = Clamp01(Num(a.Opacity));
+            if (!string.IsNullOrEmpty(a.StrokeWidth)) style.StrokeWidth = Math.Max(0, Num(a.StrokeWidth));
+            if (!string.IsNullOrEmpty(a.FontFamily)) style.FontFamily = a.FontFamily;
+            if (!string.IsNullOrEmpty(a.FontSize)) style.FontSize = Math.Max(1, Num(a.FontSize));
+            if (!string.IsNullOrEmpty(a.FontWeight)) style.FontWeight = ParseWeight(a.FontWeight);
+            if (!string.IsNullOrEmpty(a.FontStyle)) style.FontStyle = ParseFontStyle(a.FontStyle);
+
+            if (!string.IsNullOrEmpty(a.Style)) ApplyInlineStyle(a.Style, style);
+        }
+
+        // --- numbers ---
+
+        /// <summary>Same result as D(string): number with an optional unit suffix, 0 when unparsable.</summary>
+        private static double Num(string s)
+        {
+            if (string.IsNullOrEmpty(s)) return 0;
+            return TryScanNumber(s, 0, s.Length, true, out var v) ? v : D(s);
+        }
+
+        /// <summary>
+        /// Fast path for plain decimals ([+-]digits[.digits], at most 15 significant
+        /// digits, optionally followed by one unit suffix). Returns false for
+        /// anything else (exponents, whitespace, long mantissas, -0) so the caller
+        /// falls back to double.TryParse.
+        /// </summary>
+        private static bool TryScanNumber(string s, int start, int end, bool allowUnit, out double value)
+        {
+            value = 0;
+            int i = start;
+            bool negative = false;
+            if (i < end && (s[i] == '-' || s[i] == '+'))
+            {
+                negative = s[i] == '-';
+                i++;
+            }
+
+            long mantissa = 0;
+            int significant = 0, fraction = 0;
+            bool anyDigit = false, dot = false;
+            for (; i < end; i++)
+            {
+                char c = s[i];
+                if (c >= '0' && c <= '9')
+                {
+                    anyDigit = true;
+                    if (dot) fraction++;
+                    if (mantissa == 0 && c == '0') continue; // leading zeros are not significant
+                    if (++significant > 15) return false;
+                    mantissa = mantissa * 10 + (c - '0');
+                }
+                else if (c == '.' && !dot)
+                {
+                    dot = true;
+                }
+                else
+                {
+                    break;
+                }
+            }
+
+            if (!anyDigit || fraction >= Pow10.Length) return false;
+            if (i < end && !(allowUnit && IsUnitSuffix(s, i, end))) return false;
+            if (mantissa == 0 && negative) return false;
+
+            value = fraction == 0 ? mantissa : mantissa / Pow10[fraction];
+            if (negative) value = -value;
+            return true;
+        }
+
+        // Suffixes D(string) strips: px pt % em ex cm mm in. Only lower case is
+        // taken here; the regex matches upper case culture-sensitively, so leave
+        // that to the fallback.
+        private static bool IsUnitSuffix(string s, int i, int end)
+        {
+            int n = end - i;
+            if (n == 1) return s[i] == '%';
+            if (n != 2) return false;
+            char a = s[i], b = s[i + 1];
+            switch (a)
+            {
+                case 'p': return b == 'x' || b == 't';
+                case 'e': return b == 'm' || b == 'x';
+                case 'c':
+                case 'm': return b == 'm';
+                case 'i': return b == 'n';
+                default: return false;
+            }
+        }
+
+        private static bool IsPointSeparator(char c) => c == ',' || char.IsWhiteSpace(c);
+
+        /// <summary>
+        /// Same result as ParsePoints: tokens split on runs of whitespace/commas
+        /// (a leading or trailing comma yields an empty token, as Regex.Split
+        /// does), taken in pairs; a pair with an unparsable token is dropped.
+        /// </summary>
+        private static List<Point> ScanPoints(string s)
+        {
+            if (string.IsNullOrWhiteSpace(s)) return new List<Point>();
+
+            int start = 0, end = s.Length;
+            while (char.IsWhiteSpace(s[start])) start++;
+            while (char.IsWhiteSpace(s[end - 1])) end--;
+
+            var list = new List<Point>(Math.Max(4, (end - start) / 10));
+            int pos = start, index = 0;
+            double x = 0;
+            bool xOk = false;
+            while (true)
+            {
+                int tokenStart = pos;
+                while (pos < end && !IsPointSeparator(s[pos])) pos++;
+
+                bool ok = ScanToken(s, tokenStart, pos, out var v);
+                if ((index & 1) == 0)
+                {
+                    x = v;
+                    xOk = ok;
+                }
+                else if (xOk && ok)
+                {
+                    list.Add(new Point(x, v));
+                }
+                index++;
+
+                if (pos >= end) break;
+                while (pos < end && IsPointSeparator(s[pos])) pos++;
+            }
+            return list;
+        }
+
+        private static bool ScanToken(string s, int start, int end, out double value)
+        {
+            if (start == end)
+            {
+                value = 0;
+                return false;
+            }
+            if (TryScanNumber(s, start, end, false, out value)) return true;
+            return double.TryParse(s.Substring(start, end - start), NumberStyles.Float, Inv, out value);
+        }
+    }
+}
@@ -20,12 +20,22 @@ namespace SCRemoteControl.Overlay
     /// scaling to paint pixels happens at render time. Default viewBox is 0 0 1000 1000
     /// when the document does not declare one.
     /// </summary>
-    public static class SvgParser
+    public static partial class SvgParser
     {
         private static readonly Regex _wsSplit = new Regex(@"[\s,]+", RegexOptions.Compiled);
         private static readonly CultureInfo Inv = CultureInfo.InvariantCulture;
 
-        public static ParsedOverlay Parse(string svg)
+        /// <summary>
+        /// Parse an overlay document. Uses the forward-only reader path
+        /// (ParseStreaming); ParseDom is the XDocument reference it must match.
+        /// </summary>
+        public static ParsedOverlay Parse(string svg) => ParseStreaming(svg);
+
+        /// <summary>
+        /// Reference parser: loads the document into an XDocument and walks it
+        /// recursively. Kept for the equivalence check in SvgParseBench.
+        /// </summary>
+        public static ParsedOverlay ParseDom(string svg)
         {
             if (string.IsNullOrWhiteSpace(svg))
                 throw new SvgParseException("SVG body is empty");
@@ -54,9 +64,10 @@ namespace SCRemoteControl.Overlay
 
         // --- viewBox ---
 
-        private static Rect ReadViewBox(XElement svg)
+        private static Rect ReadViewBox(XElement svg) => ParseViewBox((string)svg.Attribute("viewBox"));
+
+        private static Rect ParseViewBox(string vb)
         {
-            var vb = (string)svg.Attribute("viewBox");
             if (string.IsNullOrWhiteSpace(vb))
                 return new Rect(0, 0, 1000, 1000);
 
@@ -91,6 +102,7 @@ namespace SCRemoteControl.Overlay
                 transform = localTransform;
             }
 
+            int before = output.Count;
             switch (elem.Name.LocalName)
             {
                 case "g":
@@ -180,6 +192,11 @@ namespace SCRemoteControl.Overlay
                     break;
                 // Silently skip unknowns (e.g. <title>, <desc>, <defs>, <metadata>).
             }
+
+            // Ids on leaf shapes make them addressable by patch updates. A <g> id
+            // is not propagated; patches target individual shapes.
+            if (output.Count == before + 1 && elem.Name.LocalName != "g")
+                output[before].Id = (string)elem.Attribute("id");
         }
 
         private static double D(XElement e, string name, double fallback = 0)
@@ -225,25 +242,34 @@ namespace SCRemoteControl.Overlay
             var inlineStyle = (string)elem.Attribute("style");
             if (string.IsNullOrEmpty(inlineStyle)) return;
 
+            ApplyInlineStyle(inlineStyle, style);
+        }
+
+        private static void ApplyInlineStyle(string inlineStyle, ShapeStyle style)
+        {
             foreach (var decl in inlineStyle.Split(';'))
             {
                 var kv = decl.Split(new[] { ':' }, 2);
                 if (kv.Length != 2) continue;
-                var prop = kv[0].Trim().ToLowerInvariant();
-                var val = kv[1].Trim();
-                switch (prop)
-                {
-                    case "fill": style.Fill = ParseColor(val); break;
-                    case "stroke": style.Stroke = ParseColor(val); break;
-                    case "fill-opacity": style.FillOpacity = Clamp01(D(val)); break;
-                    case "stroke-opacity": style.StrokeOpacity = Clamp01(D(val)); break;
-                    case "opacity": style.Opacity = Clamp01(D(val)); break;
-                    case "stroke-width": style.StrokeWidth = Math.Max(0, D(val)); break;
-                    case "font-family": style.FontFamily = val; break;
-                    case "font-size": style.FontSize = Math.Max(1, D(val)); break;
-                    case "font-weight": style.FontWeight = ParseWeight(val); break;
-                    case "font-style": style.FontStyle = ParseFontStyle(val); break;
-                }
+                ApplyStyleProperty(style, kv[0].Trim().ToLowerInvariant(), kv[1].Trim());
+            }
+        }
+
+        private static bool ApplyStyleProperty(ShapeStyle style, string prop, string val)
+        {
+            switch (prop)
+            {
+                case "fill": style.Fill = ParseColor(val); return true;
+                case "stroke": style.Stroke = ParseColor(val); return true;
+                case "fill-opacity": style.FillOpacity = Clamp01(D(val)); return true;
+                case "stroke-opacity": style.StrokeOpacity = Clamp01(D(val)); return true;
+                case "opacity": style.Opacity = Clamp01(D(val)); return true;
+                case "stroke-width": style.StrokeWidth = Math.Max(0, D(val)); return true;
+                case "font-family": style.FontFamily = val; return true;
+                case "font-size": style.FontSize = Math.Max(1, D(val)); return true;
+                case "font-weight": style.FontWeight = ParseWeight(val); return true;
+                case "font-style": style.FontStyle = ParseFontStyle(val); return true;
+                default: return false;
             }
         }
 
@@ -284,6 +310,174 @@ namespace SCRemoteControl.Overlay
             return FontStyles.Normal;
         }
 
+        // --- patch ---
+
+        /// <summary>
+        /// Apply one SVG attribute to an already parsed shape, with the same
+        /// semantics as if the attribute had been present in the original document.
+        /// "text" replaces the content of a text element. Throws SvgParseException
+        /// for attributes that cannot be patched on the shape's element type.
+        /// </summary>
+        public static void ApplyAttribute(ParsedShape shape, string name, string value)
+        {
+            if (string.IsNullOrEmpty(name))
+                throw new SvgParseException("attribute name is required");
+            value = value ?? "";
+
+            if (name == "style") { ApplyInlineStyle(value, shape.Style); return; }
+            if (ApplyStyleProperty(shape.Style, name, value)) return;
+
+            switch (shape)
+            {
+                case RectShape r:
+                    switch (name)
+                    {
+                        case "x": r.X = D(value); return;
+                        case "y": r.Y = D(value); return;
+                        case "width": r.Width = D(value); return;
+                        case "height": r.Height = D(value); return;
+                        case "rx": r.Rx = D(value); return;
+                        case "ry": r.Ry = D(value); return;
+                    }
+                    break;
+                case CircleShape c:
+                    switch (name)
+                    {
+                        case "cx": c.Cx = D(value); return;
+                        case "cy": c.Cy = D(value); return;
+                        case "r": c.R = D(value); return;
+                    }
+                    break;
+                case EllipseShape e:
+                    switch (name)
+                    {
+                        case "cx": e.Cx = D(value); return;
+                        case "cy": e.Cy = D(value); return;
+                        case "rx": e.Rx = D(value); return;
+                        case "ry": e.Ry = D(value); return;
+                    }
+                    break;
+                case LineShape l:
+                    switch (name)
+                    {
+                        case "x1": l.X1 = D(value); return;
+                        case "y1": l.Y1 = D(value); return;
+                        case "x2": l.X2 = D(value); return;
+                        case "y2": l.Y2 = D(value); return;
+                    }
+                    break;
+                case PolyShape p:
+                    if (name == "points") { p.Points = ParsePoints(value); return; }
+                    break;
+                case PathShape pa:
+                    if (name == "d") { pa.D = value; return; }
+                    break;
+                case TextShape t:
+                    switch (name)
+                    {
+                        case "x": t.X = D(value); return;
+                        case "y": t.Y = D(value); return;
+                        case "text": t.Text = value; return;
+                    }
+                    break;
+            }
+            throw new SvgParseException("attribute '" + name + "' cannot be patched on shape '" + shape.Id + "'");
+        }
+
+        /// <summary>
+        /// Presentation attributes, which an inline style declaration of the same
+        /// name overrides when the document is parsed.
+        /// </summary>
+        private static readonly HashSet<string> _styleProperties = new HashSet<string>(StringComparer.Ordinal)
+        {
+            "fill", "stroke", "fill-opacity", "stroke-opacity", "opacity", "stroke-width",
+            "font-family", "font-size", "font-weight", "font-style",
+        };
+
+        public static bool IsStyleProperty(string name) => name != null && _styleProperties.Contains(name);
+
+        /// <summary>
+        /// Merge the declarations of <paramref name="patch"/> into an inline style,
+        /// the way ApplyAttribute applies a style patch: declared properties are
+        /// replaced, the others are kept. Returns null when nothing is left.
+        /// </summary>
+        public static string MergeStyle(string style, string patch)
+        {
+            var decls = ParseDeclarations(style);
+            foreach (var kv in ParseDeclarations(patch))
+            {
+                int i = decls.FindIndex(d => d.Key == kv.Key);
+                if (i >= 0) decls[i] = kv;
+                else decls.Add(kv);
+            }
+            return FormatDeclarations(decls);
+        }
+
+        /// <summary>Inline style without one property, or null when nothing is left.</summary>
+        public static string RemoveStyleProperty(string style, string name)
+        {
+            var decls = ParseDeclarations(style);
+            decls.RemoveAll(d => d.Key == name);
+            return FormatDeclarations(decls);
+        }
+
+        private static List<KeyValuePair<string, string>> ParseDeclarations(string style)
+        {
+            var decls = new List<KeyValuePair<string, string>>();
+            if (string.IsNullOrEmpty(style)) return decls;
+            foreach (var decl in style.Split(';'))
+            {
+                var kv = decl.Split(new[] { ':' }, 2);
+                if (kv.Length != 2) continue;
+                decls.Add(new KeyValuePair<string, string>(kv[0].Trim().ToLowerInvariant(), kv[1].Trim()));
+            }
+            return decls;
+        }
+
+        private static string FormatDeclarations(List<KeyValuePair<string, string>> decls)
+        {
+            if (decls.Count == 0) return null;
+            return string.Join(";", decls.Select(d => d.Key + ":" + d.Value));
+        }
+
+        /// <summary>
+        /// Fold accumulated shape patches back into an SVG document so GET returns
+        /// what is actually on screen. A patched presentation attribute drops the
+        /// same property from the inline style, which would otherwise override it
+        /// when the document is parsed again; a style patch is merged declaration
+        /// by declaration. Only called on the read path.
+        /// </summary>
+        public static string MergePatches(string svg, IDictionary<string, Dictionary<string, string>> patches)
+        {
+            if (patches == null || patches.Count == 0) return svg;
+
+            XDocument doc;
+            try { doc = XDocument.Parse(svg); }
+            catch { return svg; }
+
+            var remaining = new Dictionary<string, Dictionary<string, string>>(patches, StringComparer.Ordinal);
+            foreach (var elem in doc.Descendants())
+            {
+                var id = (string)elem.Attribute("id");
+                if (id == null || !remaining.TryGetValue(id, out var attrs)) continue;
+                remaining.Remove(id); // first match wins, same as ParsedOverlay.IndexOf
+                foreach (var kv in attrs)
+                {
+                    if (kv.Key == "text") elem.Value = kv.Value ?? "";
+                    else if (kv.Key == "style") continue; // merged below, after the attributes it overrides
+                    else
+                    {
+                        elem.SetAttributeValue(kv.Key, kv.Value);
+                        if (IsStyleProperty(kv.Key))
+                            elem.SetAttributeValue("style", RemoveStyleProperty((string)elem.Attribute("style"), kv.Key));
+                    }
+                }
+                if (attrs.TryGetValue("style", out var patchStyle))
+                    elem.SetAttributeValue("style", MergeStyle((string)elem.Attribute("style"), patchStyle));
+            }
+            return doc.ToString(SaveOptions.DisableFormatting);
+        }
+
         // --- color ---
 
         private static readonly Regex _rgbRegex = new Regex(@"^rgba?\(\s*([^)]+)\)\s*$", RegexOptions.Compiled | RegexOptions.IgnoreCase);
@@ -312,6 +506,11 @@ namespace SCRemoteControl.Overlay
                 return null;
             }
 
+            // #rrggbb / #aarrggbb directly; ColorConverter builds the same Color.FromArgb
+            // but goes through its generic string parser first.
+            if (s[0] == '#' && (s.Length == 7 || s.Length == 9) && TryParseHexColor(s, out var hex))
+                return hex;
+
             // Expand 3-char hex (#f00) to 6-char (#ff0000); ColorConverter handles
             // #rrggbb and named colors natively.
             if (s.StartsWith("#") && s.Length == 4)
@@ -325,15 +524,39 @@ namespace SCRemoteControl.Overlay
 
         private static byte ToByte(double v) => (byte)Math.Max(0, Math.Min(255, v));
 
+        private static bool TryParseHexColor(string s, out Color color)
+        {
+            color = default(Color);
+            uint value = 0;
+            for (int i = 1; i < s.Length; i++)
+            {
+                int nibble = HexValue(s[i]);
+                if (nibble < 0) return false;
+                value = (value << 4) | (uint)nibble;
+            }
+            if (s.Length == 7) value |= 0xFF000000;
+            color = Color.FromArgb((byte)(value >> 24), (byte)(value >> 16), (byte)(value >> 8), (byte)value);
+            return true;
+        }
+
+        private static int HexValue(char c)
+        {
+            if (c >= '0' && c <= '9') return c - '0';
+            if (c >= 'a' && c <= 'f') return c - 'a' + 10;
+            if (c >= 'A' && c <= 'F') return c - 'A' + 10;
+            return -1;
+        }
+
         // --- transform ---
 
         private static readonly Regex _transformRegex = new Regex(
             @"(matrix|translate|scale|rotate)\s*\(\s*([^)]+)\)",
             RegexOptions.Compiled | RegexOptions.IgnoreCase);
 
-        private static Matrix ReadTransform(XElement elem)
+        private static Matrix ReadTransform(XElement elem) => ParseTransform((string)elem.Attribute("transform"));
+
+        private static Matrix ParseTransform(string t)
         {
-            var t = (string)elem.Attribute("transform");
             if (string.IsNullOrWhiteSpace(t)) return Matrix.Identity;
 
             var result = Matrix.Identity;
@@ -1,6 +1,9 @@
 using System;
+using System.Collections;
 using System.Collections.Generic;
 using System.Linq;
+using System.Net.Http;
+using System.Net.Http.Headers;
 using System.Web.Http;
 using System.Web.Http.Description;
 using SCRemoteControl.Api;
@@ -20,17 +23,64 @@ namespace SCRemoteControl.Server
         /// <summary>List all views with FQID</summary>
         [HttpGet, Route("views")]
         [ResponseType(typeof(List<ItemDto>))]
-        public IHttpActionResult GetViews() => Ok(SmartClientHelper.GetViews());
+        public IHttpActionResult GetViews() => Discovery(DiscoveryCache.Views, SmartClientHelper.GetViews);
 
         /// <summary>List all cameras with FQID</summary>
         [HttpGet, Route("cameras")]
         [ResponseType(typeof(List<ItemDto>))]
-        public IHttpActionResult GetCameras() => Ok(SmartClientHelper.GetCameras());
+        public IHttpActionResult GetCameras() => Discovery(DiscoveryCache.Cameras, SmartClientHelper.GetCameras);
+
+        /// <summary>
+        /// Cameras currently shown in a viewport of this Smart Client. Lets a
+        /// controller driving several clients (a video wall) send each overlay
+        /// only to the clients that display its camera.
+        /// </summary>
+        [HttpGet, Route("cameras/displayed")]
+        [ResponseType(typeof(List<DisplayedCameraDto>))]
+        public IHttpActionResult GetDisplayedCameras() =>
+            Ok(OverlayManager.Instance.GetDisplayedCameras()
+                .Select(kv => new DisplayedCameraDto { CameraId = kv.Key.ToString(), Viewports = kv.Value })
+                .ToList());
 
         /// <summary>List all workspaces with FQID</summary>
         [HttpGet, Route("workspaces")]
         [ResponseType(typeof(List<WorkspaceDto>))]
-        public IHttpActionResult GetWorkspaces() => Ok(SmartClientHelper.GetWorkspaces());
+        public IHttpActionResult GetWorkspaces() => Discovery(DiscoveryCache.Workspaces, SmartClientHelper.GetWorkspaces);
+
+        /// <summary>
+        /// Serve a cached discovery list with a strong ETag; answer 304 Not
+        /// Modified when the client's If-None-Match already names it. gzip
+        /// clients get the entry's cached compressed body (its own ETag variant).
+        /// </summary>
+        private IHttpActionResult Discovery(string key, Func<ICollection> build)
+        {
+            var entry = DiscoveryCache.Instance.Get(key, build, Configuration.Formatters.JsonFormatter.SerializerSettings);
+            bool gzip = entry.Body.Length >= CompressionHandler.MinCompressBytes
+                && CompressionHandler.Negotiate(Request) == CompressionHandler.Gzip;
+            var etag = new EntityTagHeaderValue(gzip ? CompressionHandler.VariantTag(entry.ETag, CompressionHandler.Gzip) : entry.ETag);
+
+            var ifNoneMatch = Request.Headers.IfNoneMatch;
+            if (ifNoneMatch.Any(t => t.Tag == "*" || (!t.IsWeak && CompressionHandler.SameEntity(t.Tag, entry.ETag))))
+            {
+                var notModified = Request.CreateResponse(System.Net.HttpStatusCode.NotModified);
+                notModified.Headers.ETag = etag;
+                notModified.Headers.CacheControl = new CacheControlHeaderValue { NoCache = true };
+                return ResponseMessage(notModified);
+            }
+
+            var response = Request.CreateResponse(System.Net.HttpStatusCode.OK);
+            response.Content = new ByteArrayContent(gzip ? entry.GzipBody : entry.Body);
+            response.Content.Headers.ContentType = new MediaTypeHeaderValue("application/json") { CharSet = "utf-8" };
+            if (gzip)
+            {
+                response.Content.Headers.ContentEncoding.Add(CompressionHandler.Gzip);
+                response.Headers.Vary.Add("Accept-Encoding");
+            }
+            response.Headers.ETag = etag;
+            // no-cache: clients may store the list but must revalidate with If-None-Match.
+            response.Headers.CacheControl = new CacheControlHeaderValue { NoCache = true };
+            return ResponseMessage(response);
+        }
 
         /// <summary>List Smart Client windows</summary>
         [HttpGet, Route("windows")]
@@ -55,6 +105,52 @@ namespace SCRemoteControl.Server
             });
         }
 
+        /// <summary>
+        /// Server-Sent Events stream of state changes: overlay.upserted, overlay.patched,
+        /// overlay.removed, overlay.expired, view.changed, workspace.changed. Replaces
+        /// polling GET /api/overlays, /api/views and /api/windows.
+        /// </summary>
+        [HttpGet, Route("events")]
+        public HttpResponseMessage GetEvents()
+        {
+            var response = Request.CreateResponse(System.Net.HttpStatusCode.OK);
+            response.Content = new PushStreamContent(
+                (stream, content, context) => EventBroadcaster.Instance.StreamAsync(stream),
+                "text/event-stream");
+            response.Headers.CacheControl = new CacheControlHeaderValue { NoCache = true };
+            return response;
+        }
+
+        /// <summary>Internal counters for diagnostics and benchmarks</summary>
+        [HttpGet, Route("metrics")]
+        [ResponseType(typeof(MetricsDto))]
+        public IHttpActionResult GetMetrics()
+        {
+            var draws = OverlayManager.Instance.GetDrawStats();
+            var expiry = OverlayManager.Instance.GetExpiryStats();
+            return Ok(new MetricsDto
+            {
+                CpuTimeMs = (long)System.Diagnostics.Process.GetCurrentProcess().TotalProcessorTime.TotalMilliseconds,
+                EventSubscribers = EventBroadcaster.Instance.SubscriberCount,
+                EventsPublished = EventBroadcaster.Instance.PublishedCount,
+                DiscoveryCacheHits = DiscoveryCache.Instance.Hits,
+                DiscoveryCacheMisses = DiscoveryCache.Instance.Misses,
+                Overlays = new OverlayMetricsDto
+                {
+                    Count = OverlayManager.Instance.List().Count,
+                    Draws = draws.Draws,
+                    SkippedDraws = draws.Skipped,
+                    Passes = draws.Passes,
+                    Expired = expiry.Expired,
+                    PendingExpiries = expiry.Pending,
+                    ExpiryLatenessMeanMs = Math.Round(expiry.LatenessMeanMs, 2),
+                    ExpiryLatenessMaxMs = Math.Round(expiry.LatenessMaxMs, 2),
+                },
+                RouteWindowSeconds = RouteMetrics.WindowSeconds,
+                Routes = RouteMetrics.Instance.Snapshot(),
+            });
+        }
+
         // ── Actions ──
 
         /// <summary>Switch to a view</summary>
@@ -170,6 +266,7 @@ namespace SCRemoteControl.Server
         /// Upsert an SVG overlay on a camera. POSTing the same overlayId replaces the
         /// existing overlay in place. The overlay renders on every viewport currently
         /// showing the camera, and re-applies when the camera is brought back into view.
+        /// Send the shapes either as svg or in the compact binary encoding (binary).
         /// </summary>
         [HttpPost, Route("overlays")]
         [ResponseType(typeof(OverlayUpsertResponse))]
@@ -178,7 +275,9 @@ namespace SCRemoteControl.Server
             if (request == null) return BadRequest("body required");
             if (string.IsNullOrWhiteSpace(request.OverlayId)) return BadRequest("overlayId is required");
             if (string.IsNullOrWhiteSpace(request.CameraId)) return BadRequest("cameraId is required");
-            if (string.IsNullOrWhiteSpace(request.Svg)) return BadRequest("svg is required");
+            bool binary = request.Binary != null && request.Binary.Length > 0;
+            if (binary && !string.IsNullOrEmpty(request.Svg)) return BadRequest("send either svg or binary, not both");
+            if (!binary && string.IsNullOrWhiteSpace(request.Svg)) return BadRequest("svg is required");
 
             if (!Guid.TryParse(request.CameraId, out var cameraGuid) || cameraGuid == Guid.Empty)
                 return BadRequest("cameraId is not a valid GUID");
@@ -190,12 +289,19 @@ namespace SCRemoteControl.Server
 
             try
             {
-                var result = OverlayManager.Instance.Upsert(
-                    request.OverlayId,
-                    cameraGuid,
-                    request.Svg,
-                    request.TtlSeconds,
-                    request.ZOrder ?? 100);
+                var result = binary
+                    ? OverlayManager.Instance.UpsertBinary(
+                        request.OverlayId,
+                        cameraGuid,
+                        request.Binary,
+                        request.TtlSeconds,
+                        request.ZOrder ?? 100)
+                    : OverlayManager.Instance.Upsert(
+                        request.OverlayId,
+                        cameraGuid,
+                        request.Svg,
+                        request.TtlSeconds,
+                        request.ZOrder ?? 100);
 
                 var response = new OverlayUpsertResponse
                 {
@@ -217,12 +323,64 @@ namespace SCRemoteControl.Server
             catch (InvalidOperationException ex) { return Content(System.Net.HttpStatusCode.Conflict, new { error = ex.Message }); }
         }
 
-        /// <summary>List active overlays</summary>
+        /// <summary>
+        /// Patch individual shapes of an existing overlay. Shapes are addressed by
+        /// the id attribute they carried in the posted SVG; only the listed
+        /// attributes change (geometry such as x/y/points/d, style such as fill,
+        /// and "text" for text content). Much cheaper than re-posting the full SVG
+        /// for live meters where only a needle or a number moves.
+        /// </summary>
+        [HttpPatch, Route("overlays/{id}")]
+        [ResponseType(typeof(OverlayUpsertResponse))]
+        public IHttpActionResult PatchOverlay(string id, PatchOverlayRequest request)
+        {
+            if (request?.Shapes == null || request.Shapes.Count == 0) return BadRequest("shapes is required");
+
+            var patches = request.Shapes.Select(s => new ShapePatch
+            {
+                ShapeId = s?.Id,
+                Attributes = s?.Attributes,
+            }).ToList();
+
+            try
+            {
+                var result = OverlayManager.Instance.Patch(id, patches, request.TtlSeconds);
+                if (result == null) return NotFound();
+
+                var rec = OverlayManager.Instance.Get(id);
+                var response = new OverlayUpsertResponse
+                {
+                    OverlayId = id,
+                    CameraId = rec?.CameraId.ToString(),
+                    ShapeCount = result.ShapeCount,
+                    ZOrder = rec?.ZOrder ?? 100,
+                    ExpiresAt = result.ExpiresAt,
+                    Replaced = true,
+                    Displayed = result.Displayed,
+                };
+                if (!result.Displayed)
+                    response.Warning = "camera is not currently displayed in any viewport, overlay queued";
+                return Ok(response);
+            }
+            catch (SvgParseException ex) { return BadRequest("patch failed: " + ex.Message); }
+            catch (ArgumentException ex) { return BadRequest(ex.Message); }
+        }
+
+        /// <summary>List active overlays. Pass cameraId to list only that camera's overlays.</summary>
         [HttpGet, Route("overlays")]
         [ResponseType(typeof(List<OverlayDto>))]
-        public IHttpActionResult ListOverlays()
+        public IHttpActionResult ListOverlays([FromUri] string cameraId = null)
         {
-            var list = OverlayManager.Instance.List();
+            List<OverlayRecord> list;
+            if (!string.IsNullOrWhiteSpace(cameraId))
+            {
+                if (!Guid.TryParse(cameraId, out var guid)) return BadRequest("cameraId is not a valid GUID");
+                list = OverlayManager.Instance.ListByCamera(guid);
+            }
+            else
+            {
+                list = OverlayManager.Instance.List();
+            }
             var dtos = list.Select(r => new OverlayDto
             {
                 OverlayId = r.OverlayId,
@@ -235,7 +393,7 @@ namespace SCRemoteControl.Server
             return Ok(dtos);
         }
 
-        /// <summary>Get one overlay including the original SVG body</summary>
+        /// <summary>Get one overlay including the SVG body (with any shape patches applied). Binary overlays have no body.</summary>
         [HttpGet, Route("overlays/{id}")]
         [ResponseType(typeof(OverlayDetailDto))]
         public IHttpActionResult GetOverlay(string id)
@@ -250,7 +408,8 @@ namespace SCRemoteControl.Server
                 ExpiresAt = r.ExpiresAt,
                 ShapeCount = r.Parsed?.Shapes.Count ?? 0,
                 Displayed = OverlayManager.Instance.AnyAddOnShowsCamera(r.CameraId),
-                Svg = r.Svg,
+                Svg = r.Svg == null ? null : SvgParser.MergePatches(r.Svg, r.Patches),
+                Format = r.Svg == null ? "binary" : "svg",
             });
         }
 
@@ -378,6 +537,14 @@ namespace SCRemoteControl.Server
         public string Path { get; set; }
     }
 
+    public class DisplayedCameraDto
+    {
+        /// <summary>Camera FQID, as in GET /api/cameras</summary>
+        public string CameraId { get; set; }
+        /// <summary>Viewports currently showing the camera</summary>
+        public int Viewports { get; set; }
+    }
+
     public class WorkspaceDto
     {
         public string Id { get; set; }
@@ -399,6 +566,67 @@ namespace SCRemoteControl.Server
         public string Version { get; set; }
     }
 
+    public class MetricsDto
+    {
+        /// <summary>Total CPU time used by the Smart Client process</summary>
+        public long CpuTimeMs { get; set; }
+        /// <summary>Clients connected to GET /api/events</summary>
+        public int EventSubscribers { get; set; }
+        /// <summary>Events published since the Smart Client started</summary>
+        public long EventsPublished { get; set; }
+        /// <summary>Discovery requests (cameras, views, workspaces) served from the cache</summary>
+        public long DiscoveryCacheHits { get; set; }
+        /// <summary>Discovery requests that rebuilt the list from the configuration</summary>
+        public long DiscoveryCacheMisses { get; set; }
+        public OverlayMetricsDto Overlays { get; set; }
+        /// <summary>Length of the rolling window the route figures cover</summary>
+        public int RouteWindowSeconds { get; set; }
+        /// <summary>Per-route latency over the last RouteWindowSeconds, busiest first</summary>
+        public List<RouteMetricsDto> Routes { get; set; }
+    }
+
+    public class OverlayMetricsDto
+    {
+        /// <summary>Registered overlays</summary>
+        public int Count { get; set; }
+        /// <summary>Overlay redraws (ShapesOverlayAdd/Update calls) since the Smart Client started</summary>
+        public long Draws { get; set; }
+        /// <summary>Overlay/viewport pairs skipped because neither the overlay nor the viewport size changed</summary>
+        public long SkippedDraws { get; set; }
+        /// <summary>Redraw passes (timer ticks plus passes triggered by upserts and view changes)</summary>
+        public long Passes { get; set; }
+        /// <summary>Overlays removed by ttlSeconds since the Smart Client started</summary>
+        public long Expired { get; set; }
+        /// <summary>Entries in the expiry queue (may include superseded ones)</summary>
+        public int PendingExpiries { get; set; }
+        /// <summary>Mean time between an overlay's expiresAt and its removal</summary>
+        public double ExpiryLatenessMeanMs { get; set; }
+        /// <summary>Worst time between an overlay's expiresAt and its removal</summary>
+        public double ExpiryLatenessMaxMs { get; set; }
+    }
+
+    public class RouteMetricsDto
+    {
+        /// <summary>Method and route template, e.g. "POST api/overlays"; "(unrouted)" for requests that matched no action</summary>
+        public string Route { get; set; }
+        /// <summary>Requests in the window</summary>
+        public long Count { get; set; }
+        /// <summary>Requests answered with a 4xx status</summary>
+        public long Rejected { get; set; }
+        /// <summary>Requests answered with a 5xx status</summary>
+        public long Errors { get; set; }
+        /// <summary>Median server time (histogram bucket bound, up to 25% high)</summary>
+        public double P50Ms { get; set; }
+        /// <summary>95th percentile server time</summary>
+        public double P95Ms { get; set; }
+        /// <summary>99th percentile server time</summary>
+        public double P99Ms { get; set; }
+        /// <summary>Slowest request in the window</summary>
+        public double MaxMs { get; set; }
+        /// <summary>Mean milliseconds per request for each Server-Timing phase (auth, bind, action, parse, lock, dispatch)</summary>
+        public Dictionary<string, double> PhaseMeanMs { get; set; }
+    }
+
     // ── Overlay DTOs ──
 
     /// <summary>Upsert request body. Same overlayId replaces an existing overlay in place.</summary>
@@ -419,6 +647,12 @@ namespace SCRemoteControl.Server
         /// </summary>
         public string Svg { get; set; }
 
+        /// <summary>
+        /// Alternative to svg: the shapes in the compact binary overlay encoding,
+        /// base64 in JSON. Decoded straight into shapes without XML parsing.
+        /// </summary>
+        public byte[] Binary { get; set; }
+
         /// <summary>Optional expiry in seconds. Omit or 0 for "persist until DELETE".</summary>
         public int? TtlSeconds { get; set; }
 
@@ -426,6 +660,28 @@ namespace SCRemoteControl.Server
         public int? ZOrder { get; set; }
     }
 
+    /// <summary>Patch request body. Changes attributes of shapes addressed by their SVG id.</summary>
+    public class PatchOverlayRequest
+    {
+        /// <summary>Shapes to change. Each id must match an id attribute in the posted SVG.</summary>
+        public List<ShapePatchDto> Shapes { get; set; }
+
+        /// <summary>Optional new expiry in seconds, counted from now. Omit to keep the current expiry, 0 to persist.</summary>
+        public int? TtlSeconds { get; set; }
+    }
+
+    public class ShapePatchDto
+    {
+        /// <summary>SVG id of the shape, e.g. "needle"</summary>
+        public string Id { get; set; }
+
+        /// <summary>
+        /// Attribute name to new value, e.g. { "x2": "412.5", "fill": "#22c55e" }.
+        /// Use "text" to replace the content of a text element.
+        /// </summary>
+        public Dictionary<string, string> Attributes { get; set; }
+    }
+
     public class OverlayUpsertResponse
     {
         public string OverlayId { get; set; }
@@ -453,7 +709,10 @@ namespace SCRemoteControl.Server
 
     public class OverlayDetailDto : OverlayDto
     {
-        /// <summary>Original SVG document as posted.</summary>
+        /// <summary>SVG document as posted, with any later shape patches folded in. Absent for binary overlays.</summary>
         public string Svg { get; set; }
+
+        /// <summary>Encoding the overlay was posted in: "svg" or "binary"</summary>
+        public string Format { get; set; }
     }
 }
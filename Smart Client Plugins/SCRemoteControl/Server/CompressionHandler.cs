@@ -0,0 +1,233 @@
+using System;
+using System.Diagnostics;
+using System.IO;
+using System.IO.Compression;
+using System.Linq;
+using System.Net;
+using System.Net.Http;
+using System.Net.Http.Headers;
+using System.Threading;
+using System.Threading.Tasks;
+
+namespace SCRemoteControl.Server
+{
+    /// <summary>
+    /// Content-Encoding for API bodies. Request bodies sent with
+    /// Content-Encoding gzip or deflate are inflated before model binding
+    /// (415 for any other encoding, 413 past MaxInflatedBytes). Responses of
+    /// MinCompressBytes or more are compressed with gzip or deflate when the
+    /// client's Accept-Encoding allows it. The event stream and responses that
+    /// already carry a Content-Encoding (cached discovery lists) pass through.
+    /// </summary>
+    class CompressionHandler : DelegatingHandler
+    {
+        public const string Gzip = "gzip";
+        public const string Deflate = "deflate";
+
+        /// <summary>Smaller bodies fit in a packet or two; compressing them costs more than it saves.</summary>
+        public const int MinCompressBytes = 1024;
+
+        /// <summary>Cap on an inflated request body, so a small compressed upload cannot expand without bound.</summary>
+        public const int MaxInflatedBytes = 8 * 1024 * 1024;
+
+        protected override async Task<HttpResponseMessage> SendAsync(HttpRequestMessage request, CancellationToken cancellationToken)
+        {
+            if (request.Content != null && request.Content.Headers.ContentEncoding.Count > 0)
+            {
+                var rejected = await InflateRequest(request);
+                if (rejected != null) return rejected;
+            }
+
+            var response = await base.SendAsync(request, cancellationToken);
+            await CompressResponse(request, response);
+            return response;
+        }
+
+        /// <summary>
+        /// Pick the response encoding from Accept-Encoding: gzip or deflate,
+        /// whichever has the higher q-value (gzip on a tie), or null for identity.
+        /// </summary>
+        public static string Negotiate(HttpRequestMessage request)
+        {
+            double? gzip = null, deflate = null, any = null;
+            foreach (var value in request.Headers.AcceptEncoding)
+            {
+                double q = value.Quality ?? 1.0;
+                if (string.Equals(value.Value, Gzip, StringComparison.OrdinalIgnoreCase)) gzip = q;
+                else if (string.Equals(value.Value, Deflate, StringComparison.OrdinalIgnoreCase)) deflate = q;
+                else if (value.Value == "*") any = q;
+            }
+
+            double g = gzip ?? any ?? 0, d = deflate ?? any ?? 0;
+            if (g > 0 && g >= d) return Gzip;
+            if (d > 0) return Deflate;
+            return null;
+        }
+
+        /// <summary>
+        /// Strong ETag of an encoded variant. A compressed body is a different
+        /// representation, so it must not reuse the identity body's strong tag.
+        /// </summary>
+        public static string VariantTag(string etag, string encoding) => etag.Substring(0, etag.Length - 1) + "-" + encoding + "\"";
+
+        /// <summary>True when tag names etag or one of its encoded variants.</summary>
+        public static bool SameEntity(string tag, string etag) =>
+            tag == etag || tag == VariantTag(etag, Gzip) || tag == VariantTag(etag, Deflate);
+
+        /// <summary>
+        /// Compress body with the given encoding at the fastest level. deflate
+        /// is written as RFC 1950 zlib data (header, raw deflate, Adler-32), which
+        /// is what HTTP clients expect; DeflateStream alone writes raw deflate.
+        /// </summary>
+        public static byte[] Compress(byte[] body, string encoding)
+        {
+            using (var output = new MemoryStream(body.Length / 4 + 64))
+            {
+                bool zlib = encoding == Deflate;
+                if (zlib)
+                {
+                    output.WriteByte(0x78); // 32 KB window, deflate
+                    output.WriteByte(0x01); // fastest level, header checksum
+                }
+                using (var z = zlib
+                    ? (Stream)new DeflateStream(output, CompressionLevel.Fastest, true)
+                    : new GZipStream(output, CompressionLevel.Fastest, true))
+                {
+                    z.Write(body, 0, body.Length);
+                }
+                if (zlib)
+                {
+                    uint adler = Adler32(body);
+                    output.WriteByte((byte)(adler >> 24));
+                    output.WriteByte((byte)(adler >> 16));
+                    output.WriteByte((byte)(adler >> 8));
+                    output.WriteByte((byte)adler);
+                }
+                return output.ToArray();
+            }
+        }
+
+        private static async Task<HttpResponseMessage> InflateRequest(HttpRequestMessage request)
+        {
+            var content = request.Content;
+            var encodings = content.Headers.ContentEncoding.ToList();
+            var encoding = encodings.Count == 1 ? encodings[0].ToLowerInvariant() : null;
+            if (encoding != Gzip && encoding != Deflate)
+            {
+                return request.CreateResponse(HttpStatusCode.UnsupportedMediaType,
+                    new { error = "Unsupported Content-Encoding '" + string.Join(", ", encodings) + "'. Use gzip or deflate." });
+            }
+
+            long start = Stopwatch.GetTimestamp();
+            var compressed = await content.ReadAsByteArrayAsync();
+            byte[] body;
+            try
+            {
+                body = Inflate(compressed, encoding);
+            }
+            catch (InvalidDataException)
+            {
+                return request.CreateResponse(HttpStatusCode.BadRequest,
+                    new { error = "Request body is not valid " + encoding + " data." });
+            }
+            if (body == null)
+            {
+                return request.CreateResponse(HttpStatusCode.RequestEntityTooLarge,
+                    new { error = "Request body inflates past " + MaxInflatedBytes + " bytes." });
+            }
+
+            var inflated = new ByteArrayContent(body);
+            foreach (var header in content.Headers)
+            {
+                if (header.Key.Equals("Content-Encoding", StringComparison.OrdinalIgnoreCase)
+                    || header.Key.Equals("Content-Length", StringComparison.OrdinalIgnoreCase))
+                    continue;
+                inflated.Headers.TryAddWithoutValidation(header.Key, header.Value);
+            }
+            request.Content = inflated;
+            content.Dispose();
+            RequestTiming.Add(RequestTiming.Inflate, start);
+            return null;
+        }
+
+        // Returns null when the body inflates past MaxInflatedBytes.
+        private static byte[] Inflate(byte[] data, string encoding)
+        {
+            // Most clients send deflate as zlib data; DeflateStream wants the raw
+            // stream, so skip the 2-byte header (the Adler-32 trailer is ignored).
+            int offset = encoding == Deflate && IsZlibHeader(data) ? 2 : 0;
+            using (var input = new MemoryStream(data, offset, data.Length - offset))
+            using (var z = encoding == Gzip
+                ? (Stream)new GZipStream(input, CompressionMode.Decompress)
+                : new DeflateStream(input, CompressionMode.Decompress))
+            using (var output = new MemoryStream())
+            {
+                var buffer = new byte[16384];
+                int n;
+                while ((n = z.Read(buffer, 0, buffer.Length)) > 0)
+                {
+                    if (output.Length + n > MaxInflatedBytes) return null;
+                    output.Write(buffer, 0, n);
+                }
+                return output.ToArray();
+            }
+        }
+
+        private static async Task CompressResponse(HttpRequestMessage request, HttpResponseMessage response)
+        {
+            var content = response.Content;
+            if (content == null || content.Headers.ContentEncoding.Count > 0) return;
+            // PushStreamContent for /api/events never completes; buffering it would hang the stream.
+            if (content.Headers.ContentType?.MediaType == "text/event-stream") return;
+
+            var body = await content.ReadAsByteArrayAsync();
+            if (body.Length < MinCompressBytes) return;
+            response.Headers.Vary.Add("Accept-Encoding");
+
+            var encoding = Negotiate(request);
+            if (encoding == null) return;
+
+            long start = Stopwatch.GetTimestamp();
+            var compressed = Compress(body, encoding);
+            if (compressed.Length < body.Length)
+            {
+                var encoded = new ByteArrayContent(compressed);
+                foreach (var header in content.Headers)
+                {
+                    if (!header.Key.Equals("Content-Length", StringComparison.OrdinalIgnoreCase))
+                        encoded.Headers.TryAddWithoutValidation(header.Key, header.Value);
+                }
+                encoded.Headers.ContentEncoding.Add(encoding);
+                response.Content = encoded;
+                content.Dispose();
+
+                var etag = response.Headers.ETag;
+                if (etag != null && !etag.IsWeak)
+                    response.Headers.ETag = new EntityTagHeaderValue(VariantTag(etag.Tag, encoding));
+            }
+            RequestTiming.Add(RequestTiming.Compress, start);
+        }
+
+        private static bool IsZlibHeader(byte[] data) =>
+            data.Length >= 2 && (data[0] & 0x0F) == 8 && ((data[0] << 8) | data[1]) % 31 == 0;
+
+        private static uint Adler32(byte[] data)
+        {
+            const uint Mod = 65521;
+            const int Block = 5552; // largest n with no uint overflow before the modulo
+            uint a = 1, b = 0;
+            for (int i = 0; i < data.Length;)
+            {
+                int end = Math.Min(data.Length, i + Block);
+                for (; i < end; i++)
+                {
+                    a += data[i];
+                    b += a;
+                }
+                a %= Mod;
+                b %= Mod;
+            }
+            return (b << 16) | a;
+        }
+    }
+}
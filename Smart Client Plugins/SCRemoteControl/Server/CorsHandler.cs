@@ -32,8 +32,9 @@ namespace SCRemoteControl.Server
             if (origin != null && IsAllowedOrigin(origin))
             {
                 response.Headers.Add("Access-Control-Allow-Origin", origin);
-                response.Headers.Add("Access-Control-Allow-Methods", "GET, POST, OPTIONS");
-                response.Headers.Add("Access-Control-Allow-Headers", "Authorization, Content-Type");
+                response.Headers.Add("Access-Control-Allow-Methods", "GET, POST, PATCH, DELETE, OPTIONS");
+                response.Headers.Add("Access-Control-Allow-Headers", "Authorization, Content-Type, Content-Encoding, If-None-Match");
+                response.Headers.Add("Access-Control-Expose-Headers", "ETag, Server-Timing");
                 response.Headers.Add("Vary", "Origin");
             }
         }
@@ -0,0 +1,283 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.IO;
+using System.Text;
+using System.Threading;
+using System.Threading.Tasks;
+using Newtonsoft.Json;
+using Newtonsoft.Json.Serialization;
+using SCRemoteControl.Overlay;
+using VideoOS.Platform;
+using VideoOS.Platform.Messaging;
+
+namespace SCRemoteControl.Server
+{
+    /// <summary>
+    /// Pushes state changes to clients connected to GET /api/events as a
+    /// Server-Sent Events stream: overlay upserts/patches/removals/expiry from
+    /// OverlayManager and view/workspace switches from Smart Client messages.
+    /// Each event is serialized once and queued per subscriber; a subscriber
+    /// that falls too far behind gets an "overflow" event and is disconnected
+    /// so it can resync with the GET endpoints instead of stalling the others.
+    /// </summary>
+    class EventBroadcaster
+    {
+        private static readonly TimeSpan KeepAliveInterval = TimeSpan.FromSeconds(15);
+
+        private static readonly Lazy<EventBroadcaster> _instance = new Lazy<EventBroadcaster>(() => new EventBroadcaster());
+        public static EventBroadcaster Instance => _instance.Value;
+
+        private static readonly JsonSerializerSettings JsonSettings = new JsonSerializerSettings
+        {
+            ContractResolver = new CamelCasePropertyNamesContractResolver(),
+            NullValueHandling = NullValueHandling.Ignore
+        };
+
+        private readonly object _lock = new object();
+        private readonly List<EventSubscriber> _subscribers = new List<EventSubscriber>();
+        private long _nextEventId;
+        private long _published;
+
+        private object _viewReceiver;
+        private object _workspaceReceiver;
+        private bool _started;
+
+        public int SubscriberCount { get { lock (_lock) return _subscribers.Count; } }
+        public long PublishedCount => Interlocked.Read(ref _published);
+
+        public void Start()
+        {
+            if (_started) return;
+            _started = true;
+
+            OverlayManager.Instance.OverlayChanged += OnOverlayChanged;
+            try
+            {
+                _viewReceiver = EnvironmentManager.Instance.RegisterReceiver(
+                    OnViewChanged,
+                    new MessageIdFilter(MessageId.SmartClient.SelectedViewChangedIndication));
+                _workspaceReceiver = EnvironmentManager.Instance.RegisterReceiver(
+                    OnWorkspaceChanged,
+                    new MessageIdFilter(MessageId.SmartClient.ShownWorkSpaceChangedIndication));
+            }
+            catch (Exception ex)
+            {
+                SCRemoteControlDefinition.Log.Error("EventBroadcaster: failed to register message receivers", ex);
+            }
+        }
+
+        public void Stop()
+        {
+            if (!_started) return;
+            _started = false;
+
+            OverlayManager.Instance.OverlayChanged -= OnOverlayChanged;
+            if (_viewReceiver != null)
+            {
+                try { EnvironmentManager.Instance.UnRegisterReceiver(_viewReceiver); } catch { }
+                _viewReceiver = null;
+            }
+            if (_workspaceReceiver != null)
+            {
+                try { EnvironmentManager.Instance.UnRegisterReceiver(_workspaceReceiver); } catch { }
+                _workspaceReceiver = null;
+            }
+
+            lock (_lock)
+            {
+                foreach (var sub in _subscribers) sub.Close();
+                _subscribers.Clear();
+            }
+        }
+
+        // --- Publishing ---
+
+        public void Publish(string eventType, object data)
+        {
+            lock (_lock)
+            {
+                // Skip serialization entirely when nobody listens.
+                if (_subscribers.Count == 0) return;
+            }
+
+            var id = Interlocked.Increment(ref _nextEventId);
+            var frame = "id: " + id + "\nevent: " + eventType + "\ndata: "
+                + JsonConvert.SerializeObject(data, JsonSettings) + "\n\n";
+            Interlocked.Increment(ref _published);
+
+            lock (_lock)
+            {
+                foreach (var sub in _subscribers) sub.Enqueue(frame);
+            }
+        }
+
+        private void OnOverlayChanged(object sender, OverlayChangedEventArgs e)
+        {
+            var rec = e.Record;
+            switch (e.Change)
+            {
+                case OverlayChange.Upserted:
+                case OverlayChange.Patched:
+                    Publish(e.Change == OverlayChange.Upserted ? "overlay.upserted" : "overlay.patched", new
+                    {
+                        overlayId = rec.OverlayId,
+                        cameraId = rec.CameraId.ToString(),
+                        version = rec.Version,
+                        shapeCount = rec.Parsed?.Shapes.Count ?? 0,
+                        expiresAt = rec.ExpiresAt,
+                        at = DateTime.UtcNow,
+                    });
+                    break;
+                case OverlayChange.Removed:
+                case OverlayChange.Expired:
+                    Publish(e.Change == OverlayChange.Removed ? "overlay.removed" : "overlay.expired", new
+                    {
+                        overlayId = rec.OverlayId,
+                        cameraId = rec.CameraId.ToString(),
+                        at = DateTime.UtcNow,
+                    });
+                    break;
+            }
+        }
+
+        private object OnViewChanged(Message message, FQID destination, FQID sender)
+        {
+            try
+            {
+                var item = message.Data as Item;
+                Publish("view.changed", new
+                {
+                    viewId = item?.FQID?.ObjectId.ToString(),
+                    name = item?.Name,
+                    at = DateTime.UtcNow,
+                });
+            }
+            catch (Exception ex)
+            {
+                SCRemoteControlDefinition.Log.Error("EventBroadcaster: view change publish failed", ex);
+            }
+            return null;
+        }
+
+        private object OnWorkspaceChanged(Message message, FQID destination, FQID sender)
+        {
+            try
+            {
+                var item = message.Data as Item;
+                Publish("workspace.changed", new
+                {
+                    workspaceId = item?.FQID?.ObjectId.ToString(),
+                    name = item?.Name ?? message.Data?.ToString(),
+                    at = DateTime.UtcNow,
+                });
+            }
+            catch (Exception ex)
+            {
+                SCRemoteControlDefinition.Log.Error("EventBroadcaster: workspace change publish failed", ex);
+            }
+            return null;
+        }
+
+        // --- Streaming ---
+
+        /// <summary>
+        /// Write events to one connected client until it disconnects or the
+        /// broadcaster stops. Runs on the PushStreamContent callback.
+        /// </summary>
+        public async Task StreamAsync(Stream stream)
+        {
+            var sub = new EventSubscriber();
+            lock (_lock) { _subscribers.Add(sub); }
+            SCRemoteControlDefinition.Log.Info("Event stream client connected (" + SubscriberCount + " total)");
+
+            try
+            {
+                // retry: tells EventSource-style clients how long to wait before reconnecting.
+                await WriteAsync(stream, "retry: 3000\n: connected\n\n");
+
+                var batch = new StringBuilder();
+                while (!sub.Closed)
+                {
+                    bool signaled = await sub.Signal.WaitAsync(KeepAliveInterval);
+                    if (sub.Closed) break;
+
+                    if (!signaled)
+                    {
+                        // Comment frame: keeps proxies from timing out and surfaces dead
+                        // connections as a write failure.
+                        await WriteAsync(stream, ": keepalive\n\n");
+                        continue;
+                    }
+
+                    batch.Clear();
+                    while (sub.Queue.TryDequeue(out var frame)) batch.Append(frame);
+                    if (sub.Overflowed)
+                    {
+                        batch.Append("event: overflow\ndata: {}\n\n");
+                        await WriteAsync(stream, batch.ToString());
+                        break;
+                    }
+                    if (batch.Length > 0) await WriteAsync(stream, batch.ToString());
+                }
+            }
+            catch (Exception ex) when (ex is IOException || ex is ObjectDisposedException || ex is InvalidOperationException)
+            {
+                // Client went away.
+            }
+            finally
+            {
+                lock (_lock) { _subscribers.Remove(sub); }
+                sub.Close();
+                try { stream.Close(); } catch { }
+                SCRemoteControlDefinition.Log.Info("Event stream client disconnected");
+            }
+        }
+
+        private static async Task WriteAsync(Stream stream, string text)
+        {
+            var bytes = Encoding.UTF8.GetBytes(text);
+            await stream.WriteAsync(bytes, 0, bytes.Length);
+            await stream.FlushAsync();
+        }
+    }
+
+    class EventSubscriber
+    {
+        private const int MaxQueued = 1000;
+
+        public readonly ConcurrentQueue<string> Queue = new ConcurrentQueue<string>();
+        public readonly SemaphoreSlim Signal = new SemaphoreSlim(0);
+        public volatile bool Overflowed;
+        public volatile bool Closed;
+
+        public void Enqueue(string frame)
+        {
+            if (Closed || Overflowed) return;
+            if (Queue.Count >= MaxQueued)
+            {
+                Overflowed = true;
+            }
+            else
+            {
+                Queue.Enqueue(frame);
+            }
+            Release();
+        }
+
+        public void Close()
+        {
+            Closed = true;
+            Release();
+        }
+
+        private void Release()
+        {
+            // Keep the semaphore count at most 1; the writer drains the whole queue per wake-up.
+            if (Signal.CurrentCount == 0)
+            {
+                try { Signal.Release(); } catch (SemaphoreFullException) { }
+            }
+        }
+    }
+}
@@ -100,8 +100,11 @@ namespace SCRemoteControl.Server
             });
 
             config.MapHttpAttributeRoutes();
+            config.Filters.Add(new TimingFilter());
+            config.MessageHandlers.Add(new TimingHandler()); // outermost: Server-Timing covers the other handlers
             config.MessageHandlers.Add(new CorsHandler());
             config.MessageHandlers.Add(new TokenAuthHandler());
+            config.MessageHandlers.Add(new CompressionHandler()); // after auth: no inflating unauthenticated uploads
 
             // Swagger spec auto-generation at /swagger/docs/v1
             config.EnableSwagger(c =>
@@ -0,0 +1,167 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Globalization;
+using System.Net.Http;
+using System.Text;
+using System.Threading;
+using System.Threading.Tasks;
+using System.Web.Http.Controllers;
+using System.Web.Http.Filters;
+
+namespace SCRemoteControl.Server
+{
+    /// <summary>
+    /// Phase timings for the request being handled on the current async flow.
+    /// TimingHandler creates one per request; code on the request path adds
+    /// phases with <c>RequestTiming.Add(phase, Stopwatch.GetTimestamp() taken
+    /// at the start)</c>, which is a no-op outside a request (timer callbacks,
+    /// UI thread). Phases with the same name are summed. Reported phases:
+    /// <list type="bullet">
+    /// <item>auth: token check in TokenAuthHandler</item>
+    /// <item>bind: routing, controller selection and JSON body binding (includes inflate)</item>
+    /// <item>action: the controller action, including the phases below</item>
+    /// <item>parse: SvgParser.Parse / BinaryOverlay.Decode</item>
+    /// <item>lock: waiting for the OverlayManager registry lock</item>
+    /// <item>dispatch: queueing work on the WPF dispatcher</item>
+    /// <item>inflate / compress: request and response Content-Encoding</item>
+    /// </list>
+    /// </summary>
+    class RequestTiming
+    {
+        public const string Auth = "auth";
+        public const string Bind = "bind";
+        public const string Action = "action";
+        public const string Parse = "parse";
+        public const string Lock = "lock";
+        public const string Dispatch = "dispatch";
+        public const string Inflate = "inflate";
+        public const string Compress = "compress";
+
+        private static readonly AsyncLocal<RequestTiming> _current = new AsyncLocal<RequestTiming>();
+        private static readonly double MsPerTick = 1000.0 / Stopwatch.Frequency;
+
+        public static RequestTiming Current
+        {
+            get => _current.Value;
+            set => _current.Value = value;
+        }
+
+        private readonly List<KeyValuePair<string, long>> _phases = new List<KeyValuePair<string, long>>(6);
+
+        public long StartedAt { get; } = Stopwatch.GetTimestamp();
+
+        /// <summary>End of the auth phase, start of bind. Set by TokenAuthHandler.</summary>
+        public long AuthenticatedAt { get; set; }
+
+        /// <summary>"METHOD template" of the matched action, null until routing picks one.</summary>
+        public string Route { get; set; }
+
+        /// <summary>Add the time since startTimestamp to phase on the current request, if any.</summary>
+        public static void Add(string phase, long startTimestamp)
+        {
+            Current?.AddTicks(phase, Stopwatch.GetTimestamp() - startTimestamp);
+        }
+
+        public void AddTicks(string phase, long ticks)
+        {
+            lock (_phases)
+            {
+                for (int i = 0; i < _phases.Count; i++)
+                {
+                    if (_phases[i].Key == phase)
+                    {
+                        _phases[i] = new KeyValuePair<string, long>(phase, _phases[i].Value + ticks);
+                        return;
+                    }
+                }
+                _phases.Add(new KeyValuePair<string, long>(phase, ticks));
+            }
+        }
+
+        public static double ToMs(long ticks) => ticks * MsPerTick;
+
+        /// <summary>Recorded phases in milliseconds, in the order they were first added.</summary>
+        public List<KeyValuePair<string, double>> Phases()
+        {
+            lock (_phases)
+            {
+                var result = new List<KeyValuePair<string, double>>(_phases.Count);
+                foreach (var p in _phases)
+                    result.Add(new KeyValuePair<string, double>(p.Key, ToMs(p.Value)));
+                return result;
+            }
+        }
+
+        /// <summary>Server-Timing header value; the route rides on the total metric's desc.</summary>
+        public static string Format(List<KeyValuePair<string, double>> phases, double totalMs, string route)
+        {
+            var sb = new StringBuilder();
+            foreach (var p in phases)
+                sb.Append(p.Key).Append(";dur=").Append(p.Value.ToString("0.###", CultureInfo.InvariantCulture)).Append(", ");
+            sb.Append("total;dur=").Append(totalMs.ToString("0.###", CultureInfo.InvariantCulture));
+            sb.Append(";desc=\"").Append(route.Replace("\"", "")).Append('"');
+            return sb.ToString();
+        }
+    }
+
+    /// <summary>
+    /// Outermost message handler: starts the per-request RequestTiming, adds the
+    /// Server-Timing response header and feeds RouteMetrics. Total covers the
+    /// Web API pipeline up to the response message; writing the body to the
+    /// socket happens later in the OWIN host and is not included.
+    /// </summary>
+    class TimingHandler : DelegatingHandler
+    {
+        protected override async Task<HttpResponseMessage> SendAsync(HttpRequestMessage request, CancellationToken cancellationToken)
+        {
+            var timing = new RequestTiming();
+            RequestTiming.Current = timing;
+
+            var response = await base.SendAsync(request, cancellationToken);
+
+            double totalMs = RequestTiming.ToMs(Stopwatch.GetTimestamp() - timing.StartedAt);
+            var route = timing.Route ?? request.Method.Method + " " + RouteOf(request);
+            var phases = timing.Phases();
+            response.Headers.TryAddWithoutValidation("Server-Timing", RequestTiming.Format(phases, totalMs, route));
+            RouteMetrics.Instance.Record(route, (int)response.StatusCode, totalMs, phases);
+            return response;
+        }
+
+        // Requests that never reached an action (401, 404, 405, swagger docs).
+        // Keyed by route template, not path, so unknown URLs share one row.
+        private static string RouteOf(HttpRequestMessage request)
+        {
+            var template = request.GetRouteData()?.Route?.RouteTemplate;
+            return string.IsNullOrEmpty(template) ? "(unrouted)" : template;
+        }
+    }
+
+    /// <summary>
+    /// Global action filter: closes the bind phase when the action starts,
+    /// times the action itself and names the route for TimingHandler.
+    /// </summary>
+    class TimingFilter : ActionFilterAttribute
+    {
+        private const string ActionStartKey = "SCRemoteControl.ActionStart";
+
+        public override void OnActionExecuting(HttpActionContext actionContext)
+        {
+            var timing = RequestTiming.Current;
+            if (timing == null) return;
+
+            long now = Stopwatch.GetTimestamp();
+            timing.AddTicks(RequestTiming.Bind, now - (timing.AuthenticatedAt != 0 ? timing.AuthenticatedAt : timing.StartedAt));
+            timing.Route = actionContext.Request.Method.Method + " "
+                + (actionContext.ControllerContext.RouteData?.Route?.RouteTemplate ?? actionContext.ActionDescriptor.ActionName);
+            actionContext.Request.Properties[ActionStartKey] = now;
+        }
+
+        public override void OnActionExecuted(HttpActionExecutedContext actionExecutedContext)
+        {
+            var timing = RequestTiming.Current;
+            if (timing != null && actionExecutedContext.Request.Properties.TryGetValue(ActionStartKey, out var start))
+                timing.AddTicks(RequestTiming.Action, Stopwatch.GetTimestamp() - (long)start);
+        }
+    }
+}
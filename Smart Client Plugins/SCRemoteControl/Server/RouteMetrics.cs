@@ -0,0 +1,142 @@
+using System;
+using System.Collections.Generic;
+using System.Linq;
+
+namespace SCRemoteControl.Server
+{
+    /// <summary>
+    /// Rolling per-route latency histograms fed by TimingHandler and reported
+    /// by GET /api/metrics. Each route keeps SlotCount slots of SlotSeconds;
+    /// a slot is reset when the clock comes back around to it, so a snapshot
+    /// covers the last WindowSeconds. Latencies go into log-spaced buckets
+    /// (each 25% wider than the last, 10 µs to ~10 s), so percentiles are
+    /// bucket upper bounds and read up to 25% high.
+    /// </summary>
+    class RouteMetrics
+    {
+        public const int SlotSeconds = 10;
+        public const int SlotCount = 6;
+        public const int WindowSeconds = SlotSeconds * SlotCount;
+
+        private const int BucketCount = 64;
+        private const double BucketBaseMs = 0.01;
+        private const double BucketGrowth = 1.25;
+        private static readonly double LogGrowth = Math.Log(BucketGrowth);
+
+        private static readonly Lazy<RouteMetrics> _instance = new Lazy<RouteMetrics>(() => new RouteMetrics());
+        public static RouteMetrics Instance => _instance.Value;
+
+        private readonly object _lock = new object();
+        private readonly Dictionary<string, Slot[]> _routes = new Dictionary<string, Slot[]>(StringComparer.Ordinal);
+
+        public void Record(string route, int status, double totalMs, List<KeyValuePair<string, double>> phases)
+        {
+            long epoch = DateTime.UtcNow.Ticks / TimeSpan.TicksPerSecond / SlotSeconds;
+            int bucket = BucketOf(totalMs);
+            lock (_lock)
+            {
+                if (!_routes.TryGetValue(route, out var slots))
+                    _routes[route] = slots = new Slot[SlotCount];
+
+                var slot = slots[epoch % SlotCount];
+                if (slot == null || slot.Epoch != epoch)
+                    slots[epoch % SlotCount] = slot = new Slot(epoch);
+
+                slot.Count++;
+                if (status >= 500) slot.Errors++;
+                else if (status >= 400) slot.Rejected++;
+                slot.Buckets[bucket]++;
+                if (totalMs > slot.MaxMs) slot.MaxMs = totalMs;
+                foreach (var p in phases)
+                {
+                    slot.PhaseMs.TryGetValue(p.Key, out var sum);
+                    slot.PhaseMs[p.Key] = sum + p.Value;
+                }
+            }
+        }
+
+        /// <summary>Routes with traffic in the window, busiest first.</summary>
+        public List<RouteMetricsDto> Snapshot()
+        {
+            long oldest = DateTime.UtcNow.Ticks / TimeSpan.TicksPerSecond / SlotSeconds - SlotCount + 1;
+            var result = new List<RouteMetricsDto>();
+            lock (_lock)
+            {
+                foreach (var kv in _routes)
+                {
+                    var buckets = new long[BucketCount];
+                    var phaseMs = new Dictionary<string, double>(StringComparer.Ordinal);
+                    var dto = new RouteMetricsDto { Route = kv.Key };
+                    double max = 0;
+                    foreach (var slot in kv.Value)
+                    {
+                        if (slot == null || slot.Epoch < oldest) continue;
+                        dto.Count += slot.Count;
+                        dto.Rejected += slot.Rejected;
+                        dto.Errors += slot.Errors;
+                        max = Math.Max(max, slot.MaxMs);
+                        for (int i = 0; i < BucketCount; i++) buckets[i] += slot.Buckets[i];
+                        foreach (var p in slot.PhaseMs)
+                        {
+                            phaseMs.TryGetValue(p.Key, out var sum);
+                            phaseMs[p.Key] = sum + p.Value;
+                        }
+                    }
+                    if (dto.Count == 0) continue;
+
+                    dto.P50Ms = Percentile(buckets, dto.Count, 0.50, max);
+                    dto.P95Ms = Percentile(buckets, dto.Count, 0.95, max);
+                    dto.P99Ms = Percentile(buckets, dto.Count, 0.99, max);
+                    dto.MaxMs = Math.Round(max, 3);
+                    dto.PhaseMeanMs = phaseMs.ToDictionary(p => p.Key, p => Math.Round(p.Value / dto.Count, 3));
+                    result.Add(dto);
+                }
+            }
+            return result.OrderByDescending(r => r.Count).ThenBy(r => r.Route, StringComparer.Ordinal).ToList();
+        }
+
+        public void Clear()
+        {
+            lock (_lock) _routes.Clear();
+        }
+
+        private static int BucketOf(double ms)
+        {
+            if (ms <= BucketBaseMs) return 0;
+            int i = (int)Math.Ceiling(Math.Log(ms / BucketBaseMs) / LogGrowth);
+            return Math.Min(BucketCount - 1, i);
+        }
+
+        private static double UpperBound(int bucket) => BucketBaseMs * Math.Pow(BucketGrowth, bucket);
+
+        // Upper bound of the bucket holding the q-th sample, capped at the
+        // observed max so a single slow request does not read as 25% slower.
+        private static double Percentile(long[] buckets, long count, double q, double max)
+        {
+            long rank = (long)Math.Ceiling(q * count);
+            long seen = 0;
+            for (int i = 0; i < buckets.Length; i++)
+            {
+                seen += buckets[i];
+                if (seen >= rank) return Math.Round(Math.Min(UpperBound(i), max), 3);
+            }
+            return Math.Round(max, 3);
+        }
+
+        private class Slot
+        {
+            public readonly long Epoch;
+            public readonly long[] Buckets = new long[BucketCount];
+            public readonly Dictionary<string, double> PhaseMs = new Dictionary<string, double>(StringComparer.Ordinal);
+            public long Count;
+            public long Rejected;
+            public long Errors;
+            public double MaxMs;
+
+            public Slot(long epoch)
+            {
+                Epoch = epoch;
+            }
+        }
+    }
+}
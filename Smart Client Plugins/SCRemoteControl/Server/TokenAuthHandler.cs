@@ -1,4 +1,5 @@
 using System;
+using System.Diagnostics;
 using System.Net;
 using System.Net.Http;
 using System.Threading;
@@ -20,6 +21,7 @@ namespace SCRemoteControl.Server
             if (request.Method == HttpMethod.Options)
                 return base.SendAsync(request, cancellationToken);
 
+            long authStart = Stopwatch.GetTimestamp();
             string token = null;
 
             // Try standard Bearer scheme: "Authorization: Bearer <token>"
@@ -47,7 +49,15 @@ namespace SCRemoteControl.Server
                 }
             }
 
-            if (!SCRemoteControlConfig.ValidateToken(token))
+            bool valid = SCRemoteControlConfig.ValidateToken(token);
+            var timing = RequestTiming.Current;
+            if (timing != null)
+            {
+                timing.AuthenticatedAt = Stopwatch.GetTimestamp();
+                timing.AddTicks(RequestTiming.Auth, timing.AuthenticatedAt - authStart);
+            }
+
+            if (!valid)
             {
                 var response = request.CreateResponse(HttpStatusCode.Unauthorized,
                     new { error = "Unauthorized. Provide a valid Bearer token in the Authorization header." });
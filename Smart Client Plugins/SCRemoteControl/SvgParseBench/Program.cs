@@ -0,0 +1,99 @@
+using System;
+using System.Globalization;
+using System.IO;
+using System.Linq;
+using System.Text;
+
+namespace SvgParseBench
+{
+    /// <summary>
+    /// Offline comparison of the XDocument and streaming overlay parsers.
+    /// Kept out of the plugin so the REST API never runs timing loops or
+    /// turns on AppDomain monitoring in the Smart Client process.
+    /// </summary>
+    internal class Program
+    {
+        private const int DefaultIterations = 50;
+
+        private const string Usage =
+            "Usage: SvgParseBench corpus-dir [iterations]\n" +
+            "  Parses every *.svg in corpus-dir with both parsers and prints time and\n" +
+            "  allocations per parse (default 50 iterations, at most 1000).\n" +
+            "  Write the gauge corpus with: python test-api.py --write-corpus corpus-dir";
+
+        private static int Main(string[] args)
+        {
+            if (args.Length < 1 || !Directory.Exists(args[0]))
+            {
+                Console.Error.WriteLine(Usage);
+                return 2;
+            }
+
+            int iterations = DefaultIterations;
+            if (args.Length > 1 && (!int.TryParse(args[1], out iterations) || iterations < 1))
+            {
+                Console.Error.WriteLine(Usage);
+                return 2;
+            }
+
+            var files = Directory.GetFiles(args[0], "*.svg")
+                .OrderBy(f => f, StringComparer.Ordinal)
+                .ToList();
+            if (files.Count == 0)
+            {
+                Console.Error.WriteLine("No *.svg files in " + args[0]);
+                return 2;
+            }
+
+            Console.OutputEncoding = Encoding.UTF8;
+            var names = files.Select(Path.GetFileNameWithoutExtension).ToList();
+            var documents = files.Select(File.ReadAllText).ToList();
+            iterations = Math.Min(iterations, SvgParseBenchmark.MaxIterations);
+
+            Console.WriteLine($"SVG parse, {documents.Count} documents x {iterations} iterations");
+            Console.WriteLine();
+            Console.WriteLine(string.Format(CultureInfo.InvariantCulture,
+                "  {0,-22} {1,6} {2,6} {3,8} {4,9} {5,7} {6,7} {7,9}  same",
+                "document", "bytes", "shapes", "dom µs", "stream µs", "speedup", "dom KB", "stream KB"));
+
+            var results = SvgParseBenchmark.Run(documents, iterations);
+            double domTotal = 0, streamTotal = 0;
+            foreach (var r in results)
+            {
+                var name = names[r.Index];
+                var same = r.Identical ? "yes" : "no";
+                if (r.Error != null)
+                {
+                    Console.WriteLine(string.Format(CultureInfo.InvariantCulture,
+                        "  {0,-22} {1,6} {2,6} {3,8} {4,9} {5,7} {6,7} {7,9}  {8}  {9}",
+                        name, r.Bytes, "", "", "", "", "", "", same, r.Error));
+                }
+                else
+                {
+                    domTotal += r.DomMicros;
+                    streamTotal += r.StreamingMicros;
+                    var speedup = r.StreamingMicros > 0 ? r.DomMicros / r.StreamingMicros : 0;
+                    Console.WriteLine(string.Format(CultureInfo.InvariantCulture,
+                        "  {0,-22} {1,6} {2,6} {3,8:F1} {4,9:F1} {5,6:F2}x {6,7:F1} {7,9:F1}  {8}",
+                        name, r.Bytes, r.Shapes, r.DomMicros, r.StreamingMicros, speedup,
+                        r.DomBytesAllocated / 1024.0, r.StreamingBytesAllocated / 1024.0, same));
+                }
+                if (!r.Identical)
+                    Console.WriteLine("  ✗ " + name + ": " + r.Difference);
+            }
+
+            if (streamTotal > 0)
+            {
+                Console.WriteLine(string.Format(CultureInfo.InvariantCulture,
+                    "  whole corpus: {0:F2}ms dom vs {1:F2}ms streaming ({2:F2}x)",
+                    domTotal / 1000, streamTotal / 1000, domTotal / streamTotal));
+            }
+
+            var identical = results.All(r => r.Identical);
+            Console.WriteLine(identical
+                ? "  streaming parser output identical to XDocument parser"
+                : "  streaming parser output differs");
+            return identical ? 0 : 1;
+        }
+    }
+}
@@ -0,0 +1,169 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Linq;
+using SCRemoteControl.Overlay;
+
+namespace SvgParseBench
+{
+    /// <summary>
+    /// Times SvgParser.ParseDom against SvgParser.ParseStreaming on a set of
+    /// documents and checks that both produce the same ParsedOverlay.
+    /// Allocation figures come from AppDomain monitoring, which also counts
+    /// the runtime's own threads, so treat them as approximate.
+    /// </summary>
+    internal static class SvgParseBenchmark
+    {
+        public const int MaxIterations = 1000;
+
+        public static List<SvgParseBenchmarkResult> Run(IList<string> documents, int iterations)
+        {
+            iterations = Math.Max(1, Math.Min(MaxIterations, iterations));
+            AppDomain.MonitoringIsEnabled = true;
+
+            var results = new List<SvgParseBenchmarkResult>();
+            for (int i = 0; i < documents.Count; i++)
+            {
+                var svg = documents[i] ?? "";
+                var result = new SvgParseBenchmarkResult { Index = i, Bytes = svg.Length };
+                results.Add(result);
+
+                ParsedOverlay dom = null, stream = null;
+                string domError = null, streamError = null;
+                try { dom = SvgParser.ParseDom(svg); } catch (SvgParseException ex) { domError = ex.Message; }
+                try { stream = SvgParser.ParseStreaming(svg); } catch (SvgParseException ex) { streamError = ex.Message; }
+
+                if (dom == null || stream == null)
+                {
+                    result.Error = domError ?? streamError;
+                    result.Identical = domError == streamError;
+                    if (!result.Identical)
+                        result.Difference = "dom: " + (domError ?? "ok") + " / streaming: " + (streamError ?? "ok");
+                    continue;
+                }
+
+                result.Shapes = dom.Shapes.Count;
+                result.Difference = Compare(dom, stream);
+                result.Identical = result.Difference == null;
+
+                Measure(SvgParser.ParseDom, svg, iterations, out var domMicros, out var domBytes);
+                Measure(SvgParser.ParseStreaming, svg, iterations, out var streamMicros, out var streamBytes);
+                result.DomMicros = domMicros;
+                result.DomBytesAllocated = domBytes;
+                result.StreamingMicros = streamMicros;
+                result.StreamingBytesAllocated = streamBytes;
+            }
+            return results;
+        }
+
+        private static void Measure(Func<string, ParsedOverlay> parse, string svg, int iterations,
+            out double microsPerDoc, out long bytesPerDoc)
+        {
+            parse(svg); // warm up (JIT, regex caches)
+            var domain = AppDomain.CurrentDomain;
+            long allocated = domain.MonitoringTotalAllocatedMemorySize;
+            var sw = Stopwatch.StartNew();
+            for (int i = 0; i < iterations; i++) parse(svg);
+            sw.Stop();
+            allocated = domain.MonitoringTotalAllocatedMemorySize - allocated;
+
+            microsPerDoc = sw.Elapsed.TotalMilliseconds * 1000.0 / iterations;
+            bytesPerDoc = allocated / iterations;
+        }
+
+        /// <summary>First difference between two parse results, or null when they match.</summary>
+        public static string Compare(ParsedOverlay a, ParsedOverlay b)
+        {
+            if (a.ViewBox != b.ViewBox) return "viewBox " + a.ViewBox + " vs " + b.ViewBox;
+            if (a.Shapes.Count != b.Shapes.Count) return "shape count " + a.Shapes.Count + " vs " + b.Shapes.Count;
+            for (int i = 0; i < a.Shapes.Count; i++)
+            {
+                var diff = CompareShape(a.Shapes[i], b.Shapes[i]);
+                if (diff != null) return "shape " + i + " (" + a.Shapes[i].GetType().Name + "): " + diff;
+            }
+            return null;
+        }
+
+        private static string CompareShape(ParsedShape a, ParsedShape b)
+        {
+            if (a.GetType() != b.GetType()) return "type " + b.GetType().Name;
+            if (a.Id != b.Id) return "id '" + a.Id + "' vs '" + b.Id + "'";
+            if (!a.Transform.Equals(b.Transform)) return "transform " + a.Transform + " vs " + b.Transform;
+
+            var sa = a.Style;
+            var sb = b.Style;
+            if (!Nullable.Equals(sa.Fill, sb.Fill)) return "fill";
+            if (!Nullable.Equals(sa.Stroke, sb.Stroke)) return "stroke";
+            if (!sa.FillOpacity.Equals(sb.FillOpacity)) return "fill-opacity";
+            if (!sa.StrokeOpacity.Equals(sb.StrokeOpacity)) return "stroke-opacity";
+            if (!sa.Opacity.Equals(sb.Opacity)) return "opacity";
+            if (!sa.StrokeWidth.Equals(sb.StrokeWidth)) return "stroke-width";
+            if (sa.FontFamily != sb.FontFamily) return "font-family";
+            if (!sa.FontSize.Equals(sb.FontSize)) return "font-size";
+            if (sa.FontWeight != sb.FontWeight) return "font-weight";
+            if (sa.FontStyle != sb.FontStyle) return "font-style";
+
+            switch (a)
+            {
+                case RectShape r:
+                    var r2 = (RectShape)b;
+                    return Diff(("x", r.X, r2.X), ("y", r.Y, r2.Y), ("width", r.Width, r2.Width),
+                        ("height", r.Height, r2.Height), ("rx", r.Rx, r2.Rx), ("ry", r.Ry, r2.Ry));
+                case CircleShape c:
+                    var c2 = (CircleShape)b;
+                    return Diff(("cx", c.Cx, c2.Cx), ("cy", c.Cy, c2.Cy), ("r", c.R, c2.R));
+                case EllipseShape e:
+                    var e2 = (EllipseShape)b;
+                    return Diff(("cx", e.Cx, e2.Cx), ("cy", e.Cy, e2.Cy), ("rx", e.Rx, e2.Rx), ("ry", e.Ry, e2.Ry));
+                case LineShape l:
+                    var l2 = (LineShape)b;
+                    return Diff(("x1", l.X1, l2.X1), ("y1", l.Y1, l2.Y1), ("x2", l.X2, l2.X2), ("y2", l.Y2, l2.Y2));
+                case PolyShape p:
+                    var p2 = (PolyShape)b;
+                    if (p.Closed != p2.Closed) return "closed";
+                    return p.Points.SequenceEqual(p2.Points) ? null : "points";
+                case PathShape pa:
+                    return pa.D == ((PathShape)b).D ? null : "d";
+                case TextShape t:
+                    var t2 = (TextShape)b;
+                    if (t.Text != t2.Text) return "text '" + t.Text + "' vs '" + t2.Text + "'";
+                    return Diff(("x", t.X, t2.X), ("y", t.Y, t2.Y));
+            }
+            return null;
+        }
+
+        private static string Diff(params (string name, double a, double b)[] fields)
+        {
+            foreach (var f in fields)
+            {
+                // Equals, not ==, so NaN matches NaN.
+                if (!f.a.Equals(f.b)) return f.name + " " + f.a.ToString("R") + " vs " + f.b.ToString("R");
+            }
+            return null;
+        }
+    }
+
+    internal class SvgParseBenchmarkResult
+    {
+        /// <summary>Position of the document in the corpus</summary>
+        public int Index { get; set; }
+        /// <summary>Document length in characters</summary>
+        public int Bytes { get; set; }
+        /// <summary>Shapes parsed</summary>
+        public int Shapes { get; set; }
+        /// <summary>Both parse paths produced the same ParsedOverlay (or the same error)</summary>
+        public bool Identical { get; set; }
+        /// <summary>First difference when not identical</summary>
+        public string Difference { get; set; }
+        /// <summary>Parse error, when the document is rejected</summary>
+        public string Error { get; set; }
+        /// <summary>XDocument path: microseconds per parse</summary>
+        public double DomMicros { get; set; }
+        /// <summary>XDocument path: bytes allocated per parse (approximate)</summary>
+        public long DomBytesAllocated { get; set; }
+        /// <summary>XmlReader path: microseconds per parse</summary>
+        public double StreamingMicros { get; set; }
+        /// <summary>XmlReader path: bytes allocated per parse (approximate)</summary>
+        public long StreamingBytesAllocated { get; set; }
+    }
+}
@@ -0,0 +1,1281 @@
+"""
+Stand-in server for the SCRemoteControl REST API.
+
+Runs the same routes as the plugin's ApiController on any OS, so test-api.py
+and client-side benchmarks can run without a Smart Client:
+
+    python mock-server.py                           # http://localhost:9500, 2000 cameras
+    python mock-server.py --cameras 10000 --port 9600
+    python mock-server.py --latency overlays=5 --latency "POST overlays=20"
+    python test-api.py --base http://localhost:9500
+    python mock-server.py --port 9601 --displayed 4 --displayed-offset 4   # 2nd wall client
+
+What matches the plugin:
+  - Bearer token check on /api/* (same token as test-api.py by default)
+  - overlay limits from OverlayManager: MaxSvgBytes, MaxShapesPerOverlay,
+    MaxOverlaysPerCamera, ttlSeconds expiry from a min-heap of due times
+  - response bodies and status codes of the overlay, discovery and action routes
+  - ETag / If-None-Match on /api/views, /api/cameras and /api/workspaces
+  - the binary overlay encoding (decoded and validated, shape ids kept for PATCH)
+  - Content-Encoding: gzip / deflate request bodies are inflated and responses
+    of 1 KB or more are compressed when Accept-Encoding allows (CompressionHandler)
+  - the Server-Timing header (auth, bind, action, parse, lock) and the per-route
+    latency histograms in GET /api/metrics
+  - GET /api/events (EventBroadcaster): overlay.upserted / patched / removed /
+    expired from the overlay store, view.changed and workspace.changed from the
+    switch routes, keepalives, and the overflow cut-off for slow readers
+
+What does not: nothing is rendered, and actions only update the simulated set
+of on-screen cameras ("displayed", also served by GET /api/cameras/displayed).
+
+--latency ROUTE=MS adds a fixed delay before a route is handled. ROUTE is the
+route template as written in ApiController ("cameras", "overlays/{id}", ...),
+optionally prefixed by the method ("PATCH overlays/{id}"), or "*" for every
+route. The most specific rule wins.
+
+No third-party dependencies.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import binascii
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_TOKEN = "334e559dea1c4930009ec24709c6d6ce"
+
+# Limits from OverlayManager.cs
+MAX_SHAPES_PER_OVERLAY = 500
+MAX_OVERLAYS_PER_CAMERA = 32
+MAX_SVG_BYTES = 50 * 1024
+TICK_INTERVAL = 0.333
+# Limits from CompressionHandler.cs
+MIN_COMPRESS_BYTES = 1024
+MAX_INFLATED_BYTES = 8 * 1024 * 1024
+
+# Attributes SvgParser.ApplyAttribute accepts per element, on top of the style properties.
+STYLE_ATTRS = {"style", "fill", "stroke", "fill-opacity", "stroke-opacity", "opacity", "stroke-width",
+               "font-family", "font-size", "font-weight", "font-style"}
+SHAPE_ATTRS = {
+    "rect": {"x", "y", "width", "height", "rx", "ry"},
+    "circle": {"cx", "cy", "r"},
+    "ellipse": {"cx", "cy", "rx", "ry"},
+    "line": {"x1", "y1", "x2", "y2"},
+    "polyline": {"points"},
+    "polygon": {"points"},
+    "path": {"d"},
+    "text": {"x", "y", "text"},
+}
+# Keep merged SVG readable: serialize the SVG namespace as the default one, not ns0:.
+ET.register_namespace("", "http://www.w3.org/2000/svg")
+
+GRID_LAYOUTS = [(1, 1), (1, 2), (1, 3), (2, 2), (2, 3), (2, 4), (3, 3), (3, 4), (4, 4), (4, 5)]
+APP_COMMANDS = ["ToggleFullscreen", "EnterFullscreen", "ExitFullscreen", "ShowSidePanel",
+                "HideSidePanel", "Maximize", "Minimize", "Restore"]
+
+
+class C:
+    YEL = "\033[33m"
+    CYAN = "\033[36m"
+    GREEN = "\033[32m"
+    RED = "\033[31m"
+    GRAY = "\033[90m"
+    BOLD = "\033[1m"
+    OFF = "\033[0m"
+
+
+_print_lock = threading.Lock()
+
+
+def log(msg: str) -> None:
+    with _print_lock:
+        print(msg, flush=True)
+
+
+def _utc(dt: datetime | None) -> str | None:
+    if dt is None:
+        return None
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_guid(value: str | None) -> str | None:
+    try:
+        g = uuid.UUID(value or "")
+    except ValueError:
+        return None
+    return None if g.int == 0 else str(g)
+
+
+def _merge_style(style: str | None, patch: str, drop: str | None = None) -> str | None:
+    decls: dict[str, str] = {}
+    for decl in f"{style or ''};{patch}".split(";"):
+        if ":" in decl:
+            k, v = decl.split(":", 1)
+            decls[k.strip().lower()] = v.strip()
+    decls.pop(drop, None)
+    return ";".join(f"{k}:{v}" for k, v in decls.items()) or None
+
+
+def _set_style(elem: ET.Element, style: str | None) -> None:
+    if style is None:
+        elem.attrib.pop("style", None)
+    else:
+        elem.set("style", style)
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Request timing (RequestTiming.cs / RouteMetrics.cs)
+# ────────────────────────────────────────────────────────────────────────────
+
+_timing = threading.local()
+
+
+def phase(name: str, start: float) -> None:
+    """Add the time since start (perf_counter) to a phase of the current request."""
+    phases = getattr(_timing, "phases", None)
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + (time.perf_counter() - start) * 1000.0
+
+
+@contextmanager
+def timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase(name, start)
+
+
+def server_timing(phases: dict[str, float], total_ms: float, route: str) -> str:
+    parts = [f"{k};dur={v:.3f}" for k, v in phases.items()]
+    parts.append(f'total;dur={total_ms:.3f};desc="{route}"')
+    return ", ".join(parts)
+
+
+class RouteMetrics:
+    """Rolling per-route histograms, same slots and buckets as RouteMetrics.cs."""
+    SLOT_SECONDS = 10
+    SLOT_COUNT = 6
+    BUCKETS = 64
+    BASE_MS = 0.01
+    GROWTH = 1.25
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: dict[str, list[dict | None]] = {}
+
+    @classmethod
+    def _bucket(cls, ms: float) -> int:
+        if ms <= cls.BASE_MS:
+            return 0
+        return min(cls.BUCKETS - 1, math.ceil(math.log(ms / cls.BASE_MS) / math.log(cls.GROWTH)))
+
+    def record(self, route: str, status: int, total_ms: float, phases: dict[str, float]) -> None:
+        epoch = int(time.time()) // self.SLOT_SECONDS
+        with self._lock:
+            slots = self._routes.setdefault(route, [None] * self.SLOT_COUNT)
+            slot = slots[epoch % self.SLOT_COUNT]
+            if slot is None or slot["epoch"] != epoch:
+                slot = slots[epoch % self.SLOT_COUNT] = {
+                    "epoch": epoch, "count": 0, "rejected": 0, "errors": 0, "max": 0.0,
+                    "buckets": [0] * self.BUCKETS, "phases": {}}
+            slot["count"] += 1
+            if status >= 500:
+                slot["errors"] += 1
+            elif status >= 400:
+                slot["rejected"] += 1
+            slot["buckets"][self._bucket(total_ms)] += 1
+            slot["max"] = max(slot["max"], total_ms)
+            for k, v in phases.items():
+                slot["phases"][k] = slot["phases"].get(k, 0.0) + v
+
+    def snapshot(self) -> list[dict]:
+        oldest = int(time.time()) // self.SLOT_SECONDS - self.SLOT_COUNT + 1
+        out = []
+        with self._lock:
+            for route, slots in self._routes.items():
+                live = [sl for sl in slots if sl is not None and sl["epoch"] >= oldest]
+                count = sum(sl["count"] for sl in live)
+                if not count:
+                    continue
+                buckets = [sum(col) for col in zip(*(sl["buckets"] for sl in live))]
+                mx = max(sl["max"] for sl in live)
+                phases: dict[str, float] = {}
+                for sl in live:
+                    for k, v in sl["phases"].items():
+                        phases[k] = phases.get(k, 0.0) + v
+
+                def pct(q: float) -> float:
+                    rank, seen = math.ceil(q * count), 0
+                    for i, n in enumerate(buckets):
+                        seen += n
+                        if seen >= rank:
+                            return round(min(self.BASE_MS * self.GROWTH ** i, mx), 3)
+                    return round(mx, 3)
+
+                out.append({"route": route, "count": count,
+                            "rejected": sum(sl["rejected"] for sl in live),
+                            "errors": sum(sl["errors"] for sl in live),
+                            "p50Ms": pct(0.50), "p95Ms": pct(0.95), "p99Ms": pct(0.99), "maxMs": round(mx, 3),
+                            "phaseMeanMs": {k: round(v / count, 3) for k, v in phases.items()}})
+        out.sort(key=lambda r: (-r["count"], r["route"]))
+        return out
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Content-Encoding (CompressionHandler.cs)
+# ────────────────────────────────────────────────────────────────────────────
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """gzip or deflate, whichever Accept-Encoding ranks higher (gzip on a tie), or None."""
+    q: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        if params.strip().lower().startswith("q="):
+            try:
+                weight = float(params.strip()[2:])
+            except ValueError:
+                weight = 0.0
+        if name:
+            q[name.strip().lower()] = weight
+    g = q.get("gzip", q.get("*", 0.0))
+    d = q.get("deflate", q.get("*", 0.0))
+    if g > 0 and g >= d:
+        return "gzip"
+    return "deflate" if d > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    # Fastest level, like CompressionLevel.Fastest; deflate as zlib data.
+    if encoding == "gzip":
+        z = zlib.compressobj(1, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    else:
+        z = zlib.compressobj(1)
+    return z.compress(body) + z.flush()
+
+
+def inflate(data: bytes, encoding: str) -> bytes:
+    """Raises ApiError 400 on bad data and 413 past MAX_INFLATED_BYTES."""
+    if encoding == "gzip":
+        wbits = 16 + zlib.MAX_WBITS
+    else:
+        # zlib-wrapped or raw deflate, as CompressionHandler accepts both.
+        zlib_header = len(data) >= 2 and data[0] & 0x0F == 8 and ((data[0] << 8) | data[1]) % 31 == 0
+        wbits = zlib.MAX_WBITS if zlib_header else -zlib.MAX_WBITS
+    z = zlib.decompressobj(wbits)
+    try:
+        out = z.decompress(data, MAX_INFLATED_BYTES + 1)
+    except zlib.error:
+        raise ApiError(400, f"Request body is not valid {encoding} data.", "error")
+    if len(out) > MAX_INFLATED_BYTES:
+        raise ApiError(413, f"Request body inflates past {MAX_INFLATED_BYTES} bytes.", "error")
+    if not z.eof:
+        raise ApiError(400, f"Request body is not valid {encoding} data.", "error")
+    return out
+
+
+def variant_tag(etag: str, encoding: str) -> str:
+    return etag[:-1] + "-" + encoding + '"'
+
+
+class ApiError(Exception):
+    """Mapped to an HTTP error. message_key mirrors Web API: BadRequest(string)
+    answers {"message": ...}, Content(code, new { error }) answers {"error": ...}."""
+
+    def __init__(self, status: int, message: str | None = None, message_key: str = "message"):
+        super().__init__(message or "")
+        self.status = status
+        self.body = {message_key: message} if message is not None else None
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Synthetic inventory
+# ────────────────────────────────────────────────────────────────────────────
+
+class Inventory:
+    """Deterministic cameras, views and workspaces. Ids are uuid5 of the item
+    name so they are stable across restarts with the same --cameras count."""
+
+    NS = uuid.UUID("6f1d2a3c-9b7e-4c55-8a10-5c2f0e6b7d41")
+
+    def __init__(self, cameras: int, cameras_per_group: int = 50):
+        self.cameras = []
+        for i in range(cameras):
+            site, group = divmod(i // cameras_per_group, 20)
+            self.cameras.append({
+                "id": str(uuid.uuid5(self.NS, f"camera-{i}")),
+                "name": f"Camera {i + 1:05d}",
+                "path": f"Site {chr(ord('A') + site % 26)} › Group {group + 1:02d}",
+            })
+        self.camera_ids = {c["id"] for c in self.cameras}
+
+        self.views = [{"id": str(uuid.uuid5(self.NS, f"view-{r}x{c}")), "name": f"{r}x{c}",
+                       "path": "Private › Remote Control"} for r, c in GRID_LAYOUTS]
+        self.workspaces = [{"id": str(uuid.uuid5(self.NS, f"ws-{n}")), "name": n}
+                           for n in ("Live", "Playback", "Search", "Alarm Manager")]
+        self.windows = [{"index": 0, "id": str(uuid.uuid5(self.NS, "window-main")), "name": "Main Window"}]
+
+        # Serialized once with an ETag, like DiscoveryCache.
+        self.lists: dict[str, tuple[bytes, str]] = {}
+        for key in ("cameras", "views", "workspaces"):
+            body = json.dumps(getattr(self, key)).encode("utf-8")
+            self.lists[key] = (body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Event stream (mirrors EventBroadcaster)
+# ────────────────────────────────────────────────────────────────────────────
+
+class EventSubscriber:
+    MAX_QUEUED = 1000
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._queue: list[bytes] = []
+        self.overflowed = False
+        self.closed = False
+
+    def enqueue(self, frame: bytes) -> None:
+        with self._cond:
+            if self.closed or self.overflowed:
+                return
+            if len(self._queue) >= self.MAX_QUEUED:
+                self.overflowed = True
+            else:
+                self._queue.append(frame)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def take(self, timeout: float) -> list[bytes]:
+        """Every queued frame, or [] when nothing arrived within timeout."""
+        with self._cond:
+            if not self._queue and not self.closed and not self.overflowed:
+                self._cond.wait(timeout)
+            frames, self._queue = self._queue, []
+            return frames
+
+
+class EventBroadcaster:
+    """Each event is serialized once and queued per subscriber; a subscriber
+    that falls MAX_QUEUED frames behind gets "overflow" and is disconnected."""
+
+    KEEPALIVE_SECONDS = 15.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: list[EventSubscriber] = []
+        self._next_id = itertools.count(1)
+        self.published = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self) -> EventSubscriber:
+        sub = EventSubscriber()
+        with self._lock:
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: EventSubscriber) -> None:
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+        sub.close()
+
+    def publish(self, event_type: str, data: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return  # nobody listens, skip serialization
+        data = {k: v for k, v in data.items() if v is not None}
+        frame = f"id: {next(self._next_id)}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+        with self._lock:
+            self.published += 1
+        for sub in subscribers:
+            sub.enqueue(frame)
+
+    def overlay_changed(self, change: str, rec: "OverlayRecord") -> None:
+        data = {"overlayId": rec.overlay_id, "cameraId": rec.camera_id}
+        if change in ("upserted", "patched"):
+            data.update(version=rec.version, shapeCount=rec.shape_count, expiresAt=_utc(rec.expires_at))
+        data["at"] = _utc(datetime.now(timezone.utc))
+        self.publish("overlay." + change, data)
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Overlay registry (mirrors OverlayManager)
+# ────────────────────────────────────────────────────────────────────────────
+
+class OverlayRecord:
+    __slots__ = ("overlay_id", "camera_id", "svg", "shape_count", "shape_ids", "z_order",
+                 "expires_at", "version")
+
+    def __init__(self, overlay_id, camera_id, svg, shape_count, shape_ids, z_order, expires_at, version):
+        self.overlay_id = overlay_id
+        self.camera_id = camera_id
+        self.svg = svg
+        self.shape_count = shape_count
+        self.shape_ids = shape_ids
+        self.z_order = z_order
+        self.expires_at = expires_at
+        self.version = version
+
+
+def parse_svg(svg: str) -> tuple[int, dict[str, str]]:
+    """Validate like SvgParser.Parse and return (shape count, {shape id: tag})."""
+    if not svg or not svg.strip():
+        raise ApiError(400, "svg parse failed: SVG body is empty")
+    try:
+        root = ET.fromstring(svg)
+    except ET.ParseError as ex:
+        raise ApiError(400, f"svg parse failed: Invalid XML: {ex}")
+    if _local(root.tag) != "svg":
+        raise ApiError(400, "svg parse failed: Root element must be <svg>")
+    vb = root.get("viewBox")
+    if vb and vb.strip():
+        parts = re.split(r"[\s,]+", vb.strip())
+        if len(parts) != 4:
+            raise ApiError(400, f"svg parse failed: viewBox must have 4 numbers: '{vb}'")
+        try:
+            [float(p) for p in parts]
+        except ValueError as ex:
+            raise ApiError(400, f"svg parse failed: viewBox parse failed: {ex}")
+
+    count, ids = 0, {}
+
+    def visit(elem: ET.Element) -> None:
+        nonlocal count
+        tag = _local(elem.tag)
+        if tag == "g":
+            for child in elem:
+                visit(child)
+        elif tag in SHAPE_ATTRS:
+            count += 1
+            if elem.get("id"):
+                ids.setdefault(elem.get("id"), tag)
+
+    for child in root:
+        visit(child)
+    return count, ids
+
+
+BINARY_TAGS = {1: "rect", 2: "circle", 3: "ellipse", 4: "line", 5: "polyline", 6: "polygon", 7: "path", 8: "text"}
+BINARY_FLOATS = {"rect": 6, "circle": 3, "ellipse": 4, "line": 4, "text": 2}
+
+
+def parse_binary(data: bytes) -> tuple[int, dict[str, str]]:
+    """Validate like BinaryOverlay.Decode and return (shape count, {shape id: tag})."""
+    if len(data) < 4:
+        raise ApiError(400, "binary overlay is empty")
+    if data[:3] != b"SCO":
+        raise ApiError(400, 'binary overlay: bad magic, expected "SCO"')
+    if data[3] != 1:
+        raise ApiError(400, f"binary overlay: unsupported version {data[3]} (expected 1)")
+    pos = 4
+
+    def take(n: int) -> bytes:
+        nonlocal pos
+        if len(data) - pos < n:
+            raise ApiError(400, f"binary overlay: truncated at byte {pos}")
+        chunk = data[pos:pos + n]
+        pos += n
+        return chunk
+
+    def u16() -> int:
+        return struct.unpack("<H", take(2))[0]
+
+    def string() -> str:
+        return take(u16()).decode("utf-8", errors="replace")
+
+    take(16)  # viewBox
+    styles = u16()
+    for _ in range(styles):
+        flags = take(1)[0]
+        take((4 if flags & 1 else 0) + (4 if flags & 2 else 0) + 20 + 2)
+        if flags & 4:
+            string()
+
+    count, ids = u16(), {}
+    if count > MAX_SHAPES_PER_OVERLAY:
+        raise ApiError(400, f"overlay has {count} shapes, max {MAX_SHAPES_PER_OVERLAY}")
+    for _ in range(count):
+        at = pos
+        kind, flags, style = struct.unpack("<BBH", take(4))
+        tag = BINARY_TAGS.get(kind)
+        if tag is None:
+            raise ApiError(400, f"binary overlay: unknown shape type {kind} at byte {at}")
+        if style >= styles:
+            raise ApiError(400, f"binary overlay: style index {style} out of range at byte {at}")
+        shape_id = string() if flags & 1 else None
+        if flags & 2:
+            take(24)
+        if tag in ("polyline", "polygon"):
+            take(8 * u16())
+        else:
+            take(4 * BINARY_FLOATS.get(tag, 0))
+            if tag in ("path", "text"):
+                string()
+        if shape_id:
+            ids.setdefault(shape_id, tag)
+    if pos != len(data):
+        raise ApiError(400, f"binary overlay: {len(data) - pos} trailing bytes")
+    return count, ids
+
+
+class OverlayStore:
+    def __init__(self, inventory: Inventory, displayed: int, displayed_offset: int = 0,
+                 changed: Any = None):
+        self.inventory = inventory
+        # changed(change, record) like OverlayManager.OverlayChanged; change is
+        # "upserted", "patched", "removed" or "expired".
+        self._changed = changed or (lambda change, rec: None)
+        self._lock = threading.Lock()
+        self._overlays: dict[str, OverlayRecord] = {}
+        self._by_camera: dict[str, dict[str, OverlayRecord]] = {}
+        self._version = 0
+        # Cameras "on screen": starts with a slice of the inventory, replaced by /api/cameras/show.
+        self.displayed = {c["id"] for c in inventory.cameras[displayed_offset:displayed_offset + displayed]}
+        # Expiry queue like OverlayManager: (due, seq, overlay id), checked
+        # against the live record when popped; expiry_loop waits on _wake.
+        self._expiries: list[tuple[datetime, int, str]] = []
+        self._seq = itertools.count()
+        self._wake = threading.Condition(self._lock)
+        self.expired = 0
+        self.lateness_total_ms = 0.0
+        self.lateness_max_ms = 0.0
+        # Redraw bookkeeping like OverlayManager.ApplyAll: an on-screen overlay
+        # counts as drawn once per version, idle passes are skipped.
+        self._drawn: dict[str, int] = {}
+        self.draws = 0
+        self.skipped = 0
+        self.passes = 0
+
+    @contextmanager
+    def _locked(self):
+        # Registry lock for request paths; the wait counts as the lock phase.
+        start = time.perf_counter()
+        with self._lock:
+            phase("lock", start)
+            yield
+
+    def _store(self, rec: OverlayRecord, previous: OverlayRecord | None) -> None:
+        if previous is not None and previous.camera_id != rec.camera_id:
+            self._unstore(previous)
+        self._overlays[rec.overlay_id] = rec
+        self._by_camera.setdefault(rec.camera_id, {})[rec.overlay_id] = rec
+        if rec.expires_at is not None and (previous is None or previous.expires_at != rec.expires_at):
+            heapq.heappush(self._expiries, (rec.expires_at, next(self._seq), rec.overlay_id))
+            self._compact_expiries()
+            if self._expiries[0][2] == rec.overlay_id:
+                self._wake.notify()
+
+    def _compact_expiries(self) -> None:
+        # Refreshed overlays leave stale entries behind; rebuild when they clearly
+        # outnumber the live ones, so the heap stays bounded by the live overlays.
+        if len(self._expiries) > 2 * len(self._overlays) + 256:
+            self._expiries = [(r.expires_at, next(self._seq), r.overlay_id)
+                              for r in self._overlays.values() if r.expires_at is not None]
+            heapq.heapify(self._expiries)
+
+    def _unstore(self, rec: OverlayRecord) -> None:
+        self._overlays.pop(rec.overlay_id, None)
+        forcam = self._by_camera.get(rec.camera_id)
+        if forcam is not None:
+            forcam.pop(rec.overlay_id, None)
+            if not forcam:
+                del self._by_camera[rec.camera_id]
+
+    def upsert(self, overlay_id: str, camera_id: str, svg: str | None, ttl: int | None, z_order: int,
+               binary: bytes | None = None) -> tuple[OverlayRecord, bool]:
+        if len(overlay_id) > 128:
+            raise ApiError(400, "overlayId must be 128 chars or less")
+        if binary is not None:
+            if len(binary) > MAX_SVG_BYTES:
+                raise ApiError(400, f"binary body too large (max {MAX_SVG_BYTES} bytes)")
+            with timed("parse"):
+                count, ids = parse_binary(binary)
+        else:
+            if len(svg) > MAX_SVG_BYTES:
+                raise ApiError(400, f"svg body too large (max {MAX_SVG_BYTES} bytes)")
+            with timed("parse"):
+                count, ids = parse_svg(svg)
+        if count > MAX_SHAPES_PER_OVERLAY:
+            raise ApiError(400, f"overlay has {count} shapes, max {MAX_SHAPES_PER_OVERLAY}")
+        expires = datetime.now(timezone.utc) + timedelta(seconds=ttl) if ttl and ttl > 0 else None
+
+        with self._locked():
+            previous = self._overlays.get(overlay_id)
+            if previous is None or previous.camera_id != camera_id:
+                n = len(self._by_camera.get(camera_id, {}))
+                if n >= MAX_OVERLAYS_PER_CAMERA:
+                    raise ApiError(409, f"camera has {n} overlays, max {MAX_OVERLAYS_PER_CAMERA}", "error")
+            self._version += 1
+            rec = OverlayRecord(overlay_id, camera_id, svg, count, ids, z_order, expires, self._version)
+            self._store(rec, previous)
+        self._changed("upserted", rec)
+        return rec, previous is not None
+
+    def patch(self, overlay_id: str, shapes: list, ttl: int | None) -> OverlayRecord | None:
+        if not shapes:
+            raise ApiError(400, "shapes is required")
+        if len(shapes) > MAX_SHAPES_PER_OVERLAY:
+            raise ApiError(400, f"patch has {len(shapes)} shapes, max {MAX_SHAPES_PER_OVERLAY}")
+        for s in shapes:
+            if not isinstance(s, dict) or not s.get("id"):
+                raise ApiError(400, "every shape patch needs an id")
+            if not s.get("attributes"):
+                raise ApiError(400, f"shape patch '{s['id']}' has no attributes")
+        if len(json.dumps(shapes)) > MAX_SVG_BYTES:
+            raise ApiError(400, f"patch too large (max {MAX_SVG_BYTES} bytes)")
+
+        with self._locked():
+            previous = self._overlays.get(overlay_id)
+            if previous is None:
+                return None
+            for s in shapes:
+                tag = previous.shape_ids.get(s["id"])
+                if tag is None:
+                    raise ApiError(400, f"overlay has no shape with id '{s['id']}'")
+                for name in s["attributes"]:
+                    if name not in STYLE_ATTRS and name not in SHAPE_ATTRS[tag]:
+                        raise ApiError(400, f"patch failed: attribute '{name}' cannot be patched on shape '{s['id']}'")
+            svg = self._merge(previous.svg, shapes) if previous.svg is not None else None
+            expires = previous.expires_at
+            if ttl is not None:
+                expires = datetime.now(timezone.utc) + timedelta(seconds=ttl) if ttl > 0 else None
+            self._version += 1
+            rec = OverlayRecord(overlay_id, previous.camera_id, svg, previous.shape_count,
+                                previous.shape_ids, previous.z_order, expires, self._version)
+            self._store(rec, previous)
+        self._changed("patched", rec)
+        return rec
+
+    @staticmethod
+    def _merge(svg: str, shapes: list) -> str:
+        # The plugin folds patches in lazily on GET; merging eagerly is
+        # equivalent for the API and keeps this store simple.
+        root = ET.fromstring(svg)
+        by_id = {e.get("id"): e for e in root.iter() if e.get("id")}
+        for s in shapes:
+            elem = by_id[s["id"]]
+            for name, value in s["attributes"].items():
+                if name == "text":
+                    elem.text = value
+                elif name == "style":
+                    # Declarations add to the inline style, as SvgParser.MergeStyle does.
+                    _set_style(elem, _merge_style(elem.get("style"), str(value)))
+                else:
+                    elem.set(name, str(value))
+                    if name in STYLE_ATTRS:
+                        # Otherwise the inline declaration would win on the next parse.
+                        _set_style(elem, _merge_style(elem.get("style"), "", drop=name))
+        return ET.tostring(root, encoding="unicode")
+
+    def get(self, overlay_id: str) -> OverlayRecord | None:
+        with self._lock:
+            return self._overlays.get(overlay_id)
+
+    def list(self, camera_id: str | None = None) -> list[OverlayRecord]:
+        with self._lock:
+            if camera_id is not None:
+                return list(self._by_camera.get(camera_id, {}).values())
+            return list(self._overlays.values())
+
+    def remove(self, overlay_id: str) -> bool:
+        with self._locked():
+            rec = self._overlays.get(overlay_id)
+            if rec is None:
+                return False
+            self._unstore(rec)
+        self._changed("removed", rec)
+        return True
+
+    def remove_by_camera(self, camera_id: str) -> int:
+        with self._locked():
+            recs = list(self._by_camera.get(camera_id, {}).values())
+            for r in recs:
+                self._unstore(r)
+        for r in recs:
+            self._changed("removed", r)
+        return len(recs)
+
+    def remove_all(self) -> int:
+        with self._locked():
+            recs = list(self._overlays.values())
+            self._overlays.clear()
+            self._by_camera.clear()
+            self._expiries.clear()
+        for r in recs:
+            self._changed("removed", r)
+        return len(recs)
+
+    def expire_due(self) -> float | None:
+        """Remove overlays whose expiry has passed. Caller holds _wake.
+        Returns seconds until the next pending expiry, or None."""
+        now = datetime.now(timezone.utc)
+        while self._expiries and self._expiries[0][0] <= now:
+            _, _, overlay_id = heapq.heappop(self._expiries)
+            rec = self._overlays.get(overlay_id)
+            if rec is None or rec.expires_at is None or rec.expires_at > now:
+                continue  # deleted, or the expiry moved and has its own entry
+            self._unstore(rec)
+            late = (now - rec.expires_at).total_seconds() * 1000.0
+            self.expired += 1
+            self.lateness_total_ms += late
+            self.lateness_max_ms = max(self.lateness_max_ms, late)
+            self._changed("expired", rec)
+        self._compact_expiries()
+        if not self._expiries:
+            return None
+        return max(0.0, (self._expiries[0][0] - now).total_seconds())
+
+    def apply_all(self) -> None:
+        with self._lock:
+            self.passes += 1
+            for cam in self.displayed:
+                for rec in self._by_camera.get(cam, {}).values():
+                    if self._drawn.get(rec.overlay_id) == rec.version:
+                        self.skipped += 1
+                    else:
+                        self._drawn[rec.overlay_id] = rec.version
+                        self.draws += 1
+            for oid in [o for o in self._drawn if o not in self._overlays]:
+                del self._drawn[oid]
+
+    def is_displayed(self, camera_id: str) -> bool:
+        return camera_id in self.displayed
+
+    def dto(self, rec: OverlayRecord, with_svg: bool = False) -> dict:
+        d = {
+            "overlayId": rec.overlay_id,
+            "cameraId": rec.camera_id,
+            "zOrder": rec.z_order,
+            "expiresAt": _utc(rec.expires_at),
+            "shapeCount": rec.shape_count,
+            "displayed": self.is_displayed(rec.camera_id),
+        }
+        if with_svg:
+            d["svg"] = rec.svg
+            d["format"] = "svg" if rec.svg is not None else "binary"
+        return {k: v for k, v in d.items() if v is not None}
+
+    def upsert_response(self, rec: OverlayRecord, replaced: bool) -> dict:
+        d = {
+            "overlayId": rec.overlay_id,
+            "cameraId": rec.camera_id,
+            "shapeCount": rec.shape_count,
+            "zOrder": rec.z_order,
+            "expiresAt": _utc(rec.expires_at),
+            "replaced": replaced,
+            "displayed": self.is_displayed(rec.camera_id),
+        }
+        if not d["displayed"]:
+            d["warning"] = "camera is not currently displayed in any viewport, overlay queued"
+        return {k: v for k, v in d.items() if v is not None}
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Routing
+# ────────────────────────────────────────────────────────────────────────────
+
+class LatencyRules:
+    def __init__(self, specs: list[str]):
+        self.rules: dict[str, float] = {}
+        for spec in specs:
+            route, sep, ms = spec.rpartition("=")
+            if not sep:
+                raise ValueError(f"--latency expects ROUTE=MS, got '{spec}'")
+            self.rules[" ".join(route.split())] = float(ms) / 1000.0
+
+    def delay(self, method: str, template: str) -> float:
+        for key in (f"{method} {template}", template, "*"):
+            if key in self.rules:
+                return self.rules[key]
+        return 0.0
+
+
+class MockApi:
+    def __init__(self, inventory: Inventory, store: OverlayStore, token: str, latency: LatencyRules,
+                 events: EventBroadcaster):
+        self.inventory = inventory
+        self.store = store
+        self.events = events
+        self.token = token
+        self.latency = latency
+        self.started = time.time()
+        self.requests = 0
+        self._counter_lock = threading.Lock()
+        self.route_metrics = RouteMetrics()
+        self._gzip_lists: dict[str, bytes] = {}
+        # (method, regex, template, handler); templates match ApiController's Route attributes.
+        self.routes: list[tuple[str, re.Pattern, str, Any]] = []
+        for method, template, handler in [
+            ("GET", "status", self.get_status),
+            ("GET", "events", None),  # streamed by the handler
+            ("GET", "metrics", self.get_metrics),
+            ("GET", "views", self.get_views),
+            ("GET", "cameras", self.get_cameras),
+            ("GET", "cameras/displayed", self.get_displayed_cameras),
+            ("GET", "workspaces", self.get_workspaces),
+            ("GET", "windows", self.get_windows),
+            ("POST", "views/switch", self.switch_view),
+            ("POST", "cameras/show", self.show_cameras),
+            ("POST", "cameras/set", self.set_camera),
+            ("POST", "workspaces/switch", self.switch_workspace),
+            ("POST", "application/control", self.application_control),
+            ("POST", "windows/close", self.close_window),
+            ("POST", "overlays", self.upsert_overlay),
+            ("GET", "overlays", self.list_overlays),
+            ("DELETE", "overlays", self.delete_overlays),
+            ("GET", "overlays/{id}", self.get_overlay),
+            ("PATCH", "overlays/{id}", self.patch_overlay),
+            ("DELETE", "overlays/{id}", self.delete_overlay),
+            ("POST", "clear", self.clear_view),
+        ]:
+            pattern = re.compile("^/api/" + re.sub(r"\\\{(\w+)\\\}", r"(?P<\1>[^/]+)", re.escape(template)) + "$",
+                                 re.IGNORECASE)
+            self.routes.append((method, pattern, template, handler))
+
+    def check_token(self, header: str | None) -> bool:
+        # Same fallbacks as TokenAuthHandler: "Bearer <token>" or the raw token.
+        if not header:
+            return False
+        raw = header.strip()
+        token = raw[7:].strip() if raw.lower().startswith("bearer ") else raw
+        return bool(token) and hashlib.sha256(token.encode()).digest() == hashlib.sha256(self.token.encode()).digest()
+
+    def match(self, method: str, path: str):
+        path_known = False
+        for m, pattern, template, handler in self.routes:
+            found = pattern.match(path)
+            if found:
+                path_known = True
+                if m == method:
+                    return template, handler, found.groupdict()
+        if path_known:
+            raise ApiError(405, "The requested resource does not support http method '" + method + "'.")
+        raise ApiError(404, "No HTTP resource was found that matches the request URI.")
+
+    # ── Discovery ──
+
+    def _list(self, key: str, req: dict):
+        body, etag = self.inventory.lists[key]
+        # Like DiscoveryEntry.GzipBody: compress each list once for gzip clients.
+        gzip = len(body) >= MIN_COMPRESS_BYTES and negotiate(req["headers"].get("Accept-Encoding")) == "gzip"
+        tag = variant_tag(etag, "gzip") if gzip else etag
+        tags = [t.strip() for t in (req["headers"].get("If-None-Match") or "").split(",") if t.strip()]
+        if "*" in tags or any(t in (etag, variant_tag(etag, "gzip"), variant_tag(etag, "deflate")) for t in tags):
+            return 304, None, {"ETag": tag, "Cache-Control": "no-cache"}
+        if not gzip:
+            return 200, body, {"ETag": etag, "Cache-Control": "no-cache"}
+        if key not in self._gzip_lists:
+            self._gzip_lists[key] = compress(body, "gzip")
+        return 200, self._gzip_lists[key], {"ETag": tag, "Cache-Control": "no-cache",
+                                            "Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+
+    def get_views(self, req):
+        return self._list("views", req)
+
+    def get_cameras(self, req):
+        return self._list("cameras", req)
+
+    def get_displayed_cameras(self, req):
+        return 200, [{"cameraId": cam, "viewports": 1} for cam in sorted(self.store.displayed)]
+
+    def get_workspaces(self, req):
+        return self._list("workspaces", req)
+
+    def get_windows(self, req):
+        return 200, self.inventory.windows
+
+    def get_status(self, req):
+        return 200, {"status": "running", "mode": "ClientLive", "listenUrl": req["base"], "version": "mock"}
+
+    def get_metrics(self, req):
+        return 200, {
+            "cpuTimeMs": int(time.process_time() * 1000),
+            "eventSubscribers": self.events.subscriber_count,
+            "eventsPublished": self.events.published,
+            "overlays": {"count": len(self.store.list()), "draws": self.store.draws,
+                         "skippedDraws": self.store.skipped, "passes": self.store.passes,
+                         "expired": self.store.expired, "pendingExpiries": len(self.store._expiries),
+                         "expiryLatenessMeanMs": round(self.store.lateness_total_ms / self.store.expired, 2)
+                         if self.store.expired else 0.0,
+                         "expiryLatenessMaxMs": round(self.store.lateness_max_ms, 2)},
+            "routeWindowSeconds": RouteMetrics.SLOT_SECONDS * RouteMetrics.SLOT_COUNT,
+            "routes": self.route_metrics.snapshot(),
+        }
+
+    # ── Actions ──
+
+    def switch_view(self, req):
+        body = req["body"] or {}
+        if not body.get("viewId"):
+            raise ApiError(400, "viewId is required")
+        view = next((v for v in self.inventory.views if v["id"] == body["viewId"]), None)
+        if view is None:
+            raise ApiError(404)
+        self.events.publish("view.changed", {"viewId": view["id"], "name": view["name"],
+                                             "at": _utc(datetime.now(timezone.utc))})
+        return 200, {"success": True, "viewId": body["viewId"], "windowIndex": body.get("windowIndex", 0)}
+
+    def show_cameras(self, req):
+        ids = (req["body"] or {}).get("cameraIds") or []
+        if not ids:
+            raise ApiError(400, "cameraIds array is required and must not be empty")
+        if len(ids) > 20:
+            raise ApiError(400, "Maximum 20 cameras per request")
+        for cam in ids:
+            if cam not in self.inventory.camera_ids:
+                raise ApiError(404, f"Camera not found: {cam}", "error")
+        self.store.displayed = set(ids)
+        return 200, {"success": True, "cameraCount": len(ids), "windowIndex": req["body"].get("windowIndex", 0)}
+
+    def set_camera(self, req):
+        body = req["body"] or {}
+        if not body.get("cameraId"):
+            raise ApiError(400, "cameraId is required")
+        if body["cameraId"] not in self.inventory.camera_ids:
+            raise ApiError(404)
+        self.store.displayed = self.store.displayed | {body["cameraId"]}
+        return 200, {"success": True, "cameraId": body["cameraId"], "slotIndex": body.get("slotIndex", 0),
+                     "windowIndex": body.get("windowIndex", 0)}
+
+    def switch_workspace(self, req):
+        body = req["body"] or {}
+        if not body.get("workspaceId"):
+            raise ApiError(400, "workspaceId is required")
+        workspace = next((w for w in self.inventory.workspaces if w["id"] == body["workspaceId"]), None)
+        if workspace is None:
+            raise ApiError(404)
+        self.events.publish("workspace.changed", {"workspaceId": workspace["id"], "name": workspace["name"],
+                                                  "at": _utc(datetime.now(timezone.utc))})
+        return 200, {"success": True, "workspaceId": body["workspaceId"]}
+
+    def application_control(self, req):
+        command = (req["body"] or {}).get("command")
+        match = next((c for c in APP_COMMANDS if command and c.lower() == command.lower()), None)
+        if match is None:
+            raise ApiError(400, f"command is required. Available: {', '.join(APP_COMMANDS)}")
+        return 200, {"success": True, "command": command}
+
+    def close_window(self, req):
+        body = req["body"] or {}
+        if body.get("all"):
+            return 200, {"success": True, "message": "All floating windows closed"}
+        if body.get("windowIndex", 0) != 0:
+            raise ApiError(404)
+        return 200, {"success": True, "windowIndex": 0}
+
+    def clear_view(self, req):
+        body = req["body"] or {}
+        if body.get("windowIndex", 0) != 0:
+            raise ApiError(404)
+        delay = max(0, min(body.get("delaySeconds") or 0, 300))
+        if delay > 0:
+            return 200, {"success": True, "message": f"View will be cleared in {delay} seconds", "windowIndex": 0}
+        return 200, {"success": True, "message": "View cleared", "windowIndex": 0}
+
+    # ── Overlays ──
+
+    def upsert_overlay(self, req):
+        body = req["body"]
+        if body is None:
+            raise ApiError(400, "body required")
+        for field in ("overlayId", "cameraId"):
+            if not str(body.get(field) or "").strip():
+                raise ApiError(400, f"{field} is required")
+        binary = None
+        if body.get("binary"):
+            if body.get("svg"):
+                raise ApiError(400, "send either svg or binary, not both")
+            try:
+                binary = base64.b64decode(body["binary"], validate=True)
+            except (binascii.Error, TypeError):
+                # Json.NET cannot bind the request, so the action sees a null body.
+                raise ApiError(400, "body required")
+        elif not str(body.get("svg") or "").strip():
+            raise ApiError(400, "svg is required")
+        camera_id = _parse_guid(body["cameraId"])
+        if camera_id is None:
+            raise ApiError(400, "cameraId is not a valid GUID")
+        if camera_id not in self.inventory.camera_ids:
+            raise ApiError(404, "camera not found: " + body["cameraId"], "error")
+        rec, replaced = self.store.upsert(body["overlayId"], camera_id, body.get("svg"),
+                                          body.get("ttlSeconds"), body.get("zOrder") or 100, binary)
+        self.store.apply_all()  # the plugin starts a draw pass right away
+        return (200 if replaced else 201), self.store.upsert_response(rec, replaced)
+
+    def patch_overlay(self, req):
+        body = req["body"] or {}
+        rec = self.store.patch(req["params"]["id"], body.get("shapes") or [], body.get("ttlSeconds"))
+        if rec is None:
+            raise ApiError(404)
+        self.store.apply_all()
+        return 200, self.store.upsert_response(rec, True)
+
+    def list_overlays(self, req):
+        camera_id = req["query"].get("cameraId")
+        if camera_id:
+            camera_id = _parse_guid(camera_id)
+            if camera_id is None:
+                raise ApiError(400, "cameraId is not a valid GUID")
+        return 200, [self.store.dto(r) for r in self.store.list(camera_id)]
+
+    def get_overlay(self, req):
+        rec = self.store.get(req["params"]["id"])
+        if rec is None:
+            raise ApiError(404)
+        return 200, self.store.dto(rec, with_svg=True)
+
+    def delete_overlay(self, req):
+        overlay_id = req["params"]["id"]
+        if not self.store.remove(overlay_id):
+            raise ApiError(404)
+        return 200, {"success": True, "overlayId": overlay_id}
+
+    def delete_overlays(self, req):
+        camera_id = req["query"].get("cameraId")
+        if camera_id:
+            guid = _parse_guid(camera_id)
+            if guid is None:
+                raise ApiError(400, "cameraId is not a valid GUID")
+            return 200, {"success": True, "removed": self.store.remove_by_camera(guid)}
+        return 200, {"success": True, "removed": self.store.remove_all()}
+
+
+def make_handler(api: MockApi, verbose: bool):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the OWIN host
+        # Headers and body go out in separate writes; without TCP_NODELAY the
+        # body waits for the client's delayed ACK (~40 ms) on reused connections.
+        disable_nagle_algorithm = True
+
+        def _send(self, status: int, payload: Any = None, headers: dict | None = None) -> None:
+            if isinstance(payload, bytes):
+                raw = payload
+            elif payload is not None:
+                raw = json.dumps(payload).encode("utf-8")
+            else:
+                raw = b""
+            self.send_response(status)
+            if raw:
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if raw and self.command != "HEAD":
+                self.wfile.write(raw)
+
+        def _handle(self) -> None:
+            t0 = time.perf_counter()
+            _timing.phases = phases = {}
+            parsed = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw_body = self.rfile.read(length) if length > 0 else b""
+            route = f"{self.command} (unrouted)"
+            with api._counter_lock:
+                api.requests += 1
+            try:
+                if not parsed.path.lower().startswith("/api/"):
+                    raise ApiError(404, "No HTTP resource was found that matches the request URI.")
+                with timed("auth"):
+                    authorized = api.check_token(self.headers.get("Authorization"))
+                if not authorized:
+                    raise ApiError(401, "Unauthorized. Provide a valid Bearer token in the Authorization header.", "error")
+                bind_start = time.perf_counter()
+                encoding = (self.headers.get("Content-Encoding") or "").strip().lower()
+                if raw_body and encoding:
+                    if encoding not in ("gzip", "deflate"):
+                        raise ApiError(415, f"Unsupported Content-Encoding '{encoding}'. Use gzip or deflate.", "error")
+                    with timed("inflate"):
+                        raw_body = inflate(raw_body, encoding)
+                template, handler, params = api.match(self.command, parsed.path)
+                route = f"{self.command} api/{template}"
+                if handler is None:
+                    _timing.phases = None
+                    self._stream_events(verbose)
+                    return
+
+                delay = api.latency.delay(self.command, template)
+                if delay > 0:
+                    time.sleep(delay)
+
+                try:
+                    body = json.loads(raw_body) if raw_body else None
+                except ValueError:
+                    body = None  # Web API binds an unreadable body as null
+                req = {
+                    "params": params,
+                    "query": {k: v[0] for k, v in parse_qs(parsed.query).items()},
+                    "body": body if isinstance(body, dict) else None,
+                    "headers": self.headers,
+                    "base": f"http://{self.headers.get('Host', 'localhost')}",
+                }
+                phase("bind", bind_start)
+                with timed("action"):
+                    result = handler(req)
+            except ApiError as ex:
+                result = (ex.status, ex.body)
+            except Exception as ex:  # keep serving; report like an unhandled controller exception
+                result = (500, {"message": "An error has occurred.", "exceptionMessage": str(ex)})
+            _timing.phases = None
+
+            status = result[0]
+            payload = result[1] if len(result) > 1 else None
+            headers = dict(result[2]) if len(result) > 2 and result[2] else {}
+            if payload is not None and not isinstance(payload, bytes):
+                payload = json.dumps(payload).encode("utf-8")
+            if payload and len(payload) >= MIN_COMPRESS_BYTES and "Content-Encoding" not in headers:
+                headers["Vary"] = "Accept-Encoding"
+                encoding = negotiate(self.headers.get("Accept-Encoding"))
+                if encoding:
+                    start = time.perf_counter()
+                    packed = compress(payload, encoding)
+                    if len(packed) < len(payload):
+                        payload = packed
+                        headers["Content-Encoding"] = encoding
+                        if headers.get("ETag", "").startswith('"'):
+                            headers["ETag"] = variant_tag(headers["ETag"], encoding)
+                    phases["compress"] = (time.perf_counter() - start) * 1000.0
+            ms = (time.perf_counter() - t0) * 1000.0
+            headers["Server-Timing"] = server_timing(phases, ms, route)
+            api.route_metrics.record(route, status, ms, phases)
+            self._send(status, payload, headers)
+            if verbose:
+                color = C.GREEN if status < 400 else C.RED
+                log(f"  {color}{status}{C.OFF}  {C.CYAN}{self.command:6}{C.OFF} {parsed.path}"
+                    f"{C.GRAY}{'?' + parsed.query if parsed.query else ''}  {ms:.1f}ms{C.OFF}")
+
+        def _write_chunk(self, data: bytes) -> None:
+            self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def _stream_events(self, verbose: bool) -> None:
+            # Like PushStreamContent: chunked, never completes on its own.
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.close_connection = True
+            sub = api.events.subscribe()
+            if verbose:
+                log(f"  {C.GREEN}event stream client connected ({api.events.subscriber_count} total){C.OFF}")
+            try:
+                self._write_chunk(b"retry: 3000\n: connected\n\n")
+                while not sub.closed:
+                    frames = sub.take(EventBroadcaster.KEEPALIVE_SECONDS)
+                    if sub.overflowed:
+                        self._write_chunk(b"".join(frames) + b"event: overflow\ndata: {}\n\n")
+                        break
+                    # Comment frame on idle: keeps proxies from timing out and
+                    # surfaces dead connections as a write failure.
+                    self._write_chunk(b"".join(frames) if frames else b": keepalive\n\n")
+            except OSError:
+                pass  # client went away
+            finally:
+                api.events.unsubscribe(sub)
+                if verbose:
+                    log(f"  {C.GRAY}event stream client disconnected{C.OFF}")
+
+        do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        def do_OPTIONS(self) -> None:
+            self._send(200)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def tick_loop(store: OverlayStore, stop: threading.Event) -> None:
+    # OverlayManager redraws on its 333 ms DispatcherTimer tick.
+    while not stop.wait(TICK_INTERVAL):
+        store.apply_all()
+
+
+def expiry_loop(store: OverlayStore, stop: threading.Event) -> None:
+    # OverlayManager arms a one-shot timer for the earliest expiry; a
+    # condition wait with the same timeout is the equivalent here.
+    with store._wake:
+        while not stop.is_set():
+            store._wake.wait(store.expire_due())
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Stand-in server for the SCRemoteControl REST API")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=9500)
+    p.add_argument("--token", default=DEFAULT_TOKEN)
+    p.add_argument("--cameras", type=int, default=2000, help="synthetic cameras to serve")
+    p.add_argument("--displayed", type=int, default=4,
+                   help="cameras initially reported as on screen (first N)")
+    p.add_argument("--displayed-offset", type=int, default=0,
+                   help="skip this many cameras before the on-screen ones, so several mocks can "
+                        "stand in for the clients of a video wall")
+    p.add_argument("--latency", action="append", default=[], metavar="ROUTE=MS",
+                   help="fixed delay per route, e.g. overlays=5, 'PATCH overlays/{id}=2', *=1")
+    p.add_argument("--quiet", action="store_true", help="do not log each request")
+    args = p.parse_args()
+
+    inventory = Inventory(args.cameras)
+    events = EventBroadcaster()
+    store = OverlayStore(inventory, args.displayed, args.displayed_offset, events.overlay_changed)
+    api = MockApi(inventory, store, args.token, LatencyRules(args.latency), events)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(api, not args.quiet))
+    server.daemon_threads = True
+    stop = threading.Event()
+    threading.Thread(target=tick_loop, args=(store, stop), daemon=True).start()
+    threading.Thread(target=expiry_loop, args=(store, stop), daemon=True).start()
+
+    log(f"{C.BOLD}SCRemoteControl mock server{C.OFF}")
+    log(f"  listen : http://{args.host}:{args.port}")
+    log(f"  token  : {args.token}")
+    log(f"  cameras: {len(inventory.cameras)}  views: {len(inventory.views)}  "
+        f"workspaces: {len(inventory.workspaces)}")
+    for route, delay in api.latency.rules.items():
+        log(f"  latency: {route} +{delay * 1000:.1f}ms")
+    log(f"{C.GRAY}  Ctrl+C to stop{C.OFF}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,19 +6,43 @@ Usage:
     python test-api.py --token <token>       # override the bundled token
     python test-api.py --base http://host:9500
     python test-api.py --demo                # skip tests, run the live fill-meter demo only
+    python test-api.py --bench-patch         # compare full upserts with shape patches
+    python test-api.py --bench-scale         # upsert/list/delete cost as the registry grows
+    python test-api.py --watch               # print GET /api/events as they arrive
+    python test-api.py --bench-events        # event stream latency vs 1 Hz polling
+    python test-api.py --bench-compression --link-kbps 2000
+                                             # gzip vs identity over a throttled link
+    python test-api.py --load --load-rate 500 --load-csv load.csv
+                                             # open-loop load test, see "Load generator"
 
 No third-party dependencies. Uses stdlib urllib + json so it runs on any Python 3.6+.
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
+import base64
+import csv
+import gzip
+import http.client
 import json
 import math
+import multiprocessing
+import os
+import random
+import re
+import socket
+import ssl
+import struct
 import sys
+import threading
 import time
 import urllib.error
 import urllib.parse
 import urllib.request
+import xml.etree.ElementTree as ET
+import zlib
+from datetime import datetime
 from typing import Any
 
 # Update these or pass --token / --base on the command line.
@@ -52,49 +76,156 @@ def fail(msg: str) -> None: print(f"  {C.RED}✗{C.OFF} {msg}")
 def info(msg: str) -> None: print(f"  {C.GRAY}-{C.OFF} {msg}")
 
 
+# ────────────────────────────────────────────────────────────────────────────
+# Server-Timing
+# ────────────────────────────────────────────────────────────────────────────
+
+TIMING_PHASES = ("auth", "inflate", "bind", "parse", "lock", "dispatch", "action", "compress")
+
+
+def parse_server_timing(value: str | None) -> tuple[str | None, dict[str, float]]:
+    """Split a Server-Timing header into (route, {metric: ms}). The plugin
+    names the route in the desc of its "total" metric."""
+    route, phases = None, {}
+    for entry in (value or "").split(","):
+        parts = [p.strip() for p in entry.split(";")]
+        if not parts[0]:
+            continue
+        params = dict(p.split("=", 1) for p in parts[1:] if "=" in p)
+        try:
+            phases[parts[0]] = float(params.get("dur", "0"))
+        except ValueError:
+            continue
+        if parts[0] == "total" and "desc" in params:
+            route = params["desc"].strip('"')
+    return route, phases
+
+
+class ServerTimingStats:
+    """Server-Timing samples per route from every Client in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: dict[str, dict[str, list[float]]] = {}
+
+    def add(self, route: str, phases: dict[str, float]) -> None:
+        with self._lock:
+            per_route = self.routes.setdefault(route, {})
+            for name, ms in phases.items():
+                per_route.setdefault(name, []).append(ms)
+
+    def report(self) -> None:
+        with self._lock:
+            rows = sorted(self.routes.items(), key=lambda kv: -len(kv[1].get("total", [])))
+        if not rows:
+            return
+        banner("Server timing (from Server-Timing headers)", C.CYAN)
+        seen = [p for p in TIMING_PHASES if any(p in phases for _, phases in rows)]
+        cols = "".join(f" {p:>8}" for p in seen)
+        print(f"  {'route':30} {'count':>6} {'p50 ms':>8} {'p95 ms':>8}{cols}")
+        for route, phases in rows:
+            total = phases.get("total", [])
+            if not total:
+                continue
+            means = "".join(f" {sum(phases[p]) / len(total):8.3f}" if p in phases else f" {'-':>8}"
+                            for p in seen)
+            print(f"  {route[:30]:30} {len(total):6d} {_percentile(total, 50):8.2f} "
+                  f"{_percentile(total, 95):8.2f}{means}")
+        info("phase columns are means per request; action includes parse, lock and dispatch")
+
+
+SERVER_TIMING = ServerTimingStats()
+
+
 # ────────────────────────────────────────────────────────────────────────────
 # HTTP helper
 # ────────────────────────────────────────────────────────────────────────────
 
+COMPRESS_MIN_BYTES = 1024  # CompressionHandler.MinCompressBytes
+
+
 class Client:
-    def __init__(self, base: str, token: str):
+    # Sent on every call; responses are inflated as they stream in. Set to
+    # None for identity responses (main() applies --no-compression).
+    accept_encoding: str | None = "gzip, deflate"
+    # gzip request bodies of COMPRESS_MIN_BYTES or more (--compress-requests).
+    compress_requests = False
+
+    def __init__(self, base: str, token: str, verbose: bool = True):
         self.base = base.rstrip("/")
         self.token = token
+        # verbose=False only prints calls that fail or miss `expect` (benchmarks).
+        self.verbose = verbose
+        # Bytes on the wire (bodies only, after compression) and after inflating.
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        self.last_headers: dict[str, str] = {}
+        # path -> (ETag, payload) for conditional GETs, see get_cached().
+        self._etags: dict[str, tuple[str, Any]] = {}
 
     def call(self, method: str, path: str, body: dict | None = None,
              expect: int | None = None, with_auth: bool = True,
-             query: dict | None = None) -> tuple[int, Any]:
+             query: dict | None = None, headers: dict | None = None,
+             raw_body: bytes | None = None) -> tuple[int, Any]:
         url = self.base + path
         if query:
             url += "?" + urllib.parse.urlencode(query)
         data = None
-        headers = {"Content-Type": "application/json"}
+        headers = {"Content-Type": "application/json", **(headers or {})}
         if with_auth:
             headers["Authorization"] = f"Bearer {self.token}"
+        if self.accept_encoding:
+            headers.setdefault("Accept-Encoding", self.accept_encoding)
         if body is not None:
             data = json.dumps(body).encode("utf-8")
+            if self.compress_requests and len(data) >= COMPRESS_MIN_BYTES:
+                data = gzip.compress(data, compresslevel=1)
+                headers["Content-Encoding"] = "gzip"
+            self.bytes_sent += len(data)
+        elif raw_body is not None:
+            data = raw_body  # sent as is, with whatever Content-Encoding the caller set
+            self.bytes_sent += len(data)
         req = urllib.request.Request(url, data=data, method=method, headers=headers)
         try:
             with urllib.request.urlopen(req, timeout=15) as resp:
-                raw = resp.read()
+                raw = self._read_body(resp)
                 status = resp.status
+                self.last_headers = dict(resp.headers)
                 payload = json.loads(raw) if raw else None
         except urllib.error.HTTPError as e:
-            raw = e.read()
+            try:
+                raw = self._read_body(e)
+            except Exception:
+                raw = b""
             status = e.code
+            self.last_headers = dict(e.headers or {})
             try:
                 payload = json.loads(raw)
             except Exception:
                 payload = raw.decode("utf-8", errors="replace") if raw else None
         except Exception as ex:
             return 0, {"error": f"{type(ex).__name__}: {ex}"}
+        route, timing = parse_server_timing(self.last_headers.get("Server-Timing"))
+        if route and "total" in timing:
+            SERVER_TIMING.add(route, timing)
+
+        failed = expect is not None and status != expect
+        if not self.verbose and not failed:
+            return status, payload
 
         label = f"{C.CYAN}{method:6}{C.OFF} {path}{(' ' + urllib.parse.urlencode(query)) if query else ''}"
-        if expect is None or status == expect:
+        if not failed:
             tag = f"{C.GREEN}{status}{C.OFF}"
         else:
             tag = f"{C.RED}{status} (expected {expect}){C.OFF}"
-        print(f"  {tag}  {label}")
+        srv = ""
+        if "total" in timing:
+            # Inner phases worth reading; action is the sum of most of them.
+            detail = " ".join(f"{k} {v:.2f}" for k, v in timing.items()
+                              if k not in ("total", "action") and v >= 0.05)
+            srv = f"  {C.GRAY}srv {timing['total']:.2f}ms{(' (' + detail + ')') if detail else ''}{C.OFF}"
+        print(f"  {tag}  {label}{srv}")
         if status == 0 or (expect is not None and status != expect):
             if isinstance(payload, (dict, list)):
                 snippet = json.dumps(payload, indent=2)[:600]
@@ -103,6 +234,540 @@ class Client:
                 print(f"    {C.GRAY}{payload}{C.OFF}")
         return status, payload
 
+    def _read_body(self, resp) -> bytes:
+        """Read a response body, inflating gzip / deflate chunk by chunk as it
+        arrives instead of buffering the compressed body first."""
+        encoding = (resp.headers.get("Content-Encoding") or "").strip().lower()
+        chunks, z = [], None
+        while True:
+            chunk = resp.read(65536)
+            if not chunk:
+                break
+            self.bytes_received += len(chunk)
+            if encoding not in ("gzip", "deflate"):
+                chunks.append(chunk)
+                continue
+            if z is None:
+                if encoding == "gzip":
+                    wbits = 16 + zlib.MAX_WBITS
+                else:
+                    # RFC 1950 zlib data, or raw deflate from servers that skip the header.
+                    zlib_header = len(chunk) >= 2 and chunk[0] & 0x0F == 8 and ((chunk[0] << 8) | chunk[1]) % 31 == 0
+                    wbits = zlib.MAX_WBITS if zlib_header else -zlib.MAX_WBITS
+                z = zlib.decompressobj(wbits)
+            chunks.append(z.decompress(chunk))
+        if z is not None:
+            chunks.append(z.flush())
+        raw = b"".join(chunks)
+        self.bytes_decoded += len(raw)
+        return raw
+
+    def get_cached(self, path: str, expect: int | None = None) -> tuple[int, Any]:
+        """GET with If-None-Match from the last response for this path.
+        On 304 the previously stored payload is returned with the 304 status."""
+        prev = self._etags.get(path)
+        headers = {"If-None-Match": prev[0]} if prev else None
+        status, payload = self.call("GET", path, expect=expect, headers=headers)
+        if status == 304 and prev:
+            return status, prev[1]
+        etag = self.last_headers.get("ETag")
+        if status == 200 and etag:
+            self._etags[path] = (etag, payload)
+        return status, payload
+
+    # ── Overlay helpers ──
+
+    def upsert_overlay(self, overlay_id: str, camera_id: str, svg: str,
+                       ttl_seconds: int | None = None, z_order: int | None = None,
+                       expect: int | None = None) -> tuple[int, Any]:
+        body: dict[str, Any] = {"overlayId": overlay_id, "cameraId": camera_id, "svg": svg}
+        if ttl_seconds is not None:
+            body["ttlSeconds"] = ttl_seconds
+        if z_order is not None:
+            body["zOrder"] = z_order
+        return self.call("POST", "/api/overlays", body=body, expect=expect)
+
+    def upsert_overlay_binary(self, overlay_id: str, camera_id: str, data: bytes,
+                              ttl_seconds: int | None = None, z_order: int | None = None,
+                              expect: int | None = None) -> tuple[int, Any]:
+        """Upsert from encode_overlay() output instead of SVG text."""
+        body: dict[str, Any] = {"overlayId": overlay_id, "cameraId": camera_id,
+                                "binary": base64.b64encode(data).decode("ascii")}
+        if ttl_seconds is not None:
+            body["ttlSeconds"] = ttl_seconds
+        if z_order is not None:
+            body["zOrder"] = z_order
+        return self.call("POST", "/api/overlays", body=body, expect=expect)
+
+    def patch_overlay(self, overlay_id: str, shapes: dict[str, dict[str, str]],
+                      ttl_seconds: int | None = None,
+                      expect: int | None = 200) -> tuple[int, Any]:
+        """Change attributes of shapes addressed by their SVG id, e.g.
+        {"semi-needle": {"x2": "120.5", "y2": "88.0"}, "semi-number": {"text": "42"}}."""
+        body: dict[str, Any] = {
+            "shapes": [{"id": sid, "attributes": attrs} for sid, attrs in shapes.items()],
+        }
+        if ttl_seconds is not None:
+            body["ttlSeconds"] = ttl_seconds
+        path = "/api/overlays/" + urllib.parse.quote(overlay_id, safe="")
+        return self.call("PATCH", path, body=body, expect=expect)
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def svg_patch(old_svg: str, new_svg: str) -> dict[str, dict[str, str]] | None:
+    """Shape patch that turns old_svg into new_svg.
+
+    Returns {} when nothing changed and None when the change can't be expressed
+    as a patch (different element structure, a changed shape without an id,
+    removed attributes, or transform changes). Callers fall back to a full upsert.
+    """
+    try:
+        old_root = ET.fromstring(old_svg)
+        new_root = ET.fromstring(new_svg)
+    except ET.ParseError:
+        return None
+    if old_root.attrib != new_root.attrib:
+        return None
+    old_elems = list(old_root.iter())[1:]
+    new_elems = list(new_root.iter())[1:]
+    if len(old_elems) != len(new_elems):
+        return None
+
+    patch: dict[str, dict[str, str]] = {}
+    for o, n in zip(old_elems, new_elems):
+        if o.tag != n.tag or o.get("id") != n.get("id"):
+            return None
+        if set(o.attrib) - set(n.attrib):
+            return None
+        changed = {k: v for k, v in n.attrib.items() if o.attrib.get(k) != v}
+        if (o.text or "") != (n.text or ""):
+            if _local(n.tag) != "text":
+                return None
+            changed["text"] = n.text or ""
+        if not changed:
+            continue
+        shape_id = n.get("id")
+        if not shape_id or _local(n.tag) == "g" or "transform" in changed:
+            return None
+        patch[shape_id] = changed
+    return patch
+
+
+class LiveOverlay:
+    """Keeps one overlay in sync with a changing SVG.
+
+    The first push is a full upsert. Later pushes send only the attributes of
+    id'd shapes that changed (PATCH), skip the request entirely when nothing
+    changed, and fall back to a full upsert when the structure changed or the
+    overlay is gone server-side (expired, deleted, Smart Client restarted).
+    """
+
+    def __init__(self, client: Client, overlay_id: str, camera_id: str,
+                 ttl_seconds: int | None = None, z_order: int | None = None):
+        self.client = client
+        self.overlay_id = overlay_id
+        self.camera_id = camera_id
+        self.ttl_seconds = ttl_seconds
+        self.z_order = z_order
+        self.upserts = 0
+        self.patches = 0
+        self.skipped = 0
+        self._last_svg: str | None = None
+
+    def push(self, svg: str) -> int:
+        if self._last_svg is not None:
+            patch = svg_patch(self._last_svg, svg)
+            if patch == {}:
+                self.skipped += 1
+                return 200
+            if patch:
+                code, _ = self.client.patch_overlay(self.overlay_id, patch, self.ttl_seconds, expect=None)
+                if code == 200:
+                    self.patches += 1
+                    self._last_svg = svg
+                    return code
+        code, _ = self.client.upsert_overlay(self.overlay_id, self.camera_id, svg,
+                                             self.ttl_seconds, self.z_order)
+        if code in (200, 201):
+            self.upserts += 1
+            self._last_svg = svg
+        else:
+            self._last_svg = None
+        return code
+
+    def delete(self) -> None:
+        self._last_svg = None
+        self.client.call("DELETE", "/api/overlays/" + urllib.parse.quote(self.overlay_id, safe=""))
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Binary overlay encoding (BinaryOverlay.cs)
+#
+# encode_overlay() converts a document in the plugin's SVG subset into the
+# compact binary encoding: styles and transforms are resolved the way
+# SvgParser does, coordinates become float32 and identical styles are stored
+# once. Post it with Client.upsert_overlay_binary().
+# ────────────────────────────────────────────────────────────────────────────
+
+# CSS names the gauge helpers and typical overlays use; SvgParser accepts every
+# WPF named color, extend this table if you need more.
+NAMED_COLORS = {
+    "black": 0x000000, "white": 0xFFFFFF, "red": 0xFF0000, "lime": 0x00FF00, "green": 0x008000,
+    "blue": 0x0000FF, "yellow": 0xFFFF00, "orange": 0xFFA500, "cyan": 0x00FFFF, "magenta": 0xFF00FF,
+    "gray": 0x808080, "grey": 0x808080, "silver": 0xC0C0C0, "purple": 0x800080, "navy": 0x000080,
+}
+_UNIT_RE = re.compile(r"(px|pt|%|em|ex|cm|mm|in)$", re.IGNORECASE)
+_TRANSFORM_RE = re.compile(r"(matrix|translate|scale|rotate)\s*\(\s*([^)]+)\)", re.IGNORECASE)
+_SEP_RE = re.compile(r"[\s,]+")
+_BINARY_TYPES = {"rect": 1, "circle": 2, "ellipse": 3, "line": 4, "polyline": 5, "polygon": 6, "path": 7, "text": 8}
+_BINARY_GEOMETRY = {
+    "rect": ("x", "y", "width", "height", "rx", "ry"),
+    "circle": ("cx", "cy", "r"),
+    "ellipse": ("cx", "cy", "rx", "ry"),
+    "line": ("x1", "y1", "x2", "y2"),
+    "text": ("x", "y"),
+}
+_IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def _num(s: str | None) -> float:
+    """SvgParser.D: optional unit suffix, 0 when unparsable."""
+    if not s:
+        return 0.0
+    try:
+        return float(_UNIT_RE.sub("", s).strip())
+    except ValueError:
+        return 0.0
+
+
+def _argb(s: str) -> int | None:
+    """SvgParser.ParseColor as 0xAARRGGBB, None for none/unknown."""
+    s = s.strip()
+    low = s.lower()
+    if low == "none":
+        return None
+    if low == "transparent":
+        return 0x00FFFFFF
+    m = re.match(r"^rgba?\(\s*([^)]+)\)\s*$", s, re.IGNORECASE)
+    if m:
+        parts = [p.strip() for p in m.group(1).split(",")]
+        try:
+            r, g, b = (max(0, min(255, int(float(p)))) for p in parts[:3])
+        except ValueError:
+            return None
+        a = 255
+        if len(parts) >= 4:
+            try:
+                a = max(0, min(255, int(float(parts[3]) * 255)))
+            except ValueError:
+                pass
+        return a << 24 | r << 16 | g << 8 | b
+    if s.startswith("#") and len(s) == 4:
+        s = "#" + s[1] * 2 + s[2] * 2 + s[3] * 2
+    if s.startswith("#") and len(s) in (7, 9):
+        try:
+            v = int(s[1:], 16)
+        except ValueError:
+            return None
+        return v | 0xFF000000 if len(s) == 7 else v
+    if low in NAMED_COLORS:
+        return 0xFF000000 | NAMED_COLORS[low]
+    return None
+
+
+def _mul(a: tuple, b: tuple) -> tuple:
+    """WPF Matrix multiply (row vectors): a then b."""
+    return (
+        a[0] * b[0] + a[1] * b[2], a[0] * b[1] + a[1] * b[3],
+        a[2] * b[0] + a[3] * b[2], a[2] * b[1] + a[3] * b[3],
+        a[4] * b[0] + a[5] * b[2] + b[4], a[4] * b[1] + a[5] * b[3] + b[5],
+    )
+
+
+def _transform(t: str | None) -> tuple:
+    """SvgParser.ParseTransform."""
+    result = _IDENTITY
+    for op, raw in _TRANSFORM_RE.findall(t or ""):
+        args = []
+        for p in _SEP_RE.split(raw.strip()):
+            try:
+                args.append(float(p))
+            except ValueError:
+                args.append(0.0)
+        op = op.lower()
+        local = _IDENTITY
+        if op == "matrix" and len(args) >= 6:
+            local = tuple(args[:6])
+        elif op == "translate":
+            local = (1.0, 0.0, 0.0, 1.0, args[0] if args else 0.0, args[1] if len(args) > 1 else 0.0)
+        elif op == "scale":
+            sx = args[0] if args else 1.0
+            local = (sx, 0.0, 0.0, args[1] if len(args) > 1 else sx, 0.0, 0.0)
+        elif op == "rotate":
+            rad = math.radians(args[0] if args else 0.0)
+            cos, sin = math.cos(rad), math.sin(rad)
+            local = (cos, sin, -sin, cos, 0.0, 0.0)
+            if len(args) >= 3:
+                cx, cy = args[1], args[2]
+                local = _mul(_mul((1.0, 0.0, 0.0, 1.0, -cx, -cy), local), (1.0, 0.0, 0.0, 1.0, cx, cy))
+        result = _mul(local, result)
+    return result
+
+
+def _apply_style(style: dict, name: str, value: str) -> None:
+    if name in ("fill", "stroke"):
+        style[name] = _argb(value)
+    elif name in ("fill-opacity", "stroke-opacity", "opacity"):
+        style[name] = max(0.0, min(1.0, _num(value)))
+    elif name == "stroke-width":
+        style[name] = max(0.0, _num(value))
+    elif name == "font-size":
+        style[name] = max(1.0, _num(value))
+    elif name == "font-family":
+        style[name] = value
+    elif name == "font-weight":
+        v = value.strip().lower()
+        style[name] = {"bold": 700, "normal": 400, "lighter": 300, "bolder": 800}.get(v)
+        if style[name] is None:
+            style[name] = max(100, min(900, int(v))) if v.lstrip("-").isdigit() else 400
+    elif name == "font-style":
+        style[name] = value.strip().lower() in ("italic", "oblique")
+
+
+def _read_style(elem: ET.Element, parent: dict) -> dict:
+    style = dict(parent)
+    for name in ("fill", "stroke", "fill-opacity", "stroke-opacity", "opacity", "stroke-width",
+                 "font-family", "font-size", "font-weight", "font-style"):
+        if elem.get(name):
+            _apply_style(style, name, elem.get(name))
+    for decl in (elem.get("style") or "").split(";"):
+        if ":" in decl:
+            k, v = decl.split(":", 1)
+            _apply_style(style, k.strip().lower(), v.strip())
+    return style
+
+
+def _pack_str(s: str) -> bytes:
+    raw = s.encode("utf-8")
+    return struct.pack("<H", len(raw)) + raw
+
+
+def _pack_style(style: dict) -> bytes:
+    flags = ((1 if style["fill"] is not None else 0) | (2 if style["stroke"] is not None else 0)
+             | (4 if style["font-family"] else 0) | (8 if style["font-style"] else 0))
+    out = bytearray(struct.pack("<B", flags))
+    if style["fill"] is not None:
+        out += struct.pack("<I", style["fill"])
+    if style["stroke"] is not None:
+        out += struct.pack("<I", style["stroke"])
+    out += struct.pack("<5fH", style["fill-opacity"], style["stroke-opacity"], style["opacity"],
+                       style["stroke-width"], style["font-size"], style["font-weight"])
+    if style["font-family"]:
+        out += _pack_str(style["font-family"])
+    return bytes(out)
+
+
+def encode_overlay(svg: str) -> bytes:
+    """Encode an SVG document (plugin subset) as a binary overlay."""
+    root = ET.fromstring(svg)
+    vb = [float(p) for p in _SEP_RE.split(root.get("viewBox", "0 0 1000 1000").strip())]
+    styles: dict[bytes, int] = {}
+    shapes = bytearray()
+    count = 0
+
+    def visit(elem: ET.Element, parent_style: dict, parent_matrix: tuple) -> None:
+        nonlocal count
+        tag = _local(elem.tag)
+        style = _read_style(elem, parent_style)
+        local = _transform(elem.get("transform"))
+        matrix = _mul(local, parent_matrix) if local != _IDENTITY else parent_matrix
+        if tag == "g":
+            for child in elem:
+                visit(child, style, matrix)
+            return
+        if tag not in _BINARY_TYPES:
+            return
+        packed_style = _pack_style(style)
+        index = styles.setdefault(packed_style, len(styles))
+        shape_id = elem.get("id")
+        flags = (1 if shape_id else 0) | (2 if matrix != _IDENTITY else 0)
+        shapes.extend(struct.pack("<BBH", _BINARY_TYPES[tag], flags, index))
+        if shape_id:
+            shapes.extend(_pack_str(shape_id))
+        if matrix != _IDENTITY:
+            shapes.extend(struct.pack("<6f", *matrix))
+        if tag in _BINARY_GEOMETRY:
+            shapes.extend(struct.pack(f"<{len(_BINARY_GEOMETRY[tag])}f",
+                                      *(_num(elem.get(a)) for a in _BINARY_GEOMETRY[tag])))
+        if tag in ("polyline", "polygon"):
+            tokens = _SEP_RE.split((elem.get("points") or "").strip())
+            points = []
+            for x, y in zip(tokens[0::2], tokens[1::2]):
+                try:
+                    points.append((float(x), float(y)))
+                except ValueError:
+                    pass
+            shapes.extend(struct.pack("<H", len(points)))
+            for x, y in points:
+                shapes.extend(struct.pack("<2f", x, y))
+        elif tag == "path":
+            shapes.extend(_pack_str(elem.get("d") or ""))
+        elif tag == "text":
+            shapes.extend(_pack_str("".join(elem.itertext())))
+        count += 1
+
+    root_style = _read_style(root, {
+        "fill": None, "stroke": None, "fill-opacity": 1.0, "stroke-opacity": 1.0, "opacity": 1.0,
+        "stroke-width": 0.0, "font-family": None, "font-size": 16.0, "font-weight": 400, "font-style": False,
+    })
+    for child in root:
+        visit(child, root_style, _IDENTITY)
+
+    out = bytearray(b"SCO\x01")
+    out += struct.pack("<4f", *vb)
+    out += struct.pack("<H", len(styles))
+    for packed in styles:  # dicts keep insertion order, which is the index order
+        out += packed
+    out += struct.pack("<H", count)
+    out += shapes
+    return bytes(out)
+
+
+class EventStream:
+    """Asyncio consumer for the GET /api/events Server-Sent Events stream.
+
+    Stdlib only: speaks HTTP/1.1 over asyncio streams and decodes chunked
+    transfer encoding itself. Iterate with `async for ev in stream.events()`;
+    each event is a dict {"event": type, "id": id, "data": parsed JSON}.
+    """
+
+    def __init__(self, base: str, token: str):
+        self.url = urllib.parse.urlsplit(base.rstrip("/") + "/api/events")
+        self.token = token
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._chunked = False
+        self._chunk_left = 0
+
+    async def connect(self) -> None:
+        https = self.url.scheme == "https"
+        ctx = None
+        if https:
+            ctx = ssl.create_default_context()
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE  # self-signed PFX is the common case
+        port = self.url.port or (443 if https else 80)
+        self._reader, self._writer = await asyncio.open_connection(self.url.hostname, port, ssl=ctx)
+        request = (
+            f"GET {self.url.path} HTTP/1.1\r\n"
+            f"Host: {self.url.netloc}\r\n"
+            f"Authorization: Bearer {self.token}\r\n"
+            "Accept: text/event-stream\r\n"
+            "Cache-Control: no-cache\r\n\r\n"
+        )
+        self._writer.write(request.encode("ascii"))
+        await self._writer.drain()
+
+        status_line = (await self._reader.readline()).decode("latin-1").strip()
+        parts = status_line.split(" ", 2)
+        if len(parts) < 2 or parts[1] != "200":
+            raise ConnectionError(f"event stream refused: {status_line}")
+        while True:
+            line = (await self._reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "transfer-encoding" and "chunked" in value.lower():
+                self._chunked = True
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+            self._writer = None
+
+    async def _read_body(self) -> bytes:
+        assert self._reader is not None
+        if not self._chunked:
+            data = await self._reader.read(65536)
+            if not data:
+                raise ConnectionError("event stream closed")
+            return data
+        if self._chunk_left == 0:
+            size_line = await self._reader.readline()
+            if not size_line:
+                raise ConnectionError("event stream closed")
+            self._chunk_left = int(size_line.split(b";")[0].strip() or b"0", 16)
+            if self._chunk_left == 0:
+                raise ConnectionError("event stream ended")
+        data = await self._reader.read(self._chunk_left)
+        if not data:
+            raise ConnectionError("event stream closed")
+        self._chunk_left -= len(data)
+        if self._chunk_left == 0:
+            await self._reader.readline()  # CRLF after each chunk
+        return data
+
+    async def events(self):
+        if self._reader is None:
+            await self.connect()
+        buf = b""
+        fields: dict[str, str] = {}
+        data_lines: list[str] = []
+        while True:
+            buf += await self._read_body()
+            while b"\n" in buf:
+                raw, buf = buf.split(b"\n", 1)
+                line = raw.rstrip(b"\r").decode("utf-8", errors="replace")
+                if not line:
+                    if data_lines or fields.get("event"):
+                        data = "\n".join(data_lines)
+                        try:
+                            parsed: Any = json.loads(data) if data else None
+                        except ValueError:
+                            parsed = data
+                        yield {"event": fields.get("event", "message"), "id": fields.get("id"), "data": parsed}
+                    fields, data_lines = {}, []
+                    continue
+                if line.startswith(":"):
+                    continue  # comment / keepalive
+                name, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if name == "data":
+                    data_lines.append(value)
+                else:
+                    fields[name] = value
+
+
+def watch_events(base: str, token: str) -> None:
+    async def run() -> None:
+        stream = EventStream(base, token)
+        try:
+            async for ev in stream.events():
+                print(f"  {C.CYAN}{ev['event']:18}{C.OFF} {json.dumps(ev['data'])}")
+        finally:
+            await stream.close()
+
+    banner("Watching /api/events (Ctrl+C to stop)", C.GREEN)
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(math.ceil(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
 
 # ────────────────────────────────────────────────────────────────────────────
 # SVG generators (used by both tests and the demo)
@@ -154,6 +819,11 @@ def _band_color(value: float, bands: list[tuple[int, int, str]] = GAUGE_BANDS) -
     return bands[-1][2]
 
 
+def _id(key: str | None, part: str) -> str:
+    """id attribute for value-dependent shapes, so live updates can PATCH them."""
+    return f" id='{key}-{part}'" if key else ""
+
+
 def _polar(cx: float, cy: float, r: float, deg: float) -> tuple[float, float]:
     rad = math.radians(deg)
     return cx + r * math.cos(rad), cy + r * math.sin(rad)
@@ -172,7 +842,7 @@ def _arc_points(cx: float, cy: float, r: float, start_deg: float, end_deg: float
 def _semi_gauge(parts: list[str], cx: float, cy: float, r: float, value: float,
                 title: str = "", number: str | None = None, needle: bool = True,
                 ring_w: float = 12, card: bool = True,
-                bands: list[tuple[int, int, str]] = GAUGE_BANDS) -> None:
+                bands: list[tuple[int, int, str]] = GAUGE_BANDS, key: str | None = None) -> None:
     if card:
         parts.append(
             f"<rect x='{cx - r - 22:.1f}' y='{cy - r - 18:.1f}' width='{2 * r + 44:.1f}' "
@@ -194,7 +864,7 @@ def _semi_gauge(parts: list[str], cx: float, cy: float, r: float, value: float,
         deg = 180 - value * 1.8
         nx, ny = _polar(cx, cy, r - 14, deg)
         parts.append(
-            f"<line x1='{cx:.1f}' y1='{cy:.1f}' x2='{nx:.1f}' y2='{ny:.1f}' "
+            f"<line{_id(key, 'needle')} x1='{cx:.1f}' y1='{cy:.1f}' x2='{nx:.1f}' y2='{ny:.1f}' "
             f"stroke='#d1d5db' stroke-width='3' stroke-linecap='round'/>"
         )
         parts.append(
@@ -208,11 +878,12 @@ def _semi_gauge(parts: list[str], cx: float, cy: float, r: float, value: float,
             f"fill='#111827' fill-opacity='0.92' stroke='white' stroke-opacity='0.25' stroke-width='1'/>"
         )
         parts.append(
-            f"<text x='{tx:.1f}' y='{chip_top + 14:.1f}' fill='white' font-size='12' font-weight='bold'>{number}</text>"
+            f"<text{_id(key, 'number')} x='{tx:.1f}' y='{chip_top + 14:.1f}' fill='white' font-size='12' font-weight='bold'>{number}</text>"
         )
 
 
-def _donut_gauge(parts: list[str], cx: float, cy: float, r: float, value: float) -> None:
+def _donut_gauge(parts: list[str], cx: float, cy: float, r: float, value: float,
+                 key: str | None = None) -> None:
     parts.append(
         f"<rect x='{cx - r - 16:.1f}' y='{cy - r - 16:.1f}' width='{2 * r + 32:.1f}' "
         f"height='{2 * r + 32:.1f}' rx='18' ry='18' fill='#05070a' fill-opacity='0.36' "
@@ -230,22 +901,23 @@ def _donut_gauge(parts: list[str], cx: float, cy: float, r: float, value: float)
     sx, sy = _polar(cx, cy, 16, deg)
     nx, ny = _polar(cx, cy, r - 9, deg)
     parts.append(
-        f"<line x1='{sx:.1f}' y1='{sy:.1f}' x2='{nx:.1f}' y2='{ny:.1f}' "
+        f"<line{_id(key, 'needle')} x1='{sx:.1f}' y1='{sy:.1f}' x2='{nx:.1f}' y2='{ny:.1f}' "
         f"stroke='white' stroke-width='3' stroke-linecap='round'/>"
     )
     # Tick dot riding on the ring at the value position
     tx_dot, ty_dot = _polar(cx, cy, r, deg)
     parts.append(
-        f"<circle cx='{tx_dot:.1f}' cy='{ty_dot:.1f}' r='4' fill='white' stroke='#111827' stroke-width='1.5'/>"
+        f"<circle{_id(key, 'dot')} cx='{tx_dot:.1f}' cy='{ty_dot:.1f}' r='4' fill='white' stroke='#111827' stroke-width='1.5'/>"
     )
     parts.append(f"<circle cx='{cx:.1f}' cy='{cy:.1f}' r='13' fill='#111827' fill-opacity='0.92'/>")
     number = str(int(round(value)))
     tx = cx - _text_width(number, 12, 0.50) / 2
-    parts.append(f"<text x='{tx:.1f}' y='{cy + 3:.1f}' fill='white' font-size='12' font-weight='bold'>{number}</text>")
+    parts.append(f"<text{_id(key, 'number')} x='{tx:.1f}' y='{cy + 3:.1f}' fill='white' font-size='12' font-weight='bold'>{number}</text>")
 
 
 def _linear_gauge(parts: list[str], x: float, y: float, w: float, h: float, value: float,
-                  rounded: bool = False, bands: list[tuple[int, int, str]] = GAUGE_BANDS) -> None:
+                  rounded: bool = False, bands: list[tuple[int, int, str]] = GAUGE_BANDS,
+                  key: str | None = None) -> None:
     radius = h / 2 if rounded else 7
     parts.append(
         f"<rect x='{x:.1f}' y='{y:.1f}' width='{w:.1f}' height='{h:.1f}' rx='{radius:.1f}' ry='{radius:.1f}' "
@@ -266,21 +938,22 @@ def _linear_gauge(parts: list[str], x: float, y: float, w: float, h: float, valu
     chip_x = marker_x - chip_w / 2
     chip_y = y - 22
     parts.append(
-        f"<rect x='{chip_x:.1f}' y='{chip_y:.1f}' width='{chip_w}' height='{chip_h}' rx='5' ry='5' "
+        f"<rect{_id(key, 'chip')} x='{chip_x:.1f}' y='{chip_y:.1f}' width='{chip_w}' height='{chip_h}' rx='5' ry='5' "
         f"fill='#111827' fill-opacity='0.92' stroke='white' stroke-opacity='0.25' stroke-width='1'/>"
     )
     # Arrow connects chip to the top of the bar (apex points down into the bar)
     parts.append(
-        f"<polygon points='{marker_x:.1f},{y + 1:.1f} {marker_x - 5:.1f},{chip_y + chip_h:.1f} {marker_x + 5:.1f},{chip_y + chip_h:.1f}' "
+        f"<polygon{_id(key, 'arrow')} points='{marker_x:.1f},{y + 1:.1f} {marker_x - 5:.1f},{chip_y + chip_h:.1f} {marker_x + 5:.1f},{chip_y + chip_h:.1f}' "
         f"fill='#111827' stroke='white' stroke-opacity='0.5' stroke-width='1'/>"
     )
     pct = str(int(round(value)))
     tx = marker_x - _text_width(pct, 8, 0.50) / 2
-    parts.append(f"<text x='{tx:.1f}' y='{chip_y + 10:.1f}' fill='white' font-size='8' font-weight='bold'>{pct}</text>")
+    parts.append(f"<text{_id(key, 'number')} x='{tx:.1f}' y='{chip_y + 10:.1f}' fill='white' font-size='8' font-weight='bold'>{pct}</text>")
 
 
 def _thermo_gauge(parts: list[str], x: float, y: float, value: float,
-                  bands: list[tuple[int, int, str]] = GAUGE_BANDS, inner_w: float = 6) -> None:
+                  bands: list[tuple[int, int, str]] = GAUGE_BANDS, inner_w: float = 6,
+                  key: str | None = None) -> None:
     outer_w, tube_h = 14, 150
     bulb_r = 13
     cx = x + outer_w / 2
@@ -306,16 +979,16 @@ def _thermo_gauge(parts: list[str], x: float, y: float, value: float,
         f"<rect x='{inner_x:.1f}' y='{inner_y:.1f}' width='{inner_w}' height='{inner_h:.1f}' rx='3' ry='3' fill='#0b0f14'/>"
     )
     # Inner bulb color (drawn before the level so the level mercury connects into it)
-    parts.append(f"<circle cx='{cx:.1f}' cy='{cy:.1f}' r='{bulb_r - 4}' fill='{fill_color}'/>")
+    parts.append(f"<circle{_id(key, 'bulb')} cx='{cx:.1f}' cy='{cy:.1f}' r='{bulb_r - 4}' fill='{fill_color}'/>")
     level_h = inner_h * (value / 100.0)
     level_y = inner_y + inner_h - level_h
     # Mercury column extends a few px past the inner tube so it visually fuses with the bulb
     parts.append(
-        f"<rect x='{inner_x:.1f}' y='{level_y:.1f}' width='{inner_w}' height='{level_h + 6:.1f}' rx='3' ry='3' fill='{fill_color}'/>"
+        f"<rect{_id(key, 'level')} x='{inner_x:.1f}' y='{level_y:.1f}' width='{inner_w}' height='{level_h + 6:.1f}' rx='3' ry='3' fill='{fill_color}'/>"
     )
     mark_y = inner_y + inner_h - level_h
     parts.append(
-        f"<line x1='{x - 10:.1f}' y1='{mark_y:.1f}' x2='{x - 2:.1f}' y2='{mark_y:.1f}' stroke='{fill_color}' stroke-width='2'/>"
+        f"<line{_id(key, 'mark')} x1='{x - 10:.1f}' y1='{mark_y:.1f}' x2='{x - 2:.1f}' y2='{mark_y:.1f}' stroke='{fill_color}' stroke-width='2'/>"
     )
     pct = f"{int(round(value))}%"
     chip_w = 28
@@ -323,11 +996,11 @@ def _thermo_gauge(parts: list[str], x: float, y: float, value: float,
     chip_x = x + 20
     chip_y = mark_y - chip_h / 2
     parts.append(
-        f"<rect x='{chip_x:.1f}' y='{chip_y:.1f}' width='{chip_w}' height='{chip_h}' rx='5' ry='5' "
+        f"<rect{_id(key, 'chip')} x='{chip_x:.1f}' y='{chip_y:.1f}' width='{chip_w}' height='{chip_h}' rx='5' ry='5' "
         f"fill='#111827' fill-opacity='0.92'/>"
     )
     tx = chip_x + (chip_w - _text_width(pct, 8, 0.50)) / 2
-    parts.append(f"<text x='{tx:.1f}' y='{chip_y + 10:.1f}' fill='white' font-size='8' font-weight='bold'>{pct}</text>")
+    parts.append(f"<text{_id(key, 'number')} x='{tx:.1f}' y='{chip_y + 10:.1f}' fill='white' font-size='8' font-weight='bold'>{pct}</text>")
 
 
 def gauge_svg(value: float) -> str:
@@ -344,10 +1017,10 @@ def gauge_svg(value: float) -> str:
         "<rect x='18' y='18' width='964' height='324' rx='24' ry='24' fill='#05070a' fill-opacity='0.10'/>"
     ]
 
-    _semi_gauge(parts, 150, 118, 44, values[0], "", str(int(round(values[0]))), True, 10, False, GAUGE_BANDS)
-    _donut_gauge(parts, 385, 104, 42, values[1])
-    _linear_gauge(parts, 520, 184, 210, 26, values[2], True, PINK_BANDS)
-    _thermo_gauge(parts, 835, 92, values[3], COOL_BANDS, 10)
+    _semi_gauge(parts, 150, 118, 44, values[0], "", str(int(round(values[0]))), True, 10, False, GAUGE_BANDS, "semi")
+    _donut_gauge(parts, 385, 104, 42, values[1], "donut")
+    _linear_gauge(parts, 520, 184, 210, 26, values[2], True, PINK_BANDS, "linear")
+    _thermo_gauge(parts, 835, 92, values[3], COOL_BANDS, 10, "thermo")
 
     return "<svg viewBox='0 0 1000 360'>" + "".join(parts) + "</svg>"
 
@@ -362,6 +1035,86 @@ def simple_box_svg(text: str) -> str:
     )
 
 
+# Plugin limits from OverlayManager.
+MAX_SVG_BYTES = 50 * 1024
+MAX_SHAPES = 500
+
+
+def _gauge_grid(kinds: list[str], count: int) -> str | None:
+    """`count` gauges of the given kinds laid out on a grid, or None when the
+    document would exceed the plugin's size or shape limits."""
+    cols = max(1, math.ceil(math.sqrt(count)))
+    cell = 1000 / cols
+    parts: list[str] = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        ox, oy = (i % cols) * cell, (i // cols) * cell
+        value = 50 + 45 * math.sin(i * 0.7)
+        g: list[str] = []
+        key = f"g{i}"
+        if kind == "semi":
+            _semi_gauge(g, 150, 118, 44, value, "", str(int(value)), True, 10, True, GAUGE_BANDS, key)
+        elif kind == "donut":
+            _donut_gauge(g, 120, 120, 42, value, key)
+        elif kind == "linear":
+            _linear_gauge(g, 20, 100, 210, 26, value, True, PINK_BANDS, key)
+        else:
+            _thermo_gauge(g, 100, 40, value, COOL_BANDS, 10, key)
+        parts.append(f"<g transform='translate({ox:.1f},{oy:.1f}) scale({cell / 300:.4f})'>" + "".join(g) + "</g>")
+    svg = "<svg viewBox='0 0 1000 1000'>" + "".join(parts) + "</svg>"
+    shapes = sum(1 for e in ET.fromstring(svg).iter() if _local(e.tag) not in ("svg", "g"))
+    if len(svg.encode()) > MAX_SVG_BYTES or shapes > MAX_SHAPES:
+        return None
+    return svg
+
+
+def _synthetic_svg(shapes: int = MAX_SHAPES) -> str:
+    """Worst case for the parser: every element type, long point lists,
+    style attributes and nested transformed groups, up to the shape limit."""
+    parts: list[str] = []
+    for i in range(shapes):
+        x, y = (i * 37) % 960, (i * 53) % 960
+        kind = i % 7
+        if kind == 0:
+            parts.append(f"<rect id='r{i}' x='{x}' y='{y}' width='30' height='18' rx='3' style='fill:#22c55e;fill-opacity:0.6'/>")
+        elif kind == 1:
+            parts.append(f"<circle cx='{x}' cy='{y}' r='9.5' fill='rgb(59,130,246)' stroke='white' stroke-width='1.5'/>")
+        elif kind == 2:
+            parts.append(f"<ellipse cx='{x}' cy='{y}' rx='12' ry='6.25' fill='orange' opacity='.8'/>")
+        elif kind == 3:
+            parts.append(f"<line x1='{x}' y1='{y}' x2='{x + 40}' y2='{y + 1e1}' stroke='#ffffff' stroke-width='2px'/>")
+        elif kind == 4:
+            pts = " ".join(f"{x + j * 2.5:.1f},{y + 8 * math.sin(j / 3):.2f}" for j in range(8))
+            parts.append(f"<polyline id='p{i}' points='{pts}' fill='none' stroke='#e11d48' stroke-width='1'/>")
+        elif kind == 5:
+            parts.append(f"<path d='M{x} {y} l 10 -5 q 4 8 -3 12 z' fill='#facc15'/>")
+        else:
+            parts.append(f"<g transform='rotate({i % 360} {x} {y})'><text x='{x}' y='{y}' font-size='11' "
+                         f"font-style='italic'>#{i} &amp;</text></g>")
+    return "<svg viewBox='0 0 1000 1000' width='1000' height='1000'>" + "".join(parts) + "</svg>"
+
+
+def svg_corpus() -> list[tuple[str, str]]:
+    """Representative overlay documents: each gauge style alone and mixed, at
+    1, 4, 16 gauges and the most that fit the plugin limits, plus a synthetic
+    500-shape document. Returns (name, svg) pairs."""
+    corpus: list[tuple[str, str]] = [("box", simple_box_svg("ALARM")), ("strip", gauge_svg(62))]
+    for kinds in (["semi"], ["donut"], ["linear"], ["thermo"], ["semi", "donut", "linear", "thermo"]):
+        name = kinds[0] if len(kinds) == 1 else "mixed"
+        for count in (1, 4, 16):
+            svg = _gauge_grid(kinds, count)
+            if svg:
+                corpus.append((f"{name}-{count}", svg))
+        best = None
+        count = 17
+        while (svg := _gauge_grid(kinds, count)) is not None:
+            best, count = (count, svg), count + 1
+        if best:
+            corpus.append((f"{name}-{best[0]}-max", best[1]))
+    corpus.append((f"synthetic-{MAX_SHAPES}", _synthetic_svg()))
+    return corpus
+
+
 # ────────────────────────────────────────────────────────────────────────────
 # Tests
 # ────────────────────────────────────────────────────────────────────────────
@@ -384,15 +1137,33 @@ def section_discovery(c: Client) -> dict:
     banner("Discovery")
     _, status = c.call("GET", "/api/status", expect=200)
     if status: info(f"server mode={status.get('mode')}  version={status.get('version')}")
-
-    _, views = c.call("GET", "/api/views", expect=200)
-    _, cameras = c.call("GET", "/api/cameras", expect=200)
-    _, workspaces = c.call("GET", "/api/workspaces", expect=200)
+    if not c.last_headers.get("Server-Timing"): fail("/api/status sent no Server-Timing header")
+
+    lists: dict[str, Any] = {}
+    full: dict[str, tuple[int, float]] = {}
+    for name in ("views", "cameras", "workspaces"):
+        before, t0 = c.bytes_received, time.perf_counter()
+        _, lists[name] = c.get_cached(f"/api/{name}", expect=200)
+        full[name] = (c.bytes_received - before, time.perf_counter() - t0)
+        if not c.last_headers.get("ETag"): fail(f"/api/{name} sent no ETag")
     _, windows = c.call("GET", "/api/windows", expect=200)
+    views, cameras, workspaces = lists["views"], lists["cameras"], lists["workspaces"]
 
     info(f"views={len(views or [])}  cameras={len(cameras or [])}  "
          f"workspaces={len(workspaces or [])}  windows={len(windows or [])}")
 
+    # Revalidate: an unchanged list must come back as 304 with no body.
+    saved_bytes, saved_ms = 0, 0.0
+    for name in ("views", "cameras", "workspaces"):
+        before, t0 = c.bytes_received, time.perf_counter()
+        status, _ = c.get_cached(f"/api/{name}", expect=304)
+        elapsed = time.perf_counter() - t0
+        if status == 304:
+            saved_bytes += full[name][0] - (c.bytes_received - before)
+            saved_ms += (full[name][1] - elapsed) * 1000.0
+    info(f"conditional GETs saved {saved_bytes} bytes and {saved_ms:.1f} ms "
+         f"vs the first full responses")
+
     return {
         "views": views or [],
         "cameras": cameras or [],
@@ -491,7 +1262,7 @@ def section_overlay_crud(c: Client, d: dict) -> None:
         "svg": simple_box_svg("TTL"),
         "ttlSeconds": 1,
     }, expect=201)
-    time.sleep(2)
+    time.sleep(1.25)  # expiry is timer-driven, not tied to the 333 ms redraw tick
     code, _ = c.call("GET", "/api/overlays/test-ttl", expect=404)
     if code == 404: ok("TTL pruning worked, overlay gone after expiry")
 
@@ -554,11 +1325,218 @@ def section_overlay_validation(c: Client, d: dict) -> None:
                expect=400)
 
 
+def section_overlay_patch(c: Client, d: dict) -> None:
+    banner("Overlay patch")
+    if not d["cameras"]:
+        info("no cameras available, skipping overlay patch tests")
+        return
+    cam_id = d["cameras"][0]["id"]
+
+    c.upsert_overlay("test-patch", cam_id, gauge_svg(10), expect=201)
+
+    patch = svg_patch(gauge_svg(10), gauge_svg(75))
+    if patch and "semi-needle" in patch: ok(f"value change maps to a patch of {len(patch)} shapes")
+    else: fail("gauge value change did not produce a shape patch")
+
+    code, body = c.patch_overlay("test-patch", patch or {}, expect=200)
+    if code == 200 and body and body.get("replaced"): ok("PATCH updated the overlay in place")
+
+    _, single = c.call("GET", "/api/overlays/test-patch", expect=200)
+    if single and svg_patch(gauge_svg(75), single.get("svg", "")) == {}:
+        ok("GET returns the SVG with patches folded in")
+    else:
+        fail("GET svg does not reflect the patch")
+
+    # Inline style outranks presentation attributes, so the SVG from GET must
+    # draw the patched colors when it is parsed again (or posted back).
+    styled = ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">'
+              '<rect id="box" x="10" y="10" width="50" height="50" style="fill:#ff0000;stroke-width:3"/></svg>')
+    c.upsert_overlay("test-patch-style", cam_id, styled, expect=201)
+    c.patch_overlay("test-patch-style", {"box": {"fill": "#0000ff"}}, expect=200)
+    c.patch_overlay("test-patch-style", {"box": {"style": "stroke:#00ff00"}}, expect=200)
+    _, single = c.call("GET", "/api/overlays/test-patch-style", expect=200)
+    want = {"fill": _argb("#0000ff"), "stroke": _argb("#00ff00"), "stroke-width": 3.0}
+    got = {}
+    if single and single.get("svg"):
+        elem = next((e for e in ET.fromstring(single["svg"]).iter() if e.get("id") == "box"), None)
+        got = _read_style(elem, {}) if elem is not None else {}
+    if all(got.get(k) == v for k, v in want.items()):
+        ok("GET svg re-parses to the patched fill, merged style and original stroke-width")
+    else:
+        fail(f"GET svg re-parses to {got}, expected {want}")
+    c.call("DELETE", "/api/overlays/test-patch-style", expect=200)
+
+    c.patch_overlay("test-patch", {"no-such-shape": {"fill": "red"}}, expect=400)
+    c.patch_overlay("test-patch", {"semi-needle": {"points": "0,0 1,1"}}, expect=400)
+    c.patch_overlay("test-patch-missing", {"semi-needle": {"x2": "1"}}, expect=404)
+
+    c.call("DELETE", "/api/overlays/test-patch", expect=200)
+
+
+def section_overlay_binary(c: Client, d: dict) -> None:
+    banner("Overlay binary encoding")
+    if not d["cameras"]:
+        info("no cameras available, skipping binary overlay tests")
+        return
+    cam_id = d["cameras"][0]["id"]
+
+    svg = gauge_svg(40)
+    data = encode_overlay(svg)
+    info(f"gauge strip: {len(svg.encode())} bytes SVG, {len(data)} bytes binary")
+
+    _, from_svg = c.upsert_overlay("test-binary", cam_id, svg, expect=201)
+    code, from_binary = c.upsert_overlay_binary("test-binary", cam_id, data, expect=200)
+    if code == 200 and from_svg and from_binary and from_binary.get("shapeCount") == from_svg.get("shapeCount"):
+        ok(f"binary upsert replaced the SVG overlay with the same {from_binary['shapeCount']} shapes")
+    else:
+        fail(f"binary upsert: {code} {from_binary}")
+
+    _, single = c.call("GET", "/api/overlays/test-binary", expect=200)
+    if single and single.get("format") == "binary" and "svg" not in single:
+        ok("GET reports format=binary without an SVG body")
+    else:
+        fail(f"GET binary overlay: {single}")
+
+    c.patch_overlay("test-binary", {"semi-needle": {"x2": "120"}}, expect=200)
+
+    c.upsert_overlay_binary("test-binary-bad", cam_id, b"XYZ\x01" + data[4:], expect=400)
+    c.upsert_overlay_binary("test-binary-bad", cam_id, data[:-3], expect=400)
+    c.call("POST", "/api/overlays", {"overlayId": "test-binary-bad", "cameraId": cam_id, "svg": svg,
+                                     "binary": base64.b64encode(data).decode("ascii")}, expect=400)
+
+    c.call("DELETE", "/api/overlays/test-binary", expect=200)
+
+
+def section_compression(c: Client, d: dict) -> None:
+    banner("Compression")
+    if not d["cameras"]:
+        info("no cameras available, skipping compression tests")
+        return
+    cam_id = d["cameras"][0]["id"]
+
+    _, plain = c.call("GET", "/api/cameras", expect=200, headers={"Accept-Encoding": "identity"})
+    for encoding in ("gzip", "deflate"):
+        before = c.bytes_received
+        _, listed = c.call("GET", "/api/cameras", expect=200, headers={"Accept-Encoding": encoding})
+        got = c.last_headers.get("Content-Encoding")
+        if got == encoding and listed == plain:
+            ok(f"GET /api/cameras as {encoding}: {c.bytes_received - before} bytes on the wire")
+        elif len(json.dumps(plain)) < COMPRESS_MIN_BYTES:
+            info(f"camera list under {COMPRESS_MIN_BYTES} bytes, sent uncompressed")
+        else:
+            fail(f"GET /api/cameras with Accept-Encoding {encoding}: Content-Encoding {got}")
+
+    zipped = Client(c.base, c.token)
+    zipped.compress_requests = True
+    svg = gauge_svg(70)
+    before = zipped.bytes_sent
+    code, _ = zipped.upsert_overlay("test-gzip", cam_id, svg, expect=201)
+    if code == 201:
+        ok(f"gzip upsert body: {zipped.bytes_sent - before} bytes for a {len(svg.encode())} byte SVG")
+    _, back = c.call("GET", "/api/overlays/test-gzip", expect=200)
+    if back and back.get("svg") == svg: ok("overlay posted gzipped reads back unchanged")
+    else: fail("gzip upsert: SVG differs on read-back")
+
+    body = json.dumps({"overlayId": "test-gzip", "cameraId": cam_id, "svg": svg}).encode()
+    c.call("POST", "/api/overlays", expect=415, headers={"Content-Encoding": "br"}, raw_body=body)
+    c.call("POST", "/api/overlays", expect=400, headers={"Content-Encoding": "gzip"}, raw_body=body)
+    c.call("DELETE", "/api/overlays/test-gzip", expect=200)
+
+
+def _draws(c: Client) -> int | None:
+    _, m = c.call("GET", "/api/metrics", expect=200)
+    return (m or {}).get("overlays", {}).get("draws")
+
+
+def section_overlay_draws(c: Client, d: dict) -> None:
+    banner("Overlay redraws")
+    if not d["cameras"]:
+        info("no cameras available, skipping redraw tests")
+        return
+    cam_id = d["cameras"][0]["id"]
+    c.call("POST", "/api/cameras/show", body={"cameraIds": [cam_id], "windowIndex": 0}, expect=200)
+    time.sleep(1)
+
+    _, body = c.upsert_overlay("test-draws", cam_id, simple_box_svg("IDLE"), expect=201)
+    time.sleep(0.5)
+    before = _draws(c)
+    time.sleep(1.5)  # several 333 ms timer ticks with nothing changing
+    after = _draws(c)
+    if before is None:
+        fail("metrics endpoint did not report overlay draws")
+    elif after == before:
+        ok("idle timer ticks redraw nothing")
+    else:
+        fail(f"idle ticks redrew {after - before} overlays")
+
+    c.upsert_overlay("test-draws", cam_id, simple_box_svg("BUSY"), expect=200)
+    time.sleep(0.5)
+    changed = _draws(c)
+    if body and body.get("displayed") and after is not None and changed is not None:
+        if changed > after: ok(f"changed overlay redrawn ({changed - after} viewports)")
+        else: fail("changed overlay was not redrawn")
+
+    c.call("DELETE", "/api/overlays/test-draws", expect=200)
+
+
+def section_events(c: Client, d: dict) -> None:
+    banner("Event stream")
+    if not d["cameras"]:
+        info("no cameras available, skipping event stream tests")
+        return
+    cam_id = d["cameras"][0]["id"]
+
+    async def run() -> list[str]:
+        stream = EventStream(c.base, c.token)
+        await stream.connect()
+        seen: list[str] = []
+
+        async def consume() -> None:
+            async for ev in stream.events():
+                if (ev["data"] or {}).get("overlayId") == "test-events":
+                    seen.append(ev["event"])
+                    if ev["event"] in ("overlay.removed", "overlay.expired"):
+                        return
+
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(consume())
+        await loop.run_in_executor(None, lambda: c.upsert_overlay("test-events", cam_id, simple_box_svg("EV"), expect=201))
+        await loop.run_in_executor(None, lambda: c.call("DELETE", "/api/overlays/test-events", expect=200))
+        try:
+            await asyncio.wait_for(task, 5)
+        except asyncio.TimeoutError:
+            pass
+        await stream.close()
+        return seen
+
+    try:
+        seen = asyncio.run(run())
+    except ConnectionError as ex:
+        fail(str(ex))
+        return
+    if seen[:2] == ["overlay.upserted", "overlay.removed"]: ok("upsert and delete pushed on /api/events")
+    else: fail(f"unexpected event sequence: {seen}")
+
+
 def section_clear(c: Client) -> None:
     banner("Clear")
     c.call("POST", "/api/clear", body={"windowIndex": 0, "delaySeconds": 3}, expect=200)
 
 
+def section_route_metrics(c: Client) -> None:
+    banner("Route metrics")
+    _, m = c.call("GET", "/api/metrics", expect=200)
+    routes = {r["route"]: r for r in (m or {}).get("routes") or []}
+    upsert = routes.get("POST api/overlays")
+    if not upsert:
+        fail("/api/metrics has no POST api/overlays row")
+        return
+    ok(f"{len(routes)} routes in the last {m.get('routeWindowSeconds')}s")
+    phases = upsert.get("phaseMeanMs") or {}
+    if "parse" in phases: ok(f"POST api/overlays: p50 {upsert['p50Ms']}ms, parse {phases['parse']}ms mean")
+    else: fail("POST api/overlays reports no parse phase")
+
+
 # ────────────────────────────────────────────────────────────────────────────
 # Live demos
 # ────────────────────────────────────────────────────────────────────────────
@@ -589,6 +1567,653 @@ def demo_fill_meter(c: Client, cam_id: str, seconds: int = 30) -> None:
         c.call("DELETE", "/api/overlays/demo-fill-meter", expect=200)
 
 
+# ────────────────────────────────────────────────────────────────────────────
+# Benchmarks
+# ────────────────────────────────────────────────────────────────────────────
+
+def bench_patch(c: Client, cam_id: str, updates: int = 200) -> None:
+    """Animate the gauge strip twice, once with full upserts and once through
+    LiveOverlay (shape patches), and compare bytes sent and round-trip latency."""
+    banner(f"Benchmark: full upsert vs shape patch ({updates} updates)", C.GREEN)
+    quiet = Client(c.base, c.token, verbose=False)
+    values = [50 + 45 * math.sin(i * 0.18) for i in range(updates)]
+    rows = []
+
+    for mode in ("upsert", "patch"):
+        overlay_id = f"bench-{mode}"
+        live = LiveOverlay(quiet, overlay_id, cam_id)
+        live.push(gauge_svg(0))
+        sent_before = quiet.bytes_sent
+        draws_before = _draws(quiet)
+        latencies = []
+        for v in values:
+            svg = gauge_svg(v)
+            t0 = time.perf_counter()
+            if mode == "upsert":
+                quiet.upsert_overlay(overlay_id, cam_id, svg, expect=200)
+            else:
+                live.push(svg)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+        time.sleep(0.5)
+        draws_after = _draws(quiet)
+        if draws_before is not None and draws_after is not None:
+            info(f"{mode} run: {draws_after - draws_before} overlay redraws for {updates} updates")
+        rows.append((mode, (quiet.bytes_sent - sent_before) / updates, latencies))
+        live.delete()
+        if mode == "patch":
+            info(f"patch run: {live.patches} patches, {live.upserts - 1} fallback upserts, {live.skipped} skipped")
+
+    print(f"\n  {'mode':8} {'bytes/upd':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for mode, per_update, lat in rows:
+        print(f"  {mode:8} {per_update:10.0f} {_percentile(lat, 50):8.2f} "
+              f"{_percentile(lat, 95):8.2f} {sum(lat) / len(lat):8.2f}")
+    full, patched = rows[0], rows[1]
+    if patched[1] > 0:
+        info(f"patch sends {full[1] / patched[1]:.1f}x fewer bytes per update")
+
+
+def bench_binary(c: Client, cam_id: str, updates: int = 200) -> None:
+    """Compare payload size and upsert round-trip latency of SVG text against
+    the binary overlay encoding, first on the parse corpus, then animating
+    the gauge strip with full upserts in both encodings."""
+    banner(f"Benchmark: SVG vs binary overlay encoding ({updates} updates)", C.GREEN)
+    print(f"\n  {'document':22} {'svg B':>7} {'binary B':>9} {'ratio':>6} {'encode µs':>10}")
+    for name, svg in svg_corpus():
+        t0 = time.perf_counter()
+        data = encode_overlay(svg)
+        encode_us = (time.perf_counter() - t0) * 1e6
+        size = len(svg.encode())
+        print(f"  {name:22} {size:7d} {len(data):9d} {size / len(data):5.1f}x {encode_us:10.0f}")
+
+    quiet = Client(c.base, c.token, verbose=False)
+    frames = [gauge_svg(50 + 45 * math.sin(i * 0.18)) for i in range(updates)]
+    encoded = [encode_overlay(svg) for svg in frames]
+    rows = []
+    for mode in ("svg", "binary"):
+        overlay_id = f"bench-enc-{mode}"
+        quiet.call("DELETE", "/api/overlays/" + overlay_id)
+        sent_before = quiet.bytes_sent
+        latencies, errors = [], 0
+        for svg, data in zip(frames, encoded):
+            t0 = time.perf_counter()
+            if mode == "svg":
+                code, _ = quiet.upsert_overlay(overlay_id, cam_id, svg)
+            else:
+                code, _ = quiet.upsert_overlay_binary(overlay_id, cam_id, data)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            errors += code not in (200, 201)
+        rows.append((mode, (quiet.bytes_sent - sent_before) / updates, latencies, errors))
+        quiet.call("DELETE", "/api/overlays/" + overlay_id)
+
+    print(f"\n  {'encoding':8} {'bytes/upd':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'errors':>7}")
+    for mode, per_update, lat, errors in rows:
+        print(f"  {mode:8} {per_update:10.0f} {_percentile(lat, 50):8.2f} "
+              f"{_percentile(lat, 95):8.2f} {sum(lat) / len(lat):8.2f} {errors:7d}")
+    info("bytes/upd is the JSON request body; binary travels base64-encoded")
+
+
+class ThrottledLink:
+    """Local TCP proxy that paces each direction to `kbps`, shared by all
+    connections, as a stand-in for a slow site link when the plugin or the
+    mock server runs on the same machine. Point a Client at `.base`."""
+
+    SEGMENT = 1460
+
+    def __init__(self, upstream: str, kbps: float):
+        u = urllib.parse.urlparse(upstream)
+        self.target = (u.hostname, u.port or (443 if u.scheme == "https" else 80))
+        self.bytes_per_second = kbps * 1000.0 / 8.0
+        self._lock = threading.Lock()
+        self._free_at = {"up": 0.0, "down": 0.0}
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self.base = f"{u.scheme}://127.0.0.1:{self._listener.getsockname()[1]}"
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self) -> None:
+        self._listener.close()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return
+            try:
+                upstream = socket.create_connection(self.target)
+            except OSError:
+                client.close()
+                continue
+            for sock in (client, upstream):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._pump, args=(client, upstream, "up"), daemon=True).start()
+            threading.Thread(target=self._pump, args=(upstream, client, "down"), daemon=True).start()
+
+    def _pump(self, src: socket.socket, dst: socket.socket, direction: str) -> None:
+        try:
+            while True:
+                data = src.recv(65536)
+                if not data:
+                    break
+                for i in range(0, len(data), self.SEGMENT):
+                    segment = data[i:i + self.SEGMENT]
+                    # Reserve the segment's slot on the shared link, then wait for it.
+                    with self._lock:
+                        start = max(self._free_at[direction], time.perf_counter())
+                        self._free_at[direction] = start + len(segment) / self.bytes_per_second
+                    delay = self._free_at[direction] - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    dst.sendall(segment)
+        except OSError:
+            pass
+        finally:
+            for sock in (src, dst):
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
+
+
+def bench_compression(c: Client, cameras: list[dict], kbps: float = 2000, rounds: int = 5,
+                      overlays: int = 200) -> None:
+    """Bytes on the wire and latency with and without Content-Encoding, over a
+    ThrottledLink: the camera list, the overlay list, one large overlay read
+    back and the same overlay posted."""
+    banner(f"Benchmark: compression over a {kbps:g} kbit/s link ({rounds} rounds)", C.GREEN)
+    # 30 per camera stays under MaxOverlaysPerCamera with the large overlay on the first camera.
+    overlays = min(overlays, 30 * len(cameras) - 1)
+    cam_ids = [cam["id"] for cam in cameras[:overlays // 30 + 1]]
+    big_name, big_svg = max(((n, svg) for n, svg in svg_corpus() if len(svg.encode()) <= MAX_SVG_BYTES),
+                            key=lambda item: len(item[1]))
+    setup = Client(c.base, c.token, verbose=False)
+    for i in range(overlays):
+        setup.upsert_overlay(f"bench-gz-{i}", cam_ids[i // 30], gauge_svg(i % 100))
+    setup.upsert_overlay("bench-gz-big", cam_ids[0], big_svg)
+    info(f"{overlays} gauge overlays listed, '{big_name}' ({len(big_svg.encode())} bytes) read and posted")
+
+    workloads = [
+        ("GET cameras", lambda cl: cl.call("GET", "/api/cameras", expect=200)),
+        ("GET overlays", lambda cl: cl.call("GET", "/api/overlays", expect=200)),
+        ("GET overlays/{id}", lambda cl: cl.call("GET", "/api/overlays/bench-gz-big", expect=200)),
+        ("POST overlays", lambda cl: cl.upsert_overlay("bench-gz-big", cam_ids[0], big_svg, expect=200)),
+    ]
+    link = ThrottledLink(c.base, kbps)
+    try:
+        print(f"\n  {'request':18} {'mode':8} {'wire B':>9} {'body B':>9} {'p50 ms':>8} {'max ms':>8}")
+        for name, run in workloads:
+            for mode in ("identity", "gzip"):
+                cl = Client(link.base, c.token, verbose=False)
+                cl.accept_encoding = None if mode == "identity" else "gzip"
+                cl.compress_requests = mode == "gzip"
+                latencies = []
+                for _ in range(rounds):
+                    t0 = time.perf_counter()
+                    run(cl)
+                    latencies.append((time.perf_counter() - t0) * 1000.0)
+                wire = (cl.bytes_sent + cl.bytes_received) / rounds
+                if name.startswith("POST"):
+                    body = len(json.dumps({"overlayId": "bench-gz-big", "cameraId": cam_ids[0], "svg": big_svg}))
+                else:
+                    body = cl.bytes_decoded / rounds
+                print(f"  {name:18} {mode:8} {wire:9.0f} {body:9.0f} {_percentile(latencies, 50):8.1f} "
+                      f"{max(latencies):8.1f}")
+        info("wire B counts request and response bodies only; headers add the same few hundred bytes to both modes")
+    finally:
+        link.close()
+        for i in range(overlays):
+            setup.call("DELETE", f"/api/overlays/bench-gz-{i}")
+        setup.call("DELETE", "/api/overlays/bench-gz-big")
+
+
+def _cpu_ms(c: Client) -> int | None:
+    _, m = c.call("GET", "/api/metrics", expect=200)
+    return (m or {}).get("cpuTimeMs")
+
+
+def bench_events(c: Client, cam_id: str, updates: int = 40, interval: float = 0.25) -> None:
+    """Post a series of overlays and measure how long until a client learns
+    about each one: pushed over /api/events vs. discovered by polling
+    /api/windows, /api/views and /api/overlays once per second. Also compares
+    the Smart Client process CPU time spent during each run."""
+    banner(f"Benchmark: event stream vs 1 Hz polling ({updates} changes)", C.GREEN)
+    quiet = Client(c.base, c.token, verbose=False)
+    results = []
+
+    for mode in ("events", "polling"):
+        posted: dict[str, float] = {}
+        seen: dict[str, float] = {}
+        requests_made = [0]
+        stop = threading.Event()
+        ready = threading.Event()
+
+        def consume_events() -> None:
+            async def run() -> None:
+                stream = EventStream(c.base, c.token)
+                await stream.connect()
+                ready.set()
+                try:
+                    async for ev in stream.events():
+                        oid = (ev["data"] or {}).get("overlayId", "")
+                        if ev["event"] == "overlay.upserted" and oid.startswith("bench-ev-"):
+                            seen.setdefault(oid, time.perf_counter())
+                        if stop.is_set() and len(seen) >= len(posted):
+                            return
+                finally:
+                    await stream.close()
+            try:
+                asyncio.run(asyncio.wait_for(run(), updates * interval + 10))
+            except Exception:
+                ready.set()
+
+        def poll() -> None:
+            ready.set()
+            while not stop.is_set() or len(seen) < len(posted):
+                t_next = time.perf_counter() + 1.0
+                quiet.call("GET", "/api/windows", expect=200)
+                quiet.call("GET", "/api/views", expect=200)
+                _, lst = quiet.call("GET", "/api/overlays", expect=200)
+                requests_made[0] += 3
+                now = time.perf_counter()
+                for o in lst or []:
+                    if o["overlayId"].startswith("bench-ev-"):
+                        seen.setdefault(o["overlayId"], now)
+                if stop.is_set() and now > deadline:
+                    return
+                time.sleep(max(0.0, t_next - time.perf_counter()))
+
+        quiet.call("DELETE", "/api/overlays", query={"cameraId": cam_id}, expect=200)
+        cpu_before = _cpu_ms(quiet)
+        deadline = time.perf_counter() + updates * interval + 5
+        worker = threading.Thread(target=consume_events if mode == "events" else poll, daemon=True)
+        worker.start()
+        ready.wait(10)
+        for i in range(updates):
+            oid = f"bench-ev-{i % 30}"  # stays under the 32 overlays per camera cap
+            quiet.call("DELETE", "/api/overlays/" + oid)
+            seen.pop(oid, None)
+            posted[oid] = time.perf_counter()
+            quiet.upsert_overlay(oid, cam_id, simple_box_svg(str(i)), expect=201)
+            time.sleep(interval)
+        stop.set()
+        worker.join(timeout=5)
+        cpu_after = _cpu_ms(quiet)
+        quiet.call("DELETE", "/api/overlays", query={"cameraId": cam_id}, expect=200)
+
+        lat = [(seen[k] - posted[k]) * 1000.0 for k in posted if k in seen]
+        cpu = (cpu_after - cpu_before) if cpu_before is not None and cpu_after is not None else None
+        results.append((mode, lat, len(posted) - len(lat), cpu, requests_made[0]))
+
+    print(f"\n  {'mode':8} {'p50 ms':>8} {'p95 ms':>8} {'missed':>7} {'server cpu':>11} {'polls':>6}")
+    for mode, lat, missed, cpu, polls in results:
+        cpu_txt = f"{cpu}ms" if cpu is not None else "n/a"
+        print(f"  {mode:8} {_percentile(lat, 50):8.1f} {_percentile(lat, 95):8.1f} "
+              f"{missed:7d} {cpu_txt:>11} {polls:6d}")
+
+
+def _parse_utc(value: str | None) -> float | None:
+    """Epoch seconds from a .NET UTC timestamp ("...T12:00:00.1234567Z")."""
+    if not value:
+        return None
+    m = re.match(r"^(.*?T\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)?$", value)
+    if not m:
+        return None
+    base = datetime.fromisoformat(m.group(1) + ((m.group(3) or "Z").replace("Z", "+00:00")))
+    return base.timestamp() + (float("0." + m.group(2)) if m.group(2) else 0.0)
+
+
+def bench_expiry(c: Client, cameras: list[dict], overlays: int = 2000, max_ttl: int = 3) -> bool:
+    """Post thousands of short-lived overlays (ttlSeconds 1..max_ttl) and measure
+    how late each one is removed, as server time of its overlay.expired event
+    minus its expiresAt. Without the event stream (mock server) only the
+    plugin's own lateness counters in /api/metrics are reported."""
+    max_per_camera = 32  # OverlayManager.MaxOverlaysPerCamera
+    cams = [cam["id"] for cam in cameras]
+    overlays = min(overlays, len(cams) * max_per_camera)
+    if overlays <= 0:
+        fail("no cameras available for --bench-expiry")
+        return False
+    banner(f"Benchmark: TTL expiry lateness, {overlays} overlays", C.GREEN)
+
+    quiet = Client(c.base, c.token, verbose=False)
+    quiet.call("DELETE", "/api/overlays", expect=200)
+    _, m = quiet.call("GET", "/api/metrics", expect=200)
+    before = (m or {}).get("overlays") or {}
+
+    expires: dict[str, float] = {}
+    expired_at: dict[str, float] = {}
+    stop = threading.Event()
+    ready = threading.Event()
+    streaming = [False]
+
+    def consume_events() -> None:
+        async def run() -> None:
+            stream = EventStream(c.base, c.token)
+            await stream.connect()
+            streaming[0] = True
+            ready.set()
+            try:
+                async for ev in stream.events():
+                    data = ev["data"] or {}
+                    if ev["event"] == "overlay.expired" and data.get("overlayId", "").startswith("expiry-"):
+                        expired_at[data["overlayId"]] = _parse_utc(data.get("at")) or 0.0
+                    if stop.is_set():
+                        return
+            finally:
+                await stream.close()
+        try:
+            asyncio.run(asyncio.wait_for(run(), max_ttl + overlays * 0.01 + 30))
+        except Exception:
+            ready.set()
+
+    threading.Thread(target=consume_events, daemon=True).start()
+    ready.wait(10)
+    if not streaming[0]:
+        info("event stream not available, reporting the server-side counters only")
+
+    svg = simple_box_svg("T")
+    errors = 0
+    t0 = time.perf_counter()
+    for i in range(overlays):
+        oid = f"expiry-{i}"
+        code, body = quiet.upsert_overlay(oid, cams[i % len(cams)], svg, ttl_seconds=1 + i % max_ttl)
+        if code != 201:
+            errors += 1
+            continue
+        expires[oid] = _parse_utc(body.get("expiresAt")) or 0.0
+    info(f"posted {len(expires)} overlays in {time.perf_counter() - t0:.1f}s ({errors} errors)")
+
+    # Wait for the last expiry plus slack, or until every event arrived.
+    deadline = time.time() + max(0.0, max(expires.values(), default=0.0) - time.time()) + 2.0
+    while time.time() < deadline and not (streaming[0] and len(expired_at) >= len(expires)):
+        time.sleep(0.05)
+    stop.set()
+
+    _, remaining = quiet.call("GET", "/api/overlays", expect=200)
+    left = [o for o in remaining or [] if o["overlayId"].startswith("expiry-")]
+    passed = not left and errors == 0
+    if left:
+        fail(f"{len(left)} overlays still registered after their expiry")
+    else:
+        ok("every overlay was removed after its TTL")
+
+    if streaming[0]:
+        lateness = [(expired_at[k] - expires[k]) * 1000.0 for k in expires if k in expired_at]
+        missed = len(expires) - len(lateness)
+        print(f"\n  {'events':>7} {'missed':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        print(f"  {len(lateness):7d} {missed:7d} {_percentile(lateness, 50):8.1f} {_percentile(lateness, 95):8.1f} "
+              f"{_percentile(lateness, 99):8.1f} {max(lateness, default=0):8.1f}")
+        if lateness and _percentile(lateness, 99) < 100:
+            ok("p99 expiry lateness under 100 ms")
+        else:
+            fail("p99 expiry lateness is 100 ms or more")
+            passed = False
+
+    _, m = quiet.call("GET", "/api/metrics", expect=200)
+    after = (m or {}).get("overlays") or {}
+    if "expired" in after:
+        n = after["expired"] - before.get("expired", 0)
+        total = after["expired"] * after["expiryLatenessMeanMs"] - before.get("expired", 0) * before.get("expiryLatenessMeanMs", 0)
+        mean = total / n if n else 0.0
+        info(f"server: {n} expired during the run, mean lateness {mean:.1f} ms, "
+             f"worst since start {after['expiryLatenessMaxMs']:.1f} ms, {after['pendingExpiries']} queued")
+        if not streaming[0] and n and mean >= 100:
+            fail("mean expiry lateness is 100 ms or more")
+            passed = False
+    return passed
+
+
+def bench_scale(c: Client, cameras: list[dict], overlays: int = 2000, step: int = 250) -> None:
+    """Fill the overlay registry in steps and measure how upsert, per-camera list
+    and per-camera delete latency develop as the global overlay count grows.
+    With the camera index these should stay flat; a full scan grows linearly."""
+    max_per_camera = 32  # OverlayManager.MaxOverlaysPerCamera
+    cams = [cam["id"] for cam in cameras]
+    capacity = len(cams) * max_per_camera
+    if capacity < overlays:
+        info(f"only {len(cams)} cameras, capping at {capacity} overlays ({max_per_camera} per camera)")
+        overlays = capacity
+    if overlays <= 0:
+        fail("no cameras available for --bench-scale")
+        return
+    banner(f"Benchmark: {overlays} overlays across {min(len(cams), overlays)} cameras", C.GREEN)
+
+    quiet = Client(c.base, c.token, verbose=False)
+    quiet.call("DELETE", "/api/overlays", expect=200)
+    svg = simple_box_svg("S")
+    print(f"\n  {'overlays':>8} {'upsert p50':>11} {'upsert p95':>11} {'list/cam':>9} {'errors':>7}")
+
+    errors = 0
+    done = 0
+    while done < overlays:
+        batch = min(step, overlays - done)
+        lat = []
+        for i in range(done, done + batch):
+            # Round-robin so every camera fills up evenly.
+            cam = cams[i % len(cams)]
+            t0 = time.perf_counter()
+            code, _ = quiet.upsert_overlay(f"scale-{i}", cam, svg, expect=201)
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            if code != 201:
+                errors += 1
+        done += batch
+
+        t0 = time.perf_counter()
+        quiet.call("GET", "/api/overlays", query={"cameraId": cams[0]}, expect=200)
+        list_ms = (time.perf_counter() - t0) * 1000.0
+        print(f"  {done:8d} {_percentile(lat, 50):9.2f}ms {_percentile(lat, 95):9.2f}ms "
+              f"{list_ms:7.2f}ms {errors:7d}")
+
+    lat = []
+    for cam in cams[:min(len(cams), 50)]:
+        t0 = time.perf_counter()
+        quiet.call("DELETE", "/api/overlays", query={"cameraId": cam}, expect=200)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    info(f"DELETE by camera: p50 {_percentile(lat, 50):.2f}ms  p95 {_percentile(lat, 95):.2f}ms")
+
+    t0 = time.perf_counter()
+    quiet.call("DELETE", "/api/overlays", expect=200)
+    info(f"DELETE all remaining: {(time.perf_counter() - t0) * 1000.0:.2f}ms")
+
+
+def write_corpus(directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    corpus = svg_corpus()
+    for name, svg in corpus:
+        with open(os.path.join(directory, name + ".svg"), "w", encoding="utf-8") as f:
+            f.write(svg)
+    ok(f"wrote {len(corpus)} documents to {directory}")
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Load generator
+#
+# Open loop: requests are sent on a fixed schedule (rate / workers per process)
+# whether or not earlier ones have completed, and latency is measured from the
+# *intended* send time. A stalled server therefore shows up as queueing delay
+# in the percentiles instead of silently lowering the request rate
+# (coordinated omission). "service" latency, measured from the actual send,
+# is reported next to it for comparison.
+# ────────────────────────────────────────────────────────────────────────────
+
+LOAD_ROUTES = ("upsert", "list", "get", "delete")
+
+
+def parse_load_mix(spec: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in LOAD_ROUTES:
+            raise ValueError(f"unknown route '{name}' in --load-mix, expected {', '.join(LOAD_ROUTES)}")
+        mix.append((name, float(weight or 1)))
+    total = sum(w for _, w in mix)
+    if total <= 0:
+        raise ValueError("--load-mix weights must add up to more than 0")
+    return [(n, w / total) for n, w in mix]
+
+
+def _load_error(route: str, status: int) -> bool:
+    # get/delete race with other workers' deletes, so a 404 there is expected.
+    if route in ("get", "delete") and status == 404:
+        return False
+    return status == 0 or status >= 400
+
+
+def _load_worker(job: dict) -> list[tuple[float, str, int, float, float]]:
+    """One process: `concurrency` threads share a fixed schedule. Returns
+    (intended offset s, route, status, latency ms, service ms) per request."""
+    url = urllib.parse.urlsplit(job["base"])
+    https = url.scheme == "https"
+    headers = {"Authorization": f"Bearer {job['token']}", "Content-Type": "application/json"}
+    rng = random.Random(job["worker"])
+    routes = [n for n, _ in job["mix"]]
+    weights = [w for _, w in job["mix"]]
+    interval = 1.0 / job["rate"]
+    total = int(job["rate"] * job["seconds"])
+    plan = [rng.choices(routes, weights)[0] for _ in range(total)]
+    keys = [(f"load-{job['worker']}-{k}", job["cameras"][k % len(job["cameras"])]) for k in range(job["keys"])]
+    svg_fn = gauge_svg if job["svg"] == "gauge" else (lambda v: simple_box_svg(f"{v:.0f}"))
+
+    samples: list[tuple[float, str, int, float, float]] = []
+    lock = threading.Lock()
+    next_index = [0]
+
+    # Line up all processes on the same wall-clock start, then use the local
+    # monotonic clock for the schedule.
+    time.sleep(max(0.0, job["start_at"] - time.time()))
+    t0 = time.perf_counter()
+
+    def connect() -> http.client.HTTPConnection:
+        if https:
+            ctx = ssl.create_default_context()
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+            return http.client.HTTPSConnection(url.hostname, url.port or 443, timeout=15, context=ctx)
+        return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=15)
+
+    def run() -> None:
+        conn = connect()
+        local = []
+        while True:
+            with lock:
+                i = next_index[0]
+                next_index[0] += 1
+            if i >= total:
+                break
+            intended = t0 + i * interval
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            route = plan[i]
+            overlay_id, cam_id = keys[rng.randrange(len(keys))]
+            body = None
+            if route == "upsert":
+                method, path = "POST", "/api/overlays"
+                body = json.dumps({"overlayId": overlay_id, "cameraId": cam_id,
+                                   "svg": svg_fn(i % 100), "ttlSeconds": 60}).encode("utf-8")
+            elif route == "list":
+                method, path = "GET", "/api/overlays?" + urllib.parse.urlencode({"cameraId": cam_id})
+            elif route == "get":
+                method, path = "GET", "/api/overlays/" + overlay_id
+            else:
+                method, path = "DELETE", "/api/overlays/" + overlay_id
+
+            sent = time.perf_counter()
+            try:
+                # bytes body: http.client sends headers and body in one segment,
+                # avoiding a Nagle / delayed-ACK stall on every POST.
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+            except Exception:
+                status = 0
+                conn.close()
+                conn = connect()
+            done = time.perf_counter()
+            local.append((intended - t0, route, status, (done - intended) * 1000.0, (done - sent) * 1000.0))
+        conn.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(job["concurrency"])]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return samples
+
+
+def _load_row(samples: list[tuple[float, str, int, float, float]]) -> dict[str, float]:
+    lat = [x[3] for x in samples]
+    svc = [x[4] for x in samples]
+    return {
+        "count": len(samples),
+        "errors": sum(1 for x in samples if _load_error(x[1], x[2])),
+        "p50": _percentile(lat, 50), "p99": _percentile(lat, 99), "p999": _percentile(lat, 99.9),
+        "max": max(lat) if lat else 0.0,
+        "svc_p50": _percentile(svc, 50), "svc_p99": _percentile(svc, 99),
+    }
+
+
+def load_test(c: Client, cameras: list[dict], rate: float, seconds: float, mix: list[tuple[str, float]],
+              workers: int, concurrency: int, csv_path: str | None, svg: str = "box") -> None:
+    cam_ids = [cam["id"] for cam in cameras[:50]]
+    # Keep every camera under MaxOverlaysPerCamera (32) across all workers.
+    keys = max(1, 30 * len(cam_ids) // workers)
+    banner(f"Load: {rate:g} req/s for {seconds:g}s, {workers} process(es) x {concurrency} connections", C.GREEN)
+    info("mix: " + ", ".join(f"{n} {w * 100:.0f}%" for n, w in mix))
+    info(f"{len(cam_ids)} cameras, {keys} overlay ids per process, {svg} SVG")
+
+    quiet = Client(c.base, c.token, verbose=False)
+    _, before = quiet.call("GET", "/api/metrics")
+    start_at = time.time() + 1.0
+    jobs = [{
+        "base": c.base, "token": c.token, "worker": w, "rate": rate / workers, "seconds": seconds,
+        "mix": mix, "concurrency": concurrency, "cameras": cam_ids, "keys": keys,
+        "start_at": start_at, "svg": svg,
+    } for w in range(workers)]
+    with multiprocessing.Pool(workers) as pool:
+        samples = [x for part in pool.map(_load_worker, jobs) for x in part]
+    elapsed = time.time() - start_at
+    _, after = quiet.call("GET", "/api/metrics")
+
+    print(f"\n  {'route':8} {'count':>7} {'err %':>6} {'p50 ms':>8} {'p99 ms':>8} {'p999 ms':>8} "
+          f"{'max ms':>8} {'svc p50':>8} {'svc p99':>8}")
+    for route in [n for n, _ in mix] + ["all"]:
+        row = _load_row([x for x in samples if route == "all" or x[1] == route])
+        if not row["count"]:
+            continue
+        err = 100.0 * row["errors"] / row["count"]
+        print(f"  {route:8} {row['count']:7d} {err:6.2f} {row['p50']:8.1f} {row['p99']:8.1f} "
+              f"{row['p999']:8.1f} {row['max']:8.1f} {row['svc_p50']:8.1f} {row['svc_p99']:8.1f}")
+    info(f"achieved {len(samples) / max(elapsed, 1e-9):.1f} req/s of {rate:g} scheduled")
+
+    if before and after:
+        b, a = before.get("overlays", {}), after.get("overlays", {})
+        passes = a.get("passes", 0) - b.get("passes", 0)
+        info(f"server: {a.get('draws', 0) - b.get('draws', 0)} redraws in {passes} passes "
+             f"({passes / max(elapsed, 1e-9):.1f}/s), "
+             f"cpu {after.get('cpuTimeMs', 0) - before.get('cpuTimeMs', 0)}ms")
+
+    if csv_path:
+        with open(csv_path, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["second", "route", "count", "errors", "p50_ms", "p99_ms", "p999_ms", "max_ms"])
+            buckets: dict[tuple[int, str], list] = {}
+            for x in samples:
+                sec = int(x[0])
+                buckets.setdefault((sec, x[1]), []).append(x)
+                buckets.setdefault((sec, "all"), []).append(x)
+            for (sec, route) in sorted(buckets):
+                row = _load_row(buckets[(sec, route)])
+                w.writerow([sec, route, row["count"], row["errors"], f"{row['p50']:.2f}",
+                            f"{row['p99']:.2f}", f"{row['p999']:.2f}", f"{row['max']:.2f}"])
+        info(f"per-second series written to {csv_path}")
+
+    quiet.call("DELETE", "/api/overlays", expect=200)
+
+
 # ────────────────────────────────────────────────────────────────────────────
 # Entry
 # ────────────────────────────────────────────────────────────────────────────
@@ -602,14 +2227,63 @@ def main() -> int:
     p.add_argument("--demo-camera",
                    help="camera FQID for --demo (defaults to first listed camera)")
     p.add_argument("--demo-seconds", type=int, default=30)
+    p.add_argument("--bench-patch", action="store_true",
+                   help="skip the test pass, benchmark full upserts against shape patches")
+    p.add_argument("--bench-updates", type=int, default=200,
+                   help="updates per benchmark run")
+    p.add_argument("--bench-binary", action="store_true",
+                   help="compare payload size and upsert latency of SVG and the binary overlay encoding")
+    p.add_argument("--bench-expiry", action="store_true",
+                   help="measure how late thousands of short-lived overlays are removed")
+    p.add_argument("--bench-scale", action="store_true",
+                   help="skip the test pass, benchmark the overlay registry with many overlays")
+    p.add_argument("--bench-overlays", type=int, default=2000,
+                   help="overlays to register for --bench-scale and --bench-expiry")
+    p.add_argument("--watch", action="store_true",
+                   help="skip the test pass, print events from /api/events until Ctrl+C")
+    p.add_argument("--bench-events", action="store_true",
+                   help="skip the test pass, benchmark /api/events against 1 Hz polling")
+    p.add_argument("--load", action="store_true",
+                   help="skip the test pass, run the open-loop load generator")
+    p.add_argument("--load-rate", type=float, default=200, help="scheduled requests per second (total)")
+    p.add_argument("--load-seconds", type=float, default=30)
+    p.add_argument("--load-mix", default="upsert=70,list=10,get=10,delete=10",
+                   help="route weights, any of upsert, list, get, delete")
+    p.add_argument("--load-workers", type=int, default=min(4, os.cpu_count() or 1),
+                   help="generator processes")
+    p.add_argument("--load-concurrency", type=int, default=16,
+                   help="connections per process; requests beyond that queue and count as latency")
+    p.add_argument("--load-svg", choices=("box", "gauge"), default="box",
+                   help="upsert body: small box or the multi-gauge strip")
+    p.add_argument("--load-csv", help="write a per-second latency series to this CSV file")
+    p.add_argument("--no-compression", action="store_true",
+                   help="do not send Accept-Encoding; ask for identity responses")
+    p.add_argument("--compress-requests", action="store_true",
+                   help="gzip request bodies of 1 KB or more (needs a plugin with Content-Encoding support)")
+    p.add_argument("--bench-compression", action="store_true",
+                   help="compare bytes and latency with and without gzip over a throttled local link")
+    p.add_argument("--link-kbps", type=float, default=2000, help="link speed for --bench-compression")
+    p.add_argument("--write-corpus", metavar="DIR",
+                   help="write the generated SVG corpus to DIR (input for SvgParseBench) and exit")
     args = p.parse_args()
 
+    if args.write_corpus:
+        write_corpus(args.write_corpus)
+        return 0
+
+    if args.no_compression:
+        Client.accept_encoding = None
+    Client.compress_requests = args.compress_requests
     c = Client(args.base, args.token)
 
     print(f"{C.BOLD}SCRemoteControl API tests{C.OFF}")
     print(f"  base : {args.base}")
     print(f"  token: {args.token[:6]}{'…' if len(args.token) > 6 else ''}")
 
+    if args.watch:
+        watch_events(args.base, args.token)
+        return 0
+
     discovery = section_discovery(c)
 
     if args.demo:
@@ -620,15 +2294,69 @@ def main() -> int:
         demo_fill_meter(c, cam, args.demo_seconds)
         return 0
 
+    if args.bench_patch:
+        cam = args.demo_camera or (discovery["cameras"][0]["id"] if discovery["cameras"] else None)
+        if not cam:
+            fail("no camera available for --bench-patch")
+            return 1
+        bench_patch(c, cam, args.bench_updates)
+        return 0
+
+    if args.bench_binary:
+        cam = args.demo_camera or (discovery["cameras"][0]["id"] if discovery["cameras"] else None)
+        if not cam:
+            fail("no camera available for --bench-binary")
+            return 1
+        bench_binary(c, cam, args.bench_updates)
+        return 0
+
+    if args.bench_compression:
+        if not discovery["cameras"]:
+            fail("no camera available for --bench-compression")
+            return 1
+        bench_compression(c, discovery["cameras"], args.link_kbps, overlays=min(args.bench_overlays, 300))
+        return 0
+
+    if args.bench_expiry:
+        return 0 if bench_expiry(c, discovery["cameras"], args.bench_overlays) else 1
+
+    if args.bench_scale:
+        bench_scale(c, discovery["cameras"], args.bench_overlays)
+        return 0
+
+    if args.load:
+        if not discovery["cameras"]:
+            fail("no camera available for --load")
+            return 1
+        load_test(c, discovery["cameras"], args.load_rate, args.load_seconds, parse_load_mix(args.load_mix),
+                  max(1, args.load_workers), max(1, args.load_concurrency), args.load_csv, args.load_svg)
+        return 0
+
+    if args.bench_events:
+        cam = args.demo_camera or (discovery["cameras"][0]["id"] if discovery["cameras"] else None)
+        if not cam:
+            fail("no camera available for --bench-events")
+            return 1
+        bench_events(c, cam)
+        return 0
+
     section_auth(c)
     section_actions(c, discovery)
     section_overlay_crud(c, discovery)
     section_overlay_validation(c, discovery)
+    section_overlay_patch(c, discovery)
+    section_overlay_binary(c, discovery)
+    section_compression(c, discovery)
+    section_overlay_draws(c, discovery)
+    section_events(c, discovery)
     section_clear(c)
+    section_route_metrics(c)
 
     banner("Done", C.GREEN)
     return 0
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    rc = main()
+    SERVER_TIMING.report()
+    sys.exit(rc)
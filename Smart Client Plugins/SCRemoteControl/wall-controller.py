@@ -0,0 +1,489 @@
+"""
+Fan-out controller for a video wall driven by several Smart Clients, each
+running its own SCRemoteControl server.
+
+One dashboard source talks to every wall client at once: overlay upserts go
+only to the clients that currently show the overlay's camera (from
+GET /api/cameras/displayed), commands are broadcast to all clients in
+parallel, and every client keeps a small pool of keep-alive connections and
+its own latency stats.
+
+    python wall-controller.py --endpoint http://wall-01:9500 --endpoint http://wall-02:9500 --status
+    python wall-controller.py --endpoints walls.txt --bench
+    python wall-controller.py --spawn-mocks 20 --bench     # 20 local mock-server.py instances
+
+--endpoints FILE lists one client per line, "URL [TOKEN]"; --token is used
+where the token is omitted. Lines starting with # are ignored.
+
+Use it as a library by loading this file (e.g. importlib) and driving
+WallController: upsert_overlay(), delete_overlay(), broadcast(), stats().
+
+No third-party dependencies.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import math
+import os
+import queue
+import ssl
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+DEFAULT_TOKEN = "334e559dea1c4930009ec24709c6d6ce"
+MAX_OVERLAYS_PER_CAMERA = 32  # OverlayManager.MaxOverlaysPerCamera
+
+
+class C:
+    YEL = "\033[33m"
+    CYAN = "\033[36m"
+    GREEN = "\033[32m"
+    RED = "\033[31m"
+    GRAY = "\033[90m"
+    BOLD = "\033[1m"
+    OFF = "\033[0m"
+
+
+def banner(text: str, color: str = C.YEL) -> None:
+    bar = "=" * 60
+    print(f"\n{color}{bar}{C.OFF}")
+    print(f"{color}{C.BOLD} {text}{C.OFF}")
+    print(f"{color}{bar}{C.OFF}")
+
+
+def ok(msg: str) -> None: print(f"  {C.GREEN}✓{C.OFF} {msg}")
+def fail(msg: str) -> None: print(f"  {C.RED}✗{C.OFF} {msg}")
+def info(msg: str) -> None: print(f"  {C.GRAY}-{C.OFF} {msg}")
+
+
+def _percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(math.ceil(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Endpoints
+# ────────────────────────────────────────────────────────────────────────────
+
+class Endpoint:
+    """One wall client: a bounded pool of keep-alive connections plus the
+    latency of every request sent through it."""
+
+    def __init__(self, base: str, token: str, pool_size: int = 4, name: str | None = None):
+        self.base = base.rstrip("/")
+        self.url = urllib.parse.urlparse(self.base)
+        self.name = name or self.url.netloc
+        self.token = token
+        self.pool_size = pool_size
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self.latencies: deque[float] = deque(maxlen=4096)
+        self.requests = 0
+        self.errors = 0
+        # Cameras on screen at the last refresh; None when the client has no
+        # /api/cameras/displayed (older plugin), so every overlay is sent to it.
+        self.displayed: set[str] | None = set()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.url.scheme == "https":
+            ctx = ssl.create_default_context()
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE  # self-signed PFX is the common case
+            return http.client.HTTPSConnection(self.url.hostname, self.url.port or 443, timeout=15, context=ctx)
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=15)
+
+    def request(self, method: str, path: str, body: dict | None = None) -> tuple[int, Any]:
+        """Send one request on a pooled connection. Returns (status, payload);
+        status 0 means the client could not be reached. A body that is not
+        JSON comes back as text, with the real status."""
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"}
+        t0 = time.perf_counter()
+        status, payload = 0, None
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn, reused = self._connect(), False
+            for attempt in (0, 1):
+                try:
+                    # bytes body: headers and body leave in one segment (no Nagle stall).
+                    conn.request(method, self.base_path + path, body=data, headers=headers)
+                    resp = conn.getresponse()
+                    raw = resp.read()
+                    status = resp.status
+                    self._idle.put(conn)
+                    try:
+                        payload = json.loads(raw) if raw else None
+                    except ValueError:
+                        payload = raw.decode("utf-8", "replace")
+                    break
+                except (http.client.HTTPException, OSError) as ex:
+                    conn.close()
+                    # A pooled connection may have been closed by the server
+                    # while idle; retry once on a fresh one.
+                    if attempt == 0 and reused:
+                        conn, reused = self._connect(), False
+                        continue
+                    status, payload = 0, {"error": f"{type(ex).__name__}: {ex}"}
+                    break
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self.requests += 1
+            self.errors += status == 0 or status >= 500
+            self.latencies.append(ms)
+        return status, payload
+
+    @property
+    def base_path(self) -> str:
+        return self.url.path.rstrip("/")
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def row(self) -> dict[str, Any]:
+        with self._lock:
+            lat = list(self.latencies)
+            requests, errors = self.requests, self.errors
+        return {
+            "endpoint": self.name, "requests": requests, "errors": errors,
+            "p50": _percentile(lat, 50), "p95": _percentile(lat, 95), "max": max(lat) if lat else 0.0,
+            "displayed": len(self.displayed) if self.displayed is not None else None,
+        }
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Controller
+# ────────────────────────────────────────────────────────────────────────────
+
+class WallController:
+    """Routes overlays to the wall clients that show their camera and
+    broadcasts everything else. The controller keeps the last upsert of every
+    overlay it placed; when a refresh finds a camera newly on screen at a
+    client, that client gets the camera's current overlays, so views can
+    change under the dashboard without losing overlays."""
+
+    def __init__(self, endpoints: list[Endpoint], refresh_interval: float = 2.0):
+        if not endpoints:
+            raise ValueError("at least one endpoint is required")
+        self.endpoints = endpoints
+        self.refresh_interval = refresh_interval
+        self._executor = ThreadPoolExecutor(max_workers=sum(ep.pool_size for ep in endpoints),
+                                            thread_name_prefix="wall")
+        self._lock = threading.Lock()
+        # overlay id -> (request body, expires at (monotonic) or None)
+        self._overlays: dict[str, tuple[dict, float | None]] = {}
+        # overlay id -> endpoints holding a copy
+        self._placed: dict[str, set[Endpoint]] = {}
+        self._stop = threading.Event()
+        self._refresher: threading.Thread | None = None
+
+    # ── lifecycle ──
+
+    def start(self) -> "WallController":
+        """Resolve displayed cameras once, then keep them fresh in the background."""
+        self.refresh()
+        if self.refresh_interval > 0:
+            self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._refresher.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=True)
+        for ep in self.endpoints:
+            ep.close()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except RuntimeError:
+                return  # executor shut down under us
+
+    # ── fan-out ──
+
+    def _fan(self, calls: list[tuple[Endpoint, str, str, dict | None]]) -> dict[Endpoint, tuple[int, Any]]:
+        """Send all calls concurrently and wait for every answer."""
+        if len(calls) == 1:
+            ep, method, path, body = calls[0]
+            return {ep: ep.request(method, path, body)}
+        futures = {self._executor.submit(ep.request, method, path, body): ep for ep, method, path, body in calls}
+        return {ep: f.result() for f, ep in futures.items()}
+
+    def broadcast(self, method: str, path: str, body: dict | None = None) -> dict[Endpoint, tuple[int, Any]]:
+        """Send the same request to every wall client at once."""
+        return self._fan([(ep, method, path, body) for ep in self.endpoints])
+
+    # ── routing ──
+
+    def refresh(self) -> None:
+        """Re-read which cameras every client shows, and push the current
+        overlays of cameras that appeared on a client since the last refresh."""
+        results = self.broadcast("GET", "/api/cameras/displayed")
+        resync: list[tuple[Endpoint, str, str, dict | None]] = []
+        now = time.monotonic()
+        with self._lock:
+            for ep, (status, payload) in results.items():
+                if status == 404:
+                    ep.displayed = None  # no displayed-camera route: send it everything
+                    continue
+                if status != 200 or not isinstance(payload, list):
+                    continue  # unreachable: keep the last known set
+                shown = {item.get("cameraId") for item in payload}
+                appeared = shown - (ep.displayed or set())
+                ep.displayed = shown
+                if not appeared:
+                    continue
+                for overlay_id, (body, expires) in self._overlays.items():
+                    if body["cameraId"] in appeared and ep not in self._placed.get(overlay_id, set()):
+                        if expires is not None and expires <= now:
+                            continue
+                        resync.append((ep, "POST", "/api/overlays", self._with_remaining_ttl(body, expires, now)))
+                        self._placed.setdefault(overlay_id, set()).add(ep)
+        if resync:
+            self._fan(resync)
+
+    def targets(self, camera_id: str) -> list[Endpoint]:
+        """Clients that show camera_id, plus clients that cannot tell."""
+        with self._lock:
+            return [ep for ep in self.endpoints if ep.displayed is None or camera_id in ep.displayed]
+
+    @staticmethod
+    def _with_remaining_ttl(body: dict, expires: float | None, now: float) -> dict:
+        if expires is None:
+            return body
+        return {**body, "ttlSeconds": max(1, math.ceil(expires - now))}
+
+    def upsert_overlay(self, overlay_id: str, camera_id: str, svg: str, ttl_seconds: int | None = None,
+                       z_order: int | None = None) -> dict[Endpoint, tuple[int, Any]]:
+        """Upsert on the clients showing the camera. With no such client the
+        overlay is only remembered, and sent when a client starts showing it."""
+        body: dict[str, Any] = {"overlayId": overlay_id, "cameraId": camera_id, "svg": svg}
+        if ttl_seconds is not None:
+            body["ttlSeconds"] = ttl_seconds
+        if z_order is not None:
+            body["zOrder"] = z_order
+        targets = self.targets(camera_id)
+        with self._lock:
+            expires = time.monotonic() + ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+            previous = self._overlays.get(overlay_id)
+            self._overlays[overlay_id] = (body, expires)
+            placed = self._placed.get(overlay_id, set())
+            # Moved to another camera: drop copies from clients that no longer need one.
+            stale = [ep for ep in placed if ep not in targets] if previous and previous[0]["cameraId"] != camera_id else []
+            self._placed[overlay_id] = (placed - set(stale)) | set(targets)
+
+        calls = [(ep, "POST", "/api/overlays", body) for ep in targets]
+        calls += [(ep, "DELETE", "/api/overlays/" + urllib.parse.quote(overlay_id, safe=""), None) for ep in stale]
+        return self._fan(calls) if calls else {}
+
+    def delete_overlay(self, overlay_id: str) -> dict[Endpoint, tuple[int, Any]]:
+        with self._lock:
+            self._overlays.pop(overlay_id, None)
+            placed = self._placed.pop(overlay_id, set())
+        path = "/api/overlays/" + urllib.parse.quote(overlay_id, safe="")
+        return self._fan([(ep, "DELETE", path, None) for ep in placed]) if placed else {}
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [ep.row() for ep in self.endpoints]
+
+
+def print_stats(wall: WallController) -> None:
+    print(f"\n  {'endpoint':24} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'on screen':>9}")
+    for row in wall.stats():
+        shown = "?" if row["displayed"] is None else str(row["displayed"])
+        print(f"  {row['endpoint'][:24]:24} {row['requests']:8d} {row['errors']:6d} {row['p50']:8.2f} "
+              f"{row['p95']:8.2f} {row['max']:8.2f} {shown:>9}")
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Benchmark
+# ────────────────────────────────────────────────────────────────────────────
+
+def status_svg(label: str, value: float) -> str:
+    width = max(0.0, min(100.0, value)) * 2.4
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 320 60">'
+            f'<rect x="10" y="10" width="300" height="40" rx="6" fill="#000" fill-opacity="0.55"/>'
+            f'<rect id="bar" x="70" y="22" width="{width:.1f}" height="16" fill="#2ecc71"/>'
+            f'<text id="label" x="18" y="36" font-size="14" fill="#fff">{label}</text></svg>')
+
+
+def bench(wall: WallController, updates: int = 100) -> None:
+    """Push the same dashboard updates twice: first the naive way, one
+    request after another to every client, then routed and concurrent
+    through the controller. Also times a broadcast against a serial loop."""
+    n = len(wall.endpoints)
+    banner(f"Benchmark: {n} wall clients, {updates} overlay updates", C.GREEN)
+    shown = sorted({cam for ep in wall.endpoints for cam in (ep.displayed or ())})
+    if not shown:
+        status, cams = wall.endpoints[0].request("GET", "/api/cameras")
+        shown = [c["id"] for c in cams[:n * 4]] if status == 200 and isinstance(cams, list) else []
+    if not shown:
+        fail("no cameras to put overlays on")
+        return
+    info(f"{len(shown)} cameras on screen across the wall")
+    plan = [(f"wall-bench-{i % (len(shown) * 4)}", shown[i % len(shown)], i % 100) for i in range(updates)]
+
+    rows = []
+    # Naive: every update to every client, one at a time.
+    latencies, sent = [], 0
+    for overlay_id, cam, value in plan:
+        t0 = time.perf_counter()
+        for ep in wall.endpoints:
+            ep.request("POST", "/api/overlays", {"overlayId": overlay_id, "cameraId": cam,
+                                                 "svg": status_svg(cam[:8], value), "ttlSeconds": 60})
+            sent += 1
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    rows.append(("serial, all clients", latencies, sent))
+    for overlay_id in {p[0] for p in plan}:
+        wall.broadcast("DELETE", "/api/overlays/" + overlay_id)
+
+    # Routed: only the clients showing the camera, concurrently.
+    latencies, sent = [], 0
+    for overlay_id, cam, value in plan:
+        t0 = time.perf_counter()
+        sent += len(wall.upsert_overlay(overlay_id, cam, status_svg(cam[:8], value), ttl_seconds=60))
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    rows.append(("routed fan-out", latencies, sent))
+    for overlay_id in {p[0] for p in plan}:
+        wall.delete_overlay(overlay_id)
+
+    # Broadcast of a harmless command, serial vs concurrent.
+    latencies = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        for ep in wall.endpoints:
+            ep.request("GET", "/api/status")
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    rows.append(("serial broadcast", latencies, 20 * n))
+    latencies = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        wall.broadcast("GET", "/api/status")
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    rows.append(("concurrent broadcast", latencies, 20 * n))
+
+    print(f"\n  {'mode':22} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name, lat, sent in rows:
+        print(f"  {name:22} {sent:8d} {_percentile(lat, 50):8.2f} {_percentile(lat, 95):8.2f} {max(lat):8.2f}")
+    info("times are per update (or per broadcast) until every targeted client answered")
+    print_stats(wall)
+
+
+# ────────────────────────────────────────────────────────────────────────────
+# Entry
+# ────────────────────────────────────────────────────────────────────────────
+
+def read_endpoints(path: str, token: str) -> list[tuple[str, str]]:
+    result = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split("#", 1)[0].split()
+            if parts:
+                result.append((parts[0], parts[1] if len(parts) > 1 else token))
+    return result
+
+
+def spawn_mocks(count: int, port: int, token: str, latency_ms: float, cameras: int) -> list[subprocess.Popen]:
+    """Start `count` mock servers on consecutive ports. Each shows its own 4
+    cameras, like the clients of one wall each showing a 2x2 grid."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock-server.py")
+    procs = []
+    for i in range(count):
+        args = [sys.executable, script, "--quiet", "--port", str(port + i), "--token", token,
+                "--cameras", str(cameras), "--displayed", "4", "--displayed-offset", str(4 * i)]
+        if latency_ms > 0:
+            args += ["--latency", f"*={latency_ms:g}"]
+        procs.append(subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    deadline = time.time() + 15
+    for i in range(count):
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port + i}/", timeout=1)
+            except urllib.error.HTTPError:
+                break  # 404 from the mock: it is up
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"mock server on port {port + i} did not start")
+                time.sleep(0.1)
+                continue
+            break
+    return procs
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Fan-out controller for SCRemoteControl video walls")
+    p.add_argument("--endpoint", action="append", default=[], metavar="URL", help="wall client base URL")
+    p.add_argument("--endpoints", metavar="FILE", help='file with one "URL [TOKEN]" per line')
+    p.add_argument("--token", default=DEFAULT_TOKEN, help="token for endpoints listed without one")
+    p.add_argument("--pool", type=int, default=4, help="keep-alive connections per endpoint")
+    p.add_argument("--refresh", type=float, default=2.0, help="seconds between displayed-camera refreshes")
+    p.add_argument("--status", action="store_true", help="print what every client shows and exit")
+    p.add_argument("--bench", action="store_true", help="serial vs fan-out overlay updates and broadcasts")
+    p.add_argument("--bench-updates", type=int, default=100)
+    p.add_argument("--spawn-mocks", type=int, default=0, metavar="N",
+                   help="start N local mock-server.py instances and use them as the wall")
+    p.add_argument("--mock-port", type=int, default=9600, help="first port for --spawn-mocks")
+    p.add_argument("--mock-latency", type=float, default=2.0, metavar="MS",
+                   help="per-request delay of the spawned mocks, standing in for the network")
+    args = p.parse_args()
+    if not (args.status or args.bench):
+        p.error("nothing to do: use --status or --bench")
+
+    specs = [(url, args.token) for url in args.endpoint]
+    if args.endpoints:
+        specs += read_endpoints(args.endpoints, args.token)
+    procs = []
+    if args.spawn_mocks:
+        procs = spawn_mocks(args.spawn_mocks, args.mock_port, args.token, args.mock_latency,
+                            max(2000, 4 * args.spawn_mocks))
+        specs += [(f"http://127.0.0.1:{args.mock_port + i}", args.token) for i in range(args.spawn_mocks)]
+    if not specs:
+        p.error("no endpoints: use --endpoint, --endpoints or --spawn-mocks")
+
+    wall = WallController([Endpoint(url, token, args.pool) for url, token in specs], args.refresh)
+    try:
+        wall.start()
+        print(f"{C.BOLD}SCRemoteControl wall controller{C.OFF}")
+        print(f"  endpoints: {len(wall.endpoints)}  pool: {args.pool}  refresh: {args.refresh:g}s")
+        if args.bench:
+            bench(wall, args.bench_updates)
+        if args.status:
+            results = wall.broadcast("GET", "/api/status")
+            for ep, (status, payload) in results.items():
+                if status == 200 and isinstance(payload, dict):
+                    shown = "?" if ep.displayed is None else len(ep.displayed)
+                    ok(f"{ep.name}: {payload.get('mode')}, {shown} cameras on screen")
+                else:
+                    fail(f"{ep.name}: {status} {payload}")
+            print_stats(wall)
+    finally:
+        wall.close()
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())